@@ -10,6 +10,8 @@ class Settings(BaseSettings):
     OPENAI_ROUTER_MODEL: str = "gpt-4.1-mini"
     OPENAI_DISTILL_MODEL: str = "gpt-4.1"
     OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    OPENAI_MAX_CONNECTIONS: int = 100  # Shared OpenAI HTTP pool (all services in the process)
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 20
     ALLOWED_ORIGINS: str = "http://localhost:3000"
     
     # R2 settings - support both naming conventions
@@ -22,11 +24,94 @@ class Settings(BaseSettings):
     R2_ACCOUNT_ID: Optional[str] = None
     R2_BUCKET_NAME: Optional[str] = None
     R2_API_TOKEN_VALUE: Optional[str] = None
+    R2_MAX_CONCURRENCY: int = 8  # Storage calls in flight per worker process (async endpoints)
+    R2_MULTIPART_THRESHOLD_BYTES: int = 8 * 1024 * 1024  # Larger uploads are streamed as multipart uploads
+    R2_MULTIPART_CHUNK_BYTES: int = 8 * 1024 * 1024
+    R2_MULTIPART_CONCURRENCY: int = 4  # Parts uploaded at once per file
+    R2_STUB: bool = False  # In-memory object store instead of R2 (local development/tests)
     
     JWT_SECRET_KEY: str = "your-secret-key-change-in-production"
     JWT_ALGORITHM: str = "HS256"
     GROQ_API_KEY: str = ""
     
+    # Shared university/major catalog snapshot (app/services/catalog_service.py)
+    CATALOG_TTL_SECONDS: float = 900.0  # Safety-net reload for writes made by other workers
+    
+    # DBQueryService.find_program_intakes: log the per-filter count funnel (extra COUNT per filter; debugging only)
+    DB_QUERY_TRACE: bool = False
+    
+    # Session state: chat history + partner conversation caches (app/services/session_store.py)
+    SESSION_STORE_BACKEND: str = "memory"  # "memory" (single worker) or "postgres" (shared by all workers)
+    SESSION_STORE_MAX_ENTRIES: int = 50000  # memory backend: LRU entry cap
+    SESSION_STORE_MAX_BYTES: int = 64 * 1024 * 1024  # memory backend: pickled size budget
+    SESSION_HISTORY_TTL_SECONDS: float = 86400.0  # Chat history kept for idle sessions
+    SESSION_STORE_PURGE_SECONDS: float = 600.0  # postgres backend: how often expired session_state rows are deleted
+    
+    # Query embedding cache for RAG retrieval (app/services/embedding_cache.py)
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 5000  # In-memory LRU size (~6KB per text-embedding-3-small vector)
+    EMBEDDING_CACHE_PERSISTENT: bool = False  # Also use the query_embedding_cache table (migrate_query_embedding_cache.py)
+    RAG_PREPARED_STATEMENTS: bool = True  # PREPARE the retrieval query per connection (disable behind transaction-mode pgbouncer)
+    RAG_HYBRID_SEARCH: bool = True  # Fuse full-text (tsvector) and vector rankings in RAG retrieval (migrate_rag_fulltext_index.py)
+    RAG_HYBRID_CANDIDATES: int = 20  # Candidates taken from each ranking before fusion
+    RAG_RRF_K: int = 60  # Reciprocal rank fusion constant: score = sum of 1 / (RAG_RRF_K + rank)
+    EMBEDDING_BATCH_MAX_INPUTS: int = 512  # RAG ingestion: inputs per embeddings request (API limit 2048)
+    EMBEDDING_BATCH_MAX_TOKENS: int = 200000  # RAG ingestion: tokens per embeddings request (API limit 300k)
+    RAG_CHUNK_MAX_TOKENS: int = 300  # RAG ingestion: chunk size in tiktoken tokens (app/services/chunker.py)
+    RAG_CHUNK_OVERLAP_TOKENS: int = 40  # Overlap when a single paragraph/Q&A is larger than a chunk
+    
+    # Semantic cache of profile-independent SalesAgent RAG answers (app/services/response_cache.py)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2000
+    RESPONSE_CACHE_TTL_SECONDS: float = 3600.0
+    RESPONSE_CACHE_SIMILARITY: float = 0.95  # Minimum cosine similarity of question embeddings for a hit
+    RESPONSE_CACHE_VERSION_CHECK_SECONDS: float = 30.0  # How often the rag_sources fingerprint is re-read
+    
+    # PDF text extraction (app/services/pdf_text_extractor.py)
+    PDF_EXTRACTION_WORKERS: int = 4  # Process pool size for large PDFs
+    PDF_PARALLEL_MIN_PAGES: int = 8  # Smaller PDFs are extracted in-process (no pool overhead)
+    PDF_OCR_ENABLED: bool = True  # OCR pages without a text layer (needs poppler + tesseract)
+    PDF_OCR_DPI: int = 200  # Render resolution for OCR
+    PDF_OCR_MAX_PIXELS: int = 12000000  # Per-page image cap; DPI is lowered for large page sizes
+    PDF_OCR_MIN_TEXT_CHARS: int = 20  # Pages with less extracted text than this are OCR'd
+    
+    # Admin document import: LLM extraction (app/services/document_extraction_service.py)
+    DOCUMENT_EXTRACTION_CHUNK_CHARS: int = 60000  # Larger documents are extracted in parts (map-reduce), never truncated
+    DOCUMENT_EXTRACTION_MAX_CONCURRENCY: int = 4  # Parts extracted at once
+    DOCUMENT_EXTRACTION_PREAMBLE_CHARS: int = 3000  # Start of the document sent with every part (university name, shared fees)
+    DATA_INGESTION_BULK: bool = True  # Set-based ingestion of extracted data (falls back to row by row on error)
+    
+    # Tavily web search (app/services/tavily_service.py)
+    TAVILY_CACHE_TTL_SECONDS: float = 1800.0  # Search results are reused for this long (normalized query)
+    TAVILY_CACHE_MAX_ENTRIES: int = 1000
+    TAVILY_MAX_CONCURRENCY: int = 8  # Concurrent per-domain searches per worker process
+    TAVILY_STUB: bool = False  # Use StubTavilyClient (no network, no results) - local development/tests
+    
+    # Background jobs for admin document import (app/services/job_runner.py)
+    JOB_MAX_CONCURRENCY: int = 2  # Jobs running at once per worker process
+    JOB_POLL_SECONDS: float = 5.0  # Maintenance loop: heartbeats, picking up queued/orphaned jobs, expiry
+    JOB_STALE_SECONDS: float = 120.0  # A running job without a heartbeat for this long is requeued
+    JOB_MAX_ATTEMPTS: int = 2  # Runs per job (a crashed worker counts as an attempt)
+    JOB_RETENTION_SECONDS: float = 86400.0  # Finished jobs (and their results) are deleted after this
+    JOB_INGEST_WAIT_SECONDS: float = 30.0  # Synchronous /ingest-data waits this long, then returns 202 + job_id
+    
+    # Agent turn executor (app/services/agent_executor.py)
+    AGENT_MAX_CONCURRENCY: int = 8  # Agent turns running at once per worker process
+    AGENT_MAX_QUEUE: int = 32  # Turns allowed to wait for a free slot before returning 503
+    AGENT_TURN_TIMEOUT_SECONDS: float = 180.0  # 0 disables the timeout
+    
+    # PartnerAgent slot extraction (app/services/partner_agent.py)
+    PARTNER_RULES_FIRST: bool = True  # Skip the LLM extraction call when the rule parsers fully explain a fresh query
+    
+    # SalesAgent turn stages (app/services/turn_stages.py)
+    TURN_STAGE_WORKERS: int = 16  # Threads for concurrent per-turn stages (profile extraction, query embeddings) per worker process
+    SALES_SPECULATIVE_RETRIEVAL: bool = True  # Prefetch FAQ match / cached answer / RAG chunks for the likely route while the profile is extracted
+    
+    # Profile state extraction (app/services/profile_state.py)
+    INCREMENTAL_PROFILE_STATE: bool = True  # Update the stored profile from the newest message only; re-read the history on topic resets
+    
+    # Partner answer templates (app/services/answer_templates.py)
+    PARTNER_TEMPLATE_ANSWERS: bool = True  # Render FEES / requirements / scholarship / details / comparison answers without the LLM formatter
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
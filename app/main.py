@@ -8,6 +8,10 @@ from app.routers import (
 )
 from app.routers import document_verification
 from app.config import settings
+from app.services.agent_executor import agent_executor
+from app.services.job_runner import job_runner
+from app.services.openai_service import close_async_openai_client
+from app.services.session_store import session_store
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,9 +27,17 @@ async def lifespan(app: FastAPI):
         logger.error(f"Error checking database tables: {e}")
         # Don't fail startup if tables already exist
         pass
+    # Background jobs: resume queued jobs and recover jobs orphaned by a previous process
+    job_runner.start()
+    # Session state: periodic purge of expired rows (postgres backend)
+    session_store.start()
     yield
     # Shutdown: cleanup if needed
     logger.info("Shutting down...")
+    agent_executor.shutdown(wait=False)
+    job_runner.stop(wait=False)
+    session_store.stop()
+    await close_async_openai_client()
 
 app = FastAPI(
     title="MalishaEdu AI Enrollment Agent",
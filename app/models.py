@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Date, Boolean, ForeignKey, JSON, Float, Enum as SQLEnum, TypeDecorator, SmallInteger
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Date, Boolean, ForeignKey, JSON, Float, Enum as SQLEnum, TypeDecorator, SmallInteger, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from pgvector.sqlalchemy import Vector
@@ -414,6 +414,7 @@ class RagSource(Base):
     status = Column(Text, nullable=False, default='active')  # active, archived, deprecated
     source_url = Column(Text, nullable=True)
     last_verified_at = Column(DateTime(timezone=True), nullable=True)
+    content_hash = Column(Text, nullable=True)  # SHA-256 of the last ingested text + doc_type/audience/version
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     chunks = relationship("RagChunk", back_populates="source", cascade="all, delete-orphan")
@@ -433,6 +434,15 @@ class RagChunk(Base):
     
     source = relationship("RagSource", back_populates="chunks")
 
+class QueryEmbeddingCache(Base):
+    """Persistent tier of the query embedding cache (app/services/embedding_cache.py)"""
+    __tablename__ = "query_embedding_cache"
+    
+    model = Column(Text, primary_key=True)  # OPENAI_EMBEDDING_MODEL the embedding was made with
+    text_hash = Column(Text, primary_key=True)  # SHA-256 of the normalized query text
+    embedding = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 # Universities table
 class University(Base):
     __tablename__ = "universities"
@@ -885,3 +895,34 @@ class AdminSettings(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     updated_by = Column(Integer, ForeignKey("users.id"))
 
+# Shared session state (app/services/session_store.py, SESSION_STORE_BACKEND=postgres)
+class SessionState(Base):
+    """Pickled agent/session state for one (namespace, key); not a user-facing conversation"""
+    __tablename__ = "session_state"
+    
+    namespace = Column(String, primary_key=True)  # e.g. "partner_state", "chat_history"
+    key = Column(String, primary_key=True)
+    value = Column(LargeBinary, nullable=False)  # pickle
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+# Background jobs (app/services/job_runner.py)
+class BackgroundJob(Base):
+    """Durable admin background job (document import: generate SQL, extract data, ingest data)"""
+    __tablename__ = "background_jobs"
+    
+    id = Column(String(36), primary_key=True)  # uuid4
+    job_type = Column(String, nullable=False, index=True)  # e.g. "extract_data"
+    status = Column(String, nullable=False, default="queued", index=True)  # queued/processing/completed/failed/cancelled
+    progress = Column(Text, nullable=True)  # Human readable progress message
+    params = Column(JSON, nullable=True)  # Small handler arguments (e.g. filename)
+    input_data = Column(LargeBinary, nullable=True)  # Uploaded file; cleared when the job finishes
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    worker_id = Column(String, nullable=True)  # "<hostname>:<pid>" of the process running it
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Refreshed while running; stale = worker died
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,16 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
 import uuid
-import threading
 import asyncio
 from fastapi import Body
 from datetime import datetime, timedelta, timezone
 import re
 import json
-from app.database import get_db
+from app.database import get_db, SessionLocal
+from app.config import settings
 from app.models import (
     User, UserRole, Lead, Complaint, Student, Document, 
     Application, AdminSettings, DocumentType, ApplicationStatus, ProgramIntake, StudentDocument
@@ -23,6 +23,14 @@ from app.services.document_verification_service import DocumentVerificationServi
 from app.services.sql_generator_service import SQLGeneratorService  # DEPRECATED - kept for backward compatibility
 from app.services.document_extraction_service import DocumentExtractionService
 from app.services.data_ingestion_service import DataIngestionService
+from app.services.agent_executor import agent_executor
+from app.services.catalog_service import catalog_service
+from app.services.session_store import session_store
+from app.services.embedding_cache import embedding_cache
+from app.services.response_cache import response_cache
+from app.services.tavily_service import search_cache
+from app.services.job_runner import JobContext, job_runner
+from app.services.stats import all_metrics as counters_metrics
 from app.schemas.document_import import ExtractedData
 from fastapi import UploadFile, File, Form
 from typing import Tuple
@@ -31,14 +39,6 @@ from PIL import Image
 
 router = APIRouter()
 
-# In-memory job store for SQL generation (use Redis in production for persistence)
-sql_generation_jobs: Dict[str, Dict[str, Any]] = {}
-sql_jobs_lock = threading.Lock()
-
-# In-memory job store for data extraction (use Redis in production for persistence)
-extraction_jobs: Dict[str, Dict[str, Any]] = {}
-extraction_jobs_lock = threading.Lock()
-
 # Initialize new services
 document_extraction_service = DocumentExtractionService()
 
@@ -126,6 +126,23 @@ async def get_admin_stats(
         }
     }
 
+@router.get("/metrics")
+async def get_runtime_metrics(
+    current_user: User = Depends(require_admin)
+):
+    """Runtime metrics for this worker process (agent turn queue depth, timeouts, ...)"""
+    return {
+        "agent_executor": agent_executor.metrics(),
+        "session_store": session_store.metrics(),
+        "embedding_cache": embedding_cache.metrics(),
+        "response_cache": response_cache.metrics(),
+        "tavily_cache": search_cache.metrics(),
+        "background_jobs": job_runner.metrics(),
+        # Counters registered by the agents: partner_routing, sales_speculation, profile_state,
+        # prompt_cache, partner_templates
+        **counters_metrics()
+    }
+
 @router.get("/leads")
 async def get_leads(
     days: int = 7,
@@ -1231,7 +1248,7 @@ async def verify_and_upload_document_admin(
     
     # Upload temporarily to get URL for verification
     try:
-        temp_url = r2_service.upload_file(
+        temp_url = await r2_service.upload_file_async(
             file=file_content,
             filename=file.filename,
             folder="temp"
@@ -1259,7 +1276,7 @@ async def verify_and_upload_document_admin(
     if verification_result["status"] != "ok":
         # Delete temp file - verification failed, don't keep it
         try:
-            r2_service.delete_file(temp_url)
+            await r2_service.delete_file_async(temp_url)
         except Exception as e:
             print(f"⚠️  Warning: Could not delete temp file {temp_url}: {e}")
         
@@ -1270,31 +1287,25 @@ async def verify_and_upload_document_admin(
             detail=error_message
         )
     
-    # If verified, upload to "verified" folder
+    # If verified, move the temp object to the "verified" folder (server-side copy, no second upload)
     try:
-        verified_url = r2_service.upload_file(
-            file=file_content,
-            filename=file.filename,
-            folder="verified"
+        verified_url = await r2_service.move_file_async(
+            temp_url,
+            folder="verified",
+            filename=file.filename
         )
     except Exception as e:
         error_msg = str(e)
-        # Try to delete temp file even if verified upload fails
+        # Try to delete temp file even if the copy fails
         try:
-            r2_service.delete_file(temp_url)
+            await r2_service.delete_file_async(temp_url)
         except:
             pass
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to upload verified file to R2 storage: {error_msg}"
+            detail=f"Failed to store verified file in R2 storage: {error_msg}"
         )
     
-    # Delete temp file
-    try:
-        r2_service.delete_file(temp_url)
-    except:
-        pass
-    
     # Save to student_documents table
     student_doc = StudentDocument(
         student_id=student.id,
@@ -1386,7 +1397,7 @@ async def delete_student_document_admin(
     # Delete from Cloudflare R2
     if document.r2_url:
         try:
-            r2_service.delete_file(document.r2_url)
+            await r2_service.delete_file_async(document.r2_url)
         except Exception as e:
             print(f"Error deleting file from R2: {e}")
             # Continue with DB deletion even if R2 deletion fails
@@ -1472,8 +1483,9 @@ async def generate_sql_from_document(
         # Read file content
         file_content = await file.read()
         
-        # Extract text from document
-        document_text = sql_generator_service.extract_text_from_document(
+        # Extract text from document (CPU bound, OCR for scans) off the event loop
+        document_text = await asyncio.to_thread(
+            sql_generator_service.extract_text_from_document,
             file_content, 
             file.filename or "document"
         )
@@ -1606,145 +1618,81 @@ async def generate_sql_from_document(
             detail=f"Failed to generate SQL: {str(e)}"
         )
 
+def _job_status(job_id: str, job_type: str) -> Dict[str, Any]:
+    job = job_runner.get(job_id)
+    if job is None or job["job_type"] != job_type:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def _started_job(job_id: str, message: str) -> Dict[str, Any]:
+    """Start-endpoint response with the job's stored status (usually "queued")"""
+    job = job_runner.get(job_id) or {}
+    return {
+        "job_id": job_id,
+        "status": job.get("status", "queued"),
+        "progress": job.get("progress"),
+        "message": message
+    }
+
+def generate_sql_job(ctx: JobContext) -> Dict[str, Any]:
+    """Background job: extract text and generate SQL (runs on the job worker pool)"""
+    ctx.progress("Extracting text from document...")
+    document_text = sql_generator_service.extract_text_from_document(
+        ctx.input_data,
+        ctx.params.get("filename") or "document"
+    )
+    
+    if not document_text.strip():
+        raise ValueError("No text content could be extracted from the document")
+    
+    ctx.progress("Generating SQL with AI (this may take 60-120 seconds)...")
+    sql_script = sql_generator_service.generate_sql_from_text(document_text)
+    ctx.check_cancelled()
+    
+    # Check if SQL generation returned empty or error SQL
+    if not sql_script or not sql_script.strip():
+        raise ValueError("SQL generation returned empty result. Please check the document content and try again.")
+    
+    if sql_script.strip().startswith('-- SQL Generation Error'):
+        error_match = re.search(r'SQL Generation Error:\s*([^\n]+)', sql_script)
+        raise ValueError(error_match.group(1).strip() if error_match else "SQL generation failed due to an unknown error")
+    
+    # Validate SQL
+    validation = sql_generator_service.validate_sql(sql_script)
+    print(f"✅ [Job {ctx.job_id}] SQL generation completed successfully: {len(sql_script)} characters")
+    return {
+        "sql": sql_script,
+        "validation": {
+            "valid": bool(validation.get('valid', False)),
+            "errors": list(validation.get('errors', [])),
+            "warnings": list(validation.get('warnings', []))
+        },
+        "document_text_preview": document_text[:500] + "..." if len(document_text) > 500 else document_text
+    }
+
+job_runner.register("generate_sql", generate_sql_job)
+
 @router.post("/document-import/generate-sql-start")
 async def start_sql_generation(
     file: UploadFile = File(...),
-    current_user: User = Depends(require_admin),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    current_user: User = Depends(require_admin)
 ):
-    """Start SQL generation in background, return job ID immediately (< 1 second)"""
-    import asyncio
-    
-    # Generate unique job ID
-    job_id = str(uuid.uuid4())
-    
-    # Read file content before starting background task
+    """Start SQL generation as a background job, return job ID immediately (< 1 second)"""
     file_content = await file.read()
-    filename = file.filename or "document"
-    
-    # Initialize job status
-    with sql_jobs_lock:
-        sql_generation_jobs[job_id] = {
-            "status": "processing",
-            "progress": "Reading document...",
-            "result": None,
-            "error": None,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-    
-    # Start background task
-    background_tasks.add_task(
-        generate_sql_background,
-        job_id,
+    job_id = await asyncio.to_thread(
+        job_runner.submit,
+        "generate_sql",
+        {"filename": file.filename or "document"},
         file_content,
-        filename
+        current_user.id,
+        "Reading document..."
     )
     
     print(f"🚀 Started SQL generation job: {job_id}")
-    return {
-        "job_id": job_id,
-        "status": "processing",
-        "message": "SQL generation started. Poll /generate-sql-status/{job_id} for results."
-    }
-
-async def generate_sql_background(job_id: str, file_content: bytes, filename: str):
-    """Background task to generate SQL"""
-    import asyncio
-    
-    try:
-        # Update progress
-        with sql_jobs_lock:
-            if job_id in sql_generation_jobs:
-                sql_generation_jobs[job_id]["progress"] = "Extracting text from document..."
-        
-        # Extract text from document
-        document_text = sql_generator_service.extract_text_from_document(
-            file_content,
-            filename
-        )
-        
-        if not document_text.strip():
-            with sql_jobs_lock:
-                if job_id in sql_generation_jobs:
-                    sql_generation_jobs[job_id].update({
-                        "status": "failed",
-                        "error": "No text content could be extracted from the document"
-                    })
-            return
-        
-        # Update progress
-        with sql_jobs_lock:
-            if job_id in sql_generation_jobs:
-                sql_generation_jobs[job_id]["progress"] = "Generating SQL with AI (this may take 60-120 seconds)..."
-        
-        # Generate SQL (this can take a long time with LLM)
-        print(f"🔄 [Job {job_id}] Starting SQL generation...")
-        sql_script = await asyncio.to_thread(
-            sql_generator_service.generate_sql_from_text,
-            document_text
-        )
-        print(f"✅ [Job {job_id}] SQL generation completed")
-        
-        # Check if SQL generation returned empty or error SQL
-        if not sql_script or not sql_script.strip():
-            with sql_jobs_lock:
-                if job_id in sql_generation_jobs:
-                    sql_generation_jobs[job_id].update({
-                        "status": "failed",
-                        "error": "SQL generation returned empty result. Please check the document content and try again."
-                    })
-            return
-        
-        # Check if it's an error SQL
-        if sql_script.strip().startswith('-- SQL Generation Error'):
-            error_match = re.search(r'SQL Generation Error:\s*([^\n]+)', sql_script)
-            error_msg = error_match.group(1).strip() if error_match else "SQL generation failed due to an unknown error"
-            with sql_jobs_lock:
-                if job_id in sql_generation_jobs:
-                    sql_generation_jobs[job_id].update({
-                        "status": "failed",
-                        "error": error_msg
-                    })
-            return
-        
-        # Validate SQL
-        validation = sql_generator_service.validate_sql(sql_script)
-        
-        # Create validation dict
-        validation_dict = {
-            "valid": bool(validation.get('valid', False)),
-            "errors": list(validation.get('errors', [])),
-            "warnings": list(validation.get('warnings', []))
-        }
-        
-        # Store result
-        with sql_jobs_lock:
-            if job_id in sql_generation_jobs:
-                sql_generation_jobs[job_id].update({
-                    "status": "completed",
-                    "progress": "Complete",
-                    "result": {
-                        "sql": sql_script,
-                        "validation": validation_dict,
-                        "document_text_preview": document_text[:500] + "..." if len(document_text) > 500 else document_text
-                    }
-                })
-        
-        print(f"✅ [Job {job_id}] SQL generation completed successfully: {len(sql_script)} characters")
-        
-    except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        error_msg = str(e)
-        print(f"❌ [Job {job_id}] SQL generation failed: {error_msg}")
-        print(f"Traceback: {error_trace}")
-        
-        with sql_jobs_lock:
-            if job_id in sql_generation_jobs:
-                sql_generation_jobs[job_id].update({
-                    "status": "failed",
-                    "error": error_msg
-                })
+    return await asyncio.to_thread(
+        _started_job, job_id,
+        "SQL generation started. Poll /generate-sql-status/{job_id} for results."
+    )
 
 @router.get("/document-import/generate-sql-status/{job_id}")
 async def get_sql_generation_status(
@@ -1752,13 +1700,7 @@ async def get_sql_generation_status(
     current_user: User = Depends(require_admin)
 ):
     """Get SQL generation job status"""
-    with sql_jobs_lock:
-        if job_id not in sql_generation_jobs:
-            raise HTTPException(status_code=404, detail="Job not found")
-        
-        job = sql_generation_jobs[job_id].copy()
-    
-    return job
+    return await asyncio.to_thread(_job_status, job_id, "generate_sql")
 
 @router.post("/document-import/execute-sql")
 async def execute_generated_sql(
@@ -1934,6 +1876,7 @@ async def execute_generated_sql(
             
             # Commit transaction
             db.commit()
+            catalog_service.invalidate()
             
             # Only show success if program_intakes were actually populated
             if total_intakes == 0:
@@ -1969,6 +1912,7 @@ async def execute_generated_sql(
             # For INSERT/UPDATE/DELETE, get rowcount
             rows_affected = result.rowcount if hasattr(result, 'rowcount') else 0
             db.commit()
+            catalog_service.invalidate()
             
             print(f"✅ SQL executed successfully. Rows affected: {rows_affected}")
             
@@ -2002,128 +1946,101 @@ class DataIngestionRequest(BaseModel):
     """Request to ingest extracted data"""
     extracted_data: Dict[str, Any]
 
+def extract_data_job(ctx: JobContext) -> Dict[str, Any]:
+    """Background job: extract text and structured data from a document (runs on the job worker pool)"""
+    ctx.progress("Extracting text from document...")
+    document_text = document_extraction_service.extract_text_from_document(
+        ctx.input_data,
+        ctx.params.get("filename") or "document"
+    )
+    
+    if not document_text.strip():
+        raise ValueError("No text content could be extracted from the document")
+    
+    ctx.progress("Extracting structured data with AI (this may take 60-120 seconds)...")
+    extracted_data = document_extraction_service.extract_data_from_text(document_text)
+    ctx.check_cancelled()
+    
+    # Validate extracted data
+    try:
+        validated_data = ExtractedData(**extracted_data)
+        extracted_data = validated_data.dict()
+    except Exception as validation_error:
+        print(f"⚠️  [Job {ctx.job_id}] Validation warning: {validation_error}")
+        # Continue with extracted data even if validation fails (will be caught during ingestion)
+    
+    # Count majors (handle both formats: individual majors or major_groups)
+    majors_count = 0
+    if extracted_data.get('majors'):
+        majors_count = len(extracted_data.get('majors', []))
+    elif extracted_data.get('major_groups'):
+        for group in extracted_data.get('major_groups', []):
+            majors_count += len(group.get('major_names', []))
+    print(f"✅ [Job {ctx.job_id}] Data extraction completed successfully: {majors_count} majors")
+    
+    return {
+        "extracted_data": extracted_data,
+        "document_text_preview": document_text[:500] + "..." if len(document_text) > 500 else document_text
+    }
+
+def ingest_data_job(ctx: JobContext) -> Dict[str, Any]:
+    """Background job: ingest extracted data with its own DB session"""
+    ctx.progress("Ingesting data...")
+    db = SessionLocal()
+    try:
+        result = DataIngestionService(db).ingest_extracted_data(ctx.params["extracted_data"])
+    finally:
+        db.close()
+    print(f"✅ [Job {ctx.job_id}] Data ingestion completed: {result}")
+    catalog_service.invalidate()
+    
+    # Check if critical entities were inserted
+    if result["program_intakes_inserted"] == 0 and result["program_intakes_updated"] == 0:
+        # This is a warning, not an error - data might already exist
+        result["errors"].append("WARNING: No program intakes were inserted or updated. Data may already exist.")
+    
+    return {
+        "counts": {
+            "majors_inserted": result["majors_inserted"],
+            "majors_updated": result["majors_updated"],
+            "program_intakes_inserted": result["program_intakes_inserted"],
+            "program_intakes_updated": result["program_intakes_updated"],
+            "documents_inserted": result["documents_inserted"],
+            "documents_updated": result["documents_updated"],
+            "scholarships_inserted": result["scholarships_inserted"],
+            "scholarships_updated": result["scholarships_updated"],
+            "links_inserted": result["links_inserted"]
+        },
+        "errors": result["errors"]
+    }
+
+job_runner.register("extract_data", extract_data_job)
+job_runner.register("ingest_data", ingest_data_job)
+
 @router.post("/document-import/extract-data-start")
 async def start_data_extraction(
     file: UploadFile = File(...),
-    current_user: User = Depends(require_admin),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    current_user: User = Depends(require_admin)
 ):
     """
-    Start data extraction in background, return job ID immediately.
+    Start data extraction as a background job, return job ID immediately.
     NEW PRODUCTION-SAFE ENDPOINT - LLM only extracts JSON, no SQL generation.
     """
-    import asyncio
-    
-    # Generate unique job ID
-    job_id = str(uuid.uuid4())
-    
-    # Read file content before starting background task
     file_content = await file.read()
-    filename = file.filename or "document"
-    
-    # Initialize job status
-    with extraction_jobs_lock:
-        extraction_jobs[job_id] = {
-            "status": "processing",
-            "progress": "Reading document...",
-            "result": None,
-            "error": None,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-    
-    # Start background task
-    background_tasks.add_task(
-        extract_data_background,
-        job_id,
+    job_id = await asyncio.to_thread(
+        job_runner.submit,
+        "extract_data",
+        {"filename": file.filename or "document"},
         file_content,
-        filename
+        current_user.id,
+        "Reading document..."
     )
     
     print(f"🚀 Started data extraction job: {job_id}")
-    return {
-        "job_id": job_id,
-        "status": "processing",
-        "message": "Data extraction started. Poll /document-import/extract-data-status/{job_id} for results."
-    }
-
-async def extract_data_background(job_id: str, file_content: bytes, filename: str):
-    """Background task to extract data from document"""
-    try:
-        # Update progress
-        with extraction_jobs_lock:
-            if job_id in extraction_jobs:
-                extraction_jobs[job_id]["progress"] = "Extracting text from document..."
-        
-        # Extract text from document
-        document_text = document_extraction_service.extract_text_from_document(
-            file_content,
-            filename
-        )
-        
-        if not document_text.strip():
-            with extraction_jobs_lock:
-                if job_id in extraction_jobs:
-                    extraction_jobs[job_id].update({
-                        "status": "failed",
-                        "error": "No text content could be extracted from the document"
-                    })
-            return
-        
-        # Update progress
-        with extraction_jobs_lock:
-            if job_id in extraction_jobs:
-                extraction_jobs[job_id]["progress"] = "Extracting structured data with AI (this may take 60-120 seconds)..."
-        
-        # Extract structured data (this can take a long time with LLM)
-        print(f"🔄 [Job {job_id}] Starting data extraction...")
-        extracted_data = await asyncio.to_thread(
-            document_extraction_service.extract_data_from_text,
-            document_text
-        )
-        print(f"✅ [Job {job_id}] Data extraction completed")
-        
-        # Validate extracted data
-        try:
-            validated_data = ExtractedData(**extracted_data)
-            extracted_data = validated_data.dict()
-        except Exception as validation_error:
-            print(f"⚠️  [Job {job_id}] Validation warning: {validation_error}")
-            # Continue with extracted data even if validation fails (will be caught during ingestion)
-        
-        # Store result
-        with extraction_jobs_lock:
-            if job_id in extraction_jobs:
-                extraction_jobs[job_id].update({
-                    "status": "completed",
-                    "progress": "Complete",
-                    "result": {
-                        "extracted_data": extracted_data,
-                        "document_text_preview": document_text[:500] + "..." if len(document_text) > 500 else document_text
-                    }
-                })
-        
-        # Count majors (handle both formats: individual majors or major_groups)
-        majors_count = 0
-        if extracted_data.get('majors'):
-            majors_count = len(extracted_data.get('majors', []))
-        elif extracted_data.get('major_groups'):
-            for group in extracted_data.get('major_groups', []):
-                majors_count += len(group.get('major_names', []))
-        print(f"✅ [Job {job_id}] Data extraction completed successfully: {majors_count} majors")
-        
-    except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        error_msg = str(e)
-        print(f"❌ [Job {job_id}] Data extraction failed: {error_msg}")
-        print(f"Traceback: {error_trace}")
-        
-        with extraction_jobs_lock:
-            if job_id in extraction_jobs:
-                extraction_jobs[job_id].update({
-                    "status": "failed",
-                    "error": error_msg
-                })
+    return await asyncio.to_thread(
+        _started_job, job_id,
+        "Data extraction started. Poll /document-import/extract-data-status/{job_id} for results."
+    )
 
 @router.get("/document-import/extract-data-status/{job_id}")
 async def get_extraction_status(
@@ -2131,73 +2048,114 @@ async def get_extraction_status(
     current_user: User = Depends(require_admin)
 ):
     """Get data extraction job status"""
-    with extraction_jobs_lock:
-        if job_id not in extraction_jobs:
-            raise HTTPException(status_code=404, detail="Job not found")
-        
-        job = extraction_jobs[job_id].copy()
-    
-    return job
+    return await asyncio.to_thread(_job_status, job_id, "extract_data")
+
+def _validate_extracted_data(extracted_data: Dict[str, Any]):
+    try:
+        ExtractedData(**extracted_data)
+    except Exception as validation_error:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid extracted data: {str(validation_error)}"
+        )
+
+@router.post("/document-import/ingest-data-start")
+async def start_data_ingestion(
+    request: DataIngestionRequest,
+    current_user: User = Depends(require_admin)
+):
+    """Start data ingestion as a background job, return job ID immediately"""
+    _validate_extracted_data(request.extracted_data)
+    job_id = await asyncio.to_thread(
+        job_runner.submit,
+        "ingest_data",
+        {"extracted_data": request.extracted_data},
+        None,
+        current_user.id
+    )
+    print(f"🚀 Started data ingestion job: {job_id}")
+    return await asyncio.to_thread(
+        _started_job, job_id,
+        "Data ingestion started. Poll /document-import/ingest-data-status/{job_id} for results."
+    )
+
+@router.get("/document-import/ingest-data-status/{job_id}")
+async def get_ingestion_status(
+    job_id: str,
+    current_user: User = Depends(require_admin)
+):
+    """Get data ingestion job status"""
+    return await asyncio.to_thread(_job_status, job_id, "ingest_data")
 
 @router.post("/document-import/ingest-data")
 async def ingest_extracted_data(
     request: DataIngestionRequest,
-    current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    response: Response,
+    current_user: User = Depends(require_admin)
 ):
     """
-    Ingest extracted data into database.
+    Ingest extracted data into database and wait (up to JOB_INGEST_WAIT_SECONDS) for the result.
     NEW PRODUCTION-SAFE ENDPOINT - All SQL is generated deterministically in backend code.
+    Runs as an ingest_data job (same concurrency limit as the other import jobs); if it is
+    still queued/running when the wait ends, returns 202 with the job_id to poll instead.
     """
-    try:
-        # Validate extracted data
-        try:
-            validated_data = ExtractedData(**request.extracted_data)
-        except Exception as validation_error:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid extracted data: {str(validation_error)}"
-            )
-        
-        # Initialize ingestion service
-        ingestion_service = DataIngestionService(db)
-        
-        # Ingest data
-        print(f"🔄 Starting data ingestion...")
-        result = ingestion_service.ingest_extracted_data(request.extracted_data)
-        print(f"✅ Data ingestion completed: {result}")
-        
-        # Check if critical entities were inserted
-        if result["program_intakes_inserted"] == 0 and result["program_intakes_updated"] == 0:
-            # This is a warning, not an error - data might already exist
-            result["errors"].append("WARNING: No program intakes were inserted or updated. Data may already exist.")
-        
+    _validate_extracted_data(request.extracted_data)
+    
+    print(f"🔄 Starting data ingestion...")
+    job_id = await asyncio.to_thread(
+        job_runner.submit,
+        "ingest_data",
+        {"extracted_data": request.extracted_data},
+        None,
+        current_user.id
+    )
+    job = await asyncio.to_thread(job_runner.wait, job_id, settings.JOB_INGEST_WAIT_SECONDS)
+    
+    if job is not None and job["status"] in ("queued", "processing"):
+        print(f"⏳ Data ingestion job {job_id} still {job['status']}, returning 202")
+        response.status_code = 202
         return {
-            "success": True,
-            "message": "Data ingested successfully",
-            "counts": {
-                "majors_inserted": result["majors_inserted"],
-                "majors_updated": result["majors_updated"],
-                "program_intakes_inserted": result["program_intakes_inserted"],
-                "program_intakes_updated": result["program_intakes_updated"],
-                "documents_inserted": result["documents_inserted"],
-                "documents_updated": result["documents_updated"],
-                "scholarships_inserted": result["scholarships_inserted"],
-                "scholarships_updated": result["scholarships_updated"],
-                "links_inserted": result["links_inserted"]
-            },
-            "errors": result["errors"]
+            "success": False,
+            "job_id": job_id,
+            "status": job["status"],
+            "progress": job["progress"],
+            "message": "Data ingestion is still running. Poll /document-import/ingest-data-status/{job_id} for results."
         }
-        
-    except Exception as e:
-        db.rollback()
-        import traceback
-        error_trace = traceback.format_exc()
-        error_msg = str(e)
+    
+    if job is None or job["status"] != "completed":
+        error_msg = (job or {}).get("error") or "job was removed"
         print(f"❌ Data ingestion failed: {error_msg}")
-        print(f"Traceback: {error_trace}")
         raise HTTPException(
             status_code=500,
             detail=f"Data ingestion failed: {error_msg}"
         )
+    
+    return {
+        "success": True,
+        "message": "Data ingested successfully",
+        "job_id": job_id,
+        "counts": job["result"]["counts"],
+        "errors": job["result"]["errors"]
+    }
 
+@router.get("/document-import/jobs/{job_id}")
+async def get_import_job(
+    job_id: str,
+    current_user: User = Depends(require_admin)
+):
+    """Get any document import job (generate_sql / extract_data / ingest_data)"""
+    job = await asyncio.to_thread(job_runner.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/document-import/jobs/{job_id}/cancel")
+async def cancel_import_job(
+    job_id: str,
+    current_user: User = Depends(require_admin)
+):
+    """Cancel a document import job (running jobs stop at their next step)"""
+    job = await asyncio.to_thread(job_runner.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
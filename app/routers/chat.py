@@ -13,6 +13,9 @@ from app.services.sales_agent import SalesAgent
 from app.services.admission_agent import AdmissionAgent
 from app.services.partner_agent import PartnerAgent
 from app.services.db_query_service import DBQueryService
+from app.services.agent_executor import agent_executor, AgentBusyError, AgentTimeoutError
+from app.services.response_stream import stream_session_turn
+from app.services.session_store import session_store
 from app.routers.auth import get_current_user, oauth2_scheme
 from app.models import Partner
 from fastapi import Security
@@ -28,30 +31,32 @@ openai_service = OpenAIService()
 groq_service = GroqService()
 tavily_service = TavilyService()
 
-# In-memory conversation history storage
-# Maps chat_session_id or device_fingerprint to list of messages
+# Conversation history for the agents (last 12 messages per session)
+# Keyed by chat_session_id or device_fingerprint in the shared session store
 # Format: {"role": "user" | "assistant", "content": str}
-_conversation_history_store: Dict[str, List[Dict[str, str]]] = {}
+HISTORY_NAMESPACE = "chat_history"
+MAX_HISTORY_MESSAGES = 12
 
 def get_conversation_history(session_key: str) -> List[Dict[str, str]]:
     """Get conversation history for a session key (chat_session_id or device_fingerprint)"""
-    return _conversation_history_store.get(session_key, [])
+    return session_store.get(HISTORY_NAMESPACE, session_key) or []
+
+def set_conversation_history(session_key: str, messages: List[Dict[str, str]]):
+    """Replace conversation history for a session key (keeps the last 12 messages)"""
+    session_store.set(HISTORY_NAMESPACE, session_key, list(messages)[-MAX_HISTORY_MESSAGES:],
+                      ttl_seconds=settings.SESSION_HISTORY_TTL_SECONDS)
 
 def append_to_conversation_history(session_key: str, role: str, content: str):
     """Append a message to conversation history for a session key"""
-    if session_key not in _conversation_history_store:
-        _conversation_history_store[session_key] = []
-    
-    _conversation_history_store[session_key].append({"role": role, "content": content})
+    messages = get_conversation_history(session_key)
+    messages.append({"role": role, "content": content})
     
     # Keep only last 12 messages (6 exchanges)
-    if len(_conversation_history_store[session_key]) > 12:
-        _conversation_history_store[session_key] = _conversation_history_store[session_key][-12:]
+    set_conversation_history(session_key, messages)
 
 def clear_conversation_history(session_key: str):
     """Clear conversation history for a session (for new chat sessions)"""
-    if session_key in _conversation_history_store:
-        del _conversation_history_store[session_key]
+    session_store.delete(HISTORY_NAMESPACE, session_key)
 
 class ChatMessage(BaseModel):
     role: str
@@ -188,6 +193,16 @@ def update_conversation_messages(
         # Re-raise to let caller handle
         raise
 
+def get_or_create_student(db: Session, user_id: int) -> Student:
+    """Get the student profile for a user, creating an empty one if it doesn't exist"""
+    student = DBQueryService(db).get_student_profile(user_id)
+    if not student:
+        student = Student(user_id=user_id)
+        db.add(student)
+        db.commit()
+        db.refresh(student)
+    return student
+
 def collect_lead(db: Session, name: Optional[str], email: Optional[str], 
                 phone: Optional[str], country: Optional[str], 
                 device_fingerprint: Optional[str]):
@@ -376,7 +391,7 @@ async def chat(
                     messages_history = conversation.messages or []
                     # Sync DB history to in-memory store
                     if session_key and messages_history:
-                        _conversation_history_store[session_key] = messages_history.copy()
+                        set_conversation_history(session_key, messages_history)
         
         # Append current user message to history BEFORE calling agent
         if session_key:
@@ -406,12 +421,14 @@ async def chat(
             print(f"DEBUG: Conversation history length: {len(messages_history)}")
             print("="*80 + "\n")
             
-            agent = PartnerAgent(db)
-            result = agent.generate_response(
-                user_message=request.message,
-                conversation_history=messages_history,
-                partner_id=current_partner.id
-            )
+            def run_partner_turn(turn_db: Session):
+                agent = PartnerAgent(turn_db)
+                return agent.generate_response(
+                    user_message=request.message,
+                    conversation_history=messages_history,
+                    partner_id=current_partner.id
+                )
+            result = await agent_executor.run_in_session(run_partner_turn)
             
             print("\n" + "="*80)
             print("DEBUG: PartnerAgent response received")
@@ -429,13 +446,15 @@ async def chat(
             
         elif not is_authenticated:
             # NO authenticated user_id → Use SalesAgent
-            agent = SalesAgent(db)
-            result = agent.generate_response(
-                user_message=request.message,
-                conversation_history=messages_history,
-                chat_session_id=request.chat_session_id,
-                use_db=use_db
-            )
+            def run_sales_turn(turn_db: Session):
+                agent = SalesAgent(turn_db)
+                return agent.generate_response(
+                    user_message=request.message,
+                    conversation_history=messages_history,
+                    chat_session_id=request.chat_session_id,
+                    use_db=use_db
+                )
+            result = await agent_executor.run_in_session(run_sales_turn)
             
             agent_type = "sales"
             used_db = bool(result.get('db_context'))
@@ -471,21 +490,14 @@ async def chat(
         elif user_role == "student":
             # Authenticated user_id AND Student row exists → Use AdmissionAgent
             print("DEBUG: Routing to AdmissionAgent (student role)")
-            db_query_service = DBQueryService(db)
-            student = db_query_service.get_student_profile(user_id)
-            
-            if not student:
-                # Create student profile if it doesn't exist
-                student = Student(user_id=user_id)
-                db.add(student)
-                db.commit()
-                db.refresh(student)
-            
-            agent = AdmissionAgent(db, student)
-            result = agent.generate_response(
-                user_message=request.message,
-                conversation_history=messages_history
-            )
+            def run_admission_turn(turn_db: Session):
+                student = get_or_create_student(turn_db, user_id)
+                agent = AdmissionAgent(turn_db, student)
+                return agent.generate_response(
+                    user_message=request.message,
+                    conversation_history=messages_history
+                )
+            result = await agent_executor.run_in_session(run_admission_turn)
             
             agent_type = "admission"
             used_db = bool(result.get('student_context') or result.get('program_context'))
@@ -540,6 +552,10 @@ async def chat(
     
     except HTTPException:
         raise
+    except AgentBusyError as e:
+        raise HTTPException(status_code=503, detail=f"Chat is busy, please retry shortly: {str(e)}")
+    except AgentTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -554,7 +570,13 @@ async def chat_stream(
 ):
     """
     Streaming chat endpoint with Router Agent logic
-    Uses the same routing logic as the regular chat endpoint
+    Uses the same routing logic as the regular chat endpoint.
+    
+    Answer text is streamed token-by-token from the agent's final LLM call
+    ({"content": ..., "done": false} events). If the agent post-processes the answer,
+    a {"content": ..., "replace": true} event carries the full final text.
+    The trailing {"done": true} event carries the metadata (used_db, show_lead_form,
+    days_to_deadline, ...).
     """
     try:
         # Router Logic: Same as regular chat endpoint
@@ -603,7 +625,7 @@ async def chat_stream(
                     messages_history = conversation.messages or []
                     # Sync DB history to in-memory store
                     if session_key and messages_history:
-                        _conversation_history_store[session_key] = messages_history.copy()
+                        set_conversation_history(session_key, messages_history)
         
         # Append current user message to history BEFORE calling agent
         if session_key:
@@ -621,100 +643,101 @@ async def chat_stream(
             use_db = lead is not None
         
         # Route to appropriate agent (same logic as regular endpoint)
-        show_lead_form = False
         is_partner = current_partner is not None
         
-        if is_partner:
-            # Partner authenticated → Use PartnerAgent
-            agent = PartnerAgent(db)
-            result = agent.generate_response(
-                user_message=request.message,
-                conversation_history=messages_history,
-                partner_id=current_partner.id
-            )
-            full_response = result['response']
-            used_rag = False
-            used_tavily = result.get('used_tavily', False)
-            
-        elif not is_authenticated:
-            # SalesAgent for non-authenticated users
-            agent = SalesAgent(db)
-            result = agent.generate_response(
-                user_message=request.message,
-                conversation_history=messages_history,
-                chat_session_id=request.chat_session_id,
-                use_db=use_db
-            )
-            full_response = result['response']
-            used_rag = bool(result.get('rag_context'))
-            used_tavily = bool(result.get('tavily_context'))
-            show_lead_form = result.get('show_lead_form', False)
-            lead_form_prefill = result.get('lead_form_prefill', {})
-            
-            # DEBUG: Log show_lead_form in streaming endpoint
-            print(f"\n{'='*80}")
-            print(f"DEBUG: chat_stream - show_lead_form = {show_lead_form}")
-            print(f"DEBUG: lead_form_prefill = {lead_form_prefill}")
-            print(f"DEBUG: result keys = {list(result.keys())}")
-            print(f"DEBUG: result['show_lead_form'] = {result.get('show_lead_form')}")
-            print(f"{'='*80}\n")
-            
-        elif user_role == "admin":
-            # Admin users → Return admin tools message
-            full_response = "As an admin, please use the Admin Dashboard for analytics, RAG uploads, and configuration. The chat interface is designed for students and prospects."
-            used_rag = False
-            used_tavily = False
+        def start_turn():
+            """Event iterator for the turn; the agent is built on the agent worker with its own Session"""
+            if not is_partner and is_authenticated and user_role == "admin":
+                # Admin users → Return admin tools message
+                return iter([("result", {
+                    'response': "As an admin, please use the Admin Dashboard for analytics, RAG uploads, and configuration. The chat interface is designed for students and prospects."
+                })])
+            if not is_partner and is_authenticated and user_role != "student":
+                return iter([("result", {'response': f"Unknown user role: {user_role}"})])
             
-        elif user_role == "student":
-            # AdmissionAgent for authenticated students
-            db_query_service = DBQueryService(db)
-            student = db_query_service.get_student_profile(user_id)
-            
-            if not student:
-                # Create student profile if it doesn't exist
-                student = Student(user_id=user_id)
-                db.add(student)
-                db.commit()
-                db.refresh(student)
+            def build(turn_db: Session):
+                if is_partner:
+                    # Partner authenticated → Use PartnerAgent
+                    agent = PartnerAgent(turn_db)
+                    return agent, agent.generate_response, dict(
+                        user_message=request.message,
+                        conversation_history=messages_history,
+                        partner_id=current_partner.id
+                    )
+                elif not is_authenticated:
+                    # SalesAgent for non-authenticated users
+                    agent = SalesAgent(turn_db)
+                    return agent, agent.generate_response, dict(
+                        user_message=request.message,
+                        conversation_history=messages_history,
+                        chat_session_id=request.chat_session_id,
+                        use_db=use_db
+                    )
+                # AdmissionAgent for authenticated students
+                student = get_or_create_student(turn_db, user_id)
+                agent = AdmissionAgent(turn_db, student)
+                return agent, agent.generate_response, dict(
+                    user_message=request.message,
+                    conversation_history=messages_history
+                )
             
-            agent = AdmissionAgent(db, student)
-            result = agent.generate_response(
-                user_message=request.message,
-                conversation_history=messages_history
-            )
-            full_response = result['response']
-            used_rag = bool(result.get('rag_context'))
-            used_tavily = bool(result.get('tavily_context'))
-        else:
-            full_response = f"Unknown user role: {user_role}"
-            used_rag = False
-            used_tavily = False
+            return stream_session_turn(build)
         
-        # Append assistant response to in-memory history
-        if session_key:
-            append_to_conversation_history(session_key, "assistant", full_response)
-        
-        # Update conversation in DB (only if conversation exists or should be created)
-        if conversation:
-            update_conversation_messages(db, conversation, request.message, full_response)
-        elif not is_authenticated and request.chat_session_id:
-            conversation = get_or_create_conversation(
-                db,
-                chat_session_id=request.chat_session_id,
-                device_fingerprint=request.device_fingerprint
-            )
-            if conversation:
-                update_conversation_messages(db, conversation, request.message, full_response)
-        
-        # Stream the response
-        async def generate_stream():
-            # Split response into chunks for streaming effect
-            words = full_response.split(' ')
-            for i, word in enumerate(words):
-                chunk = word + (' ' if i < len(words) - 1 else '')
-                yield f"data: {json.dumps({'content': chunk, 'done': False})}\n\n"
-            lead_form_prefill = result.get('lead_form_prefill', {}) if 'lead_form_prefill' in result else {}
-            yield f"data: {json.dumps({'content': '', 'done': True, 'used_rag': used_rag, 'used_tavily': used_tavily, 'show_lead_form': show_lead_form, 'lead_form_prefill': lead_form_prefill})}\n\n"
+        # Stream the response: answer deltas are forwarded as the final LLM call produces them,
+        # metadata follows in the trailing 'done' event once the agent turn has finished.
+        # Sync generator - StreamingResponse iterates it in the threadpool; the agent turn itself
+        # runs on the bounded agent executor.
+        def generate_stream():
+            try:
+                result = {}
+                for kind, payload in start_turn():
+                    if kind == "delta":
+                        yield f"data: {json.dumps({'content': payload, 'done': False})}\n\n"
+                    elif kind == "replace":
+                        yield f"data: {json.dumps({'content': payload, 'replace': True, 'done': False})}\n\n"
+                    else:
+                        result = payload
+
+                full_response = result.get('response', '')
+                
+                # Append assistant response to in-memory history
+                if session_key:
+                    append_to_conversation_history(session_key, "assistant", full_response)
+                
+                # Update conversation in DB (only if conversation exists or should be created)
+                stream_conversation = conversation
+                if stream_conversation:
+                    update_conversation_messages(db, stream_conversation, request.message, full_response)
+                elif not is_authenticated and request.chat_session_id:
+                    stream_conversation = get_or_create_conversation(
+                        db,
+                        chat_session_id=request.chat_session_id,
+                        device_fingerprint=request.device_fingerprint
+                    )
+                    if stream_conversation:
+                        update_conversation_messages(db, stream_conversation, request.message, full_response)
+                
+                if is_partner:
+                    used_db = result.get('used_db', False)
+                    used_rag = False
+                    used_tavily = result.get('used_tavily', False)
+                elif not is_authenticated:
+                    used_db = bool(result.get('db_context'))
+                    used_rag = bool(result.get('rag_context'))
+                    used_tavily = bool(result.get('tavily_context'))
+                else:
+                    used_db = bool(result.get('student_context') or result.get('program_context'))
+                    used_rag = bool(result.get('rag_context'))
+                    used_tavily = bool(result.get('tavily_context'))
+                
+                yield f"data: {json.dumps({'content': '', 'done': True, 'used_db': used_db, 'used_rag': used_rag, 'used_tavily': used_tavily, 'show_lead_form': result.get('show_lead_form', False), 'lead_form_prefill': result.get('lead_form_prefill', {}), 'days_to_deadline': result.get('days_to_deadline'), 'missing_documents': result.get('missing_documents')})}\n\n"
+            except (AgentBusyError, AgentTimeoutError) as e:
+                print(f"Error in chat_stream: {str(e)}")
+                yield f"data: {json.dumps({'error': str(e)})}\n\n"
+            except Exception as e:
+                import traceback
+                print(f"Error in chat_stream: {str(e)}\n{traceback.format_exc()}")
+                yield f"data: {json.dumps({'error': str(e)})}\n\n"
         
         return StreamingResponse(generate_stream(), media_type="text/event-stream")
     
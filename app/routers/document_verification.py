@@ -167,7 +167,7 @@ async def verify_and_upload_document(
     
     # Upload temporarily to get URL for verification
     try:
-        temp_url = r2_service.upload_file(
+        temp_url = await r2_service.upload_file_async(
             file=file_content,
             filename=file.filename,
             folder="temp"
@@ -195,7 +195,7 @@ async def verify_and_upload_document(
     if verification_result["status"] != "ok":
         # Delete temp file - verification failed, don't keep it
         try:
-            r2_service.delete_file(temp_url)
+            await r2_service.delete_file_async(temp_url)
             print(f"🗑️  Deleted temp file after failed verification: {temp_url}")
         except Exception as e:
             print(f"⚠️  Warning: Could not delete temp file {temp_url}: {e}")
@@ -213,18 +213,18 @@ async def verify_and_upload_document(
             detail=error_message
         )
     
-    # If verified, upload to "verified" folder
+    # If verified, move the temp object to the "verified" folder (server-side copy, no second upload)
     try:
-        verified_url = r2_service.upload_file(
-            file=file_content,
-            filename=file.filename,
-            folder="verified"
+        verified_url = await r2_service.move_file_async(
+            temp_url,
+            folder="verified",
+            filename=file.filename
         )
     except Exception as e:
         error_msg = str(e)
-        # Try to delete temp file even if verified upload fails
+        # Try to delete temp file even if the copy fails
         try:
-            r2_service.delete_file(temp_url)
+            await r2_service.delete_file_async(temp_url)
         except:
             pass
         if "AccessDenied" in error_msg or "Access Denied" in error_msg:
@@ -234,15 +234,9 @@ async def verify_and_upload_document(
             )
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to upload verified file to R2 storage: {error_msg}"
+            detail=f"Failed to store verified file in R2 storage: {error_msg}"
         )
     
-    # Delete temp file
-    try:
-        r2_service.delete_file(temp_url)
-    except:
-        pass
-    
     # Save to student_documents table
     student_doc = StudentDocument(
         student_id=student.id,
@@ -364,7 +358,7 @@ async def delete_student_document(
     # Delete from Cloudflare R2
     if document.r2_url:
         try:
-            r2_service.delete_file(document.r2_url)
+            await r2_service.delete_file_async(document.r2_url)
         except Exception as e:
             print(f"Error deleting file from R2: {e}")
             # Continue with DB deletion even if R2 deletion fails
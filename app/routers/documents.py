@@ -51,20 +51,19 @@ async def upload_document(
         if not application:
             raise HTTPException(status_code=404, detail="Application not found")
     
-    # Read file content
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    # Upload to R2 (pass bytes directly)
-    r2_url = r2_service.upload_file(
-        file=file_content,
+    # Stream the upload to R2 from the spooled upload file (multipart for large files)
+    r2_url = await r2_service.upload_file_async(
+        file=file.file,
         filename=file.filename,
         folder="documents"
     )
+    file_size = file.size if file.size is not None else file.file.tell()
     
     # Parse document if passport
     extracted_data = {}
     if doc_type_enum == DocumentType.PASSPORT:
+        await file.seek(0)
+        file_content = await file.read()
         extracted_data = document_parser.parse_passport(file_content, file.filename)
         
         # Update student profile with passport data
@@ -195,7 +194,7 @@ async def delete_document(
         raise HTTPException(status_code=404, detail="Document not found")
     
     # Delete from R2
-    r2_service.delete_file(document.r2_url)
+    await r2_service.delete_file_async(document.r2_url)
     
     # Delete from database
     db.delete(document)
@@ -3,12 +3,10 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List
 from app.database import get_db
-from app.services.openai_service import OpenAIService
+from app.services.openai_service import async_openai_service
 
 router = APIRouter()
 
-openai_service = OpenAIService()
-
 class EmbeddingRequest(BaseModel):
     text: str
 
@@ -30,7 +28,7 @@ async def create_embedding(
     db: Session = Depends(get_db)
 ):
     """Generate embedding for a single text"""
-    embedding = openai_service.generate_embedding(request.text)
+    embedding = await async_openai_service.generate_embedding(request.text)
     
     return EmbeddingResponse(
         embedding=embedding,
@@ -43,7 +41,7 @@ async def create_embeddings_batch(
     db: Session = Depends(get_db)
 ):
     """Generate embeddings for multiple texts"""
-    embeddings = openai_service.generate_embeddings_batch(request.texts)
+    embeddings = await async_openai_service.generate_embeddings_batch(request.texts)
     
     return EmbeddingBatchResponse(
         embeddings=embeddings,
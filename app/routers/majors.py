@@ -6,6 +6,7 @@ from datetime import datetime
 from app.database import get_db
 from app.models import Major, University, User
 from app.routers.auth import get_current_user
+from app.services.catalog_service import catalog_service
 
 router = APIRouter()
 
@@ -204,6 +205,7 @@ async def _create_major(
     major = Major(**major_data.dict())
     db.add(major)
     db.commit()
+    catalog_service.invalidate()
     db.refresh(major)
     return {
         'id': major.id,
@@ -259,6 +261,7 @@ async def update_major(
         setattr(major, field, value)
     
     db.commit()
+    catalog_service.invalidate()
     db.refresh(major)
     return {
         'id': major.id,
@@ -294,5 +297,6 @@ async def delete_major(
     
     db.delete(major)
     db.commit()
+    catalog_service.invalidate()
     return None
 
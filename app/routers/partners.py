@@ -639,8 +639,11 @@ async def upload_partner_student_document(
         )
     
     # Upload to R2
-    r2_path = f"verified/students/{student_id}/{document_type}/{file.filename}"
-    r2_url = await r2_service.upload_file(file_content, r2_path, file.content_type)
+    r2_url = await r2_service.upload_file_async(
+        file=file_content,
+        filename=file.filename,
+        folder=f"verified/students/{student_id}/{document_type}"
+    )
     
     # Save to database
     doc = StudentDocument(
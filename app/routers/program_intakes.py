@@ -6,6 +6,7 @@ from datetime import datetime, date
 from app.database import get_db
 from app.models import ProgramIntake, University, Major, User, IntakeTerm
 from app.routers.auth import get_current_user
+from app.services.catalog_service import catalog_service
 
 router = APIRouter()
 
@@ -441,6 +442,7 @@ async def _create_program_intake(
     intake = ProgramIntake(**intake_data.dict())
     db.add(intake)
     db.commit()
+    catalog_service.invalidate()
     db.refresh(intake)
     
     def build_intake_response(intake):
@@ -535,6 +537,7 @@ async def update_program_intake(
         setattr(intake, field, value)
     
     db.commit()
+    catalog_service.invalidate()
     db.refresh(intake)
     
     def build_intake_response(intake):
@@ -609,5 +612,6 @@ async def delete_program_intake(
     
     db.delete(intake)
     db.commit()
+    catalog_service.invalidate()
     return None
 
@@ -8,6 +8,7 @@ from app.routers.auth import get_current_user
 from app.services.rag_service import RAGService
 from app.services.openai_service import OpenAIService
 from app.services.document_parser import DocumentParser
+from app.services.response_cache import response_cache
 import io
 import json
 
@@ -31,17 +32,6 @@ class RAGSearchResponse(BaseModel):
     results: List[dict]
     count: int
 
-def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
-    """Split text into chunks with overlap"""
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start = end - overlap
-    return chunks
-
 class RAGTextUpload(BaseModel):
     text: str
     filename: Optional[str] = "plain_text.txt"
@@ -214,8 +204,10 @@ async def delete_rag_document(
         raise HTTPException(status_code=404, detail="Document not found")
     
     # Delete source (chunks will be deleted via CASCADE)
+    doc_type = source.doc_type
     db.delete(source)
     db.commit()
+    response_cache.invalidate(doc_type)
     
     return {"message": "Document deleted successfully"}
 
@@ -7,6 +7,7 @@ from datetime import datetime
 from app.database import get_db
 from app.models import University, User
 from app.routers.auth import get_current_user
+from app.services.catalog_service import catalog_service
 
 router = APIRouter()
 
@@ -207,6 +208,7 @@ async def _create_university(
     university = University(**data)
     db.add(university)
     db.commit()
+    catalog_service.invalidate()
     db.refresh(university)
     return {
         'id': university.id,
@@ -268,6 +270,7 @@ async def update_university(
         setattr(university, field, value)
     
     db.commit()
+    catalog_service.invalidate()
     db.refresh(university)
     return {
         'id': university.id,
@@ -309,5 +312,6 @@ async def delete_university(
     
     db.delete(university)
     db.commit()
+    catalog_service.invalidate()
     return None
 
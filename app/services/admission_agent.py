@@ -2,13 +2,14 @@
 AdmissionAgent - For logged-in students
 Goal: Guide students through the full admission pipeline and document upload flow
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from sqlalchemy.orm import Session
 from datetime import datetime
 from app.services.db_query_service import DBQueryService
 from app.services.rag_service import RAGService
 from app.services.tavily_service import TavilyService
 from app.services.openai_service import OpenAIService
+from app.services.response_stream import stream_agent_turn
 from app.models import Student, ProgramIntake, DocumentType, ApplicationStage, Application
 
 class AdmissionAgent:
@@ -988,6 +989,24 @@ Style:
         self.rag_service = RAGService()
         self.tavily_service = TavilyService()
         self.openai_service = OpenAIService()
+        # Set while a turn is streamed (see generate_response_stream); receives final answer deltas
+        self.stream_handler = None
+    
+    def generate_response_stream(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]]
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Streaming variant of generate_response.
+        Yields ("delta", text) while the final answer call is generating, then ("result", dict).
+        """
+        return stream_agent_turn(
+            self,
+            self.generate_response,
+            user_message=user_message,
+            conversation_history=conversation_history
+        )
     
     def generate_response(
         self,
@@ -1285,13 +1304,17 @@ CRITICAL INSTRUCTIONS:
         messages.extend(conversation_history[-12:] if conversation_history else [])
         messages.append({"role": "user", "content": user_message})
         
-        # Generate response
-        response = self.openai_service.chat_completion(messages)
-        answer = response.choices[0].message.content
-        
         # Step 7: Reflection for important queries (BUT NOT for scholarship chance questions)
         # Scholarship chance questions have strict format requirements - do NOT use reflection
-        if any(keyword in user_message_lower for keyword in ['document', 'requirement', 'deadline', 'csca', 'visa']) and not is_scholarship_chance_question:
+        needs_reflection = any(keyword in user_message_lower for keyword in ['document', 'requirement', 'deadline', 'csca', 'visa']) and not is_scholarship_chance_question
+        
+        # Generate response (only streamed when no reflection pass will rewrite it)
+        answer = self.openai_service.chat_completion_text(
+            messages,
+            on_delta=None if needs_reflection else self.stream_handler
+        )
+        
+        if needs_reflection:
             improved_answer = self.openai_service.reflect_and_improve(
                 answer,
                 program_context or "",
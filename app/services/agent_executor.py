@@ -0,0 +1,162 @@
+"""
+AgentExecutor - bounded worker pool for chat agent turns
+
+Agent turns (SalesAgent / AdmissionAgent / PartnerAgent.generate_response) are synchronous:
+they block on OpenAI, Tavily and SQLAlchemy calls. Running them directly inside the
+async chat endpoints stalls the event loop, so they are submitted here instead.
+
+- At most AGENT_MAX_CONCURRENCY turns run at once (one thread each)
+- At most AGENT_MAX_QUEUE turns wait for a worker; beyond that AgentBusyError is raised
+- Callers waiting longer than AGENT_TURN_TIMEOUT_SECONDS get AgentTimeoutError
+  (the worker thread itself cannot be interrupted and finishes in the background)
+- Turns must not use the request's Session: get_db closes it once the endpoint returns, while a
+  timed-out turn is still running. run_in_session / session_turn give each turn its own Session,
+  opened and closed on the worker thread
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import threading
+import time
+
+from app.config import settings
+
+
+class AgentBusyError(Exception):
+    """Raised when the agent turn queue is full"""
+
+
+class AgentTimeoutError(Exception):
+    """Raised when an agent turn does not finish within the turn timeout"""
+
+
+class AgentExecutor:
+    """Bounded thread pool with queue-depth metrics for agent turns"""
+
+    def __init__(self, max_workers: int, max_queue: int, turn_timeout: Optional[float],
+                 session_factory: Optional[Callable[[], Any]] = None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.turn_timeout = turn_timeout
+        self._session_factory = session_factory
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-turn")
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._queued = 0
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._max_queue_depth_seen = 0
+        self._total_wait_seconds = 0.0
+        self._total_run_seconds = 0.0
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) for a worker thread. Raises AgentBusyError if the queue is full."""
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise AgentBusyError(
+                    f"Agent queue is full ({self._queued} waiting, {self._running} running)"
+                )
+            self._queued += 1
+            self._submitted += 1
+            self._max_queue_depth_seen = max(self._max_queue_depth_seen, self._queued)
+
+        enqueued_at = time.monotonic()
+
+        def task():
+            started_at = time.monotonic()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._total_wait_seconds += started_at - enqueued_at
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._total_run_seconds += time.monotonic() - started_at
+                    if ok:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+
+        try:
+            return self._pool.submit(task)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            raise
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool without blocking the event loop, bounded by turn_timeout"""
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.turn_timeout)
+        except asyncio.TimeoutError:
+            self.record_timeout()
+            raise AgentTimeoutError(f"Agent turn did not finish within {self.turn_timeout:.0f}s")
+
+    def open_session(self):
+        """New SQLAlchemy Session for one turn (app.database.SessionLocal unless a factory was given)"""
+        if self._session_factory is None:
+            from app.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def session_turn(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap fn(db, *args, **kwargs) so it runs with its own Session, closed when the turn ends"""
+        def turn(*args, **kwargs):
+            db = self.open_session()
+            try:
+                return fn(db, *args, **kwargs)
+            finally:
+                db.close()
+        return turn
+
+    async def run_in_session(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """run() for fn(db, *args, **kwargs) with a turn-owned Session (never the caller's)"""
+        return await self.run(self.session_turn(fn), *args, **kwargs)
+
+    def record_timeout(self):
+        """Count a turn whose caller stopped waiting (used by streaming turns as well)"""
+        with self._lock:
+            self._timed_out += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of queue depth and turn counters"""
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "turn_timeout_seconds": self.turn_timeout,
+                "queued": self._queued,
+                "running": self._running,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "max_queue_depth_seen": self._max_queue_depth_seen,
+                "avg_wait_seconds": round(self._total_wait_seconds / finished, 3) if finished else 0.0,
+                "avg_run_seconds": round(self._total_run_seconds / finished, 3) if finished else 0.0,
+            }
+
+    def shutdown(self, wait: bool = False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+# Process-wide executor shared by the chat endpoints
+agent_executor = AgentExecutor(
+    max_workers=settings.AGENT_MAX_CONCURRENCY,
+    max_queue=settings.AGENT_MAX_QUEUE,
+    turn_timeout=settings.AGENT_TURN_TIMEOUT_SECONDS or None
+)
@@ -0,0 +1,428 @@
+"""
+Deterministic answer templates for structured PartnerAgent intents
+
+FEES, ADMISSION_REQUIREMENTS, SCHOLARSHIP, PROGRAM_DETAILS and COMPARISON answers only restate
+ProgramIntake rows, so they are rendered here instead of sending a DB context to the LLM formatter
+(format_answer_with_llm). The templates follow the formatter rules: markdown, bold labels, bullet
+lists, NULL fields omitted, fee periods labelled. GENERAL and other free-form intents still go
+through the LLM.
+
+Inputs are plain dicts: intake_to_dict() for each ProgramIntake plus the document / scholarship /
+exam maps from PartnerAgent._get_program_*_batch (one IN query each, keyed by intake id).
+template_stats counts template vs LLM answers per intent.
+"""
+from typing import Any, Dict, List, Optional
+
+from app.services.stats import Counters
+
+# Intent (router constants and llm_extract_state / legacy aliases) -> template
+_TEMPLATE_KINDS = {
+    "FEES": "fees", "fees_only": "fees",
+    "ADMISSION_REQUIREMENTS": "requirements", "REQUIREMENTS": "requirements",
+    "documents_only": "requirements", "eligibility_only": "requirements",
+    "SCHOLARSHIP": "scholarship", "scholarship_only": "scholarship",
+    "PROGRAM_DETAILS": "details",
+    "COMPARISON": "comparison",
+}
+
+MAX_DETAILED_PROGRAMS = 5  # More results: the rest are listed by name only
+MAX_COMPARED_PROGRAMS = 3  # Side-by-side comparison width
+
+_SCHOLARSHIP_NOTE_KEYWORDS = ("scholarship", "csc", "type a", "type b", "type c", "waiver", "stipend")
+
+
+def template_kind(intent: Optional[str]) -> Optional[str]:
+    """Template used for the intent, or None if the intent needs the LLM formatter"""
+    return _TEMPLATE_KINDS.get(intent) if intent else None
+
+
+def intake_to_dict(intake: Any) -> Dict[str, Any]:
+    """ProgramIntake (with university / major loaded) -> the plain dict the templates render"""
+    major = intake.major
+    term = intake.intake_term
+    return {
+        "id": intake.id,
+        "university_id": intake.university_id,
+        "university_name": intake.university.name if intake.university else "N/A",
+        "major_name": major.name if major else "N/A",
+        "degree_level": intake.degree_type or (major.degree_level if major else None),
+        "teaching_language": intake.teaching_language or (major.teaching_language if major else None),
+        "duration_years": intake.duration_years or (major.duration_years if major else None),
+        "intake_term": term.value if hasattr(term, "value") else term,
+        "intake_year": intake.intake_year,
+        "application_deadline": intake.application_deadline.isoformat() if intake.application_deadline else None,
+        "currency": intake.currency or "CNY",
+        **{
+            name: getattr(intake, name)
+            for name in (
+                "tuition_per_year", "tuition_per_semester", "application_fee", "accommodation_fee",
+                "accommodation_fee_period", "medical_insurance_fee", "medical_insurance_fee_period",
+                "service_fee", "arrival_medical_checkup_fee", "visa_extension_fee", "accommodation_note",
+                "notes", "scholarship_available", "scholarship_info", "age_min", "age_max",
+                "min_average_score", "interview_required", "written_test_required",
+                "acceptance_letter_required", "inside_china_applicants_allowed",
+                "inside_china_extra_requirements", "bank_statement_required", "bank_statement_amount",
+                "bank_statement_currency", "bank_statement_note", "hsk_required", "hsk_level",
+                "hsk_min_score", "english_test_required", "english_test_note",
+            )
+        },
+    }
+
+
+def _num(value: Any) -> str:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return f"{value:,}" if isinstance(value, (int, float)) else str(value)
+
+
+def _money(amount: Any, currency: Optional[str]) -> str:
+    return f"{_num(amount)} {currency or 'CNY'}"
+
+
+def _yes_no(value: bool) -> str:
+    return "Yes" if value else "No"
+
+
+def _date(value: Optional[str]) -> Optional[str]:
+    return value[:10] if value else None
+
+
+def _heading(intake: Dict[str, Any]) -> str:
+    details = [intake.get("degree_level")]
+    if intake.get("teaching_language"):
+        details.append(f"{intake['teaching_language']}-taught")
+    if intake.get("intake_term"):
+        details.append(f"{str(intake['intake_term']).title()} {intake.get('intake_year') or ''}".strip() + " intake")
+    details = ", ".join(d for d in details if d)
+    return f"**{intake['university_name']} - {intake['major_name']}**" + (f" ({details})" if details else "")
+
+
+def estimate_total_cost(intake: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Course total over duration_years (same arithmetic as PartnerAgent.build_db_context)"""
+    duration = intake.get("duration_years")
+    if not duration:
+        return None
+    tuition = (intake.get("tuition_per_year") or 0) * duration
+    accommodation = 0
+    if intake.get("accommodation_fee"):
+        period = intake.get("accommodation_fee_period") or "year"
+        if period == "year":
+            accommodation = intake["accommodation_fee"] * duration
+        elif period == "semester":
+            accommodation = intake["accommodation_fee"] * duration * 2
+    insurance = 0
+    if intake.get("medical_insurance_fee") and (intake.get("medical_insurance_fee_period") or "year") == "year":
+        insurance = intake["medical_insurance_fee"] * duration
+    one_time = (intake.get("application_fee") or 0) + (intake.get("arrival_medical_checkup_fee") or 0)
+    visa = (intake.get("visa_extension_fee") or 0) * duration
+    total = one_time + tuition + accommodation + insurance + visa
+    if not total:
+        return None
+    return {"duration": duration, "total": total, "one_time": one_time,
+            "recurring": tuition + accommodation + insurance, "visa": visa}
+
+
+def _fee_lines(intake: Dict[str, Any], req_focus: Dict[str, bool]) -> List[str]:
+    currency = intake.get("currency")
+    lines = []
+    if intake.get("tuition_per_year"):
+        lines.append(f"- Tuition: {_money(intake['tuition_per_year'], currency)} per year")
+    if intake.get("tuition_per_semester"):
+        lines.append(f"- Tuition: {_money(intake['tuition_per_semester'], currency)} per semester")
+    if intake.get("application_fee"):
+        lines.append(f"- Application fee: {_money(intake['application_fee'], currency)} (one-time)")
+    if intake.get("accommodation_fee"):
+        lines.append(f"- Accommodation: {_money(intake['accommodation_fee'], currency)} per {intake.get('accommodation_fee_period') or 'year'}")
+    if intake.get("medical_insurance_fee"):
+        lines.append(f"- Medical insurance: {_money(intake['medical_insurance_fee'], currency)} per {intake.get('medical_insurance_fee_period') or 'year'}")
+    if intake.get("arrival_medical_checkup_fee"):
+        lines.append(f"- Arrival medical checkup: {_money(intake['arrival_medical_checkup_fee'], currency)} (one-time)")
+    if intake.get("visa_extension_fee"):
+        lines.append(f"- Visa extension: {_money(intake['visa_extension_fee'], currency)} (annual)")
+    if intake.get("service_fee"):
+        lines.append(f"- MalishaEdu service fee: {_money(intake['service_fee'], currency)} (only after a successful application)")
+    estimate = estimate_total_cost(intake)
+    if estimate:
+        breakdown = " + ".join(
+            f"{label} {_num(estimate[key])}"
+            for key, label in (("one_time", "one-time fees"), ("recurring", "recurring fees"), ("visa", "visa extensions"))
+            if estimate[key]
+        )
+        lines.append(
+            f"- **Estimated total over {_num(estimate['duration'])} year(s):** {_money(estimate['total'], currency)} ({breakdown})"
+        )
+    if req_focus.get("bank"):
+        lines.extend(_bank_lines(intake))
+    if req_focus.get("age"):
+        lines.extend(_age_lines(intake))
+    if req_focus.get("exams"):
+        lines.extend(_language_test_lines(intake))
+    return lines
+
+
+def _bank_lines(intake: Dict[str, Any]) -> List[str]:
+    if intake.get("bank_statement_required") is None and intake.get("bank_statement_amount") is None:
+        return []
+    line = f"- **Bank statement required:** {_yes_no(intake.get('bank_statement_required') is not False)}"
+    if intake.get("bank_statement_amount") is not None:
+        line += f", amount {_money(intake['bank_statement_amount'], intake.get('bank_statement_currency'))}"
+    if intake.get("bank_statement_note"):
+        line += f" ({intake['bank_statement_note']})"
+    return [line]
+
+
+def _age_lines(intake: Dict[str, Any]) -> List[str]:
+    age_min, age_max = intake.get("age_min"), intake.get("age_max")
+    if age_min is not None and age_max is not None:
+        return [f"- Age: {age_min}-{age_max}"]
+    if age_min is not None:
+        return [f"- Age: {age_min} or older"]
+    if age_max is not None:
+        return [f"- Age: up to {age_max}"]
+    return []
+
+
+def _language_test_lines(intake: Dict[str, Any]) -> List[str]:
+    lines = []
+    if intake.get("hsk_required") is not None:
+        line = f"- HSK required: {_yes_no(intake['hsk_required'])}"
+        if intake.get("hsk_level") is not None:
+            line += f", level {intake['hsk_level']}"
+        if intake.get("hsk_min_score") is not None:
+            line += f", minimum score {intake['hsk_min_score']}"
+        lines.append(line)
+    if intake.get("english_test_required") is not None:
+        line = f"- English test required: {_yes_no(intake['english_test_required'])}"
+        if intake.get("english_test_note"):
+            line += f" ({intake['english_test_note']})"
+        lines.append(line)
+    return lines
+
+
+def _requirement_lines(intake: Dict[str, Any], documents: List[Dict[str, Any]], exams: List[Dict[str, Any]],
+                       req_focus: Dict[str, bool]) -> List[str]:
+    lines = _age_lines(intake)
+    if intake.get("min_average_score") is not None:
+        lines.append(f"- Minimum average score: {_num(intake['min_average_score'])}")
+    for field, label in (("interview_required", "Interview"), ("written_test_required", "Written test"),
+                         ("acceptance_letter_required", "Acceptance letter")):
+        if intake.get(field) is not None:
+            lines.append(f"- {label} required: {_yes_no(intake[field])}")
+    if intake.get("inside_china_applicants_allowed") is not None:
+        line = f"- Applicants inside China accepted: {_yes_no(intake['inside_china_applicants_allowed'])}"
+        if intake.get("inside_china_extra_requirements"):
+            line += f" ({intake['inside_china_extra_requirements']})"
+        lines.append(line)
+    lines.extend(_bank_lines(intake))
+    lines.extend(_language_test_lines(intake))
+    if req_focus.get("accommodation") and intake.get("accommodation_note"):
+        lines.append(f"- Accommodation: {intake['accommodation_note']}")
+    if documents:
+        lines.append("\n**Required documents:**")
+        for doc in documents:
+            line = f"- {doc.get('name') or 'Document'}"
+            if doc.get("is_required") is False:
+                line += " (optional)"
+            extra = "; ".join(str(doc[key]) for key in ("rules", "applies_to") if doc.get(key))
+            lines.append(line + (f": {extra}" if extra else ""))
+    if exams:
+        lines.append("\n**Exams:**")
+        for exam in exams:
+            details = []
+            if exam.get("required") is not None:
+                details.append("required" if exam["required"] else "optional")
+            if exam.get("subjects"):
+                details.append(f"subjects: {exam['subjects']}")
+            if exam.get("min_level") is not None:
+                details.append(f"minimum level {exam['min_level']}")
+            if exam.get("min_score") is not None:
+                details.append(f"minimum score {_num(exam['min_score'])}")
+            if exam.get("exam_language"):
+                details.append(f"in {exam['exam_language']}")
+            if exam.get("notes"):
+                details.append(exam["notes"])
+            lines.append(f"- {exam.get('exam_name') or 'Exam'}" + (f" ({', '.join(details)})" if details else ""))
+    return lines
+
+
+def _scholarship_lines(intake: Dict[str, Any], scholarships: List[Dict[str, Any]]) -> List[str]:
+    lines = []
+    if intake.get("scholarship_available") is not None:
+        lines.append(f"- **Scholarship available:** {_yes_no(intake['scholarship_available'])}")
+    if intake.get("scholarship_info"):
+        lines.append(f"- {intake['scholarship_info']}")
+    for sch in scholarships:
+        details = []
+        covered = [label for key, label in (("covers_tuition", "tuition"), ("covers_accommodation", "accommodation"),
+                                            ("covers_insurance", "insurance")) if sch.get(key)]
+        if covered:
+            details.append("covers " + ", ".join(covered))
+        if sch.get("tuition_waiver_percent") is not None:
+            details.append(f"{_num(sch['tuition_waiver_percent'])}% tuition waiver")
+        if sch.get("living_allowance_monthly") is not None:
+            details.append(f"living allowance {_num(sch['living_allowance_monthly'])} CNY/month")
+        elif sch.get("living_allowance_yearly") is not None:
+            details.append(f"living allowance {_num(sch['living_allowance_yearly'])} CNY/year")
+        if sch.get("first_year_only"):
+            details.append("first year only")
+        if sch.get("renewal_required"):
+            details.append("renewal required")
+        if sch.get("deadline"):
+            details.append(f"deadline {_date(sch['deadline'])}")
+        name = sch.get("scholarship_name") or "Scholarship"
+        if sch.get("provider"):
+            name += f" ({sch['provider']})"
+        lines.append(f"- **{name}**" + (f": {'; '.join(details)}" if details else ""))
+        if sch.get("eligibility_note"):
+            lines.append(f"  - Eligibility: {sch['eligibility_note']}")
+    notes = intake.get("notes")
+    if notes and any(keyword in notes.lower() for keyword in _SCHOLARSHIP_NOTE_KEYWORDS):
+        lines.append(f"- Notes: {notes}")
+    return lines
+
+
+def _program_block(kind: str, intake: Dict[str, Any], documents: List[Dict[str, Any]],
+                   scholarships: List[Dict[str, Any]], exams: List[Dict[str, Any]],
+                   req_focus: Dict[str, bool]) -> List[str]:
+    block = [_heading(intake)]
+    deadline = _date(intake.get("application_deadline"))
+    if kind == "fees":
+        block.extend(_fee_lines(intake, req_focus))
+        if deadline:
+            block.append(f"- Application deadline: {deadline}")
+        if intake.get("accommodation_note"):
+            block.append(f"- Accommodation: {intake['accommodation_note']}")
+        if intake.get("notes"):
+            block.append(f"- Notes: {intake['notes']}")
+    elif kind == "requirements":
+        if intake.get("notes"):
+            block.append(f"- Notes: {intake['notes']}")
+        block.extend(_requirement_lines(intake, documents, exams, req_focus))
+        if deadline:
+            block.append(f"- Application deadline: {deadline}")
+    elif kind == "scholarship":
+        block.extend(_scholarship_lines(intake, scholarships))
+        if deadline:
+            block.append(f"- Application deadline: {deadline}")
+    else:  # details
+        if intake.get("duration_years"):
+            block.append(f"- Duration: {_num(intake['duration_years'])} year(s)")
+        if deadline:
+            block.append(f"- Application deadline: {deadline}")
+        fees = _fee_lines(intake, {})
+        if fees:
+            block.append("\n**Fees:**")
+            block.extend(fees)
+        requirements = _requirement_lines(intake, documents, exams, req_focus)
+        if requirements:
+            block.append("\n**Requirements:**")
+            block.extend(requirements)
+        scholarship = _scholarship_lines(intake, scholarships)
+        if scholarship:
+            block.append("\n**Scholarships:**")
+            block.extend(scholarship)
+        if intake.get("notes"):
+            block.append(f"\n**Notes:** {intake['notes']}")
+    return block
+
+
+def _comparison_table(intakes: List[Dict[str, Any]], scholarships_map: Dict[int, List[Dict[str, Any]]]) -> List[str]:
+    def tuition(i):
+        if i.get("tuition_per_year"):
+            return f"{_money(i['tuition_per_year'], i.get('currency'))}/year"
+        if i.get("tuition_per_semester"):
+            return f"{_money(i['tuition_per_semester'], i.get('currency'))}/semester"
+        return "-"
+
+    def scholarship(i):
+        names = [s.get("scholarship_name") for s in scholarships_map.get(i["id"], []) if s.get("scholarship_name")]
+        if names:
+            return ", ".join(names)
+        return {True: "Yes", False: "No"}.get(i.get("scholarship_available"), "-")
+
+    def total(i):
+        estimate = estimate_total_cost(i)
+        return _money(estimate["total"], i.get("currency")) if estimate else "-"
+
+    rows = [
+        ("University", lambda i: i["university_name"]),
+        ("Major", lambda i: i["major_name"]),
+        ("Degree", lambda i: i.get("degree_level") or "-"),
+        ("Teaching language", lambda i: i.get("teaching_language") or "-"),
+        ("Intake", lambda i: f"{str(i.get('intake_term') or '').title()} {i.get('intake_year') or ''}".strip() or "-"),
+        ("Duration", lambda i: f"{_num(i['duration_years'])} year(s)" if i.get("duration_years") else "-"),
+        ("Tuition", tuition),
+        ("Application fee", lambda i: _money(i["application_fee"], i.get("currency")) if i.get("application_fee") else "-"),
+        ("Accommodation", lambda i: f"{_money(i['accommodation_fee'], i.get('currency'))}/{i.get('accommodation_fee_period') or 'year'}" if i.get("accommodation_fee") else "-"),
+        ("Estimated total", total),
+        ("Scholarship", scholarship),
+        ("Application deadline", lambda i: _date(i.get("application_deadline")) or "-"),
+    ]
+    lines = ["| | " + " | ".join(f"Option {n}" for n in range(1, len(intakes) + 1)) + " |",
+             "|---|" + "---|" * len(intakes)]
+    for label, value in rows:
+        lines.append(f"| **{label}** | " + " | ".join(str(value(i)).replace("|", "/") for i in intakes) + " |")
+    return lines
+
+
+def render_answer(
+    intent: Optional[str],
+    intakes: List[Dict[str, Any]],
+    docs_map: Dict[int, List[Dict[str, Any]]],
+    scholarships_map: Dict[int, List[Dict[str, Any]]],
+    exams_map: Dict[int, List[Dict[str, Any]]],
+    req_focus: Optional[Dict[str, bool]] = None,
+) -> Optional[str]:
+    """
+    Render the answer for a structured intent from intake dicts and the batch maps.
+    Returns None when the intent has no template (the caller uses the LLM formatter).
+    """
+    kind = template_kind(intent)
+    if kind is None:
+        return None
+    req_focus = req_focus or {}
+    if not intakes:
+        return "No matching programs found in our partner database."
+
+    if kind == "comparison":
+        compared = intakes[:MAX_COMPARED_PROGRAMS]
+        parts = [f"Here is a side-by-side comparison of {len(compared)} program(s):", ""]
+        parts.extend(_comparison_table(compared, scholarships_map))
+        if len(intakes) > len(compared):
+            parts.append(f"\n{len(intakes) - len(compared)} more matching program(s) not shown. Name up to {MAX_COMPARED_PROGRAMS} programs to compare them.")
+        return "\n".join(parts)
+
+    detailed = intakes[:MAX_DETAILED_PROGRAMS]
+    blocks = []
+    for intake in detailed:
+        intake_id = intake.get("id")
+        blocks.append("\n".join(_program_block(
+            kind, intake, docs_map.get(intake_id, []), scholarships_map.get(intake_id, []),
+            exams_map.get(intake_id, []), req_focus
+        )))
+    answer = "\n\n".join(blocks)
+    if len(intakes) > len(detailed):
+        others = [f"- {i['university_name']} - {i['major_name']}" for i in intakes[len(detailed):]]
+        answer += f"\n\n**{len(others)} more matching program(s):**\n" + "\n".join(others) + "\n\nAsk about any of them for details."
+    return answer
+
+
+class TemplateStats(Counters):
+    """Counts answers rendered from templates vs the LLM formatter, per intent"""
+
+    def record(self, intent: Optional[str], path: str):
+        self.add(intent or "unknown", path)
+
+    def summarize(self, counts: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+        by_intent = {intent: {"template": c.get("template", 0), "llm": c.get("llm", 0)} for intent, c in counts.items()}
+        template = sum(c["template"] for c in by_intent.values())
+        total = template + sum(c["llm"] for c in by_intent.values())
+        return {
+            "template_answers": template,
+            "llm_answers": total - template,
+            "template_rate": round(template / total, 3) if total else 0.0,
+            "by_intent": by_intent,
+        }
+
+
+template_stats = TemplateStats("partner_templates")
@@ -0,0 +1,200 @@
+"""
+CatalogService - process-wide snapshot of universities and majors
+
+Agents need the full university/major catalog for fuzzy matching and prompt context.
+Instead of every agent instance re-reading it from the database, one immutable
+CatalogSnapshot is shared by all requests in the process:
+
+- Loaded lazily on first use, then reused until invalidated or CATALOG_TTL_SECONDS passes
+  (the TTL is a safety net for writes made by other worker processes)
+- Refreshed atomically: a new snapshot is built completely, then swapped in; requests
+  holding the old snapshot keep a consistent view
+- Invalidated by the university/major/program-intake write endpoints
+- A MatchIndex (fuzzy-match candidate index) is built lazily for each snapshot
+
+Snapshot rows are plain dicts shared between requests - treat them as read-only.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import threading
+import time
+
+from app.config import settings
+from app.services.match_index import MatchIndex
+
+
+def _normalize_json_list(value: Any) -> List[str]:
+    """Normalize JSON/CSV/None list columns (aliases, keywords) to a list of strings"""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+            return parsed if isinstance(parsed, list) else []
+        except (json.JSONDecodeError, ValueError):
+            return [v.strip() for v in value.split(',') if v.strip()] if value else []
+    return []
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Immutable view of the university/major catalog"""
+    universities: Tuple[Dict[str, Any], ...] = ()
+    majors: Tuple[Dict[str, Any], ...] = ()
+    version: int = 0
+    loaded_at: float = 0.0
+    complete: bool = True  # False if part of the load failed (snapshot is then not reused)
+    university_by_id: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    major_by_id: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    partner_universities: Tuple[Dict[str, Any], ...] = ()
+    partner_majors: Tuple[Dict[str, Any], ...] = ()
+
+    @classmethod
+    def build(cls, universities: List[Dict[str, Any]], majors: List[Dict[str, Any]],
+              version: int, complete: bool = True) -> "CatalogSnapshot":
+        university_by_id = {u["id"]: u for u in universities}
+        partner_ids = {u["id"] for u in universities if u.get("is_partner")}
+        return cls(
+            universities=tuple(universities),
+            majors=tuple(majors),
+            version=version,
+            loaded_at=time.time(),
+            complete=complete,
+            university_by_id=university_by_id,
+            major_by_id={m["id"]: m for m in majors},
+            partner_universities=tuple(u for u in universities if u.get("is_partner")),
+            partner_majors=tuple(m for m in majors if m["university_id"] in partner_ids),
+        )
+
+
+class CatalogService:
+    """Holds the current CatalogSnapshot and reloads it when invalidated or stale"""
+
+    # Upper bounds for the catalog load (far above the current catalog size)
+    MAX_UNIVERSITIES = 5000
+    MAX_MAJORS = 50000
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._generation = 0  # Bumped by invalidate()
+        self._loaded_generation = -1
+        self._match_index: Optional[MatchIndex] = None
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, snapshot: Optional[CatalogSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.complete
+            and self._loaded_generation == self._generation
+            and (time.time() - snapshot.loaded_at) < self.ttl_seconds
+        )
+
+    def get(self, db_service, force_reload: bool = False) -> CatalogSnapshot:
+        """
+        Return the current snapshot, loading it with db_service (a DBQueryService) if needed.
+        Concurrent callers wait for a single reload instead of each querying the database.
+        """
+        snapshot = self._snapshot
+        if not force_reload and self._is_fresh(snapshot):
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if not force_reload and self._is_fresh(snapshot):
+                return snapshot
+            generation = self._generation
+            new_snapshot = self._load(db_service, version=(snapshot.version + 1) if snapshot else 1)
+            if not new_snapshot.complete and snapshot is not None and snapshot.complete:
+                # Keep serving the previous snapshot rather than a partial one
+                return snapshot
+            self._snapshot = new_snapshot
+            self._loaded_generation = generation
+            return new_snapshot
+
+    def get_match_index(self, db_service) -> MatchIndex:
+        """Return the MatchIndex for the current snapshot (built on first use per snapshot)"""
+        snapshot = self.get(db_service)
+        index = self._match_index
+        if index is not None and index.version == snapshot.version:
+            return index
+        with self._lock:
+            index = self._match_index
+            if index is None or index.version != snapshot.version:
+                index = MatchIndex(snapshot.universities, snapshot.majors, version=snapshot.version)
+                self._match_index = index
+            return index
+
+    def invalidate(self):
+        """Mark the snapshot stale; the next get() reloads it"""
+        with self._lock:
+            self._generation += 1
+
+    def reset(self):
+        """Drop the snapshot entirely (tests)"""
+        with self._lock:
+            self._snapshot = None
+            self._match_index = None
+            self._generation += 1
+
+    def _load(self, db_service, version: int) -> CatalogSnapshot:
+        complete = True
+        universities: List[Dict[str, Any]] = []
+        majors: List[Dict[str, Any]] = []
+
+        try:
+            for uni in db_service.search_universities(limit=self.MAX_UNIVERSITIES):
+                universities.append({
+                    "id": uni.id,
+                    "name": uni.name,
+                    "name_cn": uni.name_cn,
+                    "aliases": _normalize_json_list(uni.aliases),
+                    "city": uni.city,
+                    "province": uni.province,
+                    "ranking": uni.university_ranking,
+                    "country": uni.country or "China",
+                    "description": uni.description,
+                    "is_partner": bool(uni.is_partner),
+                })
+        except Exception as e:
+            print(f"Error loading university catalog: {e}")
+            complete = False
+            self._rollback(db_service)
+
+        # University names come from the university rows above (no per-major lazy load)
+        university_names = {u["id"]: u["name"] for u in universities}
+        try:
+            for major in db_service.search_majors(limit=self.MAX_MAJORS):
+                majors.append({
+                    "id": major.id,
+                    "name": major.name,
+                    "name_cn": getattr(major, 'name_cn', None),
+                    "keywords": _normalize_json_list(getattr(major, 'keywords', None)),
+                    "aliases": _normalize_json_list(getattr(major, 'aliases', None)),
+                    "degree_level": str(major.degree_level) if major.degree_level else None,
+                    "teaching_language": str(major.teaching_language) if major.teaching_language else None,
+                    "discipline": getattr(major, 'discipline', None),
+                    "category": getattr(major, 'category', None),
+                    "duration_years": getattr(major, 'duration_years', None),
+                    "university_id": major.university_id,
+                    "university_name": university_names.get(major.university_id),
+                })
+        except Exception as e:
+            print(f"Error loading major catalog: {e}")
+            complete = False
+            self._rollback(db_service)
+
+        return CatalogSnapshot.build(universities, majors, version=version, complete=complete)
+
+    @staticmethod
+    def _rollback(db_service):
+        # Rollback any failed transaction to allow subsequent queries
+        try:
+            db_service.db.rollback()
+        except Exception:
+            pass
+
+
+# Process-wide catalog shared by all agents
+catalog_service = CatalogService(ttl_seconds=settings.CATALOG_TTL_SECONDS)
@@ -0,0 +1,167 @@
+"""
+MarkdownChunker - structure-aware, token-sized chunking for RAG ingestion
+
+Splits documents on their own structure instead of raw character offsets:
+- Markdown headings start a new chunk and form the section path ("FAQ > Fees > Q: ...")
+- FAQ question/answer pairs (Q:/A:, **Q: ...**, ### Q1) ...) stay together
+- Paragraphs are packed into chunks of at most max_tokens (tiktoken tokens)
+- Only a unit larger than max_tokens is split (on lines/sentences, with overlap_tokens of overlap)
+
+Every chunk starts with its section path so the embedding and the LLM context both know
+where the text comes from; the path is also stored in RagChunk.meta_data.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+import re
+
+CHUNKER_VERSION = "markdown-v1"
+
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_RULE_RE = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+_QUESTION_RE = re.compile(r'^\s*(?:\*\*|__)?\s*(?:Q\d*\s*[:).]|Question\s*\d*\s*[:).])', re.IGNORECASE)
+_SENTENCE_RE = re.compile(r'(?<=[.!?。！？])\s+')
+
+
+@dataclass
+class Chunk:
+    text: str
+    section_path: List[str] = field(default_factory=list)
+    token_count: int = 0
+
+    def metadata(self) -> Dict[str, Any]:
+        return {"section_path": self.section_path, "token_count": self.token_count, "chunker": CHUNKER_VERSION}
+
+
+def _clean_heading(text: str) -> str:
+    return text.strip().strip('*_').strip()
+
+
+class MarkdownChunker:
+    """Chunks markdown/plain text by headings, paragraphs and Q/A pairs, sized by tokens"""
+
+    def __init__(self, encoding, max_tokens: int = 300, overlap_tokens: int = 40):
+        self.encoding = encoding
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def _tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+    def chunk(self, text: str) -> List[Chunk]:
+        chunks: List[Chunk] = []
+        for section_path, units in self._sections(text or ""):
+            chunks.extend(self._pack(section_path, units))
+        return chunks
+
+    def _sections(self, text: str):
+        """Yield (section_path, units) for each heading-delimited section"""
+        path: List[tuple] = []  # (level, title)
+        units: List[str] = []
+        paragraph: List[str] = []
+
+        def flush_paragraph():
+            if not paragraph:
+                return
+            block = "\n".join(paragraph).strip()
+            paragraph.clear()
+            if not block:
+                return
+            # An answer belongs to the question before it (until the next question/heading)
+            if units and not _QUESTION_RE.match(block) and _QUESTION_RE.match(units[-1]):
+                units[-1] = f"{units[-1]}\n\n{block}"
+            else:
+                units.append(block)
+
+        for line in text.splitlines():
+            heading = _HEADING_RE.match(line)
+            if heading:
+                flush_paragraph()
+                if units:
+                    yield [title for _, title in path], list(units)
+                    units.clear()
+                level = len(heading.group(1))
+                path = [(lvl, title) for lvl, title in path if lvl < level]
+                path.append((level, _clean_heading(heading.group(2))))
+            elif not line.strip() or _RULE_RE.match(line):
+                flush_paragraph()
+            else:
+                if _QUESTION_RE.match(line) and paragraph:
+                    flush_paragraph()
+                paragraph.append(line.rstrip())
+        flush_paragraph()
+        if units:
+            yield [title for _, title in path], list(units)
+
+    def _pack(self, section_path: List[str], units: List[str]) -> List[Chunk]:
+        """Greedily pack units into chunks of at most max_tokens (section path included)"""
+        header = " > ".join(section_path)
+        header_tokens = self._tokens(header) + 2 if header else 0
+        budget = max(self.max_tokens - header_tokens, self.max_tokens // 2)
+
+        bodies: List[str] = []
+        current: List[str] = []
+        current_tokens = 0
+        for unit in units:
+            unit_tokens = self._tokens(unit)
+            if unit_tokens > budget:
+                if current:
+                    bodies.append("\n\n".join(current))
+                    current, current_tokens = [], 0
+                bodies.extend(self._split_large(unit, budget))
+                continue
+            if current and current_tokens + unit_tokens > budget:
+                bodies.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(unit)
+            current_tokens += unit_tokens
+        if current:
+            bodies.append("\n\n".join(current))
+
+        chunks = []
+        for body in bodies:
+            chunk_text = f"{header}\n\n{body}" if header else body
+            chunks.append(Chunk(text=chunk_text, section_path=list(section_path), token_count=self._tokens(chunk_text)))
+        return chunks
+
+    def _split_large(self, unit: str, budget: int) -> List[str]:
+        """Split one oversized unit on lines/sentences into windows of budget tokens with overlap"""
+        pieces = []
+        for line in unit.split("\n"):
+            for sentence in _SENTENCE_RE.split(line):
+                if not sentence.strip():
+                    continue
+                if self._tokens(sentence) > budget:
+                    pieces.extend(self._split_tokens(sentence, budget))
+                else:
+                    pieces.append(sentence)
+
+        windows: List[str] = []
+        current: List[str] = []
+        current_tokens = 0
+        for piece in pieces:
+            piece_tokens = self._tokens(piece)
+            if current and current_tokens + piece_tokens > budget:
+                windows.append(" ".join(current))
+                # Carry trailing pieces (up to overlap_tokens) into the next window
+                overlap: List[str] = []
+                overlap_tokens = 0
+                for previous in reversed(current):
+                    previous_tokens = self._tokens(previous)
+                    if overlap_tokens + previous_tokens > self.overlap_tokens:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_tokens += previous_tokens
+                if overlap_tokens + piece_tokens > budget:
+                    overlap, overlap_tokens = [], 0
+                current, current_tokens = overlap, overlap_tokens
+            current.append(piece)
+            current_tokens += piece_tokens
+        if current:
+            windows.append(" ".join(current))
+        return windows
+
+    def _split_tokens(self, text: str, budget: int) -> List[str]:
+        """Last resort for text without line/sentence breaks: fixed token windows"""
+        tokens = self.encoding.encode(text)
+        step = max(budget - self.overlap_tokens, 1)
+        return [self.encoding.decode(tokens[start:start + budget]) for start in range(0, len(tokens), step)]
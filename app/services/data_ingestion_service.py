@@ -5,16 +5,63 @@ NO LLM-generated SQL is ever executed.
 """
 from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, insert, select, update
 from app.models import (
     University, Major, ProgramIntake, ProgramDocument, 
     Scholarship, ProgramIntakeScholarship, IntakeTerm
 )
 from app.schemas.document_import import ExtractedData, MajorInfo, ProgramIntakeInfo
+from app.config import settings
+from collections import OrderedDict
 from datetime import datetime
 import json
 
 
+class _UpsertPlan:
+    """In-memory insert/update diff for one table, keyed by its identity rule"""
+    
+    def __init__(self, model, key_columns: Tuple, key_of):
+        self.model = model
+        self.key_columns = key_columns
+        self.key_of = key_of  # column values (mapping) -> identity tuple
+        self.ids: Dict[Tuple, int] = {}  # identity -> id (preloaded rows, then inserted rows)
+        self.updates: Dict[int, Dict] = {}
+        self.inserts: "OrderedDict[Tuple, Dict]" = OrderedDict()
+    
+    def preload(self, db: Session, *criteria):
+        """Load the identities of existing rows in one query"""
+        # Ordered by id: like .first(), the oldest row with an identity wins
+        for row in db.execute(select(self.model.id, *self.key_columns).where(*criteria).order_by(self.model.id)):
+            self.ids.setdefault(self.key_of(row._mapping), row.id)
+    
+    def add(self, fields: Dict) -> Tuple[bool, Tuple]:
+        """Record the latest values for a row; (True if it is a new row, identity)"""
+        key = self.key_of(fields)
+        if key in self.ids:
+            self.updates[self.ids[key]] = fields
+            return False, key
+        is_new = key not in self.inserts
+        self.inserts[key] = fields
+        return is_new, key
+    
+    def apply(self, db: Session):
+        """One batched INSERT ... RETURNING and one batched UPDATE by primary key"""
+        # One executemany per column set (ORM bulk statements also split on None values)
+        for rows in self._by_columns(self.inserts.values()):
+            # New ids are matched back by identity, so RETURNING order does not matter
+            for row in db.execute(insert(self.model).returning(self.model.id, *self.key_columns), rows):
+                self.ids[self.key_of(row._mapping)] = row.id
+        for rows in self._by_columns({"id": row_id, **fields} for row_id, fields in self.updates.items()):
+            db.execute(update(self.model), rows)
+    
+    @staticmethod
+    def _by_columns(rows) -> List[List[Dict]]:
+        groups: "OrderedDict[Tuple, List[Dict]]" = OrderedDict()
+        for row in rows:
+            groups.setdefault(tuple(sorted(k for k, v in row.items() if v is not None)), []).append(row)
+        return list(groups.values())
+
+
 class DataIngestionService:
     """Service to ingest extracted data into database deterministically"""
     
@@ -113,56 +160,22 @@ class DataIngestionService:
                 counts["errors"] = errors
                 return counts
             
-            # Process each major
-            for major_data in majors_data:
+            # Bulk path: preload identities, diff in memory, batched writes (one transaction)
+            university_id = university.id
+            bulk_done = False
+            if settings.DATA_INGESTION_BULK:
                 try:
-                    major_result = self._process_major(university.id, major_data)
-                    counts["majors_inserted"] += major_result["inserted"]
-                    counts["majors_updated"] += major_result["updated"]
-                    
-                    # Process intakes for this major
-                    if major_result["major_id"]:
-                        intakes_data = major_data.get("intakes", [])
-                        major_degree_level = major_data.get("degree_level")
-                        major_teaching_language = major_data.get("teaching_language")
-                        major_duration_years = major_data.get("duration_years")
-                        for intake_data in intakes_data:
-                            intake_result = self._process_program_intake(
-                                university.id, 
-                                major_result["major_id"], 
-                                intake_data,
-                                major_degree_level,
-                                major_teaching_language,
-                                major_duration_years
-                            )
-                            counts["program_intakes_inserted"] += intake_result["inserted"]
-                            counts["program_intakes_updated"] += intake_result["updated"]
-                            
-                            # Process documents for this intake
-                            if intake_result["intake_id"]:
-                                docs_result = self._process_documents(
-                                    intake_result["intake_id"],
-                                    intake_data.get("documents", [])
-                                )
-                                counts["documents_inserted"] += docs_result["inserted"]
-                                counts["documents_updated"] += docs_result["updated"]
-                            
-                            # Process scholarships for this intake
-                            if intake_result["intake_id"]:
-                                scholarships_result = self._process_scholarships(
-                                    intake_result["intake_id"],
-                                    intake_data.get("scholarships", [])
-                                )
-                                counts["scholarships_inserted"] += scholarships_result["inserted"]
-                                counts["scholarships_updated"] += scholarships_result["updated"]
-                                counts["links_inserted"] += scholarships_result["links_inserted"]
-                
+                    self._ingest_bulk(university_id, majors_data, counts)
+                    bulk_done = True
                 except Exception as e:
-                    error_msg = f"Error processing major '{major_data.get('name', 'unknown')}': {str(e)}"
-                    errors.append(error_msg)
-                    print(f"❌ {error_msg}")
-                    import traceback
-                    print(traceback.format_exc())
+                    self.db.rollback()
+                    print(f"⚠️  Bulk ingestion failed, retrying row by row: {e}")
+                    for key in counts:
+                        if key != "errors":
+                            counts[key] = 0
+            
+            if not bulk_done:
+                self._ingest_row_by_row(university_id, majors_data, counts, errors)
             
             # Commit transaction
             self.db.commit()
@@ -184,6 +197,152 @@ class DataIngestionService:
             print(traceback.format_exc())
             return counts
     
+    def _ingest_bulk(self, university_id: int, majors_data: List[Dict], counts: Dict):
+        """
+        Set-based ingestion: preload the university's majors, intakes, documents and scholarship
+        links plus the referenced scholarships (5 queries), diff in memory with the same identity
+        rules, then apply one batched INSERT and one batched UPDATE per table. Counts are the same
+        as the row-by-row path (a repeated identity in the extracted data counts as an update).
+        """
+        university_major_ids = select(Major.id).where(Major.university_id == university_id)
+        university_intake_ids = select(ProgramIntake.id).where(ProgramIntake.major_id.in_(university_major_ids))
+        
+        # Majors: (university_id, lower(name), degree_level, teaching_language)
+        majors = _UpsertPlan(
+            Major, (Major.name, Major.degree_level, Major.teaching_language),
+            lambda r: (r["name"].lower(), r["degree_level"], r["teaching_language"])
+        )
+        majors.preload(self.db, Major.university_id == university_id)
+        major_keys = []
+        for major_data in majors_data:
+            fields = self._major_fields(university_id, major_data)
+            key = None
+            if fields:
+                is_new, key = majors.add(fields)
+                counts["majors_inserted" if is_new else "majors_updated"] += 1
+            major_keys.append(key)
+        majors.apply(self.db)
+        
+        # Program intakes: (major_id, intake_term, intake_year)
+        intakes = _UpsertPlan(
+            ProgramIntake, (ProgramIntake.major_id, ProgramIntake.intake_term, ProgramIntake.intake_year),
+            lambda r: (r["major_id"], r["intake_term"], r["intake_year"])
+        )
+        intakes.preload(self.db, ProgramIntake.major_id.in_(university_major_ids))
+        intake_entries = []  # (identity, intake_data) in document order
+        for major_data, major_key in zip(majors_data, major_keys):
+            if not major_key:
+                continue
+            major_id = majors.ids[major_key]
+            for intake_data in major_data.get("intakes") or []:
+                fields = self._intake_fields(
+                    university_id, major_id, intake_data,
+                    major_data.get("degree_level"), major_data.get("teaching_language"), major_data.get("duration_years")
+                )
+                if not fields:
+                    continue
+                is_new, key = intakes.add(fields)
+                counts["program_intakes_inserted" if is_new else "program_intakes_updated"] += 1
+                intake_entries.append((key, intake_data))
+        intakes.apply(self.db)
+        
+        # Program documents: (program_intake_id, name)
+        documents = _UpsertPlan(
+            ProgramDocument, (ProgramDocument.program_intake_id, ProgramDocument.name),
+            lambda r: (r["program_intake_id"], r["name"])
+        )
+        documents.preload(self.db, ProgramDocument.program_intake_id.in_(university_intake_ids))
+        for key, intake_data in intake_entries:
+            for doc_data in intake_data.get("documents") or []:
+                fields = self._document_fields(intakes.ids[key], doc_data)
+                if fields:
+                    is_new, _ = documents.add(fields)
+                    counts["documents_inserted" if is_new else "documents_updated"] += 1
+        documents.apply(self.db)
+        
+        # Scholarships: lower(name), global
+        scholarship_entries = [
+            (intakes.ids[key], scholarship_data)
+            for key, intake_data in intake_entries
+            for scholarship_data in intake_data.get("scholarships") or []
+            if scholarship_data.get("name", "").strip()
+        ]
+        scholarships = _UpsertPlan(Scholarship, (Scholarship.name,), lambda r: (r["name"].lower(),))
+        names = sorted({data["name"].strip().lower() for _, data in scholarship_entries})
+        if names:
+            scholarships.preload(self.db, func.lower(Scholarship.name).in_(names))
+        scholarship_keys = []
+        for _, scholarship_data in scholarship_entries:
+            is_new, key = scholarships.add(self._scholarship_fields(scholarship_data))
+            counts["scholarships_inserted" if is_new else "scholarships_updated"] += 1
+            scholarship_keys.append(key)
+        scholarships.apply(self.db)
+        
+        # Links: (program_intake_id, scholarship_id)
+        links = _UpsertPlan(
+            ProgramIntakeScholarship, (ProgramIntakeScholarship.program_intake_id, ProgramIntakeScholarship.scholarship_id),
+            lambda r: (r["program_intake_id"], r["scholarship_id"])
+        )
+        if scholarship_entries:
+            links.preload(self.db, ProgramIntakeScholarship.program_intake_id.in_(university_intake_ids))
+        for (intake_id, scholarship_data), key in zip(scholarship_entries, scholarship_keys):
+            is_new, _ = links.add(self._link_fields(intake_id, scholarships.ids[key], scholarship_data))
+            if is_new:
+                counts["links_inserted"] += 1
+        links.apply(self.db)
+    
+    def _ingest_row_by_row(self, university_id: int, majors_data: List[Dict], counts: Dict, errors: List[str]):
+        """Per-major ingestion with identity lookups (errors are isolated per major)"""
+        for major_data in majors_data:
+            try:
+                major_result = self._process_major(university_id, major_data)
+                counts["majors_inserted"] += major_result["inserted"]
+                counts["majors_updated"] += major_result["updated"]
+                
+                # Process intakes for this major
+                if major_result["major_id"]:
+                    intakes_data = major_data.get("intakes", [])
+                    major_degree_level = major_data.get("degree_level")
+                    major_teaching_language = major_data.get("teaching_language")
+                    major_duration_years = major_data.get("duration_years")
+                    for intake_data in intakes_data:
+                        intake_result = self._process_program_intake(
+                            university_id, 
+                            major_result["major_id"], 
+                            intake_data,
+                            major_degree_level,
+                            major_teaching_language,
+                            major_duration_years
+                        )
+                        counts["program_intakes_inserted"] += intake_result["inserted"]
+                        counts["program_intakes_updated"] += intake_result["updated"]
+                        
+                        # Process documents for this intake
+                        if intake_result["intake_id"]:
+                            docs_result = self._process_documents(
+                                intake_result["intake_id"],
+                                intake_data.get("documents", [])
+                            )
+                            counts["documents_inserted"] += docs_result["inserted"]
+                            counts["documents_updated"] += docs_result["updated"]
+                        
+                        # Process scholarships for this intake
+                        if intake_result["intake_id"]:
+                            scholarships_result = self._process_scholarships(
+                                intake_result["intake_id"],
+                                intake_data.get("scholarships", [])
+                            )
+                            counts["scholarships_inserted"] += scholarships_result["inserted"]
+                            counts["scholarships_updated"] += scholarships_result["updated"]
+                            counts["links_inserted"] += scholarships_result["links_inserted"]
+            
+            except Exception as e:
+                error_msg = f"Error processing major '{major_data.get('name', 'unknown')}': {str(e)}"
+                errors.append(error_msg)
+                print(f"❌ {error_msg}")
+                import traceback
+                print(traceback.format_exc())
+    
     def _resolve_university(self, university_name: str) -> Optional[University]:
         """Resolve university by name (case-insensitive)"""
         university = self.db.query(University).filter(
@@ -197,37 +356,20 @@ class DataIngestionService:
         
         Identity: (university_id, lower(name), degree_level, teaching_language)
         """
-        name = major_data.get("name", "").strip()
-        degree_level = major_data.get("degree_level")
-        teaching_language = major_data.get("teaching_language")
-        
-        if not name or not degree_level or not teaching_language:
+        major_fields = self._major_fields(university_id, major_data)
+        if not major_fields:
             return {"inserted": 0, "updated": 0, "major_id": None}
         
         # Find existing major by identity
         existing_major = self.db.query(Major).filter(
             and_(
                 Major.university_id == university_id,
-                func.lower(Major.name) == func.lower(name),
-                Major.degree_level == degree_level,
-                Major.teaching_language == teaching_language
+                func.lower(Major.name) == func.lower(major_fields["name"]),
+                Major.degree_level == major_fields["degree_level"],
+                Major.teaching_language == major_fields["teaching_language"]
             )
         ).first()
         
-        # Prepare major data
-        major_fields = {
-            "university_id": university_id,
-            "name": name,
-            "degree_level": degree_level,
-            "teaching_language": teaching_language,
-            "duration_years": major_data.get("duration_years"),
-            "discipline": major_data.get("discipline"),
-            "category": major_data.get("category"),
-            "keywords": json.dumps(major_data.get("keywords")) if major_data.get("keywords") else None,
-            "is_featured": major_data.get("is_featured", False),
-            "is_active": major_data.get("is_active", True)
-        }
-        
         if existing_major:
             # Update existing major
             for key, value in major_fields.items():
@@ -241,31 +383,81 @@ class DataIngestionService:
             self.db.flush()
             return {"inserted": 1, "updated": 0, "major_id": new_major.id}
     
+    @staticmethod
+    def _major_fields(university_id: int, major_data: Dict) -> Optional[Dict]:
+        """Column values for a major, or None if its identity fields are missing"""
+        name = major_data.get("name", "").strip()
+        degree_level = major_data.get("degree_level")
+        teaching_language = major_data.get("teaching_language")
+        
+        if not name or not degree_level or not teaching_language:
+            return None
+        
+        return {
+            "university_id": university_id,
+            "name": name,
+            "degree_level": degree_level,
+            "teaching_language": teaching_language,
+            "duration_years": major_data.get("duration_years"),
+            "discipline": major_data.get("discipline"),
+            "category": major_data.get("category"),
+            "keywords": json.dumps(major_data.get("keywords")) if major_data.get("keywords") else None,
+            "is_featured": major_data.get("is_featured", False),
+            "is_active": major_data.get("is_active", True)
+        }
+    
     def _process_program_intake(self, university_id: int, major_id: int, intake_data: Dict, major_degree_level: Optional[str] = None, major_teaching_language: Optional[str] = None, major_duration_years: Optional[float] = None) -> Dict:
         """
         Process program intake: insert or update.
         
         Identity: (major_id, intake_term, intake_year)
         """
+        intake_fields = self._intake_fields(
+            university_id, major_id, intake_data, major_degree_level, major_teaching_language, major_duration_years
+        )
+        if not intake_fields:
+            return {"inserted": 0, "updated": 0, "intake_id": None}
+        
+        # Find existing intake by identity
+        existing_intake = self.db.query(ProgramIntake).filter(
+            and_(
+                ProgramIntake.major_id == major_id,
+                ProgramIntake.intake_term == intake_fields["intake_term"],
+                ProgramIntake.intake_year == intake_fields["intake_year"]
+            )
+        ).first()
+        
+        if existing_intake:
+            # Update existing intake
+            for key, value in intake_fields.items():
+                setattr(existing_intake, key, value)
+            self.db.flush()
+            return {"inserted": 0, "updated": 1, "intake_id": existing_intake.id}
+        else:
+            # Insert new intake
+            new_intake = ProgramIntake(**intake_fields)
+            self.db.add(new_intake)
+            self.db.flush()
+            return {"inserted": 1, "updated": 0, "intake_id": new_intake.id}
+    
+    def _intake_fields(self, university_id: int, major_id: int, intake_data: Dict, major_degree_level: Optional[str] = None, major_teaching_language: Optional[str] = None, major_duration_years: Optional[float] = None) -> Optional[Dict]:
+        """Column values for a program intake, or None if term/year are missing or invalid"""
         intake_term_str = intake_data.get("intake_term")
         intake_year = intake_data.get("intake_year")
         
         if not intake_term_str or not intake_year:
-            return {"inserted": 0, "updated": 0, "intake_id": None}
+            return None
         
         # Normalize intake_term enum
         intake_term = self._normalize_intake_term(intake_term_str)
         if not intake_term:
-            return {"inserted": 0, "updated": 0, "intake_id": None}
+            return None
         
-        # Find existing intake by identity
-        existing_intake = self.db.query(ProgramIntake).filter(
-            and_(
-                ProgramIntake.major_id == major_id,
-                ProgramIntake.intake_term == intake_term,
-                ProgramIntake.intake_year == intake_year
-            )
-        ).first()
+        # Normalize intake_year ("2026" and 2026 are the same identity)
+        try:
+            intake_year = int(str(intake_year).strip())
+        except (TypeError, ValueError):
+            return None
         
         # Parse dates
         fees_data = intake_data.get("fees", {})
@@ -288,8 +480,7 @@ class DataIngestionService:
             except:
                 pass
         
-        # Prepare intake data
-        intake_fields = {
+        return {
             "university_id": university_id,
             "major_id": major_id,
             "intake_term": intake_term,
@@ -334,19 +525,6 @@ class DataIngestionService:
             "duration_years": float(intake_data.get("duration_years")) if intake_data.get("duration_years") is not None else (float(major_duration_years) if major_duration_years is not None else None),  # Convert to float, use intake or major's duration_years
             "degree_type": intake_data.get("degree_type") or major_degree_level  # Use intake degree_type or fallback to major's degree_level
         }
-        
-        if existing_intake:
-            # Update existing intake
-            for key, value in intake_fields.items():
-                setattr(existing_intake, key, value)
-            self.db.flush()
-            return {"inserted": 0, "updated": 1, "intake_id": existing_intake.id}
-        else:
-            # Insert new intake
-            new_intake = ProgramIntake(**intake_fields)
-            self.db.add(new_intake)
-            self.db.flush()
-            return {"inserted": 1, "updated": 0, "intake_id": new_intake.id}
     
     def _process_documents(self, program_intake_id: int, documents_data: List[Dict]) -> Dict:
         """
@@ -358,26 +536,18 @@ class DataIngestionService:
         updated = 0
         
         for doc_data in documents_data:
-            name = doc_data.get("name", "").strip()
-            if not name:
+            doc_fields = self._document_fields(program_intake_id, doc_data)
+            if not doc_fields:
                 continue
             
             # Find existing document by identity
             existing_doc = self.db.query(ProgramDocument).filter(
                 and_(
                     ProgramDocument.program_intake_id == program_intake_id,
-                    ProgramDocument.name == name
+                    ProgramDocument.name == doc_fields["name"]
                 )
             ).first()
             
-            doc_fields = {
-                "program_intake_id": program_intake_id,
-                "name": name,
-                "is_required": doc_data.get("is_required", True),
-                "rules": doc_data.get("rules"),
-                "applies_to": doc_data.get("applies_to")
-            }
-            
             if existing_doc:
                 # Update existing document
                 for key, value in doc_fields.items():
@@ -392,6 +562,20 @@ class DataIngestionService:
         self.db.flush()
         return {"inserted": inserted, "updated": updated}
     
+    @staticmethod
+    def _document_fields(program_intake_id: int, doc_data: Dict) -> Optional[Dict]:
+        """Column values for a program document, or None without a name"""
+        name = doc_data.get("name", "").strip()
+        if not name:
+            return None
+        return {
+            "program_intake_id": program_intake_id,
+            "name": name,
+            "is_required": doc_data.get("is_required", True),
+            "rules": doc_data.get("rules"),
+            "applies_to": doc_data.get("applies_to")
+        }
+    
     def _process_scholarships(self, program_intake_id: int, scholarships_data: List[Dict]) -> Dict:
         """
         Process scholarships and links: insert or update.
@@ -413,11 +597,7 @@ class DataIngestionService:
                 func.lower(Scholarship.name) == func.lower(name)
             ).first()
             
-            scholarship_fields = {
-                "name": name,
-                "provider": scholarship_data.get("provider"),
-                "notes": scholarship_data.get("notes")
-            }
+            scholarship_fields = self._scholarship_fields(scholarship_data)
             
             if existing_scholarship:
                 # Update existing scholarship
@@ -441,20 +621,7 @@ class DataIngestionService:
                 )
             ).first()
             
-            link_fields = {
-                "program_intake_id": program_intake_id,
-                "scholarship_id": scholarship_id,
-                "covers_tuition": scholarship_data.get("covers_tuition"),
-                "covers_accommodation": scholarship_data.get("covers_accommodation"),
-                "covers_insurance": scholarship_data.get("covers_insurance"),
-                "tuition_waiver_percent": scholarship_data.get("tuition_waiver_percent"),
-                "living_allowance_monthly": scholarship_data.get("living_allowance_monthly"),
-                "living_allowance_yearly": scholarship_data.get("living_allowance_yearly"),
-                "first_year_only": scholarship_data.get("first_year_only"),
-                "renewal_required": scholarship_data.get("renewal_required"),
-                "deadline": self._parse_date(scholarship_data.get("deadline")),
-                "eligibility_note": scholarship_data.get("eligibility_note")
-            }
+            link_fields = self._link_fields(program_intake_id, scholarship_id, scholarship_data)
             
             if existing_link:
                 # Update existing link
@@ -469,6 +636,32 @@ class DataIngestionService:
         self.db.flush()
         return {"inserted": inserted, "updated": updated, "links_inserted": links_inserted}
     
+    @staticmethod
+    def _scholarship_fields(scholarship_data: Dict) -> Dict:
+        """Column values for a (global) scholarship"""
+        return {
+            "name": scholarship_data.get("name", "").strip(),
+            "provider": scholarship_data.get("provider"),
+            "notes": scholarship_data.get("notes")
+        }
+    
+    def _link_fields(self, program_intake_id: int, scholarship_id: int, scholarship_data: Dict) -> Dict:
+        """Column values for a program intake <-> scholarship link"""
+        return {
+            "program_intake_id": program_intake_id,
+            "scholarship_id": scholarship_id,
+            "covers_tuition": scholarship_data.get("covers_tuition"),
+            "covers_accommodation": scholarship_data.get("covers_accommodation"),
+            "covers_insurance": scholarship_data.get("covers_insurance"),
+            "tuition_waiver_percent": scholarship_data.get("tuition_waiver_percent"),
+            "living_allowance_monthly": scholarship_data.get("living_allowance_monthly"),
+            "living_allowance_yearly": scholarship_data.get("living_allowance_yearly"),
+            "first_year_only": scholarship_data.get("first_year_only"),
+            "renewal_required": scholarship_data.get("renewal_required"),
+            "deadline": self._parse_date(scholarship_data.get("deadline")),
+            "eligibility_note": scholarship_data.get("eligibility_note")
+        }
+    
     def _normalize_intake_term(self, intake_term_str: str) -> Optional[IntakeTerm]:
         """Normalize intake term string to enum"""
         if not intake_term_str:
@@ -6,6 +6,7 @@ from sqlalchemy import and_, or_, func, String
 from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta, timezone
 import json
+from app.config import settings
 from app.models import (
     University, Major, ProgramIntake, Student, 
     DegreeLevel, TeachingLanguage, IntakeTerm,
@@ -985,21 +986,8 @@ class DBQueryService:
         
         return query.all()
     
-    def find_program_intakes(
-        self,
-        filters: Optional[Dict[str, Any]] = None,
-        limit: int = 48,
-        offset: int = 0,
-        order_by: str = "deadline"  # "deadline", "start_date", "tuition"
-    ) -> Tuple[List[ProgramIntake], int]:
-        """
-        Efficient query for program intakes with comprehensive filters.
-        Returns (intakes, total_count).
-        Filters include: degree_level, major_text, university_id, teaching_language,
-        intake_term, intake_year, city, province, duration_years_target, duration_constraint,
-        scholarship flags, requirements flags, country_allowed, inside_china_allowed,
-        deadline_window, earliest flag.
-        """
+    def _program_intakes_base_query(self, filters: Optional[Dict[str, Any]]):
+        """ProgramIntake ⋈ Major ⋈ University for partner universities, upcoming deadlines unless deadline_window='all'"""
         query = self.db.query(ProgramIntake)
         
         # Join with Major and University
@@ -1018,470 +1006,258 @@ class DBQueryService:
                     ProgramIntake.application_deadline.is_(None)
                 )
             )
+        return query
+    
+    def _program_intake_filter_steps(self, filters: Optional[Dict[str, Any]]) -> List[Tuple[str, Any, Any]]:
+        """
+        Conditions for find_program_intakes, one step per active filter: (filter name, value, condition).
+        Shared by the production query (all applied at once) and explain_program_intakes (applied one by one).
+        """
+        if not filters:
+            return []
+        steps: List[Tuple[str, Any, Any]] = []
         
-        if filters:
-            # DETAILED LOGGING: Track each filter step
-            base_count = query.count()
-            print(f"DEBUG: find_program_intakes - Base query count (before filters): {base_count}")
-            print(f"DEBUG: find_program_intakes - Filters received: {list(filters.keys())}")
-            print(f"DEBUG: find_program_intakes - has_scholarship={filters.get('has_scholarship')}, scholarship_types={filters.get('scholarship_types')}, scholarship_type={filters.get('scholarship_type')}")
-            print(f"DEBUG: find_program_intakes - major_ids={filters.get('major_ids')}, degree_level={filters.get('degree_level')}, intake_term={filters.get('intake_term')}, intake_year={filters.get('intake_year')}")
-            
-            if filters.get("university_id"):
-                query = query.filter(ProgramIntake.university_id == filters["university_id"])
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After university_id={filters['university_id']}: {count_after} intakes")
-            elif filters.get("university_ids"):
-                # Filter by list of university IDs (IN clause)
-                uni_ids = filters["university_ids"]
-                query = query.filter(ProgramIntake.university_id.in_(uni_ids))
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After university_ids={uni_ids} ({len(uni_ids)} universities): {count_after} intakes")
-                
-                # Check which majors exist for these universities
-                if filters.get("major_ids"):
-                    major_ids = filters["major_ids"]
-                    # Check how many ProgramIntakes exist for these university_ids (without major filter)
-                    intakes_for_unis = self.db.query(ProgramIntake).filter(
-                        ProgramIntake.university_id.in_(uni_ids)
-                    ).count()
-                    print(f"DEBUG: find_program_intakes - Total intakes for {len(uni_ids)} universities: {intakes_for_unis}")
-                    
-                    # Check which majors belong to these universities
-                    majors_for_unis = self.db.query(Major).filter(
-                        Major.university_id.in_(uni_ids)
-                    ).all()
-                    major_ids_for_unis = [m.id for m in majors_for_unis]
-                    print(f"DEBUG: find_program_intakes - Major IDs that belong to these {len(uni_ids)} universities: {major_ids_for_unis} ({len(major_ids_for_unis)} majors)")
-                    
-                    # Check overlap between requested major_ids and majors in these universities
-                    overlap = [mid for mid in major_ids if mid in major_ids_for_unis]
-                    print(f"DEBUG: find_program_intakes - Overlap between requested major_ids={major_ids} and majors in universities: {overlap} ({len(overlap)} matches)")
-                    
-                    if len(overlap) == 0:
-                        print(f"DEBUG: find_program_intakes - WARNING: None of the {len(major_ids)} requested major_ids belong to the {len(uni_ids)} universities!")
-                        # Show which majors were requested
-                        requested_majors = self.db.query(Major).filter(Major.id.in_(major_ids)).all()
-                        print(f"DEBUG: find_program_intakes - Requested majors: {[(m.id, m.name, m.university_id) for m in requested_majors[:5]]}")
-            
-            if filters.get("major_ids"):
-                # Filter by list of major IDs (IN clause)
-                major_ids = filters["major_ids"]
-                count_before = query.count()
-                query = query.filter(ProgramIntake.major_id.in_(major_ids))
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After major_ids={major_ids} ({len(major_ids)} majors): {count_before} -> {count_after} intakes")
-                
-                # Check how many ProgramIntakes exist for these major_ids (without other filters)
-                intakes_for_majors = self.db.query(ProgramIntake).filter(
-                    ProgramIntake.major_id.in_(major_ids)
-                ).count()
-                print(f"DEBUG: find_program_intakes - Total intakes for {len(major_ids)} majors (no other filters): {intakes_for_majors}")
-            elif filters.get("major_id"):
-                query = query.filter(ProgramIntake.major_id == filters["major_id"])
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After major_id={filters['major_id']}: {count_after} intakes")
-            if filters.get("major_text"):
-                # Search in major name
-                query = query.filter(Major.name.ilike(f"%{filters['major_text']}%"))
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After major_text='{filters['major_text']}': {count_after} intakes")
-            if filters.get("degree_level"):
-                count_before = query.count()
-                query = query.filter(
-                    or_(
-                        ProgramIntake.degree_type.ilike(f"%{filters['degree_level']}%"),
-                        Major.degree_level.ilike(f"%{filters['degree_level']}%")
-                    )
-                )
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After degree_level='{filters['degree_level']}': {count_before} -> {count_after} intakes")
-            if filters.get("teaching_language"):
-                count_before = query.count()
-                query = query.filter(
-                    or_(
-                        ProgramIntake.teaching_language.ilike(f"%{filters['teaching_language']}%"),
-                        Major.teaching_language.ilike(f"%{filters['teaching_language']}%")
-                    )
-                )
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After teaching_language='{filters['teaching_language']}': {count_before} -> {count_after} intakes")
-            if filters.get("intake_term"):
-                count_before = query.count()
-                query = query.filter(ProgramIntake.intake_term == filters["intake_term"])
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After intake_term={filters['intake_term']}: {count_before} -> {count_after} intakes")
-            if filters.get("intake_year"):
-                count_before = query.count()
-                query = query.filter(ProgramIntake.intake_year == filters["intake_year"])
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After intake_year={filters['intake_year']}: {count_before} -> {count_after} intakes")
-            if filters.get("city"):
-                query = query.filter(University.city.ilike(f"%{filters['city']}%"))
-            if filters.get("province"):
-                query = query.filter(University.province.ilike(f"%{filters['province']}%"))
-            
-            # Duration constraint
-            if filters.get("duration_years_target") is not None:
-                duration_expr = func.coalesce(ProgramIntake.duration_years, Major.duration_years)
-                duration_constraint = filters.get("duration_constraint", "approx")
-                
-                if duration_constraint == "exact":
-                    query = query.filter(func.abs(duration_expr - filters["duration_years_target"]) < 0.1)
-                elif duration_constraint == "min":
-                    query = query.filter(duration_expr >= filters["duration_years_target"])
-                elif duration_constraint == "max":
-                    query = query.filter(duration_expr <= filters["duration_years_target"])
-                elif duration_constraint == "approx":
-                    query = query.filter(
-                        duration_expr >= filters["duration_years_target"] * 0.75,
-                        duration_expr <= filters["duration_years_target"] * 1.25
-                    )
-            
-            # Budget filter
-            if filters.get("budget_max") is not None:
-                budget_conditions = []
-                if ProgramIntake.tuition_per_year is not None:
-                    budget_conditions.append(ProgramIntake.tuition_per_year <= filters["budget_max"])
-                if ProgramIntake.tuition_per_semester is not None:
-                    budget_conditions.append(ProgramIntake.tuition_per_semester <= filters["budget_max"])
-                if budget_conditions:
-                    query = query.filter(or_(*budget_conditions))
-            
-            # Free tuition filter (tuition_per_year = 0 or NULL, tuition_per_semester = 0 or NULL)
-            if filters.get("free_tuition") is True:
-                count_before = query.count()
-                # Filter for programs where both tuition fields are 0 or NULL
-                query = query.filter(
-                    or_(
-                        # Both are 0
-                        and_(
-                            or_(ProgramIntake.tuition_per_year == 0, ProgramIntake.tuition_per_year.is_(None)),
-                            or_(ProgramIntake.tuition_per_semester == 0, ProgramIntake.tuition_per_semester.is_(None))
-                        ),
-                        # tuition_per_year is 0 or NULL, tuition_per_semester is NULL
-                        and_(
-                            or_(ProgramIntake.tuition_per_year == 0, ProgramIntake.tuition_per_year.is_(None)),
-                            ProgramIntake.tuition_per_semester.is_(None)
-                        ),
-                        # tuition_per_year is NULL, tuition_per_semester is 0 or NULL
-                        and_(
-                            ProgramIntake.tuition_per_year.is_(None),
-                            or_(ProgramIntake.tuition_per_semester == 0, ProgramIntake.tuition_per_semester.is_(None))
-                        )
-                    )
-                )
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After free_tuition filter: {count_before} -> {count_after} intakes")
-            
-            # Scholarship filter
-            if filters.get("has_scholarship"):
-                # CRITICAL: Filter by scholarship_available = True to only get programs that actually have scholarships
-                # BUT: If scholarship_types is also provided, we should search scholarship_info even if scholarship_available is NULL/False
-                # because scholarship_info might contain the scholarship details even if the flag isn't set
-                has_scholarship_types = filters.get("scholarship_types") or filters.get("scholarship_type")
-                
-                if not has_scholarship_types:
-                    # Only filter by scholarship_available if we're not filtering by specific types
-                    # (scholarship_types filter will handle scholarship_info search)
-                    query = query.filter(ProgramIntake.scholarship_available == True)
-                    count_after = query.count()
-                    print(f"DEBUG: find_program_intakes - After has_scholarship=True filter (scholarship_available=True): {count_after} intakes")
-                else:
-                    # If we have scholarship_types, we'll search scholarship_info directly
-                    # Don't filter by scholarship_available yet - let scholarship_types filter handle it
-                    count_before = query.count()
-                    print(f"DEBUG: find_program_intakes - has_scholarship=True AND scholarship_types provided - will search scholarship_info (count before: {count_before})")
-                    # Still filter by scholarship_available OR scholarship_info is not null
-                    # This allows finding scholarships even if scholarship_available flag isn't set
-                    count_before_has_scholarship = query.count()
-                    print(f"DEBUG: find_program_intakes - Before has_scholarship filter: {count_before_has_scholarship} intakes")
-                    
-                    # Check which intakes have scholarship_available=True vs scholarship_info
-                    from sqlalchemy import case, func
-                    has_scholarship_available = query.filter(ProgramIntake.scholarship_available == True).count()
-                    has_scholarship_info = query.filter(
-                        and_(
-                            ProgramIntake.scholarship_info.isnot(None),
-                            ProgramIntake.scholarship_info != ""
-                        )
-                    ).count()
-                    print(f"DEBUG: find_program_intakes - Intakes with scholarship_available=True: {has_scholarship_available}, with scholarship_info: {has_scholarship_info}")
-                    
-                    query = query.filter(
-                        or_(
-                            ProgramIntake.scholarship_available == True,
-                            ProgramIntake.scholarship_info.isnot(None),
-                            ProgramIntake.scholarship_info != ""
-                        )
-                    )
-                    count_after = query.count()
-                    print(f"DEBUG: find_program_intakes - After has_scholarship=True filter (scholarship_available=True OR scholarship_info not null): {count_after} intakes (filtered out {count_before_has_scholarship - count_after} intakes)")
-                    
-                    # If intakes were filtered out, show which ones
-                    if count_before_has_scholarship > count_after:
-                        filtered_out_query = self.db.query(ProgramIntake).join(Major).join(University).filter(
-                            University.is_partner == True,
-                            ProgramIntake.major_id.in_(filters.get("major_ids", [])),
-                            Major.degree_level == filters.get("degree_level"),
-                            ProgramIntake.intake_term == filters.get("intake_term"),
-                            ProgramIntake.intake_year == filters.get("intake_year"),
-                            ~or_(
-                                ProgramIntake.scholarship_available == True,
-                                ProgramIntake.scholarship_info.isnot(None),
-                                ProgramIntake.scholarship_info != ""
-                            )
-                        ).limit(5)
-                        filtered_out = filtered_out_query.all()
-                        for intake in filtered_out:
-                            print(f"DEBUG: find_program_intakes - Filtered out intake ID={intake.id}, university={intake.university.name if intake.university else 'N/A'}, major={intake.major.name if intake.major else 'N/A'}, scholarship_available={intake.scholarship_available}, has_scholarship_info={bool(intake.scholarship_info)}")
-            # Support both single scholarship_type and list of scholarship_types
-            # CRITICAL: Scholarship info is stored in ProgramIntake.scholarship_info text field, not in Scholarship table
-            # Search the scholarship_info field directly for "Type A", "Type B", "Type C", "CSC", etc.
-            if filters.get("scholarship_type") or filters.get("scholarship_types"):
-                count_before_types = query.count()
-                print(f"DEBUG: find_program_intakes - Before scholarship_types filter: {count_before_types} intakes")
-                
-                # Handle list of scholarship types (Type A, Type B, Type C, CSC)
-                scholarship_types = filters.get("scholarship_types", [])
-                if scholarship_types:
-                    print(f"DEBUG: find_program_intakes - Filtering by scholarship_types: {scholarship_types}")
-                    # Build OR conditions for each scholarship type - search in scholarship_info text field
-                    type_conditions = []
-                    for stype in scholarship_types:
-                        stype_lower = stype.lower()
-                        print(f"DEBUG: find_program_intakes - Processing scholarship type: '{stype}' (lower: '{stype_lower}')")
-                        if stype_lower == "csc":
-                            # Match CSC, CSCA, China Scholarship Council, Chinese Government Scholarship
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%CSC%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%CSCA%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%China Scholarship Council%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%Chinese Government Scholarship%"))
-                            print(f"DEBUG: find_program_intakes - Added CSC patterns for '{stype}'")
-                        elif stype_lower in ["type a", "type-a", "typea", "type a"]:
-                            # Match "Type A", "type a", "type-a", "type A", etc. (case-insensitive)
-                            # CRITICAL: ILIKE is case-insensitive, so we don't need multiple variations, but we'll keep them for clarity
-                            # Match "Type A" (with space), "Type-A" (with hyphen), "type a" (lowercase)
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%Type A%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%type a%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%type-a%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%Type-A%"))
-                            # Also match without space: "TypeA" (though less common)
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%TypeA%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%typea%"))
-                            print(f"DEBUG: find_program_intakes - Added Type A patterns for '{stype}' (6 patterns)")
-                        elif stype_lower in ["type b", "type-b", "typeb", "type b"]:
-                            # Match "Type B", "type b", "type-b", "type B", etc. (case-insensitive)
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%Type B%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%type b%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%type-b%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%Type-B%"))
-                            # Also match without space: "TypeB" (though less common)
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%TypeB%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%typeb%"))
-                            print(f"DEBUG: find_program_intakes - Added Type B patterns for '{stype}' (6 patterns)")
-                        elif stype_lower in ["type c", "type-c", "typec", "type c"]:
-                            # Match "Type C", "type c", "type-c", "type C", etc. (case-insensitive)
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%Type C%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%type c%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%type-c%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%Type-C%"))
-                            # Also match without space: "TypeC" (though less common)
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%TypeC%"))
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike("%typec%"))
-                            print(f"DEBUG: find_program_intakes - Added Type C patterns for '{stype}' (6 patterns)")
-                        else:
-                            # Generic match for other scholarship names
-                            type_conditions.append(ProgramIntake.scholarship_info.ilike(f"%{stype}%"))
-                            print(f"DEBUG: find_program_intakes - Added generic pattern '%{stype}%' for '{stype}'")
-                    
-                    if type_conditions:
-                        print(f"DEBUG: find_program_intakes - Applying {len(type_conditions)} scholarship type conditions (OR)")
-                        query = query.filter(or_(*type_conditions))
-                        count_after = query.count()
-                        print(f"DEBUG: find_program_intakes - After scholarship_types={scholarship_types} filter (searching scholarship_info): {count_after} intakes")
-                        
-                        # DEBUG: Show sample scholarship_info values for debugging
-                        if count_after == 0 and count_before_types > 0:
-                            print(f"DEBUG: find_program_intakes - WARNING: scholarship_types filter returned 0 results, but had {count_before_types} before filter")
-                            # Sample a few records to see what scholarship_info looks like
-                            # Create a new query with the same base filters but without scholarship_types filter
-                            from sqlalchemy.orm import Query
-                            # Get the session from the query
-                            session = query.session if hasattr(query, 'session') else self.db
-                            sample_query = session.query(ProgramIntake).filter(
-                                ProgramIntake.scholarship_info.isnot(None),
-                                ProgramIntake.scholarship_info != ""
-                            )
-                            # Apply the same base filters (major_ids, degree_level, etc.) if they exist
-                            if filters.get("major_ids"):
-                                sample_query = sample_query.filter(ProgramIntake.major_id.in_(filters["major_ids"]))
-                            if filters.get("degree_level"):
-                                sample_query = sample_query.join(Major).filter(Major.degree_level == filters["degree_level"])
-                            if filters.get("intake_term"):
-                                sample_query = sample_query.filter(ProgramIntake.intake_term == filters["intake_term"])
-                            if filters.get("intake_year"):
-                                sample_query = sample_query.filter(ProgramIntake.intake_year == filters["intake_year"])
-                            
-                            samples = sample_query.limit(5).all()
-                            print(f"DEBUG: find_program_intakes - Found {len(samples)} sample records with scholarship_info")
-                            for sample in samples:
-                                scholarship_info_preview = (sample.scholarship_info or "")[:200] if sample.scholarship_info else "NULL"
-                                print(f"DEBUG: find_program_intakes - Sample scholarship_info (ID={sample.id}): {scholarship_info_preview}...")
-                                # Check if it matches any of our patterns
-                                scholarship_info_lower = (sample.scholarship_info or "").lower()
-                                for stype in scholarship_types:
-                                    stype_lower = stype.lower()
-                                    if stype_lower == "csc":
-                                        if "csc" in scholarship_info_lower or "china scholarship council" in scholarship_info_lower:
-                                            print(f"DEBUG: find_program_intakes - Sample matches CSC pattern")
-                                    elif stype_lower in ["type a", "type-a", "typea"]:
-                                        if "type a" in scholarship_info_lower or "type-a" in scholarship_info_lower:
-                                            print(f"DEBUG: find_program_intakes - Sample matches Type A pattern")
-                                    elif stype_lower in ["type b", "type-b", "typeb"]:
-                                        if "type b" in scholarship_info_lower or "type-b" in scholarship_info_lower:
-                                            print(f"DEBUG: find_program_intakes - Sample matches Type B pattern")
-                                    elif stype_lower in ["type c", "type-c", "typec"]:
-                                        if "type c" in scholarship_info_lower or "type-c" in scholarship_info_lower:
-                                            print(f"DEBUG: find_program_intakes - Sample matches Type C pattern")
-                    else:
-                        print(f"DEBUG: find_program_intakes - WARNING: No type_conditions generated for scholarship_types={scholarship_types}")
-                elif filters.get("scholarship_type"):
-                    # Legacy single scholarship_type support - search in scholarship_info
-                    scholarship_type_lower = filters["scholarship_type"].lower()
-                    if scholarship_type_lower == "csc":
-                        query = query.filter(
-                            or_(
-                                ProgramIntake.scholarship_info.ilike("%CSC%"),
-                                ProgramIntake.scholarship_info.ilike("%CSCA%"),
-                                ProgramIntake.scholarship_info.ilike("%China Scholarship Council%"),
-                                ProgramIntake.scholarship_info.ilike("%Chinese Government Scholarship%")
-                            )
-                        )
-                    elif scholarship_type_lower == "university":
-                        # University scholarships (not CSC)
-                        query = query.filter(
-                            and_(
-                                ProgramIntake.scholarship_info.isnot(None),
-                                ~ProgramIntake.scholarship_info.ilike("%CSC%"),
-                                ~ProgramIntake.scholarship_info.ilike("%CSCA%"),
-                                ~ProgramIntake.scholarship_info.ilike("%China Scholarship Council%"),
-                                ~ProgramIntake.scholarship_info.ilike("%Chinese Government Scholarship%")
-                            )
-                        )
-            
-            # Requirements filters
-            if filters.get("bank_statement_amount") is not None:
-                query = query.filter(
-                    or_(
-                        ProgramIntake.bank_statement_amount.is_(None),
-                        ProgramIntake.bank_statement_amount <= filters["bank_statement_amount"]
-                    )
-                )
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After bank_statement_amount filter: {count_after} intakes")
-            if filters.get("bank_statement_required") is not None:
-                if filters["bank_statement_required"] is False:
-                    # Filter for programs that don't require bank statement (NULL or False)
-                    query = query.filter(
-                        or_(
-                            ProgramIntake.bank_statement_required.is_(None),
-                            ProgramIntake.bank_statement_required == False
-                        )
-                    )
-                else:
-                    query = query.filter(ProgramIntake.bank_statement_required == True)
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After bank_statement_required={filters['bank_statement_required']} filter: {count_after} intakes")
-            if filters.get("max_age") is not None:
-                # Filter for programs where age_max >= max_age (allows older students)
-                query = query.filter(
-                    or_(
-                        ProgramIntake.age_max.is_(None),
-                        ProgramIntake.age_max >= filters["max_age"]
-                    )
-                )
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After max_age>={filters['max_age']} filter: {count_after} intakes")
-            if filters.get("hsk_required") is not None:
-                query = query.filter(ProgramIntake.hsk_required == filters["hsk_required"])
-            if filters.get("english_test_required") is not None:
-                query = query.filter(ProgramIntake.english_test_required == filters["english_test_required"])
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After english_test_required={filters['english_test_required']} filter: {count_after} intakes")
-            if filters.get("inside_china_allowed") is not None:
-                query = query.filter(ProgramIntake.inside_china_applicants_allowed == filters["inside_china_allowed"])
-            
-            # Application fee filter (no application fee = 0 or NULL)
-            if filters.get("application_fee") is False:
-                count_before = query.count()
-                # Filter for programs where application_fee is 0 or NULL
-                query = query.filter(
-                    or_(
-                        ProgramIntake.application_fee == 0,
-                        ProgramIntake.application_fee.is_(None)
-                    )
+        if filters.get("university_id"):
+            steps.append(("university_id", filters["university_id"], ProgramIntake.university_id == filters["university_id"]))
+        elif filters.get("university_ids"):
+            # Filter by list of university IDs (IN clause)
+            steps.append(("university_ids", filters["university_ids"], ProgramIntake.university_id.in_(filters["university_ids"])))
+        
+        if filters.get("major_ids"):
+            # Filter by list of major IDs (IN clause)
+            steps.append(("major_ids", filters["major_ids"], ProgramIntake.major_id.in_(filters["major_ids"])))
+        elif filters.get("major_id"):
+            steps.append(("major_id", filters["major_id"], ProgramIntake.major_id == filters["major_id"]))
+        if filters.get("major_text"):
+            # Search in major name
+            steps.append(("major_text", filters["major_text"], Major.name.ilike(f"%{filters['major_text']}%")))
+        if filters.get("degree_level"):
+            steps.append(("degree_level", filters["degree_level"], or_(
+                ProgramIntake.degree_type.ilike(f"%{filters['degree_level']}%"),
+                Major.degree_level.ilike(f"%{filters['degree_level']}%")
+            )))
+        if filters.get("teaching_language"):
+            steps.append(("teaching_language", filters["teaching_language"], or_(
+                ProgramIntake.teaching_language.ilike(f"%{filters['teaching_language']}%"),
+                Major.teaching_language.ilike(f"%{filters['teaching_language']}%")
+            )))
+        if filters.get("intake_term"):
+            steps.append(("intake_term", filters["intake_term"], ProgramIntake.intake_term == filters["intake_term"]))
+        if filters.get("intake_year"):
+            steps.append(("intake_year", filters["intake_year"], ProgramIntake.intake_year == filters["intake_year"]))
+        if filters.get("city"):
+            steps.append(("city", filters["city"], University.city.ilike(f"%{filters['city']}%")))
+        if filters.get("province"):
+            steps.append(("province", filters["province"], University.province.ilike(f"%{filters['province']}%")))
+        
+        # Duration constraint
+        if filters.get("duration_years_target") is not None:
+            target = filters["duration_years_target"]
+            duration_expr = func.coalesce(ProgramIntake.duration_years, Major.duration_years)
+            duration_constraint = filters.get("duration_constraint", "approx")
+            condition = None
+            if duration_constraint == "exact":
+                condition = func.abs(duration_expr - target) < 0.1
+            elif duration_constraint == "min":
+                condition = duration_expr >= target
+            elif duration_constraint == "max":
+                condition = duration_expr <= target
+            elif duration_constraint == "approx":
+                condition = and_(duration_expr >= target * 0.75, duration_expr <= target * 1.25)
+            if condition is not None:
+                steps.append(("duration_years_target", f"{duration_constraint} {target}", condition))
+        
+        # Budget filter
+        if filters.get("budget_max") is not None:
+            steps.append(("budget_max", filters["budget_max"], or_(
+                ProgramIntake.tuition_per_year <= filters["budget_max"],
+                ProgramIntake.tuition_per_semester <= filters["budget_max"]
+            )))
+        
+        # Free tuition filter (tuition_per_year and tuition_per_semester each 0 or NULL)
+        if filters.get("free_tuition") is True:
+            steps.append(("free_tuition", True, and_(
+                or_(ProgramIntake.tuition_per_year == 0, ProgramIntake.tuition_per_year.is_(None)),
+                or_(ProgramIntake.tuition_per_semester == 0, ProgramIntake.tuition_per_semester.is_(None))
+            )))
+        
+        # Scholarship filter
+        if filters.get("has_scholarship"):
+            if not (filters.get("scholarship_types") or filters.get("scholarship_type")):
+                # Only filter by scholarship_available if we're not filtering by specific types
+                steps.append(("has_scholarship", True, ProgramIntake.scholarship_available == True))
+            else:
+                # scholarship_info might contain the scholarship details even if the flag isn't set
+                steps.append(("has_scholarship", True, or_(
+                    ProgramIntake.scholarship_available == True,
+                    ProgramIntake.scholarship_info.isnot(None),
+                    ProgramIntake.scholarship_info != ""
+                )))
+        # Support both single scholarship_type and list of scholarship_types
+        # CRITICAL: Scholarship info is stored in ProgramIntake.scholarship_info text field, not in Scholarship table
+        # Search the scholarship_info field directly for "Type A", "Type B", "Type C", "CSC", etc.
+        scholarship_types = filters.get("scholarship_types") or []
+        if scholarship_types:
+            type_conditions = []
+            for stype in scholarship_types:
+                type_conditions.extend(self._scholarship_type_patterns(stype))
+            if type_conditions:
+                steps.append(("scholarship_types", scholarship_types, or_(*type_conditions)))
+            else:
+                print(f"DEBUG: find_program_intakes - WARNING: No type_conditions generated for scholarship_types={scholarship_types}")
+        elif filters.get("scholarship_type"):
+            # Legacy single scholarship_type support - search in scholarship_info
+            scholarship_type_lower = filters["scholarship_type"].lower()
+            csc_patterns = self._scholarship_type_patterns("csc")
+            if scholarship_type_lower == "csc":
+                steps.append(("scholarship_type", "csc", or_(*csc_patterns)))
+            elif scholarship_type_lower == "university":
+                # University scholarships (not CSC)
+                steps.append(("scholarship_type", "university", and_(
+                    ProgramIntake.scholarship_info.isnot(None),
+                    *[~pattern for pattern in csc_patterns]
+                )))
+        
+        # Requirements filters
+        if filters.get("bank_statement_amount") is not None:
+            steps.append(("bank_statement_amount", filters["bank_statement_amount"], or_(
+                ProgramIntake.bank_statement_amount.is_(None),
+                ProgramIntake.bank_statement_amount <= filters["bank_statement_amount"]
+            )))
+        if filters.get("bank_statement_required") is not None:
+            if filters["bank_statement_required"] is False:
+                # Programs that don't require bank statement (NULL or False)
+                condition = or_(
+                    ProgramIntake.bank_statement_required.is_(None),
+                    ProgramIntake.bank_statement_required == False
                 )
-                count_after = query.count()
-                print(f"DEBUG: find_program_intakes - After application_fee=False (no application fee) filter: {count_before} -> {count_after} intakes")
+            else:
+                condition = ProgramIntake.bank_statement_required == True
+            steps.append(("bank_statement_required", filters["bank_statement_required"], condition))
+        if filters.get("max_age") is not None:
+            # Programs where age_max >= max_age (allows older students)
+            steps.append(("max_age", filters["max_age"], or_(
+                ProgramIntake.age_max.is_(None),
+                ProgramIntake.age_max >= filters["max_age"]
+            )))
+        if filters.get("hsk_required") is not None:
+            steps.append(("hsk_required", filters["hsk_required"], ProgramIntake.hsk_required == filters["hsk_required"]))
+        if filters.get("english_test_required") is not None:
+            steps.append(("english_test_required", filters["english_test_required"],
+                          ProgramIntake.english_test_required == filters["english_test_required"]))
+        if filters.get("inside_china_allowed") is not None:
+            steps.append(("inside_china_allowed", filters["inside_china_allowed"],
+                          ProgramIntake.inside_china_applicants_allowed == filters["inside_china_allowed"]))
+        
+        # Application fee filter (no application fee = 0 or NULL)
+        if filters.get("application_fee") is False:
+            steps.append(("application_fee", False, or_(
+                ProgramIntake.application_fee == 0,
+                ProgramIntake.application_fee.is_(None)
+            )))
+        
+        return steps
+    
+    @staticmethod
+    def _scholarship_type_patterns(stype: str) -> List[Any]:
+        """ILIKE conditions on scholarship_info for one scholarship type (CSC, Type A/B/C, or free text)"""
+        stype_lower = stype.lower()
+        if stype_lower == "csc":
+            # Match CSC, CSCA, China Scholarship Council, Chinese Government Scholarship
+            patterns = ["%CSC%", "%CSCA%", "%China Scholarship Council%", "%Chinese Government Scholarship%"]
+        elif stype_lower in ["type a", "type-a", "typea", "type b", "type-b", "typeb", "type c", "type-c", "typec"]:
+            # ILIKE is case-insensitive: "Type A", "Type-A" and "TypeA" cover all spellings
+            letter = stype_lower[-1].upper()
+            patterns = [f"%Type {letter}%", f"%Type-{letter}%", f"%Type{letter}%"]
+        else:
+            # Generic match for other scholarship names
+            patterns = [f"%{stype}%"]
+        return [ProgramIntake.scholarship_info.ilike(pattern) for pattern in patterns]
+    
+    def find_program_intakes(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: int = 48,
+        offset: int = 0,
+        order_by: str = "deadline"  # "deadline", "start_date", "tuition"
+    ) -> Tuple[List[ProgramIntake], int]:
+        """
+        Efficient query for program intakes with comprehensive filters.
+        Returns (intakes, total_count).
+        Filters include: degree_level, major_text, university_id, teaching_language,
+        intake_term, intake_year, city, province, duration_years_target, duration_constraint,
+        scholarship flags, requirements flags, country_allowed, inside_china_allowed,
+        deadline_window, earliest flag.
         
-        # Get total count before pagination
-        total_count = query.count()
+        The page and the total count come from one query (count(*) OVER ()).
+        Per-filter counts are available from explain_program_intakes (or DB_QUERY_TRACE=true).
+        """
+        query = self._program_intakes_base_query(filters)
+        for _, _, condition in self._program_intake_filter_steps(filters):
+            query = query.filter(condition)
         
-        # Check if query uses distinct (from scholarship joins)
-        # When using DISTINCT, ORDER BY expressions must appear in SELECT list
-        uses_distinct = False
-        if filters.get("has_scholarship") or filters.get("scholarship_type"):
-            uses_distinct = True
+        if settings.DB_QUERY_TRACE and filters:
+            print(f"DEBUG: find_program_intakes - trace: {self.explain_program_intakes(filters)}")
         
-        # Ordering
-        if order_by == "deadline":
-            query = query.order_by(
-                ProgramIntake.application_deadline.asc().nullslast(),
-                ProgramIntake.program_start_date.asc().nullslast()
-            )
-        elif order_by == "start_date":
+        # Ordering (joins are many-to-one, so no DISTINCT is needed)
+        if order_by == "start_date":
             query = query.order_by(ProgramIntake.program_start_date.asc().nullslast())
         elif order_by == "tuition":
-            # When using DISTINCT, we need to use a subquery approach
-            # because ORDER BY expressions must appear in SELECT list
             tuition_expr = func.coalesce(ProgramIntake.tuition_per_year, ProgramIntake.tuition_per_semester)
-            if uses_distinct:
-                # Use subquery: first get IDs ordered by tuition, then fetch full objects
-                # When using DISTINCT, we need to order by the expression that's in SELECT
-                # Create a subquery that selects IDs with tuition ordering
-                tuition_label = tuition_expr.label('_tuition_sort')
-                subquery = query.with_entities(ProgramIntake.id, tuition_label).distinct()
-                # Order by the same expression (must match what's in SELECT for DISTINCT)
-                subquery = subquery.order_by(tuition_expr.asc().nullslast())
-                subquery = subquery.offset(offset).limit(limit)
-                
-                # Get the ordered IDs
-                ordered_ids = [row[0] for row in subquery.all()]
-                
-                # Fetch full ProgramIntake objects in the same order
-                if ordered_ids:
-                    # Create a mapping to preserve order
-                    id_to_order = {intake_id: idx for idx, intake_id in enumerate(ordered_ids)}
-                    intakes = self.db.query(ProgramIntake).filter(ProgramIntake.id.in_(ordered_ids)).all()
-                    # Sort by the original order
-                    intakes.sort(key=lambda x: id_to_order.get(x.id, len(ordered_ids)))
-                else:
-                    intakes = []
-            else:
-                query = query.order_by(tuition_expr.asc().nullslast())
-                intakes = query.offset(offset).limit(limit).all()
+            query = query.order_by(tuition_expr.asc().nullslast())
         else:
-            query = query.order_by(ProgramIntake.application_deadline.asc().nullslast())
-            intakes = query.offset(offset).limit(limit).all()
+            query = query.order_by(
+                ProgramIntake.application_deadline.asc().nullslast(),
+                ProgramIntake.program_start_date.asc().nullslast()
+            )
         
-        # Pagination (only if not already handled above)
-        if order_by != "tuition" or not uses_distinct:
-            if 'intakes' not in locals():
-                intakes = query.offset(offset).limit(limit).all()
+        # Page + total in one round trip: the window count is computed before LIMIT/OFFSET
+        rows = query.add_columns(func.count().over().label("total_count")).offset(offset).limit(limit).all()
+        intakes = [row[0] for row in rows]
+        if rows:
+            total_count = rows[0][1]
+        elif offset:
+            # Page past the end: no row carries the total
+            total_count = query.order_by(None).count()
+        else:
+            total_count = 0
         
         return intakes, total_count
     
+    def explain_program_intakes(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Diagnostic (opt-in) funnel for find_program_intakes: how many intakes remain after each filter.
+        Runs one COUNT per filter - do not call on the request path.
+        Returns {"base_count", "steps": [{"filter", "value", "count"}], "total_count", "warnings"}.
+        """
+        query = self._program_intakes_base_query(filters)
+        base_count = query.count()
+        steps = []
+        for name, value, condition in self._program_intake_filter_steps(filters):
+            query = query.filter(condition)
+            steps.append({"filter": name, "value": value, "count": query.count()})
+        
+        warnings = []
+        if filters and filters.get("university_ids") and filters.get("major_ids"):
+            # Requested majors that do not belong to any of the requested universities
+            outside = self.db.query(Major.id).filter(
+                Major.id.in_(filters["major_ids"]),
+                ~Major.university_id.in_(filters["university_ids"])
+            ).all()
+            if outside:
+                warnings.append({
+                    "warning": "major_ids_outside_university_ids",
+                    "major_ids": [row[0] for row in outside]
+                })
+        
+        return {
+            "base_count": base_count,
+            "steps": steps,
+            "total_count": steps[-1]["count"] if steps else base_count,
+            "warnings": warnings
+        }
+    
+    
     def get_scholarship_summary(self, partner_only: bool = True) -> Dict[str, Any]:
         """
         Get aggregated scholarship summary: counts of programs with scholarships.
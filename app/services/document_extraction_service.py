@@ -3,51 +3,20 @@ Document Extraction Service
 LLM extracts structured data from documents into JSON only.
 NO SQL generation - that is handled by the ingestion service.
 """
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional
 from app.services.openai_service import OpenAIService
 from app.services.document_parser import DocumentParser
+from app.services.extraction_map_reduce import split_document_sections, merge_extracted_fragments
 from app.schemas.document_import import ExtractedData
+from app.config import settings
 import json
 import re
+import time
 
-
-class DocumentExtractionService:
-    """Service to extract structured data from university program documents using LLM"""
-    
-    def __init__(self):
-        self.openai_service = OpenAIService()
-        self.document_parser = DocumentParser()
-    
-    def extract_text_from_document(self, file_content: bytes, filename: str) -> str:
-        """Extract text from uploaded document"""
-        file_type = filename.split('.')[-1].lower() if '.' in filename else 'txt'
-        
-        if file_type == 'pdf':
-            return self.document_parser.extract_text_from_pdf(file_content)
-        elif file_type in ['doc', 'docx']:
-            return self.document_parser.extract_text_from_docx(file_content)
-        elif file_type == 'txt':
-            return file_content.decode('utf-8', errors='ignore')
-        else:
-            try:
-                return file_content.decode('utf-8', errors='ignore')
-            except:
-                raise ValueError(f"Unsupported file type: {file_type}")
-    
-    def extract_data_from_text(self, document_text: str) -> Dict:
-        """Extract structured data from document text using LLM"""
-        
-        # Truncate document if too large (conservative limit for LLM context)
-        MAX_DOCUMENT_CHARS = 400000  # ~100K tokens
-        original_length = len(document_text)
-        if len(document_text) > MAX_DOCUMENT_CHARS:
-            print(f"⚠️  Document is too large ({original_length} chars). Truncating to {MAX_DOCUMENT_CHARS} chars.")
-            first_part = document_text[:int(MAX_DOCUMENT_CHARS * 0.8)]
-            last_part = document_text[-int(MAX_DOCUMENT_CHARS * 0.2):]
-            document_text = first_part + "\n\n[... document truncated ...]\n\n" + last_part
-            print(f"📊 Truncated document: {len(document_text)} chars")
-        
-        system_prompt = """You are a data extraction agent for MalishaEdu university program import system.
+# Never formatted: every extraction call starts with the same bytes, so OpenAI prompt caching reuses it
+# (the shared preamble follows it in every part after the first)
+EXTRACTION_SYSTEM_PROMPT = """You are a data extraction agent for MalishaEdu university program import system.
 
 YOUR TASK:
 Extract factual data from university program documents and output STRICT JSON only.
@@ -335,19 +304,104 @@ OUTPUT REQUIREMENTS:
 - No SQL
 - Valid JSON that can be parsed by json.loads()"""
 
-        user_prompt = f"""Extract data from this university program document:
+
+class DocumentExtractionService:
+    """Service to extract structured data from university program documents using LLM"""
+    
+    def __init__(self):
+        self.openai_service = OpenAIService()
+        self.document_parser = DocumentParser()
+    
+    def extract_text_from_document(self, file_content: bytes, filename: str) -> str:
+        """Extract text from uploaded document"""
+        file_type = filename.split('.')[-1].lower() if '.' in filename else 'txt'
+        
+        if file_type == 'pdf':
+            return self.document_parser.extract_text_from_pdf(file_content)
+        elif file_type in ['doc', 'docx']:
+            return self.document_parser.extract_text_from_docx(file_content)
+        elif file_type == 'txt':
+            return file_content.decode('utf-8', errors='ignore')
+        else:
+            try:
+                return file_content.decode('utf-8', errors='ignore')
+            except:
+                raise ValueError(f"Unsupported file type: {file_type}")
+    
+    def extract_data_from_text(self, document_text: str) -> Dict:
+        """
+        Extract structured data from document text using LLM.
+        Documents larger than DOCUMENT_EXTRACTION_CHUNK_CHARS are split on section boundaries,
+        the parts are extracted concurrently and the results merged (nothing is truncated).
+        """
+        parts = split_document_sections(document_text, settings.DOCUMENT_EXTRACTION_CHUNK_CHARS)
+        if len(parts) <= 1:
+            return self._extract_part(document_text)
+        
+        started = time.time()
+        # The beginning of the document usually names the university and states shared fees/requirements
+        preamble = document_text[:settings.DOCUMENT_EXTRACTION_PREAMBLE_CHARS]
+        print(f"📊 Map-reduce extraction: {len(document_text):,} chars in {len(parts)} parts (largest {max(len(p) for p in parts):,} chars)")
+        
+        def extract(index: int) -> Dict:
+            fragment = self._extract_part(
+                parts[index],
+                part_number=index + 1,
+                part_count=len(parts),
+                preamble=preamble if index > 0 else None
+            )
+            fragment["errors"] = [f"Part {index + 1}/{len(parts)}: {e}" for e in fragment.get("errors") or []]
+            return fragment
+        
+        workers = min(settings.DOCUMENT_EXTRACTION_MAX_CONCURRENCY, len(parts))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            fragments = list(pool.map(extract, range(len(parts))))  # Document order, whatever finishes first
+        
+        merged = merge_extracted_fragments(fragments)
+        print(f"✅ Map-reduce extraction finished in {time.time() - started:.1f}s: {len(merged['majors'])} majors from {len(parts)} parts")
+        return merged
+    
+    def _extract_part(
+        self,
+        document_text: str,
+        part_number: int = 1,
+        part_count: int = 1,
+        preamble: Optional[str] = None
+    ) -> Dict:
+        """Extract structured data from the whole document or one part of it (one LLM call)"""
+
+        if part_count > 1:
+            preamble_text = ""
+            if preamble:
+                preamble_text = f"""Beginning of the document (REFERENCE ONLY - use it for the university name and for fees/requirements/intakes that apply to the majors below; do NOT extract majors that appear only here):
+
+{preamble}
+
+---
+
+"""
+            # Shared preamble before anything part-specific: parts 2..N share the cacheable prefix
+            user_prompt = f"""{preamble_text}This is part {part_number} of {part_count} of a large university program document. The parts are extracted separately and merged afterwards.
+
+Part {part_number} of {part_count} - extract every major listed in this part:
+
+{document_text}
+
+Output the JSON object following the schema exactly. Extract only facts from the document. Use null for missing values. If this part lists no majors, output "majors": []."""
+        else:
+            user_prompt = f"""Extract data from this university program document:
 
 {document_text}
 
 Output the JSON object following the schema exactly. Extract only facts from the document. Use null for missing values."""
 
         messages = [
-            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": EXTRACTION_SYSTEM_PROMPT},
             {"role": "user", "content": user_prompt}
         ]
         
         try:
-            total_chars = len(system_prompt) + len(user_prompt)
+            total_chars = len(EXTRACTION_SYSTEM_PROMPT) + len(user_prompt)
             estimated_tokens = total_chars / 4
             print(f"📊 Extraction Context: ~{estimated_tokens:.0f} tokens ({total_chars:,} chars)")
             
@@ -355,7 +409,8 @@ Output the JSON object following the schema exactly. Extract only facts from the
                 messages=messages,
                 temperature=0.1,  # Low temperature for deterministic extraction
                 top_p=0.9,
-                max_retries=3
+                max_retries=3,
+                prompt_name="document_extraction"
             )
             
             if hasattr(response, 'usage') and response.usage:
@@ -2,9 +2,9 @@ from typing import Dict, Optional
 import re
 from datetime import datetime
 import pytesseract
-from pdf2image import convert_from_bytes
 from PIL import Image
 import io
+from app.services.pdf_text_extractor import pdf_text_extractor, PdfExtractionResult
 
 class DocumentParser:
     """Parse documents, especially passports"""
@@ -22,12 +22,9 @@ class DocumentParser:
         }
         
         try:
-            # Convert PDF to image if needed
+            # PDF: text layer where present, OCR (bounded DPI, page by page) where not
             if filename.lower().endswith('.pdf'):
-                images = convert_from_bytes(file_content)
-                text = ""
-                for image in images:
-                    text += pytesseract.image_to_string(image, lang='eng')
+                text = pdf_text_extractor.extract(file_content, ocr=True).text
             else:
                 # Assume it's an image
                 image = Image.open(io.BytesIO(file_content))
@@ -97,16 +94,18 @@ class DocumentParser:
         
         return extracted_data
     
+    @staticmethod
+    def extract_pdf_pages(file_content: bytes) -> PdfExtractionResult:
+        """Extract text per page (with OCR for pages without a text layer) plus timings"""
+        result = pdf_text_extractor.extract(file_content)
+        print(f"📄 PDF text extraction: {result.summary()}")
+        return result
+    
     @staticmethod
     def extract_text_from_pdf(file_content: bytes) -> str:
         """Extract text from PDF"""
         try:
-            from PyPDF2 import PdfReader
-            pdf_reader = PdfReader(io.BytesIO(file_content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-            return text
+            return DocumentParser.extract_pdf_pages(file_content).text
         except Exception as e:
             print(f"Error extracting PDF text: {e}")
             return ""
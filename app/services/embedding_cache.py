@@ -0,0 +1,147 @@
+"""
+EmbeddingCache - normalized query text -> embedding
+
+RAGService.embed_query (used by retrieve() and search_similar()) calls the OpenAI embeddings
+API for every query, although FAQ-style questions repeat constantly. This cache sits in front:
+
+- Memory tier: LRU of EMBEDDING_CACHE_MAX_ENTRIES embeddings (stored as float32 arrays)
+- Persistent tier (EMBEDDING_CACHE_PERSISTENT=true): query_embedding_cache table, shared by
+  all workers and restarts (create it with migrate_query_embedding_cache.py)
+
+Entries are keyed by (embedding model, SHA-256 of the normalized text), so changing
+OPENAI_EMBEDDING_MODEL never serves embeddings from the previous model.
+"""
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
+import re
+import threading
+
+from app.config import settings
+
+
+def normalize_query_text(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation ("How to apply?" == "how to apply")"""
+    text = " ".join((text or "").lower().split())
+    return re.sub(r'[\s?!.。？！]+$', '', text)
+
+
+class EmbeddingCache:
+    """Two-tier (memory LRU + optional Postgres) cache for query embeddings"""
+
+    def __init__(self, max_entries: int, persistent: bool = False, session_factory=None):
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._session_factory = session_factory
+        self._entries: "OrderedDict[Tuple[str, str], array]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._memory_hits = 0
+        self._persistent_hits = 0
+        self._misses = 0
+        self._errors = 0
+
+    @staticmethod
+    def _key(model: str, text: str) -> Tuple[str, str]:
+        return model, hashlib.sha256(normalize_query_text(text).encode("utf-8")).hexdigest()
+
+    def get_or_compute(self, text: str, model: str, compute: Callable[[str], List[float]]) -> List[float]:
+        """Return the cached embedding for text, or compute(text) and cache it (errors propagate)"""
+        key = self._key(model, text)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self._memory_hits += 1
+                return cached.tolist()
+
+        if self.persistent:
+            embedding = self._load(key)
+            if embedding is not None:
+                with self._lock:
+                    self._persistent_hits += 1
+                self._remember(key, embedding)
+                return embedding
+
+        embedding = compute(text)
+        with self._lock:
+            self._misses += 1
+        self._remember(key, embedding)
+        if self.persistent:
+            self._store(key, embedding)
+        return embedding
+
+    def _remember(self, key: Tuple[str, str], embedding: List[float]):
+        with self._lock:
+            self._entries[key] = array("f", embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop the memory tier (tests)"""
+        with self._lock:
+            self._entries.clear()
+
+    def _session(self):
+        if self._session_factory is None:
+            from app.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def _load(self, key: Tuple[str, str]) -> Optional[List[float]]:
+        from app.models import QueryEmbeddingCache
+        db = self._session()
+        try:
+            row = db.query(QueryEmbeddingCache).filter(
+                QueryEmbeddingCache.model == key[0],
+                QueryEmbeddingCache.text_hash == key[1]
+            ).first()
+            return list(row.embedding) if row is not None else None
+        except Exception as e:
+            print(f"Error reading query embedding cache: {e}")
+            with self._lock:
+                self._errors += 1
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def _store(self, key: Tuple[str, str], embedding: List[float]):
+        from app.models import QueryEmbeddingCache
+        db = self._session()
+        try:
+            # merge() upserts by primary key (another worker may have stored it meanwhile)
+            db.merge(QueryEmbeddingCache(model=key[0], text_hash=key[1], embedding=list(embedding)))
+            db.commit()
+        except Exception as e:
+            print(f"Error writing query embedding cache: {e}")
+            with self._lock:
+                self._errors += 1
+            db.rollback()
+        finally:
+            db.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._memory_hits + self._persistent_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "persistent": self.persistent,
+                "memory_hits": self._memory_hits,
+                "persistent_hits": self._persistent_hits,
+                "misses": self._misses,
+                "errors": self._errors,
+                "hit_rate": round((self._memory_hits + self._persistent_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+
+# Process-wide cache shared by all RAGService instances
+embedding_cache = EmbeddingCache(
+    max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+    persistent=settings.EMBEDDING_CACHE_PERSISTENT
+)
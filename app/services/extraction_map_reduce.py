@@ -0,0 +1,150 @@
+"""
+Map-reduce helpers for LLM extraction of large program documents
+
+DocumentExtractionService extracts each section-aligned part of a large document separately
+(concurrently), then merges the partial ExtractedData dicts here:
+- split_document_sections(): splits on headings / blank lines, packs sections up to max_chars
+- merge_extracted_fragments(): deterministic merge, independent of which part finished first
+  * university_name: most frequent non-empty name (earliest part wins ties)
+  * major_groups are expanded into majors (ingestion expands them anyway)
+  * majors deduplicated by (name, degree_level, teaching_language); intakes by (term, year);
+    scalar fields keep the first non-null value in document order; documents/scholarships are
+    unioned by name; keywords unioned (max 5)
+"""
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import copy
+import re
+
+_HEADING_LINE_RE = re.compile(
+    r'^\s*(#{1,6}\s+\S|(?:\d+(?:\.\d+)*[.)、]|[一二三四五六七八九十]+[、.])\s*\S|[A-Z][A-Z0-9 &/()\-,:]{5,}$)'
+)
+
+
+def split_document_sections(text: str, max_chars: int) -> List[str]:
+    """Split text into parts of at most max_chars, breaking only between sections where possible"""
+    text = text or ""
+    if len(text) <= max_chars:
+        return [text] if text.strip() else []
+
+    # Sections: blocks separated by blank lines, plus a break before every heading-like line
+    sections: List[str] = []
+    current: List[str] = []
+    for line in text.splitlines():
+        if not line.strip() or (_HEADING_LINE_RE.match(line) and current):
+            if current:
+                sections.append("\n".join(current))
+                current = []
+            if not line.strip():
+                continue
+        current.append(line)
+    if current:
+        sections.append("\n".join(current))
+
+    parts: List[str] = []
+    buffer: List[str] = []
+    size = 0
+    for section in sections:
+        pieces = [section]
+        if len(section) > max_chars:
+            # A single oversized section (e.g. one long table): split on lines, then hard-split
+            pieces = []
+            for line in section.split("\n"):
+                pieces.extend(line[i:i + max_chars] for i in range(0, max(len(line), 1), max_chars))
+        for piece in pieces:
+            if buffer and size + len(piece) + 2 > max_chars:
+                parts.append("\n\n".join(buffer))
+                buffer, size = [], 0
+            buffer.append(piece)
+            size += len(piece) + 2
+    if buffer:
+        parts.append("\n\n".join(buffer))
+    return parts
+
+
+def _normalize_name(name: Optional[str]) -> str:
+    return " ".join((name or "").lower().split())
+
+
+def _fill_missing(target: Dict[str, Any], source: Dict[str, Any]):
+    """Copy keys whose value is missing/None in target (first non-null wins)"""
+    for key, value in (source or {}).items():
+        if target.get(key) is None and value is not None:
+            target[key] = copy.deepcopy(value)
+
+
+def _union_by_name(target: List[Dict], source: List[Dict]):
+    names = {_normalize_name(item.get("name")) for item in target}
+    for item in source or []:
+        name = _normalize_name(item.get("name"))
+        if name not in names:
+            target.append(copy.deepcopy(item))
+            names.add(name)
+
+
+def _merge_intakes(target: List[Dict], source: List[Dict]):
+    by_key = {(i.get("intake_term"), i.get("intake_year")): i for i in target}
+    for intake in source or []:
+        key = (intake.get("intake_term"), intake.get("intake_year"))
+        existing = by_key.get(key)
+        if existing is None:
+            copied = copy.deepcopy(intake)
+            target.append(copied)
+            by_key[key] = copied
+            continue
+        for nested in ("fees", "requirements"):
+            if isinstance(intake.get(nested), dict):
+                existing.setdefault(nested, {})
+                _fill_missing(existing[nested], intake[nested])
+        for listed in ("documents", "scholarships"):
+            existing.setdefault(listed, [])
+            _union_by_name(existing[listed], intake.get(listed))
+        _fill_missing(existing, {k: v for k, v in intake.items() if k not in ("fees", "requirements", "documents", "scholarships")})
+
+
+def _expand_majors(fragment: Dict[str, Any]) -> List[Dict[str, Any]]:
+    majors = list(fragment.get("majors") or [])
+    for group in fragment.get("major_groups") or []:
+        shared = {k: v for k, v in group.items() if k != "major_names"}
+        for name in group.get("major_names") or []:
+            majors.append({"name": name, **copy.deepcopy(shared)})
+    return majors
+
+
+def merge_extracted_fragments(fragments: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge partial extraction results (in document order) into one ExtractedData-shaped dict"""
+    names = [f.get("university_name", "").strip() for f in fragments if (f.get("university_name") or "").strip()]
+    university_name = ""
+    if names:
+        counts = Counter(names)
+        best = max(counts.values())
+        university_name = next(name for name in names if counts[name] == best)
+
+    majors: List[Dict[str, Any]] = []
+    by_key: Dict[Tuple[str, Any, Any], Dict[str, Any]] = {}
+    errors: List[str] = []
+    for fragment in fragments:
+        for major in _expand_majors(fragment):
+            key = (_normalize_name(major.get("name")), major.get("degree_level"), major.get("teaching_language"))
+            existing = by_key.get(key)
+            if existing is None:
+                copied = copy.deepcopy(major)
+                copied.setdefault("intakes", [])
+                majors.append(copied)
+                by_key[key] = copied
+                continue
+            _merge_intakes(existing["intakes"], major.get("intakes"))
+            keywords = list(existing.get("keywords") or [])
+            for keyword in major.get("keywords") or []:
+                if keyword not in keywords:
+                    keywords.append(keyword)
+            existing["keywords"] = keywords[:5] or None
+            _fill_missing(existing, {k: v for k, v in major.items() if k not in ("intakes", "keywords")})
+        for error in fragment.get("errors") or []:
+            if error not in errors:
+                errors.append(error)
+
+    # A part without a university heading reports it; the merged result may still have one
+    if university_name:
+        errors = [e for e in errors if "could not extract university name" not in e.lower()]
+    return {"university_name": university_name, "majors": majors, "errors": errors}
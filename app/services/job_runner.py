@@ -0,0 +1,419 @@
+"""
+JobRunner - durable background jobs for admin document import
+
+Document import work (generate SQL, extract data, ingest data) takes minutes, so the endpoints
+return a job id and the frontend polls for the result. Jobs are rows in background_jobs
+instead of per-process dicts, so they survive restarts and are visible to every worker:
+
+- submit() stores the job (including the uploaded file) and hands it to a bounded thread pool;
+  at most JOB_MAX_CONCURRENCY jobs run at once per worker process
+- A job is claimed with a conditional UPDATE (status queued -> processing), so only one
+  process ever runs it
+- Handlers report progress through JobContext.progress(), which also refreshes the heartbeat
+  and raises JobCancelled once cancellation was requested
+- A maintenance thread (every JOB_POLL_SECONDS) refreshes heartbeats of running jobs, requeues
+  jobs whose worker died (no heartbeat for JOB_STALE_SECONDS, up to JOB_MAX_ATTEMPTS runs),
+  picks up queued jobs (e.g. submitted just before a restart) and deletes finished jobs older
+  than JOB_RETENTION_SECONDS
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+from app.config import settings
+
+
+QUEUED = "queued"
+PROCESSING = "processing"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when cancellation of its job was requested"""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+class JobContext:
+    """What a handler gets: its arguments plus progress reporting / cancellation checks"""
+
+    def __init__(self, runner: "JobRunner", job_id: str, params: Dict[str, Any], input_data: Optional[bytes]):
+        self.runner = runner
+        self.job_id = job_id
+        self.params = params
+        self.input_data = input_data
+
+    def progress(self, message: str):
+        """Record a progress message (and heartbeat); raises JobCancelled if the job was cancelled"""
+        if self.runner._touch(self.job_id, progress=message):
+            raise JobCancelled(self.job_id)
+
+    def check_cancelled(self):
+        if self.runner._touch(self.job_id):
+            raise JobCancelled(self.job_id)
+
+
+class JobRunner:
+    """Database-backed job queue with a bounded worker pool per process"""
+
+    def __init__(
+        self,
+        session_factory=None,
+        max_workers: Optional[int] = None,
+        poll_seconds: Optional[float] = None,
+        stale_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        retention_seconds: Optional[float] = None
+    ):
+        self._session_factory = session_factory
+        self.max_workers = max_workers or settings.JOB_MAX_CONCURRENCY
+        self.poll_seconds = poll_seconds or settings.JOB_POLL_SECONDS
+        self.stale_seconds = stale_seconds or settings.JOB_STALE_SECONDS
+        self.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        self.retention_seconds = retention_seconds or settings.JOB_RETENTION_SECONDS
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._handlers: Dict[str, Callable[[JobContext], Dict[str, Any]]] = {}
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="background-job")
+        self._lock = threading.Lock()
+        self._dispatched: set = set()  # Job ids handed to the local pool (waiting or running)
+        self._running: set = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Metrics
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._requeued = 0
+        self._purged = 0
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from app.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    def register(self, job_type: str, handler: Callable[[JobContext], Dict[str, Any]]):
+        """handler(ctx) returns the job result (JSON serializable); exceptions fail the job"""
+        self._handlers[job_type] = handler
+
+    # ------------------------------------------------------------------
+    # API used by the endpoints
+    # ------------------------------------------------------------------
+
+    def submit(
+        self,
+        job_type: str,
+        params: Optional[Dict[str, Any]] = None,
+        input_data: Optional[bytes] = None,
+        created_by: Optional[int] = None,
+        progress: str = "Queued..."
+    ) -> str:
+        """Persist a new job and queue it on this process's pool; returns the job id"""
+        from app.models import BackgroundJob
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job_id = str(uuid.uuid4())
+        db = self.session_factory()
+        try:
+            db.add(BackgroundJob(
+                id=job_id, job_type=job_type, status=QUEUED, progress=progress,
+                params=params or {}, input_data=input_data, created_by=created_by,
+                cancel_requested=False, attempts=0, created_at=_utcnow()
+            ))
+            db.commit()
+        finally:
+            db.close()
+        self._dispatch(job_id)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job status dict, or None if the job does not exist (or has expired)"""
+        from app.models import BackgroundJob
+        db = self.session_factory()
+        try:
+            job = db.get(BackgroundJob, job_id)
+            if job is None:
+                return None
+            return {
+                "job_id": job.id,
+                "job_type": job.job_type,
+                "status": job.status,
+                "progress": job.progress,
+                "result": job.result,
+                "error": job.error,
+                "cancel_requested": bool(job.cancel_requested),
+                "attempts": job.attempts,
+                "created_at": _isoformat(job.created_at),
+                "started_at": _isoformat(job.started_at),
+                "heartbeat_at": _isoformat(job.heartbeat_at),
+                "finished_at": _isoformat(job.finished_at),
+            }
+        finally:
+            db.close()
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued job immediately; a running job stops at its next progress() call"""
+        from app.models import BackgroundJob
+        now = _utcnow()
+        db = self.session_factory()
+        try:
+            db.query(BackgroundJob).filter(
+                BackgroundJob.id == job_id, BackgroundJob.status == QUEUED
+            ).update({
+                "status": CANCELLED, "cancel_requested": True, "progress": "Cancelled",
+                "finished_at": now, "input_data": None
+            }, synchronize_session=False)
+            db.query(BackgroundJob).filter(
+                BackgroundJob.id == job_id, BackgroundJob.status == PROCESSING
+            ).update({"cancel_requested": True, "progress": "Cancelling..."}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        return self.get(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, interval: float = 0.2) -> Optional[Dict[str, Any]]:
+        """Block until the job has finished (or timeout); returns its latest status"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in FINISHED_STATUSES:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(interval)
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+
+    def _dispatch(self, job_id: str) -> bool:
+        with self._lock:
+            if job_id in self._dispatched:
+                return False
+            self._dispatched.add(job_id)
+        try:
+            self._pool.submit(self._run, job_id)
+        except RuntimeError:
+            # Pool shut down (process stopping); another worker or the next start picks the job up
+            with self._lock:
+                self._dispatched.discard(job_id)
+            return False
+        return True
+
+    def _claim(self, job_id: str):
+        """Atomically move the job from queued to processing; returns it if this process won"""
+        from app.models import BackgroundJob
+        now = _utcnow()
+        db = self.session_factory()
+        try:
+            claimed = db.query(BackgroundJob).filter(
+                BackgroundJob.id == job_id,
+                BackgroundJob.status == QUEUED,
+                BackgroundJob.cancel_requested.is_(False)
+            ).update({
+                "status": PROCESSING, "worker_id": self.worker_id, "attempts": BackgroundJob.attempts + 1,
+                "started_at": now, "heartbeat_at": now, "progress": "Starting..."
+            }, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                return None
+            job = db.get(BackgroundJob, job_id)
+            return job.job_type, dict(job.params or {}), job.input_data
+        finally:
+            db.close()
+
+    def _run(self, job_id: str):
+        try:
+            claimed = self._claim(job_id)
+            if claimed is None:
+                return
+            job_type, params, input_data = claimed
+            with self._lock:
+                self._running.add(job_id)
+            try:
+                handler = self._handlers.get(job_type)
+                if handler is None:
+                    raise ValueError(f"No handler registered for job type: {job_type}")
+                print(f"🔄 [Job {job_id}] Started {job_type}")
+                result = handler(JobContext(self, job_id, params, input_data))
+                self._finish(job_id, COMPLETED, progress="Complete", result=result)
+                print(f"✅ [Job {job_id}] {job_type} completed")
+            except JobCancelled:
+                self._finish(job_id, CANCELLED, progress="Cancelled", error="Cancelled by user")
+                print(f"🛑 [Job {job_id}] {job_type} cancelled")
+            except Exception as e:
+                self._finish(job_id, FAILED, error=str(e))
+                print(f"❌ [Job {job_id}] {job_type} failed: {e}")
+                print(f"Traceback: {traceback.format_exc()}")
+            finally:
+                with self._lock:
+                    self._running.discard(job_id)
+        except Exception as e:
+            # Database unavailable: the job stays queued/processing and is retried by maintenance
+            print(f"❌ [Job {job_id}] Job bookkeeping failed: {e}")
+        finally:
+            with self._lock:
+                self._dispatched.discard(job_id)
+
+    def _touch(self, job_id: str, progress: Optional[str] = None) -> bool:
+        """Refresh heartbeat (and progress); returns True if cancellation was requested"""
+        from app.models import BackgroundJob
+        values: Dict[str, Any] = {"heartbeat_at": _utcnow()}
+        if progress is not None:
+            values["progress"] = progress
+        db = self.session_factory()
+        try:
+            db.query(BackgroundJob).filter(
+                BackgroundJob.id == job_id,
+                BackgroundJob.status == PROCESSING,
+                BackgroundJob.cancel_requested.is_(False)
+            ).update(values, synchronize_session=False)
+            db.commit()
+            cancel_requested = db.query(BackgroundJob.cancel_requested).filter(BackgroundJob.id == job_id).scalar()
+            return bool(cancel_requested)
+        finally:
+            db.close()
+
+    def _finish(self, job_id: str, status: str, progress: Optional[str] = None,
+                result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        from app.models import BackgroundJob
+        values: Dict[str, Any] = {
+            "status": status, "result": result, "error": error,
+            "finished_at": _utcnow(), "input_data": None
+        }
+        if progress is not None:
+            values["progress"] = progress
+        db = self.session_factory()
+        try:
+            # Only if this process still owns the job (it may have been requeued as stale)
+            db.query(BackgroundJob).filter(
+                BackgroundJob.id == job_id,
+                BackgroundJob.status == PROCESSING,
+                BackgroundJob.worker_id == self.worker_id
+            ).update(values, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        with self._lock:
+            if status == COMPLETED:
+                self._completed += 1
+            elif status == CANCELLED:
+                self._cancelled += 1
+            else:
+                self._failed += 1
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def run_maintenance(self) -> Dict[str, int]:
+        """One maintenance pass: heartbeats, stale job recovery, queued job pickup, expiry"""
+        from app.models import BackgroundJob
+        now = _utcnow()
+        stale_before = now - timedelta(seconds=self.stale_seconds)
+        with self._lock:
+            running = list(self._running)
+            free_slots = self.max_workers - len(self._dispatched)
+        db = self.session_factory()
+        try:
+            if running:
+                db.query(BackgroundJob).filter(
+                    BackgroundJob.id.in_(running), BackgroundJob.status == PROCESSING
+                ).update({"heartbeat_at": now}, synchronize_session=False)
+
+            stale = [
+                BackgroundJob.status == PROCESSING,
+                BackgroundJob.heartbeat_at < stale_before,
+            ]
+            if running:
+                stale.append(BackgroundJob.id.notin_(running))
+            requeued = db.query(BackgroundJob).filter(
+                *stale, BackgroundJob.attempts < self.max_attempts, BackgroundJob.cancel_requested.is_(False)
+            ).update({
+                "status": QUEUED, "worker_id": None, "progress": "Worker stopped, job requeued..."
+            }, synchronize_session=False)
+            abandoned = db.query(BackgroundJob).filter(*stale).update({
+                "status": FAILED, "finished_at": now, "input_data": None,
+                "error": "Worker stopped while running the job"
+            }, synchronize_session=False)
+
+            purged = db.query(BackgroundJob).filter(
+                BackgroundJob.status.in_(FINISHED_STATUSES),
+                BackgroundJob.finished_at < now - timedelta(seconds=self.retention_seconds)
+            ).delete(synchronize_session=False)
+            db.commit()
+
+            queued: List[str] = []
+            if free_slots > 0:
+                queued = [row.id for row in db.query(BackgroundJob.id).filter(
+                    BackgroundJob.status == QUEUED
+                ).order_by(BackgroundJob.created_at).limit(free_slots)]
+        finally:
+            db.close()
+
+        picked_up = sum(1 for job_id in queued if self._dispatch(job_id))
+        with self._lock:
+            self._requeued += requeued
+            self._purged += purged
+        if requeued or abandoned or purged:
+            print(f"Background jobs: {requeued} requeued, {abandoned} abandoned, {purged} expired")
+        return {"requeued": requeued, "abandoned": abandoned, "purged": purged, "picked_up": picked_up}
+
+    def _maintenance_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_maintenance()
+            except Exception as e:
+                print(f"Error in background job maintenance: {e}")
+            self._stop.wait(self.poll_seconds)
+
+    def start(self):
+        """Start the maintenance thread (app startup)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._maintenance_loop, name="background-job-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: bool = False):
+        """Stop maintenance; jobs still running are requeued by another worker once their heartbeat goes stale"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_seconds)
+            self._thread = None
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "worker_id": self.worker_id,
+                "max_workers": self.max_workers,
+                "running": len(self._running),
+                "waiting": len(self._dispatched) - len(self._running),
+                "completed": self._completed,
+                "failed": self._failed,
+                "cancelled": self._cancelled,
+                "requeued": self._requeued,
+                "purged": self._purged,
+            }
+
+
+# Process-wide job runner (handlers are registered by app/routers/admin.py)
+job_runner = JobRunner()
@@ -0,0 +1,286 @@
+"""
+MatchIndex - in-memory candidate index for university/major fuzzy matching
+
+The agents score user text against catalog names with difflib.SequenceMatcher. Doing that
+for every cached name, alias and keyword is O(N * L^2) per lookup, so candidates are
+generated here first and the exact SequenceMatcher scoring only runs on the top few:
+
+- Exact table: normalized name / Chinese name / alias / keyword -> entries
+- Acronym table: university initials (e.g. "hit" -> Harbin Institute of Technology) and, for
+  majors, the MAJOR_ACRONYMS whose expansion is in the name ("cse" -> Computer Science and
+  Technology), the same map the agents use in expand_major_acronym
+- Trigram postings: normalized text -> padded character trigrams, ranked by Dice overlap
+
+Built once per CatalogSnapshot (see CatalogService.get_match_index) and read-only afterwards.
+"""
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import re
+
+# Rank of exact text matches (above any Dice score, which is <= 1.0)
+_EXACT_RANK = 2.0
+
+# Words ignored when building university initials ("Harbin Institute of Technology" -> "hit")
+_ACRONYM_STOPWORDS = {"and", "of", "in", "the", "for", "&"}
+
+
+def normalize_match_text(text: Any) -> str:
+    """Lowercase, drop punctuation (keeping &), collapse spaces"""
+    if not text:
+        return ""
+    text = re.sub(r'[^\w\s&]', '', str(text).lower())
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def trigrams(text: str) -> set:
+    """Character trigrams of normalized text, padded so word starts/ends are indexed"""
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def acronyms(text: str) -> set:
+    """Initials of a normalized (university) name, with and without stopwords"""
+    words = text.split()
+    if len(words) < 2:
+        return set()
+    result = {"".join(w[0] for w in words if w[0].isalpha())}
+    content_words = [w for w in words if w not in _ACRONYM_STOPWORDS]
+    if len(content_words) >= 2:
+        result.add("".join(w[0] for w in content_words if w[0].isalpha()))
+    return {a for a in result if len(a) >= 2}
+
+
+# Acronym expansion map (includes ECE, BBA, LLB, MBBS, MD, MPhil, etc.)
+MAJOR_ACRONYMS = {
+    # Computer Science & Engineering
+    "cse": "computer science",
+    "cs": "computer science",
+    "ce": "computer engineering",
+    "se": "software engineering",
+    "ece": "electronics and communication engineering",
+    "eee": "electrical engineering",
+    "it": "information technology",
+    "ai": "artificial intelligence",
+    "ds": "data science",
+    "ml": "machine learning",
+    "cv": "computer vision",
+    "nlp": "natural language processing",
+    "bme": "biomedical engineering",
+    "mse": "materials science engineering",
+    # Sciences
+    "chem": "chemistry",
+    "bio": "biology",
+    "phy": "physics",
+    "math": "mathematics",
+    "econ": "economics",
+    "fin": "finance",
+    # Business & Management
+    "bba": "bachelor of business administration",
+    "mba": "master of business administration",
+    "bcom": "bachelor of commerce",
+    "mcom": "master of commerce",
+    # Law
+    "llb": "bachelor of laws",
+    "llm": "master of laws",
+    "jd": "juris doctor",
+    # Medicine & Health Sciences
+    "mbbs": "bachelor of medicine and bachelor of surgery",
+    "md": "doctor of medicine",
+    "ms": "master of surgery",
+    "dm": "doctor of medicine",
+    "mch": "master of surgery",
+    "bds": "bachelor of dental surgery",
+    "mds": "master of dental surgery",
+    "bpharm": "bachelor of pharmacy",
+    "mpharm": "master of pharmacy",
+    "bpt": "bachelor of physiotherapy",
+    "mpt": "master of physiotherapy",
+    "bsc nursing": "bachelor of science in nursing",
+    "msc nursing": "master of science in nursing",
+    "bvsc": "bachelor of veterinary science",
+    "mvsc": "master of veterinary science",
+    # Arts & Humanities
+    "ba": "bachelor of arts",
+    "ma": "master of arts",
+    "bsc": "bachelor of science",
+    "msc": "master of science",
+    "btech": "bachelor of technology",
+    "mtech": "master of technology",
+    "bed": "bachelor of education",
+    "med": "master of education",
+    # Research Degrees
+    "mphil": "master of philosophy",
+    "phd": "doctor of philosophy",
+    "dphil": "doctor of philosophy",
+    "dsc": "doctor of science",
+    "dlitt": "doctor of letters",
+    # Architecture & Design
+    "barch": "bachelor of architecture",
+    "march": "master of architecture",
+    # Other Professional Degrees
+    "ca": "chartered accountant",
+    "cpa": "certified public accountant",
+    "cfa": "chartered financial analyst",
+}
+
+
+def expand_major_acronym(text: str) -> str:
+    """
+    Expand common major acronyms before fuzzy matching.
+    Also strips trailing stopwords like "and", "&", ",".
+    Handles dots in acronyms (e.g., "B.B.A." -> "BBA" -> "bachelor of business administration").
+    """
+    if not text:
+        return text
+
+    # Normalize dots in acronyms first (e.g., "B.B.A." -> "BBA")
+    text = text.replace('.', '').strip()
+
+    # Strip trailing stopwords
+    text = re.sub(r'\s+(and|&|,)\s*$', '', text, flags=re.IGNORECASE).strip()
+
+    text_lower = text.lower()
+
+    # Check if text is short (<=6 chars) or all-caps-like (mostly uppercase)
+    # Also check for longer medical/law acronyms (MBBS, MPhil, etc.)
+    is_short = len(text.replace(' ', '')) <= 6
+    is_caps_like = len([c for c in text if c.isupper()]) > len([c for c in text if c.islower()]) if text else False
+    is_long_acronym = len(text.replace(' ', '')) <= 8 and text.replace(' ', '').isupper()  # For MBBS, MPhil, etc.
+
+    if is_short or is_caps_like or is_long_acronym:
+        for abbrev, expansion in MAJOR_ACRONYMS.items():
+            # Match whole word only (case-insensitive)
+            pattern = r'\b' + re.escape(abbrev) + r'\b'
+            if re.search(pattern, text_lower):
+                # Replace acronym with expansion
+                text = re.sub(pattern, expansion, text, flags=re.IGNORECASE)
+                break  # Only expand first match
+
+    return text
+
+
+def major_acronyms(name: Any) -> set:
+    """MAJOR_ACRONYMS keys whose expansion appears (as whole words) in a major name"""
+    text = f" {normalize_match_text(name)} "
+    return {abbrev for abbrev, expansion in MAJOR_ACRONYMS.items() if f" {expansion} " in text}
+
+
+class FuzzyIndex:
+    """Exact, acronym and trigram lookup tables over the text fields of a list of entries"""
+
+    def __init__(self, entries: Iterable[Dict[str, Any]],
+                 fields: Callable[[Dict[str, Any]], Iterable[Any]],
+                 acronyms_of: Optional[Callable[[Dict[str, Any]], Iterable[str]]] = None):
+        self.entries: List[Dict[str, Any]] = list(entries)
+        # Each distinct normalized text is one document; many majors share the same name
+        self._doc_by_text: Dict[str, int] = {}
+        self._doc_entries: List[List[int]] = []  # document -> entry positions
+        self._doc_size: List[int] = []           # document -> number of trigrams
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._acronyms: Dict[str, List[int]] = defaultdict(list)
+
+        for position, entry in enumerate(self.entries):
+            for value in fields(entry):
+                text = normalize_match_text(value)
+                if not text:
+                    continue
+                doc = self._doc_by_text.get(text)
+                if doc is None:
+                    doc = len(self._doc_entries)
+                    self._doc_by_text[text] = doc
+                    self._doc_entries.append([])
+                    grams = trigrams(text)
+                    self._doc_size.append(len(grams))
+                    for gram in grams:
+                        self._postings[gram].append(doc)
+                if not self._doc_entries[doc] or self._doc_entries[doc][-1] != position:
+                    self._doc_entries[doc].append(position)
+            for acronym in (acronyms_of(entry) if acronyms_of else ()):
+                self._acronyms[acronym].append(position)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def candidates(self, *texts: str, limit: int = 20,
+                   predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
+        """
+        Return up to limit entries most likely to match any of texts, best first:
+        exact matches, then acronym matches, then by trigram Dice overlap.
+        predicate filters entries before the limit is applied.
+        """
+        doc_ranks: Dict[int, float] = {}
+        acronym_hits: List[int] = []
+
+        for text in texts:
+            text = normalize_match_text(text)
+            if not text:
+                continue
+            exact_doc = self._doc_by_text.get(text)
+            if exact_doc is not None:
+                doc_ranks[exact_doc] = _EXACT_RANK
+            compact = text.replace(" ", "")
+            if len(compact) <= 6:
+                acronym_hits.extend(self._acronyms.get(compact, ()))
+
+            grams = trigrams(text)
+            overlap = Counter()
+            for gram in grams:
+                overlap.update(self._postings.get(gram, ()))
+            query_size = len(grams)
+            doc_size = self._doc_size
+            for doc, shared in overlap.items():
+                rank = 2.0 * shared / (query_size + doc_size[doc])
+                if rank > doc_ranks.get(doc, 0.0):
+                    doc_ranks[doc] = rank
+
+        # Walk documents best first; an entry's first appearance is its best rank.
+        # Ties keep catalog order, like the full scans this replaces.
+        ranked_docs = sorted(doc_ranks.items(), key=lambda item: (-item[1], item[0]))
+        groups = [self._doc_entries[doc] for doc, rank in ranked_docs if rank >= _EXACT_RANK]
+        groups.append(acronym_hits)
+        groups.extend(self._doc_entries[doc] for doc, rank in ranked_docs if rank < _EXACT_RANK)
+
+        seen = set()
+        result: List[Dict[str, Any]] = []
+        for positions in groups:
+            for position in positions:
+                if position in seen:
+                    continue
+                seen.add(position)
+                entry = self.entries[position]
+                if predicate is not None and not predicate(entry):
+                    continue
+                result.append(entry)
+                if len(result) >= limit:
+                    return result
+        return result
+
+
+class MatchIndex:
+    """University and major FuzzyIndexes for one catalog snapshot"""
+
+    def __init__(self, universities: Iterable[Dict[str, Any]], majors: Iterable[Dict[str, Any]], version: int = 0):
+        self.version = version
+        self.universities = FuzzyIndex(
+            universities,
+            fields=lambda u: [u.get("name"), u.get("name_cn")] + list(u.get("aliases") or []),
+            acronyms_of=lambda u: acronyms(normalize_match_text(u.get("name"))),
+        )
+        self.majors = FuzzyIndex(
+            majors,
+            fields=lambda m: [m.get("name"), m.get("name_cn")] + list(m.get("keywords") or []) + list(m.get("aliases") or []),
+            acronyms_of=lambda m: major_acronyms(m.get("name")),
+        )
+        self._partner_university_ids = {u["id"] for u in self.universities.entries if u.get("is_partner")}
+
+    def university_candidates(self, *texts: str, limit: int = 20, partner_only: bool = False) -> List[Dict[str, Any]]:
+        predicate = (lambda u: u.get("is_partner")) if partner_only else None
+        return self.universities.candidates(*texts, limit=limit, predicate=predicate)
+
+    def major_candidates(self, *texts: str, limit: int = 30, partner_only: bool = False,
+                         predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
+        if partner_only:
+            partner_ids = self._partner_university_ids
+            base = predicate
+            predicate = lambda m: m.get("university_id") in partner_ids and (base is None or base(m))
+        return self.majors.candidates(*texts, limit=limit, predicate=predicate)
@@ -1,18 +1,76 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from openai import APIConnectionError, APITimeoutError, RateLimitError
 from app.config import settings
-from typing import List, Dict, Optional
+from app.services.prompt_cache import prompt_usage_stats
+from typing import AsyncIterator, Callable, List, Dict, Optional
+import asyncio
+import httpx
 import json
+import threading
 import time
 
+# Process-wide OpenAI clients. Every OpenAIService / AsyncOpenAIService shares these,
+# so all call sites reuse one keep-alive connection pool instead of opening their own
+# (and paying a TLS handshake per new service instance).
+_client_lock = threading.Lock()
+_sync_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=60.0
+    )
+
+def get_openai_client() -> OpenAI:
+    """Shared sync OpenAI client (thread-safe, used by OpenAIService)"""
+    global _sync_client
+    if _sync_client is None:
+        with _client_lock:
+            if _sync_client is None:
+                _sync_client = OpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    timeout=300.0,  # 5 minutes timeout for long SQL generation
+                    max_retries=3,  # Retry up to 3 times
+                    http_client=httpx.Client(limits=_http_limits(), timeout=300.0)
+                )
+    return _sync_client
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Shared AsyncOpenAI client (used by AsyncOpenAIService on the app's event loop)"""
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = AsyncOpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    timeout=300.0,
+                    max_retries=3,
+                    http_client=httpx.AsyncClient(limits=_http_limits(), timeout=300.0)
+                )
+    return _async_client
+
+async def close_async_openai_client():
+    """Close the shared async client's connection pool (app shutdown)"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+def _retry_wait_seconds(error: Exception, attempt: int) -> float:
+    """Backoff used by both services: 2s, 4s, 8s for connection errors, 60s for rate limits"""
+    if isinstance(error, RateLimitError):
+        return 60.0
+    return float((2 ** attempt) * 2)
+
 class OpenAIService:
+    """
+    Sync OpenAI service used by the agents and legacy call sites.
+    Thin wrapper over the shared client, so constructing it per request is cheap.
+    """
     def __init__(self):
-        # Configure OpenAI client with timeout and retry settings
-        self.client = OpenAI(
-            api_key=settings.OPENAI_API_KEY,
-            timeout=300.0,  # 5 minutes timeout for long SQL generation
-            max_retries=3  # Retry up to 3 times
-        )
+        self.client = get_openai_client()
         self.model = settings.OPENAI_MODEL
         self.router_model = settings.OPENAI_ROUTER_MODEL
         self.distill_model = settings.OPENAI_DISTILL_MODEL
@@ -45,39 +103,40 @@ class OpenAIService:
         temperature: float = 0.7,
         top_p: float = 1.0,
         stream: bool = False,
-        max_retries: int = 3
+        max_retries: int = 3,
+        prompt_name: Optional[str] = None
     ):
-        """Generate chat completion with retry logic"""
+        """
+        Generate chat completion with retry logic.
+        prompt_name labels the call in prompt_usage_stats (prompt / cached tokens); streamed calls are
+        recorded by the caller from the final usage chunk (see chat_completion_text).
+        """
         last_exception = None
         
         for attempt in range(max_retries):
             try:
+                started = time.monotonic()
                 response = self.client.chat.completions.create(
                     model=self.model,
                     messages=messages,
                     temperature=temperature,
                     top_p=top_p,
                     stream=stream,
-                    timeout=300.0  # 5 minutes timeout
+                    timeout=300.0,  # 5 minutes timeout
+                    **({"stream_options": {"include_usage": True}} if stream else {})
                 )
+                if not stream:
+                    prompt_usage_stats.record(prompt_name or "other", messages, getattr(response, "usage", None),
+                                              time.monotonic() - started)
                 return response
-            except (APIConnectionError, APITimeoutError) as e:
-                last_exception = e
-                if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) * 2  # Exponential backoff: 2s, 4s, 8s
-                    print(f"⚠️  OpenAI connection error (attempt {attempt + 1}/{max_retries}). Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    print(f"❌ OpenAI connection failed after {max_retries} attempts")
-                    raise
-            except RateLimitError as e:
+            except (APIConnectionError, APITimeoutError, RateLimitError) as e:
                 last_exception = e
                 if attempt < max_retries - 1:
-                    wait_time = 60  # Wait 60 seconds for rate limit
-                    print(f"⚠️  OpenAI rate limit (attempt {attempt + 1}/{max_retries}). Waiting {wait_time}s...")
+                    wait_time = _retry_wait_seconds(e, attempt)
+                    print(f"⚠️  OpenAI {type(e).__name__} (attempt {attempt + 1}/{max_retries}). Retrying in {wait_time:.0f}s...")
                     time.sleep(wait_time)
                 else:
-                    print(f"❌ OpenAI rate limit exceeded after {max_retries} attempts")
+                    print(f"❌ OpenAI request failed after {max_retries} attempts: {type(e).__name__}")
                     raise
             except Exception as e:
                 # For other errors, don't retry
@@ -88,6 +147,38 @@ class OpenAIService:
         if last_exception:
             raise last_exception
     
+    def chat_completion_text(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        top_p: float = 1.0,
+        on_delta: Optional[Callable[[str], None]] = None,
+        prompt_name: Optional[str] = None
+    ) -> str:
+        """
+        Generate chat completion and return the answer text.
+        If on_delta is given, the completion is streamed and every content delta
+        is forwarded to it as soon as it arrives (used by the streaming chat endpoint).
+        """
+        if on_delta is None:
+            response = self.chat_completion(messages, temperature=temperature, top_p=top_p, prompt_name=prompt_name)
+            return response.choices[0].message.content
+        
+        started = time.monotonic()
+        stream = self.chat_completion(messages, temperature=temperature, top_p=top_p, stream=True)
+        parts = []
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None and not chunk.choices:
+                # Final chunk (stream_options.include_usage): token counts for the whole call
+                prompt_usage_stats.record(prompt_name or "other", messages, chunk.usage, time.monotonic() - started)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                on_delta(delta)
+        return "".join(parts)
+    
     def distill_content(self, content: str, context: str) -> str:
         """Distill and extract key information from content"""
         messages = [
@@ -164,3 +255,102 @@ RAG Context:
         )
         return response.choices[0].message.content
 
+
+class AsyncOpenAIService:
+    """
+    Async counterpart of OpenAIService backed by the shared AsyncOpenAI client.
+    Use from async code paths: many turns can wait on the LLM concurrently
+    without holding a thread each, and retries back off with asyncio.sleep.
+    """
+    def __init__(self):
+        self.model = settings.OPENAI_MODEL
+        self.embedding_model = settings.OPENAI_EMBEDDING_MODEL
+    
+    @property
+    def client(self) -> AsyncOpenAI:
+        return get_async_openai_client()
+    
+    async def generate_embedding(self, text: str) -> List[float]:
+        """Generate embedding using text-embedding-3-small"""
+        response = await self.client.embeddings.create(
+            model=self.embedding_model,
+            input=text
+        )
+        return response.data[0].embedding
+    
+    async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for multiple texts"""
+        response = await self.client.embeddings.create(
+            model=self.embedding_model,
+            input=texts
+        )
+        return [item.embedding for item in response.data]
+    
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        top_p: float = 1.0,
+        stream: bool = False,
+        max_retries: int = 3,
+        prompt_name: Optional[str] = None
+    ):
+        """Generate chat completion with retry logic (non-blocking backoff)"""
+        for attempt in range(max_retries):
+            try:
+                started = time.monotonic()
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    top_p=top_p,
+                    stream=stream,
+                    timeout=300.0,
+                    **({"stream_options": {"include_usage": True}} if stream else {})
+                )
+                if not stream:
+                    prompt_usage_stats.record(prompt_name or "other", messages, getattr(response, "usage", None),
+                                              time.monotonic() - started)
+                return response
+            except (APIConnectionError, APITimeoutError, RateLimitError) as e:
+                if attempt < max_retries - 1:
+                    wait_time = _retry_wait_seconds(e, attempt)
+                    print(f"⚠️  OpenAI {type(e).__name__} (attempt {attempt + 1}/{max_retries}). Retrying in {wait_time:.0f}s...")
+                    await asyncio.sleep(wait_time)
+                else:
+                    print(f"❌ OpenAI request failed after {max_retries} attempts: {type(e).__name__}")
+                    raise
+            except Exception as e:
+                print(f"❌ OpenAI API error: {str(e)}")
+                raise
+    
+    async def chat_completion_text(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        top_p: float = 1.0,
+        prompt_name: Optional[str] = None
+    ) -> str:
+        """Generate chat completion and return the answer text"""
+        response = await self.chat_completion(messages, temperature=temperature, top_p=top_p, prompt_name=prompt_name)
+        return response.choices[0].message.content
+    
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        top_p: float = 1.0,
+        prompt_name: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream chat completion content deltas as they arrive"""
+        started = time.monotonic()
+        stream = await self.chat_completion(messages, temperature=temperature, top_p=top_p, stream=True)
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None and not chunk.choices:
+                prompt_usage_stats.record(prompt_name or "other", messages, chunk.usage, time.monotonic() - started)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+# Process-wide async service instance
+async_openai_service = AsyncOpenAIService()
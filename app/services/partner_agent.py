@@ -2,14 +2,22 @@
 PartnerAgent - For logged-in partners
 Goal: Help partners answer questions about MalishaEdu universities, majors, and programs
 """
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Iterator
 from dataclasses import dataclass, field
 from sqlalchemy.orm import Session
 from app.services.db_query_service import DBQueryService
 from app.services.tavily_service import TavilyService
 from app.services.openai_service import OpenAIService
-from app.services.router import PartnerRouter
+from app.services.response_stream import stream_agent_turn
+from app.config import settings
+from app.services.router import PartnerRouter, routing_stats
 from app.services.slot_schema import PartnerQueryState
+from app.services.catalog_service import catalog_service
+from app.services.match_index import MatchIndex, expand_major_acronym
+from app.services.session_store import session_store
+from app.services.profile_state import is_topic_reset, profile_state_stats
+from app.services.prompt_cache import cacheable_messages
+from app.services.answer_templates import MAX_DETAILED_PROGRAMS, intake_to_dict, render_answer, template_kind, template_stats
 from difflib import SequenceMatcher
 from app.models import University, Major, ProgramIntake, ProgramDocument, ProgramIntakeScholarship, Scholarship, ProgramExamRequirement, IntakeTerm
 from datetime import datetime, date
@@ -19,6 +27,46 @@ import re
 import hashlib
 
 
+# Words the rule parsers account for. A fresh query made only of these (plus recognised slot values)
+# carries nothing the LLM extraction could add.
+_RULES_VOCABULARY = frozenset("""
+    i im me my we our you your want wants need needs looking look like would could can will please pls plz
+    the a an and or of in at on for to from with about by is are be do does did there any some few all
+    what which how many much when where give provide show list tell know find get see
+    offer offers offered offering provides available information info details detail
+    program programs programme programmes course courses major majors subject subjects degree degrees
+    study studying student students university universities uni college colleges institute partner
+    intake intakes term semester semesters year years month months week weeks
+    next earliest upcoming asap soonest new starting start
+    apply application applications admission admissions requirement requirements eligibility eligible
+    document documents docs doc required require requires needed paper papers materials
+    scholarship scholarships csc csca type government council waiver partial full stipend
+    fee fees tuition cost costs price prices cheapest lowest low less compare comparison free zero no without
+    budget per deadline deadlines date last due
+    taught teaching language english chinese mandarin
+    bachelor bachelors master masters phd doctorate doctoral undergraduate undergrad postgraduate postgrad
+    graduate diploma foundation nondegree non-degree preparatory
+    march september spring fall autumn sept sep mar china city province
+    hsk ielts toefl bank statement age country nationality allowed accommodation dormitory housing
+    calculate total estimate usd rmb yuan cny dollar dollars
+    least minimum min max maximum exactly approx approximately around than more under over up
+""".split())
+
+# Words that point back to earlier turns (the LLM sees the conversation, the rule parsers do not)
+_CONTEXT_REFERENCE = re.compile(r'\b(it|its|this|these|those|same|they|them|previous|above|mentioned)\b')
+
+# parse_query_rules intent -> llm_extract_state intent
+_RULES_INTENT_MAP = {
+    "scholarship_only": "SCHOLARSHIP",
+    "documents_only": "REQUIREMENTS",
+    "fees_only": "FEES",
+    "fees_compare": "FEES",
+    "list_universities": "LIST_UNIVERSITIES",
+    "list_programs": "LIST_PROGRAMS",
+    "general": "GENERAL",
+}
+
+
 @dataclass
 class PaginationState:
     """State for list query pagination"""
@@ -44,9 +92,16 @@ class PendingState:
 class PartnerAgent:
     """Partner agent for answering questions about MalishaEdu universities and programs"""
     
-    # CLASS-LEVEL cache to persist across requests (since agent is instantiated per request)
-    _class_state_cache: Dict[Tuple[Optional[int], str], Dict[str, Any]] = {}
+    # Per-conversation state persists across requests (the agent is instantiated per request)
+    # in the shared session store (app/services/session_store.py), one namespace per cache
     _class_state_cache_ttl: float = 1800.0  # 30 minutes TTL
+    _pagination_ttl: float = 3600.0  # 1 hour TTL
+    STATE_NAMESPACE = "partner_state"
+    PENDING_SLOT_NAMESPACE = "partner_pending_slot"
+    PENDING_NAMESPACE = "partner_pending"
+    PAGINATION_NAMESPACE = "partner_pagination"
+    PAGINATION_KEY_NAMESPACE = "partner_last_pagination_key"
+    SESSION_FALLBACK_NAMESPACE = "partner_session_fallback_id"
     
     # List query caps to prevent huge context
     MAX_LIST_UNIVERSITIES = 12
@@ -65,6 +120,100 @@ CRITICAL RULES:
 - For scholarships: Show coverage, allowances, deadlines. Specify CSC vs university scholarship.
 - For comparison: Side-by-side for up to 3 programs. Require targets or ask one question.
 - Ask at most ONE clarifying question per turn, only when required to run a DB query.
+"""
+
+    # Slot extraction schema and rules (llm_extract_state). Never formatted: today's date and the
+    # conversation go in the user message so this system prompt stays byte-identical across turns
+    PARTNER_EXTRACTION_PROMPT = """You are a JSON extractor. Output only valid JSON matching the exact schema.
+Extract information from the conversation in the user message.
+
+Output ONLY valid JSON with these exact fields:
+{
+  "intent": "SCHOLARSHIP" | "FEES" | "REQUIREMENTS" | "LIST_PROGRAMS" | "LIST_UNIVERSITIES" | "GENERAL" | "PAGINATION",
+  "degree_level": "Language" | "Bachelor" | "Master" | "PhD" | null,
+  "major_raw": string or null,
+  "university_raw": string or null,  # Can be full name, alias (e.g., "HIT" for "Harbin Institute of Technology"), or abbreviation
+  "intake_term": "March" | "September" | null,
+  "intake_year": number or null,
+  "teaching_language": "English" | "Chinese" | null,
+  "city": string or null,  # City name (e.g., "Guangzhou", "Beijing", "Shanghai", "Shenzhen", "Hangzhou", "Nanjing", "Chengdu", "Xian", "Wuhan", "Tianjin", "Dalian", "Qingdao")
+  "province": string or null,  # Province name (e.g., "Guangdong", "Jiangsu", "Zhejiang", "Sichuan", "Shaanxi", "Hubei", "Shandong", "Hunan", "Beijing", "Shanghai", "Tianjin")
+  "duration_years": number or null,
+  "wants_earliest": boolean,
+  "wants_scholarship": boolean,
+  "wants_requirements": boolean,
+  "wants_fees": boolean,
+  "page_action": "next" | "prev" | "none",
+  "confidence": number
+}
+
+RULES:
+- Use today's date (given with the conversation) to interpret "next intake", "earliest intake", "asap".
+- Do NOT output major_raw = "scholarship info" / "fees" / "information". If unsure, null.
+- Do NOT output university_raw = "list" / "all" / "database". If unsure, null.
+- For university_raw: Extract university names, abbreviations, or aliases (e.g., "HIT" for "Harbin Institute of Technology", "BUAA" for "Beihang University"). Include common abbreviations and aliases.
+- For degree_level: "Chinese Language", "English Language", "Mandarin Language", "Language Program", "Language Course", "Foundation Program","Chinese Language Program", "English Language Program", "Mandarin Language Program", "Non-degree Program" should all be set to degree_level="Language". If user says "Chinese Language" or "English Language", it means they want a Language program (degree_level="Language"), NOT a Bachelor/Master/PhD program taught in Chinese/English.
+- For teaching_language: Extract "English" from phrases like "English", "English taught", "English-taught", "taught in English", "English program". Extract "Chinese" from  "Chinese taught", "Mandarin", "中文". CRITICAL: If user says "Chinese Language" or "English Language" as a degree level (major name), set degree_level="Language" but DO NOT set teaching_language. "Chinese Language" is a major/program name, NOT a teaching language requirement. Only set teaching_language if user explicitly mentions teaching language (e.g., "taught in Chinese", "English-taught program").
+- For deadline questions (e.g., "application deadline", "when is the deadline"), set wants_deadline=true and intent can be GENERAL if no other intent is clear.
+- CRITICAL: If user asks "which universities" or "list universities" or "how many universities" or "any university" (even with fee comparison like "lowest fees"), set intent="LIST_UNIVERSITIES" (NOT FEES). Set wants_fees=true if fees are mentioned.
+- For fee-related questions (e.g., "tuition fee", "tuition", "fee", "cost", "price", "bank statement amount"), set wants_fees=true and intent=FEES (unless it's a "which universities" query).
+- For scholarship questions (e.g., "scholarship", "scholarship info", "scholarship opportunity", "requiring CSC/CSCA", "requiring CSC", "requiring CSCA"), set wants_scholarship=true and intent=SCHOLARSHIP. Do NOT set wants_requirements=true for CSC/CSCA scholarship queries - "requiring CSC/CSCA" means scholarship requirement, not document requirements.
+- For accommodation questions (e.g., "accommodation", "accommodation facility", "housing", "dormitory"), set wants_fees=true and intent=FEES (accommodation info is part of fees).
+- For "offered majors", "offered subjects", "available majors", "list of majors", set intent=LIST_PROGRAMS.
+- For city/province: Extract city names (e.g., "Guangzhou", "Beijing", "Shanghai", "Shenzhen", "Hangzhou", "Nanjing", "Chengdu", "Xian", "Wuhan", "Tianjin", "Dalian", "Qingdao") and province names (e.g., "Guangdong", "Jiangsu", "Zhejiang", "Sichuan", "Shaanxi", "Hubei", "Shandong", "Hunan", "Beijing", "Shanghai", "Tianjin"). Handle common typos (e.g., "guangzou" -> "Guangzhou", "guangjou" -> "Guangzhou"). City/province is NOT a university or major - it's a location filter.
+- Output confidence in [0,1] based on how clear the user's intent is.
+- For "next March intake", set intake_term="March" and wants_earliest=true, NOT page_action="next".
+"""
+
+    # Answer formatting rules (format_answer_with_llm). Static and sent right after PARTNER_SYSTEM_PROMPT,
+    # so the formatter prompt starts with a byte-stable prefix that OpenAI prompt caching can reuse
+    PARTNER_FORMATTER_RULES = """
+CRITICAL RULES:
+- Use ONLY the information provided in DATABASE CONTEXT in the user message.
+- Never mention a major/university that is NOT in the DATABASE CONTEXT.
+- POSITIVE LANGUAGE: Always present information in a positive way. NEVER say "Not provided" unless the DATABASE CONTEXT explicitly says "not provided", "Not specified", or "N/A".
+- NULL fields in database mean "not required" or "not specified" - do NOT mention them in your response.
+- If a field is present in DATABASE CONTEXT, show it. Only omit if it literally says "not provided" or "Not specified" in the context.
+- Do NOT use negative language like "No specific details on..." or "Not provided in our partner database" unless the context explicitly states that.
+- Do NOT invent or hallucinate any information.
+
+FORMATTING REQUIREMENTS:
+- Use markdown formatting for better readability
+- Use **bold** for university names, major names, and important labels (e.g., **Bank statement required:**, **Scholarship Available:**)
+- Use bullet points (- or •) for lists of items (documents, fees, requirements, scholarships)
+- Use numbered lists (1., 2., 3.) for sequential steps or ordered information
+- Use line breaks between different universities/programs for clarity
+- Group related information together (e.g., all fees together, all documents together)
+- Use clear section headers with **bold** text (e.g., **Fees:**, **Required Documents:**, **Exams:**)
+
+Example format:
+**University Name:**
+
+**Major Name:**
+
+**Bank statement required:** Yes, amount 5000 USD.
+
+**Other fees:**
+- Medical checkup fee: 800 CNY (first year only)
+- Accommodation fees: Triple room 3000 or 5000 CNY/year
+
+**Required documents:**
+- Passport
+- Photo
+- High school certificate & transcript
+- Medical report
+
+CONTENT REQUIREMENTS:
+- For REQUIREMENTS/ADMISSION intents: Only show detailed document lists and admission process if there are LESS than 3 universities in the results
+- For REQUIREMENTS/ADMISSION intents: If there are 3 or more universities, ask the user to choose a specific university first
+- For LIST_UNIVERSITIES with fee comparison (wants_fees=True): DO NOT ask user to choose. Instead, COMPARE all universities and show which has the LOWEST fees. Show fee breakdown for all universities sorted by lowest fees first.
+- For LIST_UNIVERSITIES: If there are MORE than 6 universities, show ONLY university names with teaching language and major/degree_level, then ask user to choose one for specific details
+- For LIST_UNIVERSITIES: If there are 6 or LESS universities, show ALL universities with their actual names, teaching languages, major/degree_level, and scholarship information (if available). DO NOT use placeholders like "University A", "University B", "University C". Use the actual university names from the DATABASE CONTEXT.
+- For LIST_UNIVERSITIES with scholarship requirement (including Type A, Type B, Type C, CSC): Show which universities offer scholarships and provide FULL scholarship details from the Scholarship Information field. Focus on scholarship information, NOT document requirements. Only show documents if specifically asked. Show ALL universities found in the DATABASE CONTEXT, do not limit to 2. CRITICAL: If Scholarship Information field contains Type A, Type B, or Type C, explicitly mention these scholarship types in your response.
+- For LIST_PROGRAMS: Show ALL majors (even if 30-40), grouped by teaching language if multiple languages exist (don't ask user to choose language)
+- For GENERAL queries: If multiple teaching languages exist and list < 4, show both Chinese and English taught programs separately (don't ask user to choose)
+- Focus on the most relevant information based on the user's question (e.g., if they ask about fees, prioritize fee information)
+- CRITICAL: ALWAYS use actual university names from the DATABASE CONTEXT. NEVER use placeholders like "University A", "University B", "University C", etc.
 """
 
     def __init__(self, db: Session):
@@ -74,11 +223,11 @@ CRITICAL RULES:
         self.openai_service = OpenAIService()
         self.router = PartnerRouter(self.openai_service)
         
-        # Unified lazy caches with TTL (loaded only when needed for fuzzy matching)
-        self._universities_cache: Optional[List[Dict[str, Any]]] = None
-        self._majors_cache: Optional[List[Dict[str, Any]]] = None
-        self._cache_ts: Optional[float] = None
-        self._cache_ttl_seconds: float = 900.0  # 15 minutes TTL
+        # Set while a turn is streamed (see generate_response_stream); receives final answer deltas
+        self.stream_handler = None
+        
+        # University/major lists for fuzzy matching come from the process-wide catalog snapshot
+        # (app/services/catalog_service.py), loaded only when matching actually needs them
         
         # Conversation memory for follow-up questions
         self.last_selected_university_id: Optional[int] = None
@@ -88,45 +237,16 @@ CRITICAL RULES:
         # Multi-track info for responses with multiple teaching languages
         self._multi_track_info: Optional[Dict[str, Any]] = None
         
-        # List pagination cache: keyed by (partner_id, conversation_id) -> PaginationState
-        self._pagination_cache: Dict[Tuple[Optional[int], str], PaginationState] = {}
+        # List pagination state (PaginationState keyed by (partner_id, conversation_id)), the stable
+        # session fallback ID and last pagination key per partner live in the session store
         
-        # Stable session fallback IDs per partner (for pagination when no conversation_id)
-        self._session_fallback_id_by_partner: Dict[Optional[int], str] = {}
-        
-        # Last pagination key by partner (for stable fallback)
-        self._last_pagination_key_by_partner: Dict[Optional[int], Tuple[Optional[int], str]] = {}
-    
-        # Note: State cache is now class-level (PartnerAgent._class_state_cache) to persist across requests
-        
-        # Legacy pending slot cache (for backward compatibility during migration)
-        self._pending_slot_cache: Dict[Tuple[Optional[int], str], Dict[str, Any]] = {}
+        # Legacy pending slot cache / pending clarification state (for backward compatibility)
         self._pending_slot_ttl: float = 600.0  # 10 minutes TTL
-        
-        # Legacy pending clarification state (for backward compatibility)
-        self._pending: Dict[str, PendingState] = {}
         self._pending_ttl: float = 600.0  # 10 minutes TTL
     
     def _get_universities_cached(self, force_reload: bool = False) -> List[Dict[str, Any]]:
-        """Lazy load university cache with TTL (only loads when needed for fuzzy matching)"""
-        import time
-        now = time.time()
-        
-        if force_reload or self._universities_cache is None or (self._cache_ts and (now - self._cache_ts) > self._cache_ttl_seconds):
-            # Load only name, id, aliases for fuzzy matching (lightweight)
-            universities = self.db_service.search_universities(is_partner=True, limit=1000)  # Reasonable limit
-            self._universities_cache = [
-                {
-                    "id": uni.id,
-                    "name": uni.name,
-                    "name_cn": uni.name_cn,
-                    "aliases": uni.aliases if isinstance(uni.aliases, list) else (json.loads(uni.aliases) if isinstance(uni.aliases, str) else []),
-                }
-                for uni in universities
-            ]
-            self._cache_ts = now
-        
-        return self._universities_cache
+        """Partner universities (id, name, name_cn, aliases, ...) from the shared catalog snapshot"""
+        return list(catalog_service.get(self.db_service, force_reload=force_reload).partner_universities)
     
     def _get_uni_name_cache(self, force_reload: bool = False) -> List[Dict[str, Any]]:
         """Alias for backward compatibility"""
@@ -152,93 +272,47 @@ CRITICAL RULES:
     
     def _get_majors_cached(self, force_reload: bool = False) -> List[Dict[str, Any]]:
         """
-        Lazy load major cache with TTL (ONLY loads when fuzzy matching is actually needed).
-        This is called ONLY when _fuzzy_match_major needs it, not on every request.
+        All majors (id, name, name_cn, keywords, aliases, degree_level, teaching_language, university_id)
+        from the shared catalog snapshot. Loaded once per process, not per request.
         """
-        import time
-        now = time.time()
-        
-        if force_reload or self._majors_cache is None or (self._cache_ts and (now - self._cache_ts) > self._cache_ttl_seconds):
-            # Load minimal fields for fuzzy matching (bounded to 2000 entries)
-            majors = self.db_service.search_majors(limit=2000)  # Max 2000 entries
-            self._majors_cache = []
-            for major in majors:
-                # Normalize keywords (same as _load_all_majors did)
-                keywords = getattr(major, 'keywords', None)
-                if isinstance(keywords, str):
-                    try:
-                        keywords = json.loads(keywords)
-                    except (json.JSONDecodeError, ValueError):
-                        keywords = [k.strip() for k in keywords.split(',') if k.strip()] if keywords else []
-                elif not isinstance(keywords, list):
-                    keywords = []
-                
-                # Normalize aliases
-                aliases = getattr(major, 'aliases', None)
-                if isinstance(aliases, str):
-                    try:
-                        aliases = json.loads(aliases)
-                    except (json.JSONDecodeError, ValueError):
-                        aliases = [a.strip() for a in aliases.split(',') if a.strip()] if aliases else []
-                elif not isinstance(aliases, list):
-                    aliases = []
-                
-                self._majors_cache.append({
-                    "id": major.id,
-                    "name": major.name,
-                    "name_cn": getattr(major, 'name_cn', None),
-                    "keywords": keywords,
-                    "aliases": aliases,
-                    "degree_level": str(major.degree_level) if major.degree_level else None,
-                    "teaching_language": str(major.teaching_language) if major.teaching_language else None,
-                    "university_id": major.university_id,
-                })
-            self._cache_ts = now
-        
-        return self._majors_cache
+        return list(catalog_service.get(self.db_service, force_reload=force_reload).majors)
     
     def _get_major_cache(self, force_reload: bool = False) -> List[Dict[str, Any]]:
         """Alias for backward compatibility"""
         return self._get_majors_cached(force_reload)
     
+    def _get_match_index(self) -> MatchIndex:
+        """Fuzzy-match candidate index over the shared catalog snapshot"""
+        return catalog_service.get_match_index(self.db_service)
+    
+    @staticmethod
+    def _session_key(partner_id: Optional[int], conversation_id: Optional[str]) -> str:
+        """Session store key for (partner_id, conversation_id)"""
+        return f"{partner_id}:{conversation_id}"
+    
     def _get_pending_slot(self, partner_id: Optional[int], conversation_id: Optional[str]) -> Optional[Dict[str, Any]]:
-        """Get pending slot for conversation, checking TTL"""
+        """Get pending slot for conversation (expired entries are dropped by the session store)"""
         if not conversation_id:
             return None
-        
-        key = (partner_id, conversation_id)
-        pending = self._pending_slot_cache.get(key)
-        
-        if pending:
-            now = time.time()
-            if (now - pending.get("timestamp", 0)) > self._pending_slot_ttl:
-                # Expired, remove it
-                del self._pending_slot_cache[key]
-                return None
-            return pending
-        
-        return None
+        return session_store.get(self.PENDING_SLOT_NAMESPACE, self._session_key(partner_id, conversation_id))
     
     def _set_pending_slot(self, partner_id: Optional[int], conversation_id: Optional[str], slot: str, intent: str):
         """Set pending slot for conversation"""
         if not conversation_id:
             return
         
-        key = (partner_id, conversation_id)
-        self._pending_slot_cache[key] = {
+        session_store.set(self.PENDING_SLOT_NAMESPACE, self._session_key(partner_id, conversation_id), {
             "slot": slot,
             "timestamp": time.time(),
             "intent": intent
-        }
+        }, ttl_seconds=self._pending_slot_ttl)
     
     def _clear_pending_slot(self, partner_id: Optional[int], conversation_id: Optional[str]):
         """Clear pending slot for conversation"""
         if not conversation_id:
             return
         
-        key = (partner_id, conversation_id)
-        if key in self._pending_slot_cache:
-            del self._pending_slot_cache[key]
+        session_store.delete(self.PENDING_SLOT_NAMESPACE, self._session_key(partner_id, conversation_id))
     
     def _get_conv_key(self, partner_id: Optional[int], conversation_id: Optional[str], 
                       conversation_history: List[Dict[str, str]], user_message: str = None) -> str:
@@ -269,17 +343,8 @@ CRITICAL RULES:
         return hashlib.sha1(key_str.encode()).hexdigest()[:16]
     
     def _get_pending_state(self, conv_key: str) -> Optional[PendingState]:
-        """Get pending state for conversation, checking TTL"""
-        pending = self._pending.get(conv_key)
-        if not pending:
-            return None
-        
-        now = time.time()
-        if (now - pending.created_at) > self._pending_ttl:
-            del self._pending[conv_key]
-            return None
-        
-        return pending
+        """Get pending state for conversation (expired entries are dropped by the session store)"""
+        return session_store.get(self.PENDING_NAMESPACE, conv_key)
     
     def _set_pending_state(self, conv_key: str, intent: str, missing_slots: List[str], 
                            full_state: PartnerQueryState):
@@ -305,31 +370,25 @@ CRITICAL RULES:
             "req_focus": full_state.req_focus,
             "scholarship_focus": full_state.scholarship_focus,
         }
-        self._pending[conv_key] = PendingState(
+        session_store.set(self.PENDING_NAMESPACE, conv_key, PendingState(
             intent=intent,
             missing_slots=missing_slots,
             created_at=time.time(),
             partial_state=partial_state_dict
-        )
+        ), ttl_seconds=self._pending_ttl)
     
     def _get_cached_state(self, partner_id: Optional[int], conversation_id: Optional[str]) -> Optional[Dict[str, Any]]:
         """Get unified cached state for conversation (state + pending info)"""
         if not conversation_id:
             print(f"DEBUG: _get_cached_state - conversation_id is None, returning None")
             return None
-        key = (partner_id, conversation_id)
-        print(f"DEBUG: _get_cached_state - key={key}, cache_keys={list(self._class_state_cache.keys())}")
-        if key in self._class_state_cache:
-            cached = self._class_state_cache[key]
+        key = self._session_key(partner_id, conversation_id)
+        cached = session_store.get(self.STATE_NAMESPACE, key)
+        if cached:
             age = time.time() - cached.get("ts", 0)
-            if age < self._class_state_cache_ttl:
-                print(f"DEBUG: _get_cached_state - found cached state (age={age:.1f}s, pending={cached.get('pending') is not None})")
-                return cached
-            else:
-                print(f"DEBUG: _get_cached_state - cached state expired (age={age:.1f}s > {self._class_state_cache_ttl}s)")
-                del self._class_state_cache[key]
-        else:
-            print(f"DEBUG: _get_cached_state - key not found in cache")
+            print(f"DEBUG: _get_cached_state - key={key} found cached state (age={age:.1f}s, pending={cached.get('pending') is not None})")
+            return cached
+        print(f"DEBUG: _get_cached_state - key={key} not found in cache (or expired)")
         return None
     
     def _set_cached_state(self, partner_id: Optional[int], conversation_id: Optional[str], 
@@ -337,12 +396,11 @@ CRITICAL RULES:
         """Cache unified state for conversation (state + pending info)"""
         if not conversation_id:
             return
-        key = (partner_id, conversation_id)
-        self._class_state_cache[key] = {
+        session_store.set(self.STATE_NAMESPACE, self._session_key(partner_id, conversation_id), {
             "state": state,
             "pending": pending,
             "ts": time.time()
-        }
+        }, ttl_seconds=self._class_state_cache_ttl)
     
     def _get_pending(self, partner_id: Optional[int], conversation_id: Optional[str]) -> Optional[Dict[str, Any]]:
         """Get pending slot info from unified cache"""
@@ -397,7 +455,6 @@ CRITICAL RULES:
         if not cached or not cached.get("pending"):
             return None
         pending = cached["pending"]
-        cached["pending"] = None
         self._set_cached_state(partner_id, conversation_id, cached.get("state"), None)
         return pending.get("snapshot")
     
@@ -417,70 +474,57 @@ CRITICAL RULES:
         Returns JSON dict with intent, slots, and confidence.
         DO NOT inject university/major lists - keep prompt small.
         """
-        # Build conversation text (6 most recent turns ONLY - not whole history)
+        # Incremental: with a previous state only the newest exchange is sent (prompt size stays constant);
+        # the 6 most recent turns are re-read for a new conversation or a topic reset
+        latest_user_message = next(
+            (msg.get('content', '') for msg in reversed(conversation_history) if msg.get('role') == 'user'), ""
+        )
+        incremental = bool(prev_state) and settings.INCREMENTAL_PROFILE_STATE and not is_topic_reset(latest_user_message)
+        profile_state_stats.record(
+            'partner', 'incremental' if incremental else 'full',
+            None if incremental else ('topic_reset' if prev_state and settings.INCREMENTAL_PROFILE_STATE else 'no_state')
+        )
+        
+        # Build conversation text (newest exchange, or the 6 most recent turns - never the whole history)
         conversation_text = ""
-        for msg in conversation_history[-6:]:
+        for msg in conversation_history[-2:] if incremental else conversation_history[-6:]:
             role = msg.get('role', '')
             content = msg.get('content', '')
+            if incremental and role == 'assistant':
+                content = content[:400]  # Long list answers: the question at its start/end is what matters
             conversation_text += f"{role}: {content}\n"
         
         # Add prev_state summary if exists
         prev_state_summary = ""
-        if prev_state:
+        if prev_state and incremental:
+            known = {
+                "intent": prev_state.intent, "degree": prev_state.degree_level, "major": prev_state.major_query,
+                "university": prev_state.university_query, "intake": prev_state.intake_term,
+                "intake_year": prev_state.intake_year, "teaching_language": prev_state.teaching_language,
+                "city": prev_state.city, "province": prev_state.province,
+                "duration_years": prev_state.duration_years_target, "wants_fees": prev_state.wants_fees,
+                "wants_scholarship": prev_state.wants_scholarship, "wants_requirements": prev_state.wants_requirements,
+            }
+            prev_state_summary = "\nPrevious context (keep unless the newest user message changes it): " + ", ".join(
+                f"{name}={value}" for name, value in known.items() if value
+            )
+        elif prev_state and not settings.INCREMENTAL_PROFILE_STATE:
             prev_state_summary = f"\nPrevious context: intent={prev_state.intent}, degree={prev_state.degree_level}, major={prev_state.major_query}, intake={prev_state.intake_term}"
         
-        # Small LLM prompt for JSON extraction
-        extraction_prompt = f"""Extract information from this conversation. Today's date: {today_date.strftime('%Y-%m-%d')}.
-
-Output ONLY valid JSON with these exact fields:
-{{
-  "intent": "SCHOLARSHIP" | "FEES" | "REQUIREMENTS" | "LIST_PROGRAMS" | "LIST_UNIVERSITIES" | "GENERAL" | "PAGINATION",
-  "degree_level": "Language" | "Bachelor" | "Master" | "PhD" | null,
-  "major_raw": string or null,
-  "university_raw": string or null,  # Can be full name, alias (e.g., "HIT" for "Harbin Institute of Technology"), or abbreviation
-  "intake_term": "March" | "September" | null,
-  "intake_year": number or null,
-  "teaching_language": "English" | "Chinese" | null,
-  "city": string or null,  # City name (e.g., "Guangzhou", "Beijing", "Shanghai", "Shenzhen", "Hangzhou", "Nanjing", "Chengdu", "Xian", "Wuhan", "Tianjin", "Dalian", "Qingdao")
-  "province": string or null,  # Province name (e.g., "Guangdong", "Jiangsu", "Zhejiang", "Sichuan", "Shaanxi", "Hubei", "Shandong", "Hunan", "Beijing", "Shanghai", "Tianjin")
-  "duration_years": number or null,
-  "wants_earliest": boolean,
-  "wants_scholarship": boolean,
-  "wants_requirements": boolean,
-  "wants_fees": boolean,
-  "page_action": "next" | "prev" | "none",
-  "confidence": number
-}}
-
-RULES:
-- Use today's date ({today_date.strftime('%Y-%m-%d')}) to interpret "next intake", "earliest intake", "asap".
-- Do NOT output major_raw = "scholarship info" / "fees" / "information". If unsure, null.
-- Do NOT output university_raw = "list" / "all" / "database". If unsure, null.
-- For university_raw: Extract university names, abbreviations, or aliases (e.g., "HIT" for "Harbin Institute of Technology", "BUAA" for "Beihang University"). Include common abbreviations and aliases.
-- For degree_level: "Chinese Language", "English Language", "Mandarin Language", "Language Program", "Language Course", "Foundation Program","Chinese Language Program", "English Language Program", "Mandarin Language Program", "Non-degree Program" should all be set to degree_level="Language". If user says "Chinese Language" or "English Language", it means they want a Language program (degree_level="Language"), NOT a Bachelor/Master/PhD program taught in Chinese/English.
-- For teaching_language: Extract "English" from phrases like "English", "English taught", "English-taught", "taught in English", "English program". Extract "Chinese" from  "Chinese taught", "Mandarin", "中文". CRITICAL: If user says "Chinese Language" or "English Language" as a degree level (major name), set degree_level="Language" but DO NOT set teaching_language. "Chinese Language" is a major/program name, NOT a teaching language requirement. Only set teaching_language if user explicitly mentions teaching language (e.g., "taught in Chinese", "English-taught program").
-- For deadline questions (e.g., "application deadline", "when is the deadline"), set wants_deadline=true and intent can be GENERAL if no other intent is clear.
-- CRITICAL: If user asks "which universities" or "list universities" or "how many universities" or "any university" (even with fee comparison like "lowest fees"), set intent="LIST_UNIVERSITIES" (NOT FEES). Set wants_fees=true if fees are mentioned.
-- For fee-related questions (e.g., "tuition fee", "tuition", "fee", "cost", "price", "bank statement amount"), set wants_fees=true and intent=FEES (unless it's a "which universities" query).
-- For scholarship questions (e.g., "scholarship", "scholarship info", "scholarship opportunity", "requiring CSC/CSCA", "requiring CSC", "requiring CSCA"), set wants_scholarship=true and intent=SCHOLARSHIP. Do NOT set wants_requirements=true for CSC/CSCA scholarship queries - "requiring CSC/CSCA" means scholarship requirement, not document requirements.
-- For accommodation questions (e.g., "accommodation", "accommodation facility", "housing", "dormitory"), set wants_fees=true and intent=FEES (accommodation info is part of fees).
-- For "offered majors", "offered subjects", "available majors", "list of majors", set intent=LIST_PROGRAMS.
-- For city/province: Extract city names (e.g., "Guangzhou", "Beijing", "Shanghai", "Shenzhen", "Hangzhou", "Nanjing", "Chengdu", "Xian", "Wuhan", "Tianjin", "Dalian", "Qingdao") and province names (e.g., "Guangdong", "Jiangsu", "Zhejiang", "Sichuan", "Shaanxi", "Hubei", "Shandong", "Hunan", "Beijing", "Shanghai", "Tianjin"). Handle common typos (e.g., "guangzou" -> "Guangzhou", "guangjou" -> "Guangzhou"). City/province is NOT a university or major - it's a location filter.
-- Output confidence in [0,1] based on how clear the user's intent is.
-- For "next March intake", set intake_term="March" and wants_earliest=true, NOT page_action="next".
+        # Static schema and rules first (PARTNER_EXTRACTION_PROMPT, cacheable prefix); date and conversation last
+        extraction_prompt = f"""Today's date: {today_date.strftime('%Y-%m-%d')}
 
 Conversation:
 {conversation_text}{prev_state_summary}
 
 Output ONLY valid JSON, no other text:"""
+        profile_state_stats.record_prompt('partner', 'incremental' if incremental else 'full', len(extraction_prompt))
         
         try:
             response = self.openai_service.chat_completion(
-                messages=[
-                    {"role": "system", "content": "You are a JSON extractor. Output only valid JSON matching the exact schema."},
-                    {"role": "user", "content": extraction_prompt}
-                ],
-                temperature=0.0
+                messages=cacheable_messages(self.PARTNER_EXTRACTION_PROMPT, user=extraction_prompt),
+                temperature=0.0,
+                prompt_name="partner_extraction"
             )
             
             # Parse JSON response - OpenAI response is an object, not a dict
@@ -550,10 +594,136 @@ Output ONLY valid JSON, no other text:"""
                 "confidence": 0.0
             }
     
+    def rules_extract_state(self, conversation_history: List[Dict[str, str]]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Deterministic counterpart of llm_extract_state() for the latest user message.
+        Returns (extracted, None) when route_stage1_rules and parse_query_rules agree and together explain the
+        whole message, otherwise (None, reason) with the reason the LLM call is still needed.
+        """
+        latest_user_message = ""
+        user_turns = 0
+        for msg in conversation_history:
+            if msg.get('role') == 'user':
+                latest_user_message = msg.get('content', '')
+                user_turns += 1
+        if not latest_user_message.strip():
+            return None, "empty_message"
+        
+        try:
+            stage1 = self.router.route_stage1_rules(latest_user_message)
+            rules = self.parse_query_rules(latest_user_message)
+        except Exception as e:
+            print(f"DEBUG: Rules-first extraction failed: {e}")
+            return None, "rules_error"
+        
+        normalized = self.router.normalize_query(latest_user_message)
+        if stage1.intent == self.router.INTENT_PAGINATION:
+            return None, "pagination"
+        if _CONTEXT_REFERENCE.search(normalized):
+            return None, "context_reference"
+        
+        # Intent: apply the deterministic rules of the extraction prompt, otherwise both parsers must agree
+        stage1_intent = {
+            self.router.INTENT_ADMISSION_REQUIREMENTS: "REQUIREMENTS",
+            self.router.INTENT_COMPARISON: "FEES",
+        }.get(stage1.intent, stage1.intent.upper())
+        rules_intent = _RULES_INTENT_MAP.get(rules.get("intent"), "GENERAL")
+        if rules_intent == "LIST_UNIVERSITIES":
+            intent = rules_intent
+        elif stage1_intent == "LIST_UNIVERSITIES" and rules_intent == "LIST_PROGRAMS" and \
+                not any(rules.get(flag) for flag in ("wants_scholarship", "wants_fees", "wants_documents")) and \
+                not re.search(r'\b(programs?|majors?|courses?|subjects?)\b',
+                              re.sub(r'\b(language|foundation)\s+(programs?|courses?)\b', '', normalized)):
+            intent = stage1_intent  # "university list"
+        elif rules.get("wants_csca_scholarship"):
+            intent = "SCHOLARSHIP"
+        elif stage1_intent == "REQUIREMENTS" and re.search(r'\b(accommodation|dorm|dormitory|housing|apartment)\b', normalized):
+            intent = "FEES"  # Accommodation info is part of fees
+        elif rules_intent in (stage1_intent, "GENERAL"):
+            intent = stage1_intent
+        elif stage1_intent == "GENERAL":
+            intent = rules_intent
+        else:
+            return None, "ambiguous_intent"
+        if intent not in ("SCHOLARSHIP", "FEES", "REQUIREMENTS", "LIST_PROGRAMS", "LIST_UNIVERSITIES"):
+            return None, "no_intent"
+        
+        slots = {}
+        for name, first, second in (
+            ("degree_level", rules.get("degree_level"), stage1.degree_level),
+            ("intake_term", stage1.intake_term, rules.get("intake_term")),
+            ("intake_year", rules.get("intake_year"), stage1.intake_year),
+        ):
+            if first and second and first != second:
+                return None, "conflicting_slots"
+            slots[name] = first or second
+        
+        # Every word must be accounted for; anything left is a major/university/place the rules can't resolve
+        tokens = [t for t in re.findall(r"[a-z0-9]+(?:\.[a-z0-9]+)*", normalized)
+                  if t.replace('.', '') not in _RULES_VOCABULARY and not t.replace('.', '').isdigit()]
+        university_raw = rules.get("university_raw")
+        if university_raw:
+            university_words = set(re.findall(r"[a-z0-9]+", university_raw.lower()))
+            if university_words - _RULES_VOCABULARY - {"institute", "medical", "normal"}:
+                tokens = [t for t in tokens if t not in university_words]
+            else:
+                university_raw = None  # Only generic words ("Bachelor University")
+        places = [p.lower() for p in (rules.get("city"), rules.get("province")) if p]
+        tokens = [t for t in tokens if not any(SequenceMatcher(None, t, p).ratio() >= 0.75 for p in places)]
+        
+        major_raw = None
+        unresolved = []
+        for token in tokens:
+            degree = self.router._fuzzy_match_degree_level(token)
+            if degree and slots["degree_level"] in (None, degree):
+                slots["degree_level"] = degree
+            elif self._expand_major_acronym(token) != token and major_raw is None:
+                major_raw = token
+            else:
+                unresolved.append(token)
+        if unresolved:
+            print(f"DEBUG: Rules-first extraction - unresolved words: {unresolved}")
+            return None, "unrecognized_text"
+        
+        extracted = {
+            "intent": intent,
+            "degree_level": slots["degree_level"],
+            "major_raw": major_raw,
+            "university_raw": university_raw,
+            "intake_term": slots["intake_term"],
+            "intake_year": slots["intake_year"],
+            "teaching_language": rules.get("teaching_language"),
+            "city": rules.get("city"),
+            "province": rules.get("province"),
+            "duration_years": stage1.duration_years_target,
+            "wants_earliest": stage1.wants_earliest,
+            "wants_scholarship": bool(rules.get("wants_scholarship") or stage1.wants_scholarship),
+            "wants_requirements": intent == "REQUIREMENTS",
+            "wants_fees": bool(rules.get("wants_fees") or stage1.wants_fees or intent == "FEES"),
+            "wants_deadline": bool(rules.get("wants_deadline")),
+            "page_action": "none",
+            "confidence": stage1.confidence,
+        }
+        
+        # Earlier turns may hold slots this message leaves out - only the LLM reads the conversation
+        if user_turns > 1:
+            candidate = PartnerQueryState(
+                intent=intent, degree_level=extracted["degree_level"], major_query=major_raw,
+                university_query=university_raw, intake_term=extracted["intake_term"],
+                teaching_language=extracted["teaching_language"], city=extracted["city"],
+                province=extracted["province"], wants_earliest=extracted["wants_earliest"],
+                wants_fees=extracted["wants_fees"], wants_scholarship=extracted["wants_scholarship"],
+                wants_list=intent in ("LIST_PROGRAMS", "LIST_UNIVERSITIES")
+            )
+            missing_slots, _ = self.determine_missing_fields(intent, candidate, date.today())
+            if missing_slots:
+                return None, "missing_slots"
+        
+        return extracted, None
+    
     def _clear_pending_state(self, conv_key: str):
         """Clear pending state for conversation"""
-        if conv_key in self._pending:
-            del self._pending[conv_key]
+        session_store.delete(self.PENDING_NAMESPACE, conv_key)
     
     def _get_university_name_by_id(self, university_id: int) -> str:
         """Get university name by ID using DBQueryService (lazy, no eager load)"""
@@ -566,111 +736,8 @@ Output ONLY valid JSON, no other text:"""
         return major.name if major else "Unknown Major"
     
     def _expand_major_acronym(self, text: str) -> str:
-        """
-        Expand common major acronyms before fuzzy matching.
-        Also strips trailing stopwords like "and", "&", ",".
-        Handles dots in acronyms (e.g., "B.B.A." -> "BBA" -> "bachelor of business administration").
-        """
-        if not text:
-            return text
-        
-        # Normalize dots in acronyms first (e.g., "B.B.A." -> "BBA")
-        text = text.replace('.', '').strip()
-        
-        # Strip trailing stopwords
-        text = re.sub(r'\s+(and|&|,)\s*$', '', text, flags=re.IGNORECASE).strip()
-        
-        text_lower = text.lower()
-        
-        # Acronym expansion map (includes ECE, BBA, LLB, MBBS, MD, MPhil, etc.)
-        acronym_map = {
-            # Computer Science & Engineering
-            "cse": "computer science",
-            "cs": "computer science",
-            "ce": "computer engineering",
-            "se": "software engineering",
-            "ece": "electronics and communication engineering",
-            "eee": "electrical engineering",
-            "it": "information technology",
-            "ai": "artificial intelligence",
-            "ds": "data science",
-            "ml": "machine learning",
-            "cv": "computer vision",
-            "nlp": "natural language processing",
-            "bme": "biomedical engineering",
-            "mse": "materials science engineering",
-            # Sciences
-            "chem": "chemistry",
-            "bio": "biology",
-            "phy": "physics",
-            "math": "mathematics",
-            "econ": "economics",
-            "fin": "finance",
-            # Business & Management
-            "bba": "bachelor of business administration",
-            "mba": "master of business administration",
-            "bcom": "bachelor of commerce",
-            "mcom": "master of commerce",
-            # Law
-            "llb": "bachelor of laws",
-            "llm": "master of laws",
-            "jd": "juris doctor",
-            # Medicine & Health Sciences
-            "mbbs": "bachelor of medicine and bachelor of surgery",
-            "md": "doctor of medicine",
-            "ms": "master of surgery",
-            "dm": "doctor of medicine",
-            "mch": "master of surgery",
-            "bds": "bachelor of dental surgery",
-            "mds": "master of dental surgery",
-            "bpharm": "bachelor of pharmacy",
-            "mpharm": "master of pharmacy",
-            "bpt": "bachelor of physiotherapy",
-            "mpt": "master of physiotherapy",
-            "bsc nursing": "bachelor of science in nursing",
-            "msc nursing": "master of science in nursing",
-            "bvsc": "bachelor of veterinary science",
-            "mvsc": "master of veterinary science",
-            # Arts & Humanities
-            "ba": "bachelor of arts",
-            "ma": "master of arts",
-            "bsc": "bachelor of science",
-            "msc": "master of science",
-            "btech": "bachelor of technology",
-            "mtech": "master of technology",
-            "bed": "bachelor of education",
-            "med": "master of education",
-            # Research Degrees
-            "mphil": "master of philosophy",
-            "phd": "doctor of philosophy",
-            "dphil": "doctor of philosophy",
-            "dsc": "doctor of science",
-            "dlitt": "doctor of letters",
-            # Architecture & Design
-            "barch": "bachelor of architecture",
-            "march": "master of architecture",
-            # Other Professional Degrees
-            "ca": "chartered accountant",
-            "cpa": "certified public accountant",
-            "cfa": "chartered financial analyst",
-        }
-        
-        # Check if text is short (<=6 chars) or all-caps-like (mostly uppercase)
-        # Also check for longer medical/law acronyms (MBBS, MPhil, etc.)
-        is_short = len(text.replace(' ', '')) <= 6
-        is_caps_like = len([c for c in text if c.isupper()]) > len([c for c in text if c.islower()]) if text else False
-        is_long_acronym = len(text.replace(' ', '')) <= 8 and text.replace(' ', '').isupper()  # For MBBS, MPhil, etc.
-        
-        if is_short or is_caps_like or is_long_acronym:
-            for abbrev, expansion in acronym_map.items():
-                # Match whole word only (case-insensitive)
-                pattern = r'\b' + re.escape(abbrev) + r'\b'
-                if re.search(pattern, text_lower):
-                    # Replace acronym with expansion
-                    text = re.sub(pattern, expansion, text, flags=re.IGNORECASE)
-                    break  # Only expand first match
-        
-        return text
+        """Expand common major acronyms before fuzzy matching (see match_index.MAJOR_ACRONYMS)"""
+        return expand_major_acronym(text)
     
     # ========== DETERMINISTIC PARSING HELPERS ==========
     
@@ -851,8 +918,8 @@ Output ONLY valid JSON, no other text:"""
         
         text_norm = self.normalize_text(text)
         
-        # Load universities cache for matching (lazy - only when needed)
-        uni_cache = self._get_universities_cached()
+        # Score only the top candidates from the catalog match index (exact hits rank first)
+        uni_cache = self._get_match_index().university_candidates(text, partner_only=True)
         
         for uni in uni_cache:
             # Exact name match
@@ -2185,6 +2252,7 @@ Output ONLY valid JSON, no other text:"""
             prev_wants_fees = False
             prev_wants_free_tuition = False
             prev_scholarship_focus = None
+            prev_cached_state = None
             if partner_id and conversation_id:
                 cached = self._get_cached_state(partner_id, conversation_id)
                 if cached and cached.get("state"):
@@ -2234,12 +2302,23 @@ Output ONLY valid JSON, no other text:"""
                 if is_list_query_from_history:
                                 break
             
-            print(f"DEBUG: Calling llm_extract_state() for fresh query...")
-            extracted = self.llm_extract_state(conversation_history, date.today(), prev_state)
-            print(f"DEBUG: LLM extracted: intent={extracted.get('intent')}, confidence={extracted.get('confidence')}")
+            # Rules first: the LLM extraction call is only made when the rule parsers are not confident
+            extracted, llm_reason = self.rules_extract_state(conversation_history) if settings.PARTNER_RULES_FIRST else (None, "disabled")
+            if extracted is not None:
+                extraction_path = "rules"
+                print(f"DEBUG: Rules-first extraction is confident - skipping llm_extract_state()")
+            else:
+                extraction_path = "llm"
+                print(f"DEBUG: Calling llm_extract_state() for fresh query (rules not confident: {llm_reason})...")
+                # The conversation's cached state lets llm_extract_state send only the newest exchange
+                extracted = self.llm_extract_state(conversation_history, date.today(),
+                                                  prev_state or (prev_cached_state if isinstance(prev_cached_state, PartnerQueryState) else None))
+            routing_stats.record(extraction_path, llm_reason)
+            print(f"DEBUG: {extraction_path.upper()} extracted: intent={extracted.get('intent')}, confidence={extracted.get('confidence')}")
             
             # Convert extracted dict to PartnerQueryState
             state = PartnerQueryState()
+            state.extraction_path = extraction_path
             # CRITICAL: If we have a previous list intent OR detected from history, preserve it
             # This ensures list queries don't change to FEES when user provides additional info
             if prev_list_intent:
@@ -3000,6 +3079,9 @@ Output ONLY valid JSON, no other text:"""
                     match = re.search(pattern, latest_user_message, re.IGNORECASE)
                     if match:
                         potential_uni = match.group(2) if match.lastindex >= 2 else match.group(1)
+                        # Routing words only ("SCHOLARSHIP INFORMATION") - not a university name
+                        if set(potential_uni.lower().split()) <= _RULES_VOCABULARY:
+                            continue
                         # Try to resolve it
                         matched, uni_dict, _ = self._fuzzy_match_university(potential_uni)
                         if matched and uni_dict:
@@ -3079,6 +3161,7 @@ Output ONLY valid JSON, no other text:"""
             traceback.print_exc()
             # Return default state on error, but preserve extracted fields if available
             state = PartnerQueryState()
+            state.extraction_path = locals().get('extraction_path')
             # Try to preserve what was extracted before the error
             if 'extracted' in locals() and extracted:
                 state.intent = extracted.get("intent", "GENERAL")
@@ -5006,15 +5089,46 @@ Output ONLY valid JSON, no other text:"""
         
         return "\n".join(context_parts)
     
+    def render_template_answer(self, db_results: List[Any], intent: str, req_focus: Dict[str, bool]) -> Optional[str]:
+        """
+        Stage B without the LLM: render FEES / requirements / SCHOLARSHIP / PROGRAM_DETAILS / COMPARISON
+        answers from the intakes (app/services/answer_templates.py). Documents, scholarships and exams
+        are batch-loaded only when the template shows them.
+        Returns None when the intent or the results need format_answer_with_llm (also when rendering fails).
+        """
+        kind = template_kind(intent)
+        if not settings.PARTNER_TEMPLATE_ANSWERS or kind is None:
+            return None
+        if not db_results or not all(isinstance(result, ProgramIntake) for result in db_results):
+            return None
+        
+        try:
+            intakes = [intake_to_dict(result) for result in db_results]
+            intake_ids = [intake["id"] for intake in intakes[:MAX_DETAILED_PROGRAMS]]
+            docs_map = self._get_program_documents_batch(intake_ids) if kind in ("requirements", "details") else {}
+            exams_map = self._get_program_exam_requirements_batch(intake_ids) if kind in ("requirements", "details") else {}
+            scholarships_map = self._get_program_scholarships_batch(intake_ids) if kind in ("scholarship", "details", "comparison") else {}
+            
+            answer = render_answer(intent, intakes, docs_map, scholarships_map, exams_map, req_focus)
+        except Exception as e:
+            import traceback
+            print(f"ERROR: render_template_answer() failed for {intent}, falling back to LLM formatting: {e}")
+            traceback.print_exc()
+            return None
+        if answer is not None:
+            template_stats.record(intent, "template")
+            print(f"DEBUG: Rendered {kind} template answer for {len(intakes)} intake(s) (no LLM formatting)")
+        return answer
+    
     def format_answer_with_llm(self, db_context: str, user_question: str, intent: str, req_focus: Dict[str, bool], wants_fees: bool = False) -> str:
         """
         Stage B: Format final answer using LLM with small DB_CONTEXT.
         Temperature=0 for deterministic output.
         FORMATTER SAFETY: Enforces that LLM only uses provided db_results.
         """
-        system_prompt = self.PARTNER_SYSTEM_PROMPT
+        system_prompt = self.PARTNER_SYSTEM_PROMPT + self.PARTNER_FORMATTER_RULES
         
-        # Intent-specific instructions
+        # Intent-specific instructions (one of four fixed variants, sent after the static rules)
         intent_instructions = ""
         if intent in ["SCHOLARSHIP", "scholarship_only"]:
             intent_instructions = """
@@ -5074,67 +5188,18 @@ User question: {user_question}
 
 Intent: {intent}
 Focus areas: {', '.join([k for k, v in req_focus.items() if v])}
-{intent_instructions}
-
-CRITICAL RULES:
-- Use ONLY the information provided in DATABASE CONTEXT above.
-- Never mention a major/university that is NOT in the DATABASE CONTEXT.
-- POSITIVE LANGUAGE: Always present information in a positive way. NEVER say "Not provided" unless the DATABASE CONTEXT explicitly says "not provided", "Not specified", or "N/A".
-- NULL fields in database mean "not required" or "not specified" - do NOT mention them in your response.
-- If a field is present in DATABASE CONTEXT, show it. Only omit if it literally says "not provided" or "Not specified" in the context.
-- Do NOT use negative language like "No specific details on..." or "Not provided in our partner database" unless the context explicitly states that.
-- Do NOT invent or hallucinate any information.
-
-FORMATTING REQUIREMENTS:
-- Use markdown formatting for better readability
-- Use **bold** for university names, major names, and important labels (e.g., **Bank statement required:**, **Scholarship Available:**)
-- Use bullet points (- or •) for lists of items (documents, fees, requirements, scholarships)
-- Use numbered lists (1., 2., 3.) for sequential steps or ordered information
-- Use line breaks between different universities/programs for clarity
-- Group related information together (e.g., all fees together, all documents together)
-- Use clear section headers with **bold** text (e.g., **Fees:**, **Required Documents:**, **Exams:**)
-
-Example format:
-**University Name:**
-
-**Major Name:**
-
-**Bank statement required:** Yes, amount 5000 USD.
-
-**Other fees:**
-- Medical checkup fee: 800 CNY (first year only)
-- Accommodation fees: Triple room 3000 or 5000 CNY/year
-
-**Required documents:**
-- Passport
-- Photo
-- High school certificate & transcript
-- Medical report
-
-CONTENT REQUIREMENTS:
-- For REQUIREMENTS/ADMISSION intents: Only show detailed document lists and admission process if there are LESS than 3 universities in the results
-- For REQUIREMENTS/ADMISSION intents: If there are 3 or more universities, ask the user to choose a specific university first
-- For LIST_UNIVERSITIES with fee comparison (wants_fees=True): DO NOT ask user to choose. Instead, COMPARE all universities and show which has the LOWEST fees. Show fee breakdown for all universities sorted by lowest fees first.
-- For LIST_UNIVERSITIES: If there are MORE than 6 universities, show ONLY university names with teaching language and major/degree_level, then ask user to choose one for specific details
-- For LIST_UNIVERSITIES: If there are 6 or LESS universities, show ALL universities with their actual names, teaching languages, major/degree_level, and scholarship information (if available). DO NOT use placeholders like "University A", "University B", "University C". Use the actual university names from the DATABASE CONTEXT.
-- For LIST_UNIVERSITIES with scholarship requirement (including Type A, Type B, Type C, CSC): Show which universities offer scholarships and provide FULL scholarship details from the Scholarship Information field. Focus on scholarship information, NOT document requirements. Only show documents if specifically asked. Show ALL universities found in the DATABASE CONTEXT, do not limit to 2. CRITICAL: If Scholarship Information field contains Type A, Type B, or Type C, explicitly mention these scholarship types in your response.
-- For LIST_PROGRAMS: Show ALL majors (even if 30-40), grouped by teaching language if multiple languages exist (don't ask user to choose language)
-- For GENERAL queries: If multiple teaching languages exist and list < 4, show both Chinese and English taught programs separately (don't ask user to choose)
-- Focus on the most relevant information based on the user's question (e.g., if they ask about fees, prioritize fee information)
-- CRITICAL: ALWAYS use actual university names from the DATABASE CONTEXT. NEVER use placeholders like "University A", "University B", "University C", etc.
 
 Provide a comprehensive, positive answer using ALL relevant information from the DATABASE CONTEXT above, focusing on the intent-specific fields. Format it clearly with markdown for easy reading.
 """
         
         try:
-            response = self.openai_service.chat_completion(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.0
+            answer = self.openai_service.chat_completion_text(
+                messages=cacheable_messages(system_prompt, intent_instructions.strip(), user=user_prompt),
+                temperature=0.0,
+                on_delta=self.stream_handler,
+                prompt_name="partner_format"
             )
-            return response.choices[0].message.content.strip()
+            return answer.strip()
         except Exception as e:
             return f"Error generating response: {str(e)}"
     
@@ -5186,8 +5251,8 @@ Provide a comprehensive, positive answer using ALL relevant information from the
                 else:
                     return False, None, matches[:3] if matches else []
         
-        # Fallback to lightweight cache for fuzzy matching
-        uni_cache = self._get_uni_name_cache()
+        # Fallback to the catalog match index: score only the top candidates
+        uni_cache = self._get_match_index().university_candidates(user_input, partner_only=True)
         matches = []
         for uni in uni_cache:
             uni_name_lower = uni["name"].lower()
@@ -5327,9 +5392,14 @@ Provide a comprehensive, positive answer using ALL relevant information from the
         
         # Step 3: Prepare candidates list (from DB results or cache)
         if not majors:
-            # If DB returns no results, try cache-based fuzzy matching (lazy loaded)
-            major_cache = self._get_majors_cached()  # Use cached loaders
-            candidates = major_cache
+            # If DB returns no results, fuzzy match against the top candidates from the catalog match index
+            def in_scope(m: Dict[str, Any]) -> bool:
+                if university_id and m.get("university_id") != university_id:
+                    return False
+                return not degree_level or str(m.get("degree_level", "")).lower() == str(degree_level).lower()
+            candidates = self._get_match_index().major_candidates(
+                user_input, expanded_input, limit=max(top_k * 2, 20), predicate=in_scope
+            )
         else:
             # Convert DB objects to dict format for compatibility
             candidates = [
@@ -7311,17 +7381,18 @@ Provide a comprehensive, positive answer using ALL relevant information from the
             return cache_key
         
         # Stable fallback: use session fallback ID (does NOT depend on last messages)
-        if partner_id not in self._session_fallback_id_by_partner:
+        fallback_id = session_store.get(self.SESSION_FALLBACK_NAMESPACE, str(partner_id))
+        if not fallback_id:
             import uuid
-            self._session_fallback_id_by_partner[partner_id] = str(uuid.uuid4())[:8]
-            print(f"DEBUG: Generated stable session fallback ID for partner_id={partner_id}: {self._session_fallback_id_by_partner[partner_id]}")
+            fallback_id = str(uuid.uuid4())[:8]
+            print(f"DEBUG: Generated stable session fallback ID for partner_id={partner_id}: {fallback_id}")
+        session_store.set(self.SESSION_FALLBACK_NAMESPACE, str(partner_id), fallback_id, ttl_seconds=self._pagination_ttl)
         
-        fallback_id = self._session_fallback_id_by_partner[partner_id]
         cache_key = (partner_id, fallback_id)
         print(f"DEBUG: Pagination cache key (stable fallback): {cache_key}")
         
         # Store this key as last pagination key for this partner (for stable fallback)
-        self._last_pagination_key_by_partner[partner_id] = cache_key
+        session_store.set(self.PAGINATION_KEY_NAMESPACE, str(partner_id), cache_key, ttl_seconds=self._pagination_ttl)
         
         return cache_key
     
@@ -7329,24 +7400,18 @@ Provide a comprehensive, positive answer using ALL relevant information from the
                              conversation_id: Optional[str] = None) -> Optional[PaginationState]:
         """Get pagination state from cache"""
         cache_key = self._get_pagination_cache_key(partner_id, conversation_history, conversation_id)
-        state = self._pagination_cache.get(cache_key)
+        state = session_store.get(self.PAGINATION_NAMESPACE, self._session_key(*cache_key))
         if state:
             print(f"DEBUG: Pagination cache HIT for key: {cache_key}")
         else:
             print(f"DEBUG: Pagination cache MISS for key: {cache_key}")
             # Try partner_id fallback key if available
-            if partner_id in self._last_pagination_key_by_partner:
-                fallback_key = self._last_pagination_key_by_partner[partner_id]
-                state = self._pagination_cache.get(fallback_key)
+            fallback_key = session_store.get(self.PAGINATION_KEY_NAMESPACE, str(partner_id))
+            if fallback_key:
+                state = session_store.get(self.PAGINATION_NAMESPACE, self._session_key(*fallback_key))
                 if state:
                     print(f"DEBUG: Pagination cache HIT for fallback key: {fallback_key}")
-                    # Update cache key mapping
-                    cache_key = fallback_key
-        # Check if state is expired (older than 1 hour)
-        if state and time.time() - state.timestamp > 3600:
-            del self._pagination_cache[cache_key]
-            print(f"DEBUG: Pagination state expired, removed from cache")
-            return None
+        # Expiry (1 hour) is enforced by the session store TTL
         return state
     
     def _set_pagination_state(self, partner_id: Optional[int], conversation_history: List[Dict[str, str]], 
@@ -7371,7 +7436,7 @@ Provide a comprehensive, positive answer using ALL relevant information from the
                 result_ids = [item.get('major_id') for item in results if item.get('major_id')]
                 result_type = "major_ids"
         
-        self._pagination_cache[cache_key] = PaginationState(
+        session_store.set(self.PAGINATION_NAMESPACE, self._session_key(*cache_key), PaginationState(
             results=result_ids,
             result_type=result_type,
             offset=offset,
@@ -7380,12 +7445,28 @@ Provide a comprehensive, positive answer using ALL relevant information from the
             intent=intent,
             timestamp=time.time(),
             last_displayed=last_displayed  # Keep full objects for duration questions
-        )
+        ), ttl_seconds=self._pagination_ttl)
         # Store this key as last pagination key for this partner (for stable fallback)
         if partner_id:
-            self._last_pagination_key_by_partner[partner_id] = cache_key
+            session_store.set(self.PAGINATION_KEY_NAMESPACE, str(partner_id), cache_key, ttl_seconds=self._pagination_ttl)
         print(f"DEBUG: Stored pagination state for key: {cache_key}, offset={offset}, total={total}, page_size={page_size}, result_type={result_type}, ids_count={len(result_ids)}, last_displayed_count={len(last_displayed) if last_displayed else 0}")
     
+    def generate_response_stream(self, user_message: str, conversation_history: List[Dict[str, str]],
+                                 partner_id: Optional[int] = None, conversation_id: Optional[str] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Streaming variant of generate_response.
+        Yields ("delta", text) while format_answer_with_llm is generating, then ("result", dict).
+        Deterministic answers (lists, clarifications) arrive as a single delta.
+        """
+        return stream_agent_turn(
+            self,
+            self.generate_response,
+            user_message=user_message,
+            conversation_history=conversation_history,
+            partner_id=partner_id,
+            conversation_id=conversation_id
+        )
+    
     def generate_response(self, user_message: str, conversation_history: List[Dict[str, str]], 
                          partner_id: Optional[int] = None, conversation_id: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -8091,14 +8172,17 @@ Provide a comprehensive, positive answer using ALL relevant information from the
                         intakes = self.run_db(route_plan, latest_user_message=None, conversation_history=None)
                         if intakes and len(intakes) > 0:
                             # Format and return results using the same method as normal flow
-                            db_context = self.build_db_context(intakes, state.req_focus if hasattr(state, 'req_focus') else {}, list_mode=False, intent=state.intent)
-                            response_text = self.format_answer_with_llm(
-                                db_context=db_context,
-                                user_question=conversation_history[-1].get("content", "") if conversation_history else "",
-                                intent=state.intent,
-                                req_focus=state.req_focus if hasattr(state, 'req_focus') else {},
-                                wants_fees=state.wants_fees if hasattr(state, 'wants_fees') else False
-                            )
+                            response_text = self.render_template_answer(intakes, state.intent, state.req_focus if hasattr(state, 'req_focus') else {})
+                            if response_text is None:
+                                template_stats.record(state.intent, "llm")
+                                db_context = self.build_db_context(intakes, state.req_focus if hasattr(state, 'req_focus') else {}, list_mode=False, intent=state.intent)
+                                response_text = self.format_answer_with_llm(
+                                    db_context=db_context,
+                                    user_question=conversation_history[-1].get("content", "") if conversation_history else "",
+                                    intent=state.intent,
+                                    req_focus=state.req_focus if hasattr(state, 'req_focus') else {},
+                                    wants_fees=state.wants_fees if hasattr(state, 'wants_fees') else False
+                                )
                             return {
                                 "response": response_text,
                                 "used_db": True,
@@ -8417,11 +8501,9 @@ Provide a comprehensive, positive answer using ALL relevant information from the
             # Cache the state with previous IDs
             self._set_cached_state(partner_id, conversation_id, state, None)
         
-        # Build DB context (small, field-aware)
         req_focus = route_plan.get("req_focus", {})
         list_mode = state.wants_list if state else False
         intent = state.intent if state else "general"
-        db_context = self.build_db_context(db_results, req_focus, list_mode, intent=intent)
         
         # For list queries with many results, use deterministic formatting
         if list_mode and len(db_results) > 5:
@@ -8595,25 +8677,31 @@ Provide a comprehensive, positive answer using ALL relevant information from the
                     "sources": []
                 }
         
-        # For single result or small results, use LLM formatting
-        try:
-            print(f"DEBUG: Formatting answer with LLM...")
-            intent = state.intent if state else "general"
-            wants_fees = state.wants_fees if state else False
-            formatted_response = self.format_answer_with_llm(
-                db_context=db_context,
-                user_question=user_message,
-                intent=intent,
-                req_focus=req_focus,
-                wants_fees=wants_fees  # Pass wants_fees for fee comparison queries
-            )
-            print(f"DEBUG: LLM formatting completed, response length={len(formatted_response)} chars")
-        except Exception as e:
-            import traceback
-            print(f"ERROR: format_answer_with_llm() failed: {e}")
-            traceback.print_exc()
-            # Fallback response
-            formatted_response = "I found information in the database, but encountered an error formatting the response. Please try rephrasing your question."
+        # Structured intents: render the rows directly (no DB context, no LLM call)
+        formatted_response = self.render_template_answer(db_results, intent, req_focus)
+        
+        # Free-form questions (and non-intake results): build the DB context and format with the LLM
+        if formatted_response is None:
+            try:
+                print(f"DEBUG: Formatting answer with LLM...")
+                template_stats.record(intent, "llm")
+                # Build DB context (small, field-aware)
+                db_context = self.build_db_context(db_results, req_focus, list_mode, intent=intent)
+                wants_fees = state.wants_fees if state else False
+                formatted_response = self.format_answer_with_llm(
+                    db_context=db_context,
+                    user_question=user_message,
+                    intent=intent,
+                    req_focus=req_focus,
+                    wants_fees=wants_fees  # Pass wants_fees for fee comparison queries
+                )
+                print(f"DEBUG: LLM formatting completed, response length={len(formatted_response)} chars")
+            except Exception as e:
+                import traceback
+                print(f"ERROR: format_answer_with_llm() failed: {e}")
+                traceback.print_exc()
+                # Fallback response
+                formatted_response = "I found information in the database, but encountered an error formatting the response. Please try rephrasing your question."
         
         # CRITICAL: Cache the state after generating response to preserve context for follow-up questions
         if state and partner_id and conversation_id:
@@ -8946,7 +9034,7 @@ if __name__ == "__main__":
     # Create minimal agent instance
     agent = PartnerAgent.__new__(PartnerAgent)
     # Removed: agent.all_universities and agent.all_majors - now using lazy cached loaders
-    # agent._universities_cache and agent._majors_cache are loaded only when needed
+    # University/major lists come from the shared catalog snapshot, loaded only when needed
     
     # Test queries
     test_queries = [
@@ -0,0 +1,190 @@
+"""
+PdfTextExtractor - page-level PDF text extraction with OCR fallback
+
+Used by DocumentParser (admin document import, RAG uploads, passports):
+- Pages are read from the PDF's text layer; only pages with (almost) no text are OCR'd
+  (pdf2image + pytesseract), one page image at a time
+- OCR resolution is PDF_OCR_DPI, lowered per page so the rendered image stays under
+  PDF_OCR_MAX_PIXELS (large-format brochure pages would otherwise use hundreds of MB)
+- PDFs with more than PDF_PARALLEL_MIN_PAGES pages are split into page ranges and processed by
+  a process pool of PDF_EXTRACTION_WORKERS (text extraction and OCR are CPU bound)
+- Returns per-page text, method (text/ocr/empty/error) and timings
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import io
+import math
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from app.config import settings
+
+
+@dataclass
+class PageText:
+    page_number: int  # 1-based
+    text: str
+    method: str  # "text", "ocr", "empty" or "error"
+    seconds: float
+    error: Optional[str] = None
+
+
+@dataclass
+class PdfExtractionResult:
+    pages: List[PageText] = field(default_factory=list)
+    seconds: float = 0.0
+    workers: int = 1
+
+    @property
+    def text(self) -> str:
+        return "\n".join(page.text for page in self.pages if page.text)
+
+    def summary(self) -> Dict[str, Any]:
+        methods: Dict[str, int] = {}
+        for page in self.pages:
+            methods[page.method] = methods.get(page.method, 0) + 1
+        return {
+            "pages": len(self.pages),
+            "methods": methods,
+            "seconds": round(self.seconds, 3),
+            "page_seconds": round(sum(page.seconds for page in self.pages), 3),
+            "workers": self.workers,
+        }
+
+
+def _ocr_dpi(page, dpi: int, max_pixels: int) -> int:
+    """Highest DPI <= dpi whose rendered page stays within max_pixels"""
+    try:
+        width_inches = float(page.mediabox.width) / 72
+        height_inches = float(page.mediabox.height) / 72
+    except Exception:
+        return dpi
+    area = width_inches * height_inches
+    if area <= 0:
+        return dpi
+    return max(50, min(dpi, int(math.sqrt(max_pixels / area))))
+
+
+def _ocr_page(path: str, page_number: int, dpi: int, lang: str) -> str:
+    from pdf2image import convert_from_path
+    import pytesseract
+    images = convert_from_path(path, dpi=dpi, first_page=page_number, last_page=page_number, grayscale=True)
+    try:
+        return "".join(pytesseract.image_to_string(image, lang=lang) for image in images)
+    finally:
+        for image in images:
+            image.close()
+
+
+def _extract_page_range(path: str, start: int, end: int, ocr: bool, dpi: int, max_pixels: int,
+                        min_text_chars: int, lang: str) -> List[PageText]:
+    """Extract pages [start, end) (0-based) of the PDF at path; runs inside a pool worker"""
+    from PyPDF2 import PdfReader
+    reader = PdfReader(path)
+    pages = []
+    for index in range(start, min(end, len(reader.pages))):
+        started = time.perf_counter()
+        page = reader.pages[index]
+        try:
+            text = page.extract_text() or ""
+        except Exception as e:
+            text = ""
+            print(f"Error extracting text from PDF page {index + 1}: {e}")
+        method = "text" if len(text.strip()) >= min_text_chars else "empty"
+        error = None
+        if method == "empty" and ocr:
+            try:
+                ocr_text = _ocr_page(path, index + 1, _ocr_dpi(page, dpi, max_pixels), lang)
+                if ocr_text.strip():
+                    text, method = ocr_text, "ocr"
+            except Exception as e:
+                method, error = "error", str(e)
+                print(f"Error running OCR on PDF page {index + 1}: {e}")
+        pages.append(PageText(page_number=index + 1, text=text, method=method,
+                              seconds=time.perf_counter() - started, error=error))
+    return pages
+
+
+class PdfTextExtractor:
+    """Extracts PDF text per page, OCR only where the text layer is missing, in parallel for large PDFs"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        parallel_min_pages: Optional[int] = None,
+        ocr_dpi: Optional[int] = None,
+        ocr_max_pixels: Optional[int] = None,
+        min_text_chars: Optional[int] = None,
+        ocr_lang: str = "eng"
+    ):
+        self.max_workers = max_workers or settings.PDF_EXTRACTION_WORKERS
+        self.parallel_min_pages = parallel_min_pages or settings.PDF_PARALLEL_MIN_PAGES
+        self.ocr_dpi = ocr_dpi or settings.PDF_OCR_DPI
+        self.ocr_max_pixels = ocr_max_pixels or settings.PDF_OCR_MAX_PIXELS
+        self.min_text_chars = settings.PDF_OCR_MIN_TEXT_CHARS if min_text_chars is None else min_text_chars
+        self.ocr_lang = ocr_lang
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Created on first use; "spawn" because forking a threaded server process is unsafe
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def extract(self, file_content: bytes, ocr: Optional[bool] = None) -> PdfExtractionResult:
+        """Extract text from PDF bytes; ocr defaults to PDF_OCR_ENABLED"""
+        from PyPDF2 import PdfReader
+        ocr = settings.PDF_OCR_ENABLED if ocr is None else ocr
+        started = time.perf_counter()
+        page_count = len(PdfReader(io.BytesIO(file_content)).pages)
+
+        # Workers (and pdf2image) read the PDF from disk instead of receiving a copy of the bytes
+        handle, path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(handle, "wb") as f:
+                f.write(file_content)
+            args = (ocr, self.ocr_dpi, self.ocr_max_pixels, self.min_text_chars, self.ocr_lang)
+
+            if page_count <= self.parallel_min_pages or self.max_workers <= 1:
+                pages = _extract_page_range(path, 0, page_count, *args)
+                workers = 1
+            else:
+                # Contiguous ranges, a few per worker so one slow (OCR) range does not dominate
+                batch = max(1, math.ceil(page_count / (self.max_workers * 2)))
+                try:
+                    pool = self._get_pool()
+                    futures = [
+                        pool.submit(_extract_page_range, path, start, start + batch, *args)
+                        for start in range(0, page_count, batch)
+                    ]
+                    pages = [page for future in futures for page in future.result()]
+                    workers = min(self.max_workers, len(futures))
+                except Exception as e:
+                    # e.g. BrokenProcessPool after a worker was killed - start a fresh pool next time
+                    print(f"PDF extraction pool failed, extracting in-process: {e}")
+                    with self._pool_lock:
+                        self._pool = None
+                    pages = _extract_page_range(path, 0, page_count, *args)
+                    workers = 1
+        finally:
+            os.unlink(path)
+
+        return PdfExtractionResult(pages=pages, seconds=time.perf_counter() - started, workers=workers)
+
+
+# Process-wide extractor (one worker pool per server process)
+pdf_text_extractor = PdfTextExtractor()
@@ -0,0 +1,61 @@
+"""
+Incremental profile-state extraction helpers (SalesAgent / PartnerAgent)
+
+Both agents used to rebuild their slot state every turn by sending the recent conversation to the
+LLM, so the extraction prompt grew with the history. With INCREMENTAL_PROFILE_STATE the previous
+state is kept per session and only the newest user message (plus a compact summary of the state
+and the assistant's last question) is sent; the history is re-read only when:
+
+- there is no stored state for the session (first turn, expired, or the previous turn failed)
+- the stored state does not follow on from the previous user message (history edited or lost)
+- the newest message resets the topic ("start over", "for my brother", ...)
+
+profile_state_stats counts the extraction path taken and the prompt size per path.
+"""
+from typing import Any, Dict, Optional
+import re
+
+from app.services.stats import Counters
+
+# "Start over" style messages: earlier slots no longer apply, re-read the conversation
+_TOPIC_RESET_PATTERN = re.compile(
+    r"\b(start(ing)? (over|again|fresh)|new (search|question|topic|student|enquiry|inquiry)|reset|"
+    r"forget (that|it|everything|what i said|the previous)|another student|different student|"
+    r"for (my|a) (friend|brother|sister|son|daughter|cousin|relative|another student))\b",
+    re.IGNORECASE,
+)
+
+
+def is_topic_reset(message: Optional[str]) -> bool:
+    """True if the message abandons the profile built so far"""
+    return bool(message) and _TOPIC_RESET_PATTERN.search(message) is not None
+
+
+class ProfileStateStats(Counters):
+    """Full vs incremental state extractions and their prompt sizes, per agent"""
+
+    def record(self, agent: str, path: str, reason: Optional[str] = None):
+        """Count one extraction; reason explains a full extraction"""
+        self.add(agent, "paths", path)
+        if path == "full" and reason:
+            self.add(agent, "full_reasons", reason)
+
+    def record_prompt(self, agent: str, path: str, chars: int):
+        self.add_many(agent, "prompts", path, count=1, chars=chars)
+
+    def summarize(self, counts: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            agent: {
+                "full": stats.get("paths", {}).get("full", 0),
+                "incremental": stats.get("paths", {}).get("incremental", 0),
+                "full_reasons": stats.get("full_reasons", {}),
+                "avg_prompt_chars": {
+                    path: round(prompt["chars"] / prompt["count"]) for path, prompt in stats.get("prompts", {}).items()
+                },
+            }
+            for agent, stats in counts.items()
+        }
+
+
+# Shared by all agent instances in the process
+profile_state_stats = ProfileStateStats("profile_state")
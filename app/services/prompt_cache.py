@@ -0,0 +1,76 @@
+"""
+Prompt layout for provider-side prompt caching
+
+OpenAI reuses the longest prompt prefix it has seen recently (from 1024 tokens, in 128-token
+steps): cached input tokens are cheaper and the time to first token drops. Only a byte-identical
+prefix hits, so a prompt that starts with "Today's date: ..." or the conversation never does.
+Agent prompts are therefore assembled in this order (cacheable_messages):
+
+1. static instructions: one system message that is a module/class constant (never formatted)
+2. semi-static parts: a few variants each (e.g. per-intent instructions), cached per variant
+3. dynamic parts: today's date, state summaries, conversation, DB/RAG context, the question
+
+Calls name their prompt (chat_completion(..., prompt_name=...)) and prompt_usage_stats collects
+prompt / cached token counts from response.usage and latency with and without a cache hit.
+"""
+from typing import Any, Dict, List, Optional
+import hashlib
+
+from app.services.stats import Counters
+
+_MAX_PREFIX_VARIANTS = 32
+
+
+def cacheable_messages(static_prefix: str, *dynamic_parts: Optional[str], user: Optional[str] = None) -> List[Dict[str, str]]:
+    """[static system message] + one system message per non-empty dynamic part + optional user message"""
+    messages = [{"role": "system", "content": static_prefix}]
+    messages.extend({"role": "system", "content": part} for part in dynamic_parts if part)
+    if user is not None:
+        messages.append({"role": "user", "content": user})
+    return messages
+
+
+def _usage_int(usage: Any, *path: str) -> Optional[int]:
+    value = usage
+    for name in path:
+        value = value.get(name) if isinstance(value, dict) else getattr(value, name, None)
+        if value is None:
+            return None
+    return value if isinstance(value, int) else None
+
+
+class PromptUsageStats(Counters):
+    """Per prompt name: calls, prompt / cached tokens, latency split by cache hit"""
+
+    def record(self, name: str, messages: List[Dict[str, str]], usage: Any, seconds: float):
+        prompt_tokens = _usage_int(usage, "prompt_tokens")
+        cached_tokens = _usage_int(usage, "prompt_tokens_details", "cached_tokens") or 0
+        first_message = messages[0].get("content", "") if messages else ""
+        prefix_hash = hashlib.sha256(str(first_message).encode("utf-8")).hexdigest()[:16]
+
+        hit = bool(cached_tokens)
+        self.add_many(
+            name, calls=1, prompt_tokens=prompt_tokens or 0, cached_tokens=cached_tokens,
+            hit_calls=int(hit), hit_seconds=seconds if hit else 0.0, miss_seconds=0.0 if hit else seconds
+        )
+        self.add(name, "prefixes", prefix_hash, limit=_MAX_PREFIX_VARIANTS)
+
+    def summarize(self, counts: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        result = {}
+        for name, stats in counts.items():
+            misses = stats["calls"] - stats["hit_calls"]
+            result[name] = {
+                "calls": stats["calls"],
+                "prompt_tokens": stats["prompt_tokens"],
+                "cached_tokens": stats["cached_tokens"],
+                "cached_token_rate": round(stats["cached_tokens"] / stats["prompt_tokens"], 3) if stats["prompt_tokens"] else 0.0,
+                "cache_hit_calls": stats["hit_calls"],
+                "avg_seconds_cache_hit": round(stats["hit_seconds"] / stats["hit_calls"], 3) if stats["hit_calls"] else None,
+                "avg_seconds_cache_miss": round(stats["miss_seconds"] / misses, 3) if misses else None,
+                # More than one means the "static" first message varies between calls
+                "static_prefix_variants": len(stats.get("prefixes", {})),
+            }
+        return result
+
+
+prompt_usage_stats = PromptUsageStats("prompt_cache")
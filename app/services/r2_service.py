@@ -1,13 +1,99 @@
+"""
+R2Service - Cloudflare R2 (S3 compatible) object storage
+
+- Uploads stream from file-like objects (e.g. UploadFile.file); files above
+  R2_MULTIPART_THRESHOLD_BYTES are sent as multipart uploads of R2_MULTIPART_CHUNK_BYTES parts,
+  so a large upload never has to be held in memory as one bytes object
+- copy_file()/move_file() use server-side copy: an object already uploaded (e.g. to temp/ for
+  verification) is promoted to its final folder without uploading it again
+- *_async() methods run the boto3 calls on a bounded thread pool (R2_MAX_CONCURRENCY), so async
+  endpoints never block the event loop on storage I/O
+- Any S3-compatible endpoint works (R2_ENDPOINT_URL, e.g. a local MinIO); R2_STUB=true (or
+  R2Service(client=InMemoryObjectStore())) keeps objects in memory - local development/tests
+"""
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from app.config import settings
-from typing import BinaryIO, Union
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+import asyncio
+import functools
+import threading
 import uuid
-from datetime import datetime
 import io
 
-class R2Service:
+
+class InMemoryObjectStore:
+    """Offline stand-in for the boto3 S3 client (the calls R2Service makes), records every call"""
+
     def __init__(self):
+        self.objects: Dict[Tuple[str, str], Dict[str, Any]] = {}  # (bucket, key) -> {"body", "content_type", "parts"}
+        self.calls: List[Tuple[str, str]] = []  # (operation, key)
+        self._lock = threading.Lock()
+
+    def _record(self, operation: str, key: str):
+        with self._lock:
+            self.calls.append((operation, key))
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        # Read in parts like the managed transfer does (multipart above the threshold)
+        threshold = Config.multipart_threshold if Config else 8 * 1024 * 1024
+        chunk_size = Config.multipart_chunksize if Config else 8 * 1024 * 1024
+        chunks = []
+        while True:
+            chunk = Fileobj.read(chunk_size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        body = b"".join(chunks)
+        parts = len(chunks) if len(body) >= threshold else 1
+        with self._lock:
+            self.objects[(Bucket, Key)] = {
+                "body": body, "content_type": (ExtraArgs or {}).get("ContentType"), "parts": parts
+            }
+        self._record("upload", Key)
+
+    def download_fileobj(self, Bucket, Key, Fileobj, ExtraArgs=None, Config=None):
+        with self._lock:
+            stored = self.objects.get((Bucket, Key))
+        if stored is None:
+            raise KeyError(f"NoSuchKey: {Key}")
+        Fileobj.write(stored["body"])
+        self._record("download", Key)
+
+    def copy(self, CopySource, Bucket, Key, ExtraArgs=None, Config=None):
+        with self._lock:
+            stored = self.objects.get((CopySource["Bucket"], CopySource["Key"]))
+            if stored is None:
+                raise KeyError(f"NoSuchKey: {CopySource['Key']}")
+            self.objects[(Bucket, Key)] = dict(stored, content_type=(ExtraArgs or {}).get("ContentType", stored["content_type"]))
+        self._record("copy", Key)
+
+    def delete_object(self, Bucket, Key):
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        self._record("delete", Key)
+
+
+# Storage calls from async endpoints run here (shared by all R2Service instances in the process)
+_r2_pool = ThreadPoolExecutor(max_workers=settings.R2_MAX_CONCURRENCY, thread_name_prefix="r2")
+
+
+class R2Service:
+    def __init__(self, client=None, bucket_name: Optional[str] = None, transfer_config: Optional[TransferConfig] = None):
+        self.transfer_config = transfer_config or TransferConfig(
+            multipart_threshold=settings.R2_MULTIPART_THRESHOLD_BYTES,
+            multipart_chunksize=settings.R2_MULTIPART_CHUNK_BYTES,
+            max_concurrency=settings.R2_MULTIPART_CONCURRENCY
+        )
+        if client is None and settings.R2_STUB:
+            client = InMemoryObjectStore()
+        if client is not None:
+            self.s3_client = client
+            self.bucket_name = bucket_name or settings.R2_BUCKET_NAME or "local"
+            return
+
         # Validate R2 settings
         if not settings.R2_ENDPOINT_URL:
             raise ValueError("R2_ENDPOINT_URL is not set in environment variables")
@@ -15,9 +101,11 @@ class R2Service:
             raise ValueError("R2_ACCESS_KEY is not set in environment variables")
         if not settings.R2_SECRET_KEY:
             raise ValueError("R2_SECRET_KEY is not set in environment variables")
-        
+
         # Use R2_BUCKET_NAME if available, otherwise extract from R2_BUCKET_URL
-        if settings.R2_BUCKET_NAME:
+        if bucket_name:
+            self.bucket_name = bucket_name
+        elif settings.R2_BUCKET_NAME:
             self.bucket_name = settings.R2_BUCKET_NAME
         elif settings.R2_BUCKET_URL:
             # Extract bucket name from URL
@@ -38,86 +126,148 @@ class R2Service:
                 self.bucket_name = settings.R2_BUCKET_URL
         else:
             raise ValueError("Either R2_BUCKET_NAME or R2_BUCKET_URL must be set in environment variables")
-        
+
         print(f"R2 Configuration: Endpoint={settings.R2_ENDPOINT_URL}, Bucket={self.bucket_name}")
-        
+
         self.s3_client = boto3.client(
             's3',
             endpoint_url=settings.R2_ENDPOINT_URL,
             aws_access_key_id=settings.R2_ACCESS_KEY,
             aws_secret_access_key=settings.R2_SECRET_KEY,
-            config=Config(signature_version='s3v4')
+            config=Config(
+                signature_version='s3v4',
+                # Pool threads plus multipart part uploads share the client's connections
+                max_pool_connections=settings.R2_MAX_CONCURRENCY * settings.R2_MULTIPART_CONCURRENCY
+            )
         )
-    
+
+    def _new_key(self, filename: str, folder: str) -> str:
+        """Unique object key in folder, keeping the file extension"""
+        file_ext = filename.split('.')[-1] if '.' in filename else ''
+        return f"{folder}/{uuid.uuid4()}.{file_ext}" if file_ext else f"{folder}/{uuid.uuid4()}"
+
+    def public_url(self, key: str) -> str:
+        """Public URL of an object key"""
+        if settings.R2_BUCKET_URL:
+            # Ensure URL ends with / if it doesn't already
+            base_url = settings.R2_BUCKET_URL.rstrip('/')
+            return f"{base_url}/{key}"
+        # Fallback: construct URL from endpoint and bucket
+        endpoint_base = settings.R2_ENDPOINT_URL.replace('https://', '').replace('http://', '').split('/')[0]
+        return f"https://{endpoint_base}/{self.bucket_name}/{key}"
+
+    def key_from_url(self, file_url: str) -> str:
+        """Object key of a URL returned by public_url() (a bare key is returned unchanged)"""
+        file_url = file_url.split('?')[0]
+        if settings.R2_BUCKET_URL and file_url.startswith(settings.R2_BUCKET_URL.rstrip('/') + '/'):
+            return file_url[len(settings.R2_BUCKET_URL.rstrip('/')) + 1:]
+        if '://' in file_url:
+            # https://<endpoint>/<bucket>/<key> (or an unknown public domain: path without the bucket)
+            path = file_url.split('://', 1)[1].split('/', 1)[-1]
+            if path.startswith(self.bucket_name + '/'):
+                path = path[len(self.bucket_name) + 1:]
+            return path
+        return file_url
+
     def upload_file(self, file: Union[BinaryIO, bytes, io.BytesIO], filename: str, folder: str = "documents") -> str:
-        """Upload file to R2 and return public URL"""
+        """Upload file to R2 and return public URL (file-like objects are streamed, multipart when large)"""
+        unique_filename = self._new_key(filename, folder)
         try:
-            # Generate unique filename
-            file_ext = filename.split('.')[-1] if '.' in filename else ''
-            unique_filename = f"{folder}/{uuid.uuid4()}.{file_ext}" if file_ext else f"{folder}/{uuid.uuid4()}"
-            
             # Convert bytes to file-like object if needed
             if isinstance(file, bytes):
                 file = io.BytesIO(file)
-            
+
             # Reset file pointer to beginning
             if hasattr(file, 'seek'):
                 file.seek(0)
-            
+
             print(f"Uploading to R2: bucket={self.bucket_name}, key={unique_filename}")
-            
+
             # Upload to R2
             self.s3_client.upload_fileobj(
                 file,
                 self.bucket_name,
                 unique_filename,
-                ExtraArgs={'ContentType': self._get_content_type(filename)}
+                ExtraArgs={'ContentType': self._get_content_type(filename)},
+                Config=self.transfer_config
             )
-            
-            # Return public URL
-            if settings.R2_BUCKET_URL:
-                # Ensure URL ends with / if it doesn't already
-                base_url = settings.R2_BUCKET_URL.rstrip('/')
-                return f"{base_url}/{unique_filename}"
-            else:
-                # Fallback: construct URL from endpoint and bucket
-                endpoint_base = settings.R2_ENDPOINT_URL.replace('https://', '').replace('http://', '').split('/')[0]
-                return f"https://{endpoint_base}/{self.bucket_name}/{unique_filename}"
+            return self.public_url(unique_filename)
         except Exception as e:
             print(f"R2 Upload Error: {type(e).__name__}: {str(e)}")
             print(f"Bucket: {self.bucket_name}, Endpoint: {settings.R2_ENDPOINT_URL}")
             raise
-    
+
+    def copy_file(self, source_url: str, folder: str, filename: Optional[str] = None) -> str:
+        """Server-side copy of an uploaded object into folder; returns the new public URL"""
+        source_key = self.key_from_url(source_url)
+        filename = filename or source_key.split('/')[-1]
+        new_key = self._new_key(filename, folder)
+        try:
+            self.s3_client.copy(
+                {'Bucket': self.bucket_name, 'Key': source_key},
+                self.bucket_name,
+                new_key,
+                ExtraArgs={'ContentType': self._get_content_type(filename), 'MetadataDirective': 'REPLACE'},
+                Config=self.transfer_config
+            )
+            return self.public_url(new_key)
+        except Exception as e:
+            print(f"R2 Copy Error: {type(e).__name__}: {str(e)} ({source_key} -> {new_key})")
+            raise
+
+    def move_file(self, source_url: str, folder: str, filename: Optional[str] = None) -> str:
+        """copy_file() then delete the source object (e.g. temp/ -> verified/)"""
+        new_url = self.copy_file(source_url, folder, filename)
+        self.delete_file(source_url)
+        return new_url
+
     def delete_file(self, file_path: str) -> bool:
         """Delete file from R2"""
         try:
-            # Extract key from URL
-            key = file_path.split(settings.R2_BUCKET_URL + '/')[-1] if settings.R2_BUCKET_URL in file_path else file_path
-            self.s3_client.delete_object(Bucket=self.bucket_name, Key=key)
+            self.s3_client.delete_object(Bucket=self.bucket_name, Key=self.key_from_url(file_path))
             return True
         except Exception as e:
             print(f"Error deleting file from R2: {e}")
             return False
-    
+
     def download_file(self, file_url: str, local_path: str) -> bool:
         """Download file from R2 to local path"""
         try:
-            # Extract key from URL
-            if settings.R2_BUCKET_URL and settings.R2_BUCKET_URL in file_url:
-                key = file_url.split(settings.R2_BUCKET_URL + '/')[-1].split('?')[0]
-            else:
-                # Try to extract from URL path
-                key = file_url.split('/')[-1].split('?')[0]
-            
-            # Download file
             with open(local_path, 'wb') as f:
-                self.s3_client.download_fileobj(self.bucket_name, key, f)
-            
+                self.s3_client.download_fileobj(self.bucket_name, self.key_from_url(file_url), f, Config=self.transfer_config)
             return True
         except Exception as e:
             print(f"Error downloading file from R2: {e}")
             return False
-    
+
+    def download_bytes(self, file_url: str) -> bytes:
+        """Download an object into memory (small files, e.g. document images)"""
+        buffer = io.BytesIO()
+        self.s3_client.download_fileobj(self.bucket_name, self.key_from_url(file_url), buffer, Config=self.transfer_config)
+        return buffer.getvalue()
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_r2_pool, functools.partial(fn, *args, **kwargs))
+
+    async def upload_file_async(self, file: Union[BinaryIO, bytes, io.BytesIO], filename: str, folder: str = "documents") -> str:
+        return await self._run(self.upload_file, file, filename, folder)
+
+    async def copy_file_async(self, source_url: str, folder: str, filename: Optional[str] = None) -> str:
+        return await self._run(self.copy_file, source_url, folder, filename)
+
+    async def move_file_async(self, source_url: str, folder: str, filename: Optional[str] = None) -> str:
+        return await self._run(self.move_file, source_url, folder, filename)
+
+    async def delete_file_async(self, file_path: str) -> bool:
+        return await self._run(self.delete_file, file_path)
+
+    async def download_file_async(self, file_url: str, local_path: str) -> bool:
+        return await self._run(self.download_file, file_url, local_path)
+
+    async def download_bytes_async(self, file_url: str) -> bytes:
+        return await self._run(self.download_bytes, file_url)
+
     def _get_content_type(self, filename: str) -> str:
         """Get content type based on file extension"""
         ext = filename.split('.')[-1].lower()
@@ -134,4 +284,3 @@ class R2Service:
             'mov': 'video/quicktime'
         }
         return content_types.get(ext, 'application/octet-stream')
-
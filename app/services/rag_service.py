@@ -1,10 +1,133 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import select, text
 from app.models import RagSource, RagChunk
 from app.services.openai_service import OpenAIService
-from typing import List, Dict, Optional
+from app.services.embedding_cache import embedding_cache
+from app.services.response_cache import response_cache
+from app.services.chunker import Chunk, MarkdownChunker
+from typing import List, Dict, Optional, Tuple
 import hashlib
 import tiktoken
+from app.config import settings
+
+# Retrieval is one statement: the latest version for the doc_type/audience is resolved in a
+# CTE (no separate MAX(version) round trip) and the query embedding is a single bound
+# parameter, so the statement text is constant and can be prepared once per connection.
+# Placeholders are filled in for SQLAlchemy text() binds and for PostgreSQL PREPARE ($n).
+#
+# Hybrid search: the best {candidates} chunks by cosine distance and the best {candidates} by
+# full-text rank (any query term matches; exact terms like "CSCA", "HSK 4" or university aliases
+# that embeddings blur) are fused with reciprocal rank fusion, score = sum of 1 / ({rrf_k} + rank).
+# to_tsvector('english', content) matches the GIN index from migrate_rag_fulltext_index.py.
+# An empty {query} leaves the lexical side empty, i.e. plain vector ranking.
+#
+# Vector candidates come from a plain ORDER BY embedding <=> (query vector) LIMIT {candidates}
+# (vector_indexed), which the HNSW index (rag_chunks_embedding_hnsw_idx) can serve; ROW_NUMBER()
+# only runs over that small set. pgvector applies the source filter after the index scan
+# (hnsw.ef_search rows, default 40), so a selective doc_type/audience filter can leave fewer
+# than {candidates} rows: only then does the exact scan of the eligible chunks run (both
+# branches are gated on the vector_indexed count, so Postgres skips the other one).
+_RETRIEVE_SQL_TEMPLATE = """
+    WITH filtered_sources AS (
+        SELECT s.id, s.name, s.doc_type, s.audience, s.version
+        FROM rag_sources s
+        WHERE s.doc_type = {doc_type}
+          AND s.status = 'active'
+          AND (CAST({audience} AS text) IS NULL OR s.audience = {audience} OR s.audience = 'Both')
+    ),
+    latest AS (
+        SELECT MAX(version) AS max_version FROM filtered_sources
+    ),
+    eligible_sources AS (
+        SELECT s.*
+        FROM filtered_sources s
+        CROSS JOIN latest l
+        -- Latest version only (unversioned sources always included); no version at all -> everything
+        WHERE COALESCE(l.max_version, '') = '' OR s.version = l.max_version OR s.version IS NULL
+    ),
+    query_vector AS (
+        SELECT CAST({embedding} AS vector) AS embedding
+    ),
+    query_terms AS (
+        SELECT CAST(replace(CAST(plainto_tsquery('english', {query}) AS text), ' & ', ' | ') AS tsquery) AS terms
+    ),
+    vector_indexed AS MATERIALIZED (
+        SELECT c.id, c.priority, c.embedding <=> (SELECT embedding FROM query_vector) AS distance
+        FROM rag_chunks c
+        JOIN eligible_sources s ON c.source_id = s.id
+        ORDER BY c.embedding <=> (SELECT embedding FROM query_vector)
+        LIMIT {candidates}
+    ),
+    vector_candidates AS (
+        SELECT * FROM vector_indexed
+        WHERE (SELECT COUNT(*) FROM vector_indexed) >= {candidates}
+        UNION ALL
+        (
+            SELECT c.id, c.priority, c.embedding <=> q.embedding AS distance
+            FROM rag_chunks c
+            JOIN eligible_sources s ON c.source_id = s.id
+            CROSS JOIN query_vector q
+            WHERE (SELECT COUNT(*) FROM vector_indexed) < {candidates}
+            ORDER BY distance, c.priority
+            LIMIT {candidates}
+        )
+    ),
+    vector_ranked AS (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY distance, priority) AS rank
+        FROM vector_candidates
+    ),
+    lexical_ranked AS (
+        SELECT c.id, ROW_NUMBER() OVER (
+            ORDER BY ts_rank(to_tsvector('english', c.content), q.terms) DESC, c.priority
+        ) AS rank
+        FROM rag_chunks c
+        JOIN eligible_sources s ON c.source_id = s.id
+        CROSS JOIN query_terms q
+        WHERE to_tsvector('english', c.content) @@ q.terms
+        ORDER BY rank
+        LIMIT {candidates}
+    ),
+    fused AS (
+        SELECT
+            COALESCE(v.id, l.id) AS id,
+            v.rank AS vector_rank,
+            l.rank AS lexical_rank,
+            COALESCE(1.0 / ({rrf_k} + v.rank), 0) + COALESCE(1.0 / ({rrf_k} + l.rank), 0) AS score
+        FROM vector_ranked v
+        FULL OUTER JOIN lexical_ranked l ON v.id = l.id
+    )
+    SELECT
+        c.id,
+        c.content,
+        c.metadata,
+        c.source_id,
+        c.priority,
+        s.name as source_name,
+        s.doc_type,
+        s.audience,
+        s.version,
+        c.embedding <=> q.embedding as distance,
+        f.score,
+        f.vector_rank,
+        f.lexical_rank
+    FROM fused f
+    JOIN rag_chunks c ON c.id = f.id
+    JOIN eligible_sources s ON c.source_id = s.id
+    CROSS JOIN query_vector q
+    ORDER BY f.score DESC, distance, c.priority ASC
+    LIMIT {top_k}
+"""
+_RETRIEVE_PARAMS = ("embedding", "query", "doc_type", "audience", "top_k", "candidates", "rrf_k")
+_RETRIEVE_QUERY = text(_RETRIEVE_SQL_TEMPLATE.format(**{name: f":{name}" for name in _RETRIEVE_PARAMS}))
+_PREPARED_NAME = "rag_retrieve"
+_PREPARED_TYPES = "vector, text, text, text, integer, integer, integer"
+_PREPARED_SQL = _RETRIEVE_SQL_TEMPLATE.format(**{name: f"${i}" for i, name in enumerate(_RETRIEVE_PARAMS, 1)})
+
+
+def _vector_literal(embedding: List[float]) -> str:
+    """pgvector text format ('[0.1,0.2,...]') for binding as a parameter"""
+    return '[' + ','.join(map(str, embedding)) + ']'
+
 
 class RAGService:
     def __init__(self):
@@ -14,9 +137,11 @@ class RAGService:
         self.encoding = tiktoken.get_encoding("cl100k_base")  # For token counting
     
     def embed_query(self, text: str) -> Optional[List[float]]:
-        """Generate embedding for a query text"""
+        """Generate embedding for a query text (cached per embedding model and normalized text)"""
         try:
-            return self.openai_service.generate_embedding(text)
+            return embedding_cache.get_or_compute(
+                text, self.openai_service.embedding_model, self.openai_service.generate_embedding
+            )
         except Exception as e:
             print(f"RAG embedding generation failed: {e}")
             return None
@@ -43,66 +168,8 @@ class RAGService:
             if not query_embedding:
                 return []
             
-            # Convert to PostgreSQL array format string
-            embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
-            
-            # Build WHERE clause with filters - use parameterized queries for safety
-            # embedding_str is safe to insert as literal since it's generated from our own data
-            where_conditions = ["s.doc_type = :doc_type", "s.status = 'active'"]
-            params = {"doc_type": doc_type, "top_k": top_k}
-            
-            if audience:
-                # Allow exact audience match OR audience='Both' (if exists)
-                where_conditions.append("(s.audience = :audience OR s.audience = 'Both')")
-                params["audience"] = audience
-            
-            where_clause = " AND ".join(where_conditions)
-            
-            # Get highest version for this doc_type + audience combination
-            # First, find the highest version (handle NULL versions)
-            version_where = " AND ".join([wc for wc in where_conditions])
-            version_params = {k: v for k, v in params.items() if k != "top_k"}
-            version_query = text(f"""
-                SELECT MAX(s.version) as max_version
-                FROM rag_sources s
-                WHERE {version_where}
-            """)
-            version_result = db.execute(version_query, version_params)
-            max_version_row = version_result.fetchone()
-            max_version = max_version_row[0] if max_version_row and max_version_row[0] else None
-            
-            # If version exists, filter by it; otherwise get all versions (including NULL)
-            if max_version:
-                where_conditions.append("(s.version = :max_version OR s.version IS NULL)")
-                params["max_version"] = max_version
-                where_clause = " AND ".join(where_conditions)
-            
-            # Vector similarity search with filtering
-            # Use cosine distance with HNSW index (vector_cosine_ops)
-            # Build SQL using string concatenation to avoid f-string parameter parsing issues
-            # embedding_str is inserted as literal (safe - we control the value)
-            # Other parameters use proper :param_name binding
-            base_sql = """
-                SELECT 
-                    c.id,
-                    c.content,
-                    c.metadata,
-                    c.source_id,
-                    c.priority,
-                    s.name as source_name,
-                    s.doc_type,
-                    s.audience,
-                    s.version,
-                    1 - (c.embedding <=> '""" + embedding_str + """'::vector) as similarity
-                FROM rag_chunks c
-                JOIN rag_sources s ON c.source_id = s.id
-                WHERE """ + where_clause + """
-                ORDER BY c.embedding <=> '""" + embedding_str + """'::vector, c.priority ASC
-                LIMIT :top_k
-            """
-            
-            query_sql = text(base_sql)
-            result = db.execute(query_sql, params)
+            params = self._retrieve_params(query_embedding, query, doc_type, audience, top_k)
+            result = self._execute_retrieve(db, params)
             
             chunks = []
             total_tokens = 0
@@ -125,7 +192,10 @@ class RAGService:
                     "audience": row.audience,
                     "version": row.version,
                     "priority": row.priority,
-                    "similarity": float(row.similarity)
+                    "similarity": 1 - float(row.distance),
+                    "score": float(row.score),
+                    "vector_rank": row.vector_rank,
+                    "lexical_rank": row.lexical_rank
                 })
                 
                 total_tokens += chunk_tokens
@@ -140,6 +210,51 @@ class RAGService:
                 pass
             return []
     
+    @staticmethod
+    def _retrieve_params(query_embedding: List[float], query: str, doc_type: str,
+                         audience: Optional[str], top_k: int) -> Dict:
+        """Bind parameters for the retrieval statement (lexical side only when RAG_HYBRID_SEARCH)"""
+        return {
+            "embedding": _vector_literal(query_embedding),
+            "query": query if settings.RAG_HYBRID_SEARCH else "",
+            "doc_type": doc_type,
+            "audience": audience,
+            "top_k": top_k,
+            "candidates": max(settings.RAG_HYBRID_CANDIDATES, top_k),
+            "rrf_k": settings.RAG_RRF_K,
+        }
+    
+    @classmethod
+    def _execute_retrieve(cls, db: Session, params: Dict):
+        """Run the retrieval statement, as a server-side prepared statement on PostgreSQL"""
+        if settings.RAG_PREPARED_STATEMENTS and db.get_bind().dialect.name == "postgresql":
+            try:
+                return cls._execute_prepared(db, params)
+            except Exception as e:
+                print(f"RAG prepared retrieve failed, falling back to plain statement: {e}")
+                db.rollback()
+        return db.execute(_RETRIEVE_QUERY, params)
+    
+    @staticmethod
+    def _execute_prepared(db: Session, params: Dict):
+        # PREPARE once per pooled DBAPI connection; connection.info lives as long as that connection
+        connection = db.connection()
+        info = connection.connection.info
+        try:
+            if not info.get(_PREPARED_NAME):
+                connection.exec_driver_sql(
+                    f"PREPARE {_PREPARED_NAME}({_PREPARED_TYPES}) AS {_PREPARED_SQL}"
+                )
+                info[_PREPARED_NAME] = True
+            return connection.exec_driver_sql(
+                f"EXECUTE {_PREPARED_NAME}({', '.join(f'%({name})s' for name in _RETRIEVE_PARAMS)})",
+                params
+            )
+        except Exception:
+            # e.g. a pooler handed us a different server connection - prepare again next time
+            info.pop(_PREPARED_NAME, None)
+            raise
+    
     def format_rag_context(self, results: List[Dict]) -> str:
         """Format RAG search results into context string - summarize chunks, don't paste large blocks"""
         if not results:
@@ -160,29 +275,22 @@ class RAGService:
         
         return context
     
-    def chunk_text(
-        self, 
-        text: str, 
-        chunk_size: int = 700, 
-        overlap: int = 120
-    ) -> List[str]:
+    def chunk_document(
+        self,
+        text: str,
+        max_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None
+    ) -> List[Chunk]:
         """
-        Split text into chunks with overlap.
-        Default: ~500-800 chars (approximately 700 chars) with 100-150 char overlap (120).
+        Split text on markdown headings, paragraphs and Q/A pairs into chunks of at most
+        max_tokens tokens (default RAG_CHUNK_MAX_TOKENS). See app/services/chunker.py.
         """
-        chunks = []
-        start = 0
-        text_length = len(text)
-        
-        while start < text_length:
-            end = start + chunk_size
-            chunk = text[start:end]
-            chunks.append(chunk)
-            start = end - overlap
-            if start >= text_length:
-                break
-        
-        return chunks
+        chunker = MarkdownChunker(
+            self.encoding,
+            max_tokens=max_tokens or settings.RAG_CHUNK_MAX_TOKENS,
+            overlap_tokens=settings.RAG_CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+        )
+        return chunker.chunk(text)
     
     def compute_chunk_hash(
         self, 
@@ -194,6 +302,37 @@ class RAGService:
         hash_input = f"{chunk_text}|{doc_type}|{version or ''}"
         return hashlib.md5(hash_input.encode('utf-8')).hexdigest()
     
+    @staticmethod
+    def compute_content_hash(full_text: str, doc_type: str, audience: str, version: Optional[str] = None) -> str:
+        """SHA-256 identifying one ingestion of a document (text + doc_type/audience/version)"""
+        hash_input = f"{doc_type}|{audience}|{version or ''}|{full_text}"
+        return hashlib.sha256(hash_input.encode('utf-8')).hexdigest()
+    
+    def is_source_current(self, db: Session, name: str, doc_type: str, full_text: str,
+                          audience: str = 'student', version: Optional[str] = None) -> bool:
+        """True if this exact text was already ingested for the source (nothing to do)"""
+        source = db.query(RagSource).filter(
+            RagSource.name == name,
+            RagSource.doc_type == doc_type,
+            RagSource.audience == audience
+        ).first()
+        return (
+            source is not None
+            and source.status == 'active'
+            and source.content_hash == self.compute_content_hash(full_text, doc_type, audience, version)
+        )
+    
+    def estimate_ingestion(self, db: Session, doc_type: str, full_text: str, version: Optional[str] = None,
+                           max_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None) -> Dict:
+        """What ingest_source would embed for this text, without writing or calling the API"""
+        chunks = self.chunk_document(full_text, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+        new_chunks = self._new_chunks(db, chunks, doc_type, version)
+        return {
+            "total_chunks": len(chunks),
+            "new_chunks": len(new_chunks),
+            "new_tokens": sum(chunk.token_count for _, chunk, _ in new_chunks)
+        }
+    
     def ingest_source(
         self,
         db: Session,
@@ -204,12 +343,13 @@ class RAGService:
         version: Optional[str] = None,
         source_url: Optional[str] = None,
         last_verified_at: Optional[str] = None,
-        chunk_size: int = 700,
-        overlap: int = 120
+        max_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None
     ) -> Dict:
         """
         Ingest a source document into the RAG system.
-        Chunks the text, computes embeddings, and stores with deduplication.
+        Chunks and hashes the text, embeds only chunks not stored yet (in bounded batches)
+        and bulk-inserts them.
         Returns dict with source_id, chunks_created, chunks_skipped.
         """
         # Create or get source
@@ -219,6 +359,7 @@ class RAGService:
             RagSource.audience == audience
         ).first()
         
+        is_new_source = source is None
         if not source:
             source = RagSource(
                 name=name,
@@ -242,46 +383,44 @@ class RAGService:
             source.status = 'active'
             db.flush()
         
-        # Chunk the text
-        chunks = self.chunk_text(full_text, chunk_size=chunk_size, overlap=overlap)
+        # Chunk the text and hash every chunk before any embedding work
+        chunks = self.chunk_document(full_text, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+        new_chunks = self._new_chunks(db, chunks, doc_type, version)
         
-        # Generate embeddings in batch
+        # Only new chunks are embedded
         try:
-            embeddings = self.openai_service.generate_embeddings_batch(chunks)
+            embeddings = self.embed_texts([chunk.text for _, chunk, _ in new_chunks])
         except Exception as e:
             print(f"Failed to generate embeddings: {e}")
             raise
         
-        # Insert chunks with deduplication
-        chunks_created = 0
-        chunks_skipped = 0
+        rows = [
+            {
+                "source_id": source.id,
+                "chunk_index": idx,
+                "chunk_hash": chunk_hash,
+                "content": chunk.text,
+                "embedding": embedding,
+                "priority": 3,  # Default priority
+                "meta_data": chunk.metadata(),
+            }
+            for (idx, chunk, chunk_hash), embedding in zip(new_chunks, embeddings)
+        ]
+        chunks_created = self._bulk_insert_chunks(db, rows)
+        chunks_skipped = len(chunks) - chunks_created
         
-        for idx, (chunk_text, embedding) in enumerate(zip(chunks, embeddings)):
-            chunk_hash = self.compute_chunk_hash(chunk_text, doc_type, version)
-            
-            # Check if chunk already exists
-            existing = db.query(RagChunk).filter(
-                RagChunk.chunk_hash == chunk_hash
-            ).first()
-            
-            if existing:
-                chunks_skipped += 1
-                continue
-            
-            # Create new chunk
-            chunk = RagChunk(
-                source_id=source.id,
-                chunk_index=idx,
-                chunk_hash=chunk_hash,
-                content=chunk_text,
-                embedding=embedding,
-                priority=3,  # Default priority
-                meta_data={}
-            )
-            db.add(chunk)
-            chunks_created += 1
+        # Chunks of the previous text of this source that are no longer part of it
+        if not is_new_source:
+            current_hashes = [self.compute_chunk_hash(chunk.text, doc_type, version) for chunk in chunks]
+            db.query(RagChunk).filter(
+                RagChunk.source_id == source.id,
+                RagChunk.chunk_hash.notin_(current_hashes)
+            ).delete(synchronize_session=False)
         
+        source.content_hash = self.compute_content_hash(full_text, doc_type, audience, version)
         db.commit()
+        # Cached answers built from the previous content of this doc_type are stale now
+        response_cache.invalidate(doc_type)
         
         return {
             "source_id": source.id,
@@ -290,6 +429,66 @@ class RAGService:
             "total_chunks": len(chunks)
         }
     
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts in batches bounded by EMBEDDING_BATCH_MAX_INPUTS inputs and
+        EMBEDDING_BATCH_MAX_TOKENS tokens per request (the embeddings API rejects larger requests).
+        """
+        embeddings: List[List[float]] = []
+        batch: List[str] = []
+        batch_tokens = 0
+        for text_item in texts:
+            tokens = len(self.encoding.encode(text_item))
+            if batch and (len(batch) >= settings.EMBEDDING_BATCH_MAX_INPUTS or
+                          batch_tokens + tokens > settings.EMBEDDING_BATCH_MAX_TOKENS):
+                embeddings.extend(self.openai_service.generate_embeddings_batch(batch))
+                batch, batch_tokens = [], 0
+            batch.append(text_item)
+            batch_tokens += tokens
+        if batch:
+            embeddings.extend(self.openai_service.generate_embeddings_batch(batch))
+        return embeddings
+    
+    def _new_chunks(self, db: Session, chunks: List[Chunk], doc_type: str, version: Optional[str]) -> List[Tuple[int, Chunk, str]]:
+        """(index, chunk, hash) of chunks not stored yet, deduplicated within the document too"""
+        hashed = [(idx, chunk, self.compute_chunk_hash(chunk.text, doc_type, version))
+                  for idx, chunk in enumerate(chunks)]
+        existing_hashes = self._existing_chunk_hashes(db, [chunk_hash for _, _, chunk_hash in hashed])
+        new_chunks = []
+        for idx, chunk, chunk_hash in hashed:
+            if chunk_hash in existing_hashes:
+                continue
+            existing_hashes.add(chunk_hash)
+            new_chunks.append((idx, chunk, chunk_hash))
+        return new_chunks
+    
+    @staticmethod
+    def _existing_chunk_hashes(db: Session, hashes: List[str]) -> set:
+        """Which of hashes are already stored (one query)"""
+        if not hashes:
+            return set()
+        if db.get_bind().dialect.name == "postgresql":
+            result = db.execute(
+                text("SELECT chunk_hash FROM rag_chunks WHERE chunk_hash = ANY(:hashes)"),
+                {"hashes": list(set(hashes))}
+            )
+        else:
+            result = db.execute(select(RagChunk.chunk_hash).where(RagChunk.chunk_hash.in_(set(hashes))))
+        return {row[0] for row in result}
+    
+    @staticmethod
+    def _bulk_insert_chunks(db: Session, rows: List[Dict]) -> int:
+        """INSERT ... ON CONFLICT (chunk_hash) DO NOTHING in multi-row batches; returns rows inserted"""
+        if not rows:
+            return 0
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(RagChunk).on_conflict_do_nothing(index_elements=["chunk_hash"]).returning(RagChunk.id)
+        # Chunks inserted concurrently by another ingestion are skipped, not errors
+        return len(db.execute(statement, rows).all())
+    
     # Legacy method for backward compatibility
     def search_similar(self, db: Session, query: str, top_k: int = None) -> List[Dict]:
         """
@@ -303,9 +502,7 @@ class RAGService:
         if not query_embedding:
             return []
         
-        embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
-        
-        query_sql = text(f"""
+        query_sql = text("""
             SELECT 
                 c.id,
                 c.content as chunk_text,
@@ -313,15 +510,15 @@ class RAGService:
                 c.source_id as document_id,
                 s.name as filename,
                 s.metadata as doc_metadata,
-                1 - (c.embedding <=> '{embedding_str}'::vector) as similarity
+                c.embedding <=> CAST(:embedding AS vector) as distance
             FROM rag_chunks c
             JOIN rag_sources s ON c.source_id = s.id
             WHERE s.status = 'active'
-            ORDER BY c.embedding <=> '{embedding_str}'::vector
-            LIMIT {top_k}
+            ORDER BY distance
+            LIMIT :top_k
         """)
         
-        result = db.execute(query_sql)
+        result = db.execute(query_sql, {"embedding": _vector_literal(query_embedding), "top_k": top_k})
         
         results = []
         for row in result:
@@ -331,7 +528,7 @@ class RAGService:
                 "document_id": row.document_id,
                 "filename": row.filename,
                 "doc_metadata": row.doc_metadata,
-                "similarity": float(row.similarity)
+                "similarity": 1 - float(row.distance)
             })
         
         return results
@@ -0,0 +1,218 @@
+"""
+ResponseCache - semantic cache for profile-independent RAG answers
+
+SalesAgent answers CSCA and general FAQ questions from RAG context plus one LLM call, and the
+generated answer depends only on the question and the knowledge base (the student's profile is
+only used for the follow-up lead question appended afterwards). Equivalent questions asked
+minutes apart therefore get the same answer; this cache returns it without retrieval or an LLM call.
+
+- Keyed by the query embedding (cosine similarity >= RESPONSE_CACHE_SIMILARITY) within the
+  same doc_type + audience
+- Entries expire after RESPONSE_CACHE_TTL_SECONDS; the oldest are evicted beyond RESPONSE_CACHE_MAX_ENTRIES
+- Each entry records the corpus version of its doc_type (fingerprint of the rag_sources rows and
+  chunk counts). Entries from an older corpus version never match, so re-ingesting, archiving
+  or re-versioning a source invalidates its answers in every worker. The fingerprint is re-read at
+  most every RESPONSE_CACHE_VERSION_CHECK_SECONDS; invalidate() forces an immediate re-read.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import itertools
+import threading
+import time
+
+import numpy as np
+
+from app.config import settings
+
+# Phrases that make an answer depend on who is asking (kept out of the cache)
+_PERSONAL_PATTERNS = (
+    " i ", " i'm ", " im ", " i've ", " my ", " me ", " mine ", "can i ", "should i ", "am i ",
+    " we ", " our ", " us ",
+)
+
+
+def is_profile_independent(user_message: str) -> bool:
+    """True if the question does not refer to the asker (their grades, country, plans, ...)"""
+    padded = f" {' '.join((user_message or '').lower().split())} "
+    padded = padded.replace("?", " ").replace(",", " ").replace(".", " ")
+    return not any(pattern in padded for pattern in _PERSONAL_PATTERNS)
+
+
+@dataclass
+class _Entry:
+    group: Tuple[str, str, str]  # (doc_type, audience, corpus_version)
+    vector: np.ndarray
+    answer: str
+    rag_context: Optional[str]
+    expires_at: float
+
+
+class ResponseCache:
+    """Embedding-similarity cache of LLM answers, grouped by doc_type/audience/corpus version"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity: float, version_check_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.version_check_seconds = version_check_seconds
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()  # insertion order = age
+        self._groups: Dict[Tuple[str, str, str], List[int]] = {}
+        self._matrices: Dict[Tuple[str, str, str], Tuple[List[int], np.ndarray]] = {}
+        self._versions: Dict[str, Tuple[str, float]] = {}  # doc_type -> (fingerprint, checked_at)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._invalidations = 0
+
+    def corpus_version(self, db, doc_type: str) -> str:
+        """
+        Fingerprint of the rag_sources rows for doc_type: id, version, status, content hash, chunk
+        count and newest chunk id (an edited source keeps its id/version/status and often its count)
+        """
+        with self._lock:
+            cached = self._versions.get(doc_type)
+        if cached is not None and time.time() - cached[1] < self.version_check_seconds:
+            return cached[0]
+
+        from sqlalchemy import func
+        from app.models import RagSource, RagChunk
+        rows = db.query(
+            RagSource.id, RagSource.version, RagSource.status, RagSource.content_hash,
+            func.count(RagChunk.id), func.max(RagChunk.id)
+        ).outerjoin(RagChunk, RagChunk.source_id == RagSource.id).filter(
+            RagSource.doc_type == doc_type
+        ).group_by(RagSource.id, RagSource.version, RagSource.status, RagSource.content_hash).order_by(RagSource.id).all()
+        fingerprint = hashlib.sha1(repr([tuple(row) for row in rows]).encode("utf-8")).hexdigest()[:16]
+
+        with self._lock:
+            previous = self._versions.get(doc_type)
+            self._versions[doc_type] = (fingerprint, time.time())
+            if previous is not None and previous[0] != fingerprint:
+                self._drop_doc_type(doc_type, keep_version=fingerprint)
+        return fingerprint
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def get(self, embedding: List[float], doc_type: str, audience: Optional[str], version: str) -> Optional[Dict[str, Any]]:
+        """Return {"answer", "rag_context", "similarity"} of the closest fresh entry, or None"""
+        group = (doc_type, audience or "", version)
+        query = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            matrix = self._matrix(group)
+            if matrix is not None:
+                entry_ids, vectors = matrix
+                scores = vectors @ query
+                for position in np.argsort(-scores):
+                    score = float(scores[position])
+                    if score < self.similarity:
+                        break
+                    entry = self._entries.get(entry_ids[position])
+                    if entry is None or entry.expires_at <= now:
+                        continue
+                    self._hits += 1
+                    return {"answer": entry.answer, "rag_context": entry.rag_context, "similarity": score}
+            self._misses += 1
+            return None
+
+    def set(self, embedding: List[float], doc_type: str, audience: Optional[str], version: str,
+            answer: str, rag_context: Optional[str] = None):
+        """Store an answer for this question embedding"""
+        group = (doc_type, audience or "", version)
+        entry = _Entry(group=group, vector=self._normalize(embedding), answer=answer,
+                       rag_context=rag_context, expires_at=time.time() + self.ttl_seconds)
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = entry
+            self._groups.setdefault(group, []).append(entry_id)
+            self._matrices.pop(group, None)
+            self._stores += 1
+            self._evict()
+
+    def invalidate(self, doc_type: Optional[str] = None):
+        """Re-check the corpus version of doc_type (or all doc_types) on next use"""
+        with self._lock:
+            self._invalidations += 1
+            doc_types = [doc_type] if doc_type else list(self._versions)
+            for name in doc_types:
+                if name in self._versions:
+                    # Keep the fingerprint so entries of the replaced version get dropped
+                    self._versions[name] = (self._versions[name][0], 0.0)
+
+    def clear(self):
+        """Drop every entry (tests)"""
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+            self._matrices.clear()
+            self._versions.clear()
+
+    def _matrix(self, group) -> Optional[Tuple[List[int], np.ndarray]]:
+        # Stacked vectors per group, rebuilt lazily after the group changes
+        matrix = self._matrices.get(group)
+        if matrix is None:
+            entry_ids = [i for i in self._groups.get(group, ()) if i in self._entries]
+            if not entry_ids:
+                return None
+            matrix = (entry_ids, np.stack([self._entries[i].vector for i in entry_ids]))
+            self._matrices[group] = matrix
+        return matrix
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        ids = self._groups.get(entry.group)
+        if ids is not None:
+            ids.remove(entry_id)
+            if not ids:
+                del self._groups[entry.group]
+        self._matrices.pop(entry.group, None)
+
+    def _evict(self):
+        # Expired entries first, then the oldest ones
+        if len(self._entries) <= self.max_entries:
+            return
+        now = time.time()
+        for entry_id in [i for i, e in self._entries.items() if e.expires_at <= now]:
+            self._remove(entry_id)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _drop_doc_type(self, doc_type: str, keep_version: str):
+        # Entries from older corpus versions can never match again
+        for group in [g for g in self._groups if g[0] == doc_type and g[2] != keep_version]:
+            for entry_id in list(self._groups.get(group, ())):
+                self._remove(entry_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stores": self._stores,
+                "invalidations": self._invalidations,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+# Process-wide cache shared by all SalesAgent instances
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+    similarity=settings.RESPONSE_CACHE_SIMILARITY,
+    version_check_seconds=settings.RESPONSE_CACHE_VERSION_CHECK_SECONDS
+)
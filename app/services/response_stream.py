@@ -0,0 +1,87 @@
+"""
+Streaming bridge for agent turns.
+
+Agents build their answer synchronously (DB lookups, RAG, several LLM calls) and only
+the final formatting call produces user-visible text. While a turn is streamed, the
+agent's stream_handler is set and that final call forwards its deltas through it.
+This module runs the turn on the shared agent executor and turns those deltas into events:
+
+    ("delta", text)     - answer text as it is produced
+    ("replace", text)   - the final answer differs from what was streamed (post-processing
+                          or fallback); clients should replace the streamed text with it
+    ("result", dict)    - the agent's full result dict (always last)
+"""
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+import queue
+import time
+
+from app.services.agent_executor import AgentExecutor, AgentTimeoutError, agent_executor
+
+
+def stream_agent_turn(agent: Any, generate: Callable[..., Dict[str, Any]], executor: Optional[AgentExecutor] = None,
+                      **kwargs) -> Iterator[Tuple[str, Any]]:
+    """
+    Run generate(**kwargs) for agent and yield streaming events as described above.
+    The turn is submitted when iteration starts; AgentBusyError / AgentTimeoutError propagate to the caller.
+    """
+    return _stream_turn(lambda db: (agent, generate, kwargs), executor, own_session=False)
+
+
+def stream_session_turn(build: Callable[[Any], Tuple[Any, Callable[..., Dict[str, Any]], Dict[str, Any]]],
+                        executor: Optional[AgentExecutor] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Like stream_agent_turn, but build(db) -> (agent, generate, kwargs) runs on the worker thread with a
+    Session owned by the turn (closed when it ends), so a turn that outlives the stream's timeout never
+    touches the request's Session.
+    """
+    return _stream_turn(build, executor, own_session=True)
+
+
+def _stream_turn(build: Callable[[Any], Tuple[Any, Callable[..., Dict[str, Any]], Dict[str, Any]]],
+                 executor: Optional[AgentExecutor], own_session: bool) -> Iterator[Tuple[str, Any]]:
+    executor = executor or agent_executor
+    events: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+
+    def run():
+        db = executor.open_session() if own_session else None
+        agent = None
+        try:
+            agent, generate, kwargs = build(db)
+            agent.stream_handler = lambda text: events.put(("delta", text))
+            events.put(("result", generate(**kwargs)))
+        except BaseException as e:
+            events.put(("error", e))
+            raise
+        finally:
+            if agent is not None:
+                agent.stream_handler = None
+            if db is not None:
+                db.close()
+
+    executor.submit(run)
+    deadline = time.monotonic() + executor.turn_timeout if executor.turn_timeout else None
+
+    streamed = []
+    while True:
+        try:
+            kind, payload = events.get(timeout=max(deadline - time.monotonic(), 0) if deadline else None)
+        except queue.Empty:
+            executor.record_timeout()
+            raise AgentTimeoutError(f"Agent turn did not finish within {executor.turn_timeout:.0f}s")
+        if kind == "delta":
+            streamed.append(payload)
+            yield "delta", payload
+        elif kind == "error":
+            raise payload
+        else:
+            # Reconcile streamed text with the final answer: agents may append a
+            # follow-up question or replace the LLM text with a fallback.
+            response = payload.get("response") or ""
+            sent = "".join(streamed).strip()
+            if response.startswith(sent):
+                if len(response) > len(sent):
+                    yield "delta", response[len(sent):]
+            else:
+                yield "replace", response
+            yield "result", payload
+            return
@@ -9,6 +9,30 @@ from typing import Optional, Dict, Any, Tuple, List
 from difflib import SequenceMatcher
 from app.services.slot_schema import PartnerQueryState, RequirementFocus, ScholarshipFocus, PaginationConfig
 from app.services.openai_service import OpenAIService
+from app.services.stats import Counters
+
+
+class RoutingStats(Counters):
+    """Which slot-extraction path PartnerAgent took for fresh queries"""
+
+    def record(self, path: str, llm_reason: Optional[str] = None):
+        self.add("paths", path)
+        if path == "llm" and llm_reason:
+            self.add("llm_reasons", llm_reason)
+
+    def summarize(self, counts: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+        paths = counts.get("paths", {})
+        rules, llm = paths.get("rules", 0), paths.get("llm", 0)
+        return {
+            "rules": rules,
+            "llm": llm,
+            "llm_calls_saved_rate": round(rules / (rules + llm), 3) if rules + llm else 0.0,
+            "llm_reasons": counts.get("llm_reasons", {}),
+        }
+
+
+# Shared by all PartnerAgent instances in the process
+routing_stats = RoutingStats("partner_routing")
 
 
 class PartnerRouter:
@@ -2,18 +2,27 @@
 SalesAgent - For non-logged-in users
 Goal: Generate leads and promote MalishaEdu partner universities & majors
 """
-from typing import List, Optional, Dict, Any, Tuple
-from dataclasses import dataclass, field
+from typing import List, Optional, Dict, Any, Tuple, Iterator
+from dataclasses import dataclass, field, fields, replace
 from sqlalchemy.orm import Session
 from app.services.db_query_service import DBQueryService
 from app.services.rag_service import RAGService
 from app.services.tavily_service import TavilyService
 from app.services.openai_service import OpenAIService
+from app.services.catalog_service import catalog_service
+from app.services.match_index import expand_major_acronym
+from app.services.response_cache import response_cache, is_profile_independent
+from app.services.response_stream import stream_agent_turn
+from app.services.turn_stages import TurnStages, speculation_stats
+from app.services.session_store import session_store
+from app.services.profile_state import is_topic_reset, profile_state_stats
 from difflib import SequenceMatcher
 from app.models import University, Major, ProgramIntake, Lead
+from app.config import settings
 import json
 import re
 import os
+import time
 
 
 @dataclass
@@ -392,6 +401,10 @@ A: Yes. All partnerships are governed by formal agreements."""
 class SalesAgent:
     """Sales agent for lead generation and university promotion"""
     
+    # Per-session StudentProfileState (see load_student_profile_state), in the shared session store
+    PROFILE_STATE_NAMESPACE = "sales_profile_state"
+    _PROFILE_FIELDS = frozenset(f.name for f in fields(StudentProfileState))
+    
     SALES_SYSTEM_PROMPT = """You are the MalishaEdu Sales Agent, helping prospective students discover Chinese universities and programs.
 
 CRITICAL: Be CONCISE and CONVERSATIONAL. Do NOT overwhelm users with too much information at once. Build rapport gradually.
@@ -825,11 +838,11 @@ CRITICAL: General Process/FAQ Questions:
             print(f"Warning: FAQ service initialization failed: {e}. Continuing without FAQ support.")
             self.faq_service = None
         
-        # Load all partner universities at startup
-        self.all_universities = self._load_all_universities()
-        
-        # Load all majors with university and degree level associations at startup
-        self.all_majors = self._load_all_majors()
+        # Partner universities and their majors from the process-wide catalog snapshot
+        # (loaded once per process and shared, not re-read on every turn)
+        catalog = catalog_service.get(self.db_service)
+        self.all_universities = list(catalog.partner_universities)
+        self.all_majors = list(catalog.partner_majors)
         
         # Pagination state for "show more" queries
         self.last_list_results: List[ProgramIntake] = []
@@ -838,59 +851,11 @@ CRITICAL: General Process/FAQ Questions:
         # Follow-up resolver state
         self.last_intent: Optional[str] = None
         self.last_state: Optional[StudentProfileState] = None
+        
+        # Set while a turn is streamed (see generate_response_stream); receives final answer deltas
+        self.stream_handler = None
     
-    def _load_all_universities(self) -> List[Dict[str, Any]]:
-        """Load all partner universities from database at startup"""
-        try:
-            universities = self.db.query(University).filter(University.is_partner == True).all()
-            return [
-                {
-                    "id": uni.id,
-                    "name": uni.name,
-                    "city": uni.city,
-                    "province": uni.province,
-                    "ranking": uni.university_ranking,
-                    "country": uni.country or "China",
-                    "description": uni.description
-                }
-                for uni in universities
-            ]
-        except Exception as e:
-            print(f"Error loading universities: {e}")
-            # Rollback any failed transaction to allow subsequent queries
-            try:
-                self.db.rollback()
-            except:
-                pass
-            return []
-    
-    def _load_all_majors(self) -> List[Dict[str, Any]]:
-        """Load all majors with university and degree level associations at startup"""
-        try:
-            majors = self.db.query(Major).join(University).filter(University.is_partner == True).all()
-            return [
-                {
-                    "id": major.id,
-                    "name": major.name,
-                    "university_id": major.university_id,
-                    "university_name": major.university.name,
-                    "degree_level": major.degree_level,
-                    "teaching_language": major.teaching_language,
-                    "discipline": major.discipline,
-                    "duration_years": major.duration_years
-                }
-                for major in majors
-            ]
-        except Exception as e:
-            print(f"Error loading majors: {e}")
-            # Rollback any failed transaction to allow subsequent queries
-            try:
-                self.db.rollback()
-            except:
-                pass
-            return []
-    
-    def extract_student_profile_state(self, conversation_history: List[Dict[str, str]]) -> StudentProfileState:
+    def extract_student_profile_state(self, conversation_history: List[Dict[str, str]], catalog=None) -> StudentProfileState:
         """
         Extract and consolidate StudentProfileState from conversation history.
         ALWAYS uses LLM to infer state (not just when history is long).
@@ -902,6 +867,8 @@ CRITICAL: General Process/FAQ Questions:
         This state is NOT saved to database or cache - it's computed fresh each time from conversation history.
         For non-logged-in users, this is the ONLY way to remember context within the current chat session.
         CRITICAL: Do NOT use information from messages older than the last 12 messages.
+        
+        Pass the catalog snapshot when running this off the request thread (it then never touches self.db).
         """
         if not conversation_history:
             return StudentProfileState()
@@ -915,8 +882,8 @@ CRITICAL: General Process/FAQ Questions:
         
         # Get list of available majors from database to help LLM match user's major
         # This helps LLM understand that "Industrial automation" might match "Automation", "Control Engineering", etc.
-        available_majors = self.db_service.search_majors(limit=200)  # Get up to 200 majors for reference
-        major_list = [major.name for major in available_majors]
+        available_majors = (catalog or catalog_service.get(self.db_service)).majors[:200]  # Get up to 200 majors for reference
+        major_list = [major["name"] for major in available_majors]
         # Group by similar keywords to reduce list size for LLM
         major_list_str = ", ".join(major_list[:100])  # Limit to first 100 to avoid token limits
         if len(major_list) > 100:
@@ -1021,13 +988,15 @@ CONVERSATION:
 Return the JSON object:"""
         
         # ALWAYS call LLM extraction (not conditional on history length)
+        profile_state_stats.record_prompt('sales', 'full', len(extraction_prompt))
         try:
             response = self.openai_service.chat_completion(
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant that extracts structured information. Always return valid JSON only."},
                     {"role": "user", "content": extraction_prompt}
                 ],
-                temperature=0.1
+                temperature=0.1,
+                prompt_name="sales_profile_extraction"
             )
             
             response_text = response.choices[0].message.content if response.choices else ""
@@ -1053,56 +1022,8 @@ Return the JSON object:"""
             
             # Regex-based extraction as fallback
             if not phone and not email and not whatsapp and not wechat:
-                # Try to extract from conversation text
-                conversation_text_lower = conversation_text.lower()
-                
-                # Phone patterns
-                phone_patterns = [
-                    r'\+?\d{10,15}',  # International or local format
-                    r'phone[:\s]+([+\d\s\-\(\)]+)',
-                    r'mobile[:\s]+([+\d\s\-\(\)]+)',
-                    r'contact[:\s]+([+\d\s\-\(\)]+)',
-                ]
-                for pattern in phone_patterns:
-                    match = re.search(pattern, conversation_text, re.IGNORECASE)
-                    if match:
-                        phone = match.group(1) if match.groups() else match.group(0)
-                        phone = re.sub(r'[^\d+]', '', phone)  # Clean phone number
-                        if len(phone) >= 10:
-                            break
-                
-                # Email patterns
-                if not email:
-                    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-                    match = re.search(email_pattern, conversation_text)
-                    if match:
-                        email = match.group(0)
-                
-                # WhatsApp patterns
-                if not whatsapp:
-                    whatsapp_patterns = [
-                        r'whatsapp[:\s]+([+\d\s\-\(\)]+)',
-                        r'wa[:\s]+([+\d\s\-\(\)]+)',
-                    ]
-                    for pattern in whatsapp_patterns:
-                        match = re.search(pattern, conversation_text, re.IGNORECASE)
-                        if match:
-                            whatsapp = match.group(1) if match.groups() else match.group(0)
-                            whatsapp = re.sub(r'[^\d+]', '', whatsapp)
-                            if len(whatsapp) >= 10:
-                                break
-                
-                # WeChat patterns
-                if not wechat:
-                    wechat_patterns = [
-                        r'wechat[:\s]+([a-zA-Z0-9_\-]+)',
-                        r'weixin[:\s]+([a-zA-Z0-9_\-]+)',
-                    ]
-                    for pattern in wechat_patterns:
-                        match = re.search(pattern, conversation_text, re.IGNORECASE)
-                        if match:
-                            wechat = match.group(1) if match.groups() else match.group(0)
-                            break
+                contact = self._regex_contact_info(conversation_text)
+                phone, email, whatsapp, wechat = contact['phone'], contact['email'], contact['whatsapp'], contact['wechat']
             
             # Build StudentProfileState
             state = StudentProfileState(
@@ -1129,25 +1050,7 @@ Return the JSON object:"""
             # Post-extraction validation: Fix common extraction errors and validate major
             conversation_lower = conversation_text.lower()
             
-            # CRITICAL: Fix program_type based on degree_level
-            # If degree_level is Bachelor/Master/PhD, program_type should be "Degree", not "Language"
-            if state.degree_level in ["Bachelor", "Master", "PhD"]:
-                if state.program_type == "Language":
-                    # User wants a degree program, not language - fix it
-                    print(f"WARNING: User wants {state.degree_level} but program_type was 'Language'. Fixing: setting program_type='Degree'")
-                    state.program_type = "Degree"
-                    if state.major == "Chinese Language":
-                        # Clear Chinese Language major if they want a degree program
-                        print(f"WARNING: Clearing 'Chinese Language' major since user wants a {state.degree_level} degree program")
-                        state.major = None
-                elif state.program_type is None:
-                    # Set program_type to "Degree" if not set
-                    state.program_type = "Degree"
-            elif state.degree_level == "Language" or (state.program_type == "Language" and state.degree_level is None):
-                # User explicitly wants language program
-                state.program_type = "Language"
-                if state.degree_level is None:
-                    state.degree_level = "Language"
+            self._normalize_program_type(state)
             
             # REMOVED: Auto-fix hack for degree_level based on single words
             # Only set degree_level if explicitly extracted by LLM or provided via lead form
@@ -1164,11 +1067,7 @@ Return the JSON object:"""
                 
                 # Check if the LAST message is an informational query (asking about majors) vs stating intent to study
                 # Only check the current/last message, not the entire conversation history
-                is_info_query = any(phrase in last_user_message for phrase in [
-                    'what majors', 'which majors', 'list majors', 'show majors', 'available majors',
-                    'what programs', 'which programs', 'list programs', 'show programs', 'available programs',
-                    'what does', 'what offers', 'does offer', 'offers', 'has'
-                ])
+                is_info_query = self._is_major_info_query(last_user_message)
                 
                 if is_info_query:
                     # This is an informational query in the current message, not a statement of intent - clear major
@@ -1248,6 +1147,245 @@ Return the JSON object:"""
             # Return empty state on error
             return StudentProfileState()
     
+    def load_student_profile_state(self, conversation_history: List[Dict[str, str]], session_key: Optional[str],
+                                   catalog=None) -> StudentProfileState:
+        """
+        StudentProfileState for this turn, kept per session in the session store.
+        
+        The stored state is updated from the newest user message only (see update_student_profile_state),
+        so the extraction prompt does not grow with the conversation. The last 12 messages are re-read
+        (extract_student_profile_state) when there is no stored state, the stored state does not follow on
+        from the previous user message, or the newest message resets the topic.
+        Session-store only (never self.db), so it can run off the request thread.
+        """
+        user_messages = [msg.get('content', '') for msg in conversation_history if msg.get('role') == 'user']
+        if not settings.INCREMENTAL_PROFILE_STATE or not session_key or not user_messages:
+            profile_state_stats.record('sales', 'full', 'disabled' if not settings.INCREMENTAL_PROFILE_STATE else 'no_session')
+            return self.extract_student_profile_state(conversation_history, catalog)
+        
+        newest_message = user_messages[-1]
+        previous_message = user_messages[-2] if len(user_messages) > 1 else None
+        stored = session_store.get(self.PROFILE_STATE_NAMESPACE, session_key)
+        
+        if is_topic_reset(newest_message):
+            reason = 'topic_reset'
+        elif not stored:
+            reason = 'no_state'
+        elif previous_message is None or stored.get('last_user_message') != previous_message:
+            reason = 'discontinuous'
+        else:
+            reason = None
+        
+        if reason:
+            print(f"DEBUG: Full profile extraction ({reason})")
+            profile_state_stats.record('sales', 'full', reason)
+            state = self.extract_student_profile_state(conversation_history, catalog)
+            if state != StudentProfileState():  # Empty result (or failed call): extract in full again next turn
+                self._store_profile_state(session_key, state, newest_message)
+            else:
+                session_store.delete(self.PROFILE_STATE_NAMESPACE, session_key)
+            return state
+        
+        last_assistant_message = ""
+        for msg in reversed(conversation_history):
+            if msg.get('role') == 'assistant':
+                last_assistant_message = msg.get('content', '')
+                break
+        
+        profile_state_stats.record('sales', 'incremental')
+        state = self.update_student_profile_state(stored['state'], newest_message, last_assistant_message, catalog)
+        if state is None:
+            # Update failed: keep the previous state for this turn, the next turn re-reads the history
+            session_store.delete(self.PROFILE_STATE_NAMESPACE, session_key)
+            return stored['state']
+        self._store_profile_state(session_key, state, newest_message)
+        
+        if state.major and self._is_major_info_query(newest_message):
+            # Asking ABOUT majors: no major filter this turn (same rule as the full extraction), stored major kept
+            print(f"WARNING: User is asking about majors in the current message. Ignoring major '{state.major}' for this turn.")
+            state = replace(state, major=None)
+        return state
+    
+    def _store_profile_state(self, session_key: str, state: StudentProfileState, last_user_message: str):
+        session_store.set(self.PROFILE_STATE_NAMESPACE, session_key, {
+            'state': state,
+            'last_user_message': last_user_message,
+            'ts': time.time()
+        }, ttl_seconds=settings.SESSION_HISTORY_TTL_SECONDS)
+    
+    def update_student_profile_state(self, prev_state: StudentProfileState, user_message: str,
+                                     last_assistant_message: str = "", catalog=None) -> Optional[StudentProfileState]:
+        """
+        Apply the newest user message to prev_state (LLM returns only the fields the message sets or changes).
+        The prompt holds the state summary, the assistant's last question and at most 20 candidate majors,
+        so its size is constant however long the conversation is. Returns None if the LLM call fails.
+        """
+        # Candidate database majors sharing a word with the message (instead of the 100-major list)
+        message_words = {w for w in re.findall(r'[a-z]+', user_message.lower()) if len(w) > 3}
+        candidate_majors = []
+        if message_words:
+            for major in (catalog or catalog_service.get(self.db_service)).majors:
+                if message_words & set(re.findall(r'[a-z]+', major["name"].lower())):
+                    candidate_majors.append(major["name"])
+                    if len(candidate_majors) >= 20:
+                        break
+        
+        profile_summary = self._state_to_summary_string(prev_state)
+        for label, value in (("Age", prev_state.age), ("IELTS", prev_state.ielts_score),
+                             ("Budget per year", prev_state.budget_per_year)):
+            if value:
+                profile_summary += f"\n{label}: {value}"
+        
+        update_prompt = f"""You update a student's profile from their newest chat message.
+
+CURRENT PROFILE:
+{profile_summary}
+
+ASSISTANT'S PREVIOUS MESSAGE: {last_assistant_message[:400]}
+STUDENT'S NEWEST MESSAGE: {user_message}
+
+Output a JSON object with ONLY the fields the newest message sets or changes (omit every other field; use null only when the student withdraws a value):
+- degree_level: "Bachelor", "Master", "PhD" or "Language"
+- major: subject the student wants to STUDY (not one they ask about). Use the closest database major below, else the student's wording
+- program_type: "Degree" or "Language"
+- city, province: Chinese city / province where they want to study
+- nationality: country the student is from (only if explicitly stated)
+- intake_term: "March", "September" or "Other"; intake_year: number
+- age, ielts_score, budget_per_year: numbers
+- preferred_universities: array of China universities they want to study at (NOT their current/previous university)
+- university_certainty: "certain" or "uncertain"
+- phone, email, whatsapp, wechat, name
+
+RULES:
+- The newest message wins over the current profile. A short answer ("Bangladesh", "March") answers the assistant's question.
+- Degree levels: "masters" -> "Master", "bsc"/"bachelor's" -> "Bachelor", "doctorate" -> "PhD".
+- Do NOT infer nationality from "study in China". Do NOT invent a major from a degree level alone.
+
+DATABASE MAJORS SIMILAR TO THE MESSAGE: {", ".join(candidate_majors) or "none"}
+
+Return the JSON object:"""
+        profile_state_stats.record_prompt('sales', 'incremental', len(update_prompt))
+        
+        try:
+            response = self.openai_service.chat_completion(
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that extracts structured information. Always return valid JSON only."},
+                    {"role": "user", "content": update_prompt}
+                ],
+                temperature=0.1,
+                prompt_name="sales_profile_update"
+            )
+            response_text = response.choices[0].message.content if response.choices else ""
+            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+            changes = json.loads(json_match.group() if json_match else response_text)
+        except Exception as e:
+            print(f"Error updating state: {e}")
+            return None
+        
+        state = replace(prev_state, preferred_universities=list(prev_state.preferred_universities))
+        for field_name, value in changes.items():
+            if field_name not in self._PROFILE_FIELDS:
+                continue
+            if field_name == 'preferred_universities':
+                value = value or []
+            setattr(state, field_name, value)
+        
+        # Contact details the LLM missed
+        contact = self._regex_contact_info(user_message)
+        for field_name, value in contact.items():
+            if value and not getattr(state, field_name):
+                setattr(state, field_name, value)
+        
+        if 'degree_level' in changes or 'program_type' in changes:
+            self._normalize_program_type(state)
+        if 'march' in user_message.lower() and state.intake_term is None:
+            state.intake_term = "March"
+        
+        print(f"DEBUG: Updated StudentProfileState from newest message (changed: {sorted(changes)}): major={state.major}, degree_level={state.degree_level}, nationality={state.nationality}, city={state.city}, intake_term={state.intake_term}")
+        return state
+    
+    def _regex_contact_info(self, text: str) -> Dict[str, Optional[str]]:
+        """Phone / email / WhatsApp / WeChat found in text by regex (fallback when the LLM misses them)"""
+        phone = email = whatsapp = wechat = None
+        
+        # Phone patterns
+        phone_patterns = [
+            r'\+?\d{10,15}',  # International or local format
+            r'phone[:\s]+([+\d\s\-\(\)]+)',
+            r'mobile[:\s]+([+\d\s\-\(\)]+)',
+            r'contact[:\s]+([+\d\s\-\(\)]+)',
+        ]
+        for pattern in phone_patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                phone = match.group(1) if match.groups() else match.group(0)
+                phone = re.sub(r'[^\d+]', '', phone)  # Clean phone number
+                if len(phone) >= 10:
+                    break
+        
+        # Email patterns
+        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+        match = re.search(email_pattern, text)
+        if match:
+            email = match.group(0)
+        
+        # WhatsApp patterns
+        whatsapp_patterns = [
+            r'whatsapp[:\s]+([+\d\s\-\(\)]+)',
+            r'wa[:\s]+([+\d\s\-\(\)]+)',
+        ]
+        for pattern in whatsapp_patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                whatsapp = match.group(1) if match.groups() else match.group(0)
+                whatsapp = re.sub(r'[^\d+]', '', whatsapp)
+                if len(whatsapp) >= 10:
+                    break
+        
+        # WeChat patterns
+        wechat_patterns = [
+            r'wechat[:\s]+([a-zA-Z0-9_\-]+)',
+            r'weixin[:\s]+([a-zA-Z0-9_\-]+)',
+        ]
+        for pattern in wechat_patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                wechat = match.group(1) if match.groups() else match.group(0)
+                break
+        
+        return {'phone': phone, 'email': email, 'whatsapp': whatsapp, 'wechat': wechat}
+    
+    def _normalize_program_type(self, state: StudentProfileState):
+        """CRITICAL: Fix program_type based on degree_level (in place)"""
+        # If degree_level is Bachelor/Master/PhD, program_type should be "Degree", not "Language"
+        if state.degree_level in ["Bachelor", "Master", "PhD"]:
+            if state.program_type == "Language":
+                # User wants a degree program, not language - fix it
+                print(f"WARNING: User wants {state.degree_level} but program_type was 'Language'. Fixing: setting program_type='Degree'")
+                state.program_type = "Degree"
+                if state.major == "Chinese Language":
+                    # Clear Chinese Language major if they want a degree program
+                    print(f"WARNING: Clearing 'Chinese Language' major since user wants a {state.degree_level} degree program")
+                    state.major = None
+            elif state.program_type is None:
+                # Set program_type to "Degree" if not set
+                state.program_type = "Degree"
+        elif state.degree_level == "Language" or (state.program_type == "Language" and state.degree_level is None):
+            # User explicitly wants language program
+            state.program_type = "Language"
+            if state.degree_level is None:
+                state.degree_level = "Language"
+    
+    @staticmethod
+    def _is_major_info_query(message: str) -> bool:
+        """User is asking about majors/programs rather than stating what they want to study"""
+        message_lower = message.lower()
+        return any(phrase in message_lower for phrase in [
+            'what majors', 'which majors', 'list majors', 'show majors', 'available majors',
+            'what programs', 'which programs', 'list programs', 'show programs', 'available programs',
+            'what does', 'what offers', 'does offer', 'offers', 'has'
+        ])
+    
     def _state_to_summary_string(self, state: StudentProfileState) -> str:
         """
         Convert StudentProfileState to a compact summary string for system prompt.
@@ -1564,14 +1702,17 @@ Return the JSON object:"""
         user_input_clean = re.sub(r'[^\w\s&]', '', user_input.lower().strip())
         user_input_words = set(user_input_clean.split())
         
-        # Use pre-loaded majors array instead of querying database
+        # Score only the top candidates from the catalog match index (partner majors)
         # Filter by university_id and degree_level if provided
-        all_majors = self.all_majors
-        if university_id:
-            all_majors = [m for m in all_majors if m["university_id"] == university_id]
-        if degree_level:
+        def in_scope(m: Dict[str, Any]) -> bool:
+            if university_id and m["university_id"] != university_id:
+                return False
             # Filter by degree level if provided
-            all_majors = [m for m in all_majors if m.get("degree_level") and degree_level.lower() in m["degree_level"].lower()]
+            return not degree_level or bool(m.get("degree_level") and degree_level.lower() in m["degree_level"].lower())
+        # Acronyms ("cse", "B.B.A.") are also looked up by their expansion, like PartnerAgent does
+        all_majors = catalog_service.get_match_index(self.db_service).major_candidates(
+            user_input, expand_major_acronym(user_input), limit=30, partner_only=True, predicate=in_scope
+        )
         
         # Calculate similarity scores with multiple strategies
         matches = []
@@ -2179,6 +2320,225 @@ Return the JSON object:"""
         # All important fields collected
         return None
     
+    def _csca_search_query(self, user_message: str) -> str:
+        """Comprehensive RAG search query for CSCA/CSC/Chinese Government Scholarship questions"""
+        user_lower = user_message.lower()
+        csca_search_query = "CSCA China Scholastic Competency Assessment Chinese Government Scholarship CSC undergraduate bachelor 2026 2027"
+        
+        # Add specific terms based on user question
+        if any(term in user_lower for term in ['master', 'masters', 'phd', 'doctorate']):
+            csca_search_query += " masters phd not required"
+        if any(term in user_lower for term in ['scholarship', 'csc', 'chinese government']):
+            csca_search_query += " scholarship application process requirements"
+        if any(term in user_lower for term in ['exam', 'test', 'registration', 'fee']):
+            csca_search_query += " exam schedule registration fee"
+        return csca_search_query
+    
+    def _match_faq(self, user_message: str) -> Tuple[Optional[Dict[str, str]], float]:
+        """FAQService match for a general FAQ question, rejected unless semantically relevant"""
+        faq_match = None
+        faq_score = 0.0
+        if self.faq_service:
+            should_try_faq = self.faq_service._should_try_faq_match(user_message)
+            if should_try_faq:
+                faq_match, faq_score = self.faq_service.match(user_message, threshold=0.62)
+            if not faq_match:
+                faq_match, faq_score = self.faq_service.match(user_message, threshold=0.55)
+
+        # Validate FAQ match is semantically relevant
+        if faq_match:
+            # Extract key semantic words from user question and matched FAQ
+            user_lower = user_message.lower()
+            matched_question_lower = faq_match['question'].lower()
+            matched_answer_lower = faq_match['answer'].lower()
+
+            # Extract meaningful semantic keywords (exclude common stopwords)
+            stopwords = {'what', 'are', 'the', 'your', 'that', 'this', 'with', 'from', 'china', 'chinese', 
+                       'how', 'do', 'you', 'is', 'in', 'for', 'and', 'or', 'to', 'a', 'an', 'of', 'on', 'at',
+                       'monthly', 'average', 'per', 'month', 'depending', 'city', 'lifestyle'}
+            user_keywords = set([w for w in user_lower.split() if len(w) > 3 and w not in stopwords])
+            matched_keywords = set([w for w in matched_question_lower.split() if len(w) > 3 and w not in stopwords])
+            matched_answer_keywords = set([w for w in matched_answer_lower.split() if len(w) > 3 and w not in stopwords])
+
+            # Check semantic overlap
+            semantic_overlap = user_keywords.intersection(matched_keywords)
+            answer_overlap = user_keywords.intersection(matched_answer_keywords)
+            total_overlap = semantic_overlap.union(answer_overlap)
+
+            # For low scores, require meaningful semantic overlap
+            # "travel options" should NOT match "living cost" - they share no semantic keywords
+            if faq_score < 0.60:
+                if not total_overlap:  # Require at least 1 matching keyword in question OR answer
+                    print(f"DEBUG: FAQ match rejected - low score ({faq_score:.2f}) and no semantic overlap. User: '{user_message}' -> Matched: '{faq_match['question']}'. User keywords: {user_keywords}, Matched keywords: {matched_keywords}")
+                    faq_match = None
+                    faq_score = 0.0
+                elif faq_score < 0.58 and len(total_overlap) < 2:
+                    # For very low scores, require at least 2 matching keywords
+                    print(f"DEBUG: FAQ match rejected - very low score ({faq_score:.2f}) and insufficient semantic overlap ({len(total_overlap)} matches). User: '{user_message}' -> Matched: '{faq_match['question']}'")
+                    faq_match = None
+                    faq_score = 0.0
+        
+        return faq_match, faq_score
+    
+    def _speculate_retrieval(self, user_message: str, stages: TurnStages) -> Optional[Dict[str, Any]]:
+        """
+        Prefetch what the CSCA / general FAQ branches need while the profile extraction stage runs.
+        
+        The message is classified against an empty profile. CSCA routing never depends on the profile,
+        general FAQ routing only through program context, so the guess is usually the final route.
+        Query embeddings run as stages; the FAQ match, response cache lookup and RAG retrieval
+        (which use self.db) run on this thread. Stops early, cancelling the remaining stages, once the
+        extraction has finished and the real route already differs. Results are only used by
+        generate_response if the real classification matches (see _take_speculation).
+        """
+        guess = self.classify_query(user_message, StudentProfileState())
+        intent = guess['intent']
+        if intent not in ('csca', 'general_faq'):
+            return None
+        
+        started_at = time.monotonic()
+        doc_type, audience = guess['doc_type'], guess['audience']
+        speculation = {'intent': intent, 'doc_type': doc_type, 'audience': audience}
+        search_query = self._csca_search_query(user_message) if intent == 'csca' else user_message
+        speculation_stats.record_started()
+        print(f"DEBUG: Speculating on route intent={intent}, doc_type={doc_type} while the profile is extracted")
+        
+        stages.start('embed_message', self.rag_service.embed_query, user_message)
+        if search_query != user_message:
+            stages.start('embed_search', self.rag_service.embed_query, search_query)
+        
+        def abandon() -> Dict[str, Any]:
+            cancelled = sum(1 for name in ('embed_message', 'embed_search') if stages.cancel(name))
+            speculation_stats.record_abandoned(cancelled)
+            print(f"DEBUG: Speculative route {intent} abandoned (profile changes the route, {cancelled} stages cancelled)")
+            return {**speculation, 'abandoned': True}
+        
+        try:
+            if intent == 'general_faq':
+                speculation['faq'] = self._match_faq(user_message)
+                if speculation['faq'][0]:
+                    # The FAQ answer is used as-is: no cache lookup or retrieval needed
+                    stages.cancel('embed_message')
+                    stages.cancel('embed_search')
+                    speculation['seconds'] = time.monotonic() - started_at
+                    return speculation
+            
+            stages.join('embed_message')  # _response_cache_key then hits the embedding cache
+            if self._speculation_overtaken(user_message, speculation, stages):
+                return abandon()
+            cache_key = self._response_cache_key(user_message, doc_type)
+            speculation['cache_key'] = cache_key
+            speculation['cached'] = self._get_cached_answer(cache_key, doc_type, audience)
+            
+            if not speculation['cached']:
+                if stages.started('embed_search'):
+                    stages.join('embed_search')
+                if self._speculation_overtaken(user_message, speculation, stages):
+                    return abandon()
+                try:
+                    speculation['rag_results'] = self.rag_service.retrieve(
+                        self.db, search_query, doc_type=doc_type, audience=audience, top_k=4
+                    )
+                except Exception as e:
+                    # Not prefetched: the branch retries the retrieval and handles the error itself
+                    print(f"DEBUG: Speculative RAG retrieval failed: {e}")
+                    try:
+                        self.db.rollback()
+                    except:
+                        pass
+        except Exception as e:
+            print(f"DEBUG: Speculative prefetch failed: {e}")
+        
+        speculation['seconds'] = time.monotonic() - started_at
+        return speculation
+    
+    def _speculation_overtaken(self, user_message: str, speculation: Dict[str, Any], stages: TurnStages) -> bool:
+        """True if the extraction stage has finished and its profile routes the message elsewhere"""
+        if not stages.done('extract_state'):
+            return False
+        try:
+            student_state = stages.join('extract_state')
+        except Exception:
+            return False  # generate_response handles the extraction error
+        return not self._speculation_matches(speculation, self.classify_query(user_message, student_state))
+    
+    @staticmethod
+    def _speculation_matches(speculation: Dict[str, Any], query_classification: Dict[str, Any]) -> bool:
+        return (
+            speculation['intent'] == query_classification['intent'] and
+            speculation['doc_type'] == query_classification.get('doc_type') and
+            speculation['audience'] == query_classification.get('audience')
+        )
+    
+    def _take_speculation(self, speculation: Optional[Dict[str, Any]], query_classification: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Prefetched results if the speculative route is the real one, else None (discarded)"""
+        if not speculation or speculation.get('abandoned'):
+            return None
+        if not self._speculation_matches(speculation, query_classification):
+            speculation_stats.record_discarded()
+            print(f"DEBUG: Speculative route {speculation['intent']} discarded (real intent={query_classification['intent']})")
+            return None
+        speculation_stats.record_used(speculation.get('seconds', 0.0))
+        return speculation
+    
+    def _response_cache_key(self, user_message: str, doc_type: str) -> Optional[Tuple[List[float], str]]:
+        """(query embedding, corpus version) for the semantic response cache, or None if not cacheable"""
+        if not settings.RESPONSE_CACHE_ENABLED or not is_profile_independent(user_message):
+            return None
+        try:
+            embedding = self.rag_service.embed_query(user_message)
+            if not embedding:
+                return None
+            return embedding, response_cache.corpus_version(self.db, doc_type)
+        except Exception as e:
+            print(f"Response cache key failed: {e}")
+            try:
+                self.db.rollback()
+            except:
+                pass
+            return None
+    
+    def _get_cached_answer(self, cache_key, doc_type: str, audience: Optional[str]) -> Optional[Dict[str, Any]]:
+        if cache_key is None:
+            return None
+        try:
+            cached = response_cache.get(cache_key[0], doc_type, audience, cache_key[1])
+        except Exception as e:
+            print(f"Response cache lookup failed: {e}")
+            return None
+        if cached:
+            print(f"DEBUG: Response cache hit (doc_type={doc_type}, similarity={cached['similarity']:.3f})")
+        return cached
+    
+    def _store_cached_answer(self, cache_key, doc_type: str, audience: Optional[str], answer: str, rag_context: Optional[str]):
+        if cache_key is None or not isinstance(answer, str) or not answer:
+            return
+        try:
+            response_cache.set(cache_key[0], doc_type, audience, cache_key[1], answer, rag_context)
+        except Exception as e:
+            print(f"Response cache store failed: {e}")
+    
+    def _csca_answer_response(self, answer: str, rag_context: Optional[str], student_state: StudentProfileState,
+                              lead_collected: bool) -> Dict[str, Any]:
+        """Result for a RAG-based CSCA answer, with a CSCA lead question unless the answer already asks for details"""
+        already_asks_for_info = any(term in answer.lower() for term in [
+            'nationality', 'major', 'degree level', 'scholarship category', 'university'
+        ])
+        if not already_asks_for_info:
+            lead_question = self._build_csca_lead_question(student_state)
+            if lead_question:
+                answer = answer + f"\n\n{lead_question}"
+        
+        return {
+            'response': answer,
+            'db_context': '',
+            'rag_context': rag_context,
+            'tavily_context': None,
+            'lead_collected': lead_collected,
+            'show_lead_form': False,
+            'lead_form_prefill': {}
+        }
+    
     def _provide_csca_fallback_answer(self, user_message: str) -> str:
         """Provide short practical CSCA fallback answer when RAG context is empty or low confidence"""
         user_lower = user_message.lower()
@@ -2751,6 +3111,29 @@ Would you like to know about accommodation at a specific university or city?"""
         
         return "\n".join(response_parts)
     
+    def generate_response_stream(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]],
+        device_fingerprint: Optional[str] = None,
+        chat_session_id: Optional[str] = None,
+        use_db: bool = False
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Streaming variant of generate_response.
+        Yields ("delta", text) while the final answer call is generating, then ("result", dict)
+        with the same dict generate_response returns (see app/services/response_stream.py).
+        """
+        return stream_agent_turn(
+            self,
+            self.generate_response,
+            user_message=user_message,
+            conversation_history=conversation_history,
+            device_fingerprint=device_fingerprint,
+            chat_session_id=chat_session_id,
+            use_db=use_db
+        )
+    
     def generate_response(
         self,
         user_message: str,
@@ -2936,9 +3319,21 @@ Would you like to know about accommodation at a specific university or city?"""
         print(f"current user_message: {user_message[:100]}...")
         print(f"{'='*80}\n")
         
-        # Step 0: Extract StudentProfileState from conversation history (ONLY last 12 messages - ignore older history)
+        # Step 0: StudentProfileState - kept per session and updated from the newest message; the last 12
+        # messages are only re-read on topic resets or a missing/stale state (see load_student_profile_state)
+        # The extraction LLM call runs as a turn stage while this thread prefetches the FAQ match /
+        # cached answer / RAG chunks for the route the message most likely takes (see _speculate_retrieval)
         conversation_slice = conversation_history[-12:] if conversation_history else []
-        student_state = self.extract_student_profile_state(conversation_slice)
+        profile_key = chat_session_id or (f"fp:{device_fingerprint}" if device_fingerprint else None)
+        speculation = None
+        if settings.SALES_SPECULATIVE_RETRIEVAL and conversation_slice:
+            with TurnStages() as stages:
+                stages.start('extract_state', self.load_student_profile_state, conversation_slice,
+                             profile_key, catalog_service.get(self.db_service))
+                speculation = self._speculate_retrieval(user_message, stages)
+                student_state = stages.join('extract_state')
+        else:
+            student_state = self.load_student_profile_state(conversation_slice, profile_key)
         
         # Step 0.1: Apply deterministic intake year inference (A)
         if not student_state.intake_year and student_state.intake_term:
@@ -3116,23 +3511,29 @@ Would you like to know about accommodation at a specific university or city?"""
         
         print(f"DEBUG: Query classification - intent={intent}, doc_type={doc_type}, audience={audience}, needs_db={needs_db}, needs_csca_rag={needs_csca_rag}, needs_general_rag={needs_general_rag}, needs_web={needs_web}")
         
+        # Step 0.85: Results prefetched in Step 0 are only valid for the route they were guessed for
+        prefetched = self._take_speculation(speculation, query_classification)
+        
         # Priority 1: CSCA/CSC/Chinese Government Scholarship questions - RAG only (strict rule)
         if intent == 'csca' and needs_csca_rag:
             try:
-                # Build comprehensive search query for CSCA/CSC/Chinese Government Scholarship
                 user_lower = user_message.lower()
-                csca_search_query = "CSCA China Scholastic Competency Assessment Chinese Government Scholarship CSC undergraduate bachelor 2026 2027"
+                csca_search_query = self._csca_search_query(user_message)
                 
-                # Add specific terms based on user question
-                if any(term in user_lower for term in ['master', 'masters', 'phd', 'doctorate']):
-                    csca_search_query += " masters phd not required"
-                if any(term in user_lower for term in ['scholarship', 'csc', 'chinese government']):
-                    csca_search_query += " scholarship application process requirements"
-                if any(term in user_lower for term in ['exam', 'test', 'registration', 'fee']):
-                    csca_search_query += " exam schedule registration fee"
+                # Same question answered recently (answer does not depend on the profile)
+                if prefetched and 'cached' in prefetched:
+                    cache_key, cached = prefetched['cache_key'], prefetched['cached']
+                else:
+                    cache_key = self._response_cache_key(user_message, 'csca')
+                    cached = self._get_cached_answer(cache_key, 'csca', audience)
+                if cached:
+                    return self._csca_answer_response(cached['answer'], cached['rag_context'], student_state, lead_collected)
                 
                 # Use filtered retrieval with doc_type='csca'
-                rag_results = self.rag_service.retrieve(self.db, csca_search_query, doc_type='csca', audience=audience, top_k=4)
+                if prefetched and 'rag_results' in prefetched:
+                    rag_results = prefetched['rag_results']
+                else:
+                    rag_results = self.rag_service.retrieve(self.db, csca_search_query, doc_type='csca', audience=audience, top_k=4)
                 
                 if rag_results:
                     rag_context = self.rag_service.format_rag_context(rag_results)
@@ -3211,22 +3612,10 @@ Answer the question naturally and conversationally. Use the information provided
                             tavily_context = None
                             try:
                                 allowed_domains = ["malishaedu.com", "gov.cn", "csc.edu.cn", "chineseembassy.org"]
-                                all_tavily_results = []
-                                
-                                for domain in allowed_domains:
-                                    try:
-                                        tavily_query = f"{user_message} site:{domain}"
-                                        domain_results = self.tavily_service.search(tavily_query, max_results=2)
-                                        filtered_results = [
-                                            r for r in domain_results 
-                                            if domain in r.get('url', '').lower()
-                                        ]
-                                        all_tavily_results.extend(filtered_results)
-                                        if len(all_tavily_results) >= 3:
-                                            break
-                                    except Exception as e:
-                                        print(f"DEBUG: Tavily search for {domain} failed: {e}")
-                                        continue
+                                # Per-domain searches run concurrently; results are filtered to their domain
+                                all_tavily_results = self.tavily_service.search_domains(
+                                    user_message, allowed_domains, max_results=2, max_total=3
+                                )
                                 
                                 if all_tavily_results and len(all_tavily_results) > 0:
                                     all_tavily_results = all_tavily_results[:3]
@@ -3250,11 +3639,10 @@ User question: {user_message}
 
 Please answer the question using the information from the web search results above."""
                                     
-                                    response = self.openai_service.chat_completion([
+                                    answer = self.openai_service.chat_completion_text([
                                         {"role": "system", "content": system_prompt},
                                         {"role": "user", "content": user_prompt}
-                                    ])
-                                    answer = response.choices[0].message.content
+                                    ], on_delta=self.stream_handler)
                                     print(f"DEBUG: Tavily provided answer for CSCA question")
                                     return {
                                         'response': answer,
@@ -3285,25 +3673,9 @@ Please answer the question using the information from the web search results abo
                             'lead_form_prefill': {}
                         }
                     
-                    # Answer is good - add CSCA-specific lead question if needed
-                    # Check if answer already asks for lead info
-                    already_asks_for_info = any(term in answer.lower() for term in [
-                        'nationality', 'major', 'degree level', 'scholarship category', 'university'
-                    ])
-                    if not already_asks_for_info:
-                        lead_question = self._build_csca_lead_question(student_state)
-                        if lead_question:
-                            answer = answer + f"\n\n{lead_question}"
-                    
-                    return {
-                        'response': answer,
-                        'db_context': '',
-                        'rag_context': rag_context,
-                        'tavily_context': None,
-                        'lead_collected': lead_collected,
-                        'show_lead_form': False,
-                        'lead_form_prefill': {}
-                    }
+                    # Answer is good - cache it and add CSCA-specific lead question if needed
+                    self._store_cached_answer(cache_key, 'csca', audience, answer, rag_context)
+                    return self._csca_answer_response(answer, rag_context, student_state, lead_collected)
                 else:
                     # No RAG results found - try Tavily as fallback for CSCA questions
                     # Use Tavily for: 1) latest rules explicitly asked, OR 2) general CSCA questions not in RAG
@@ -3341,23 +3713,10 @@ Please answer the question using the information from the web search results abo
                         # Restrict Tavily search to MalishaEdu and government sites using site: operator
                         # Try multiple searches for different domains
                         allowed_domains = ["malishaedu.com", "gov.cn", "csc.edu.cn", "chineseembassy.org"]
-                        all_tavily_results = []
-                        
-                        for domain in allowed_domains:
-                            try:
-                                tavily_query = f"{user_message} site:{domain}"
-                                domain_results = self.tavily_service.search(tavily_query, max_results=2)
-                                # Filter to ensure results are from the correct domain
-                                filtered_results = [
-                                    r for r in domain_results 
-                                    if domain in r.get('url', '').lower()
-                                ]
-                                all_tavily_results.extend(filtered_results)
-                                if len(all_tavily_results) >= 3:
-                                    break
-                            except Exception as e:
-                                print(f"DEBUG: Tavily search for {domain} failed: {e}")
-                                continue
+                        # Per-domain searches run concurrently; results are filtered to their domain
+                        all_tavily_results = self.tavily_service.search_domains(
+                            user_message, allowed_domains, max_results=2, max_total=3
+                        )
                         
                         if all_tavily_results and len(all_tavily_results) > 0:
                             # Limit to top 3 results
@@ -3387,11 +3746,10 @@ User question: {user_message}
 Please answer the question using the information from the web search results above. If the information is not sufficient, ask for the user's nationality, major, and intake preferences."""
                         
                         try:
-                            response = self.openai_service.chat_completion([
+                            answer = self.openai_service.chat_completion_text([
                                 {"role": "system", "content": system_prompt},
                                 {"role": "user", "content": user_prompt}
-                            ])
-                            answer = response.choices[0].message.content
+                            ], on_delta=self.stream_handler)
                             
                             # Add lead question if not already present
                             if "nationality" not in answer.lower() and "major" not in answer.lower():
@@ -3442,47 +3800,10 @@ Please answer the question using the information from the web search results abo
         # Priority 2: General FAQ questions - FAQService first, then RAG
         if intent == 'general_faq' and not needs_db:
             # Try FAQService match first
-            faq_match = None
-            faq_score = 0.0
-            if self.faq_service:
-                should_try_faq = self.faq_service._should_try_faq_match(user_message)
-                if should_try_faq:
-                    faq_match, faq_score = self.faq_service.match(user_message, threshold=0.62)
-                if not faq_match:
-                    faq_match, faq_score = self.faq_service.match(user_message, threshold=0.55)
-            
-            # Validate FAQ match is semantically relevant
-            if faq_match:
-                # Extract key semantic words from user question and matched FAQ
-                user_lower = user_message.lower()
-                matched_question_lower = faq_match['question'].lower()
-                matched_answer_lower = faq_match['answer'].lower()
-                
-                # Extract meaningful semantic keywords (exclude common stopwords)
-                stopwords = {'what', 'are', 'the', 'your', 'that', 'this', 'with', 'from', 'china', 'chinese', 
-                           'how', 'do', 'you', 'is', 'in', 'for', 'and', 'or', 'to', 'a', 'an', 'of', 'on', 'at',
-                           'monthly', 'average', 'per', 'month', 'depending', 'city', 'lifestyle'}
-                user_keywords = set([w for w in user_lower.split() if len(w) > 3 and w not in stopwords])
-                matched_keywords = set([w for w in matched_question_lower.split() if len(w) > 3 and w not in stopwords])
-                matched_answer_keywords = set([w for w in matched_answer_lower.split() if len(w) > 3 and w not in stopwords])
-                
-                # Check semantic overlap
-                semantic_overlap = user_keywords.intersection(matched_keywords)
-                answer_overlap = user_keywords.intersection(matched_answer_keywords)
-                total_overlap = semantic_overlap.union(answer_overlap)
-                
-                # For low scores, require meaningful semantic overlap
-                # "travel options" should NOT match "living cost" - they share no semantic keywords
-                if faq_score < 0.60:
-                    if not total_overlap:  # Require at least 1 matching keyword in question OR answer
-                        print(f"DEBUG: FAQ match rejected - low score ({faq_score:.2f}) and no semantic overlap. User: '{user_message}' -> Matched: '{faq_match['question']}'. User keywords: {user_keywords}, Matched keywords: {matched_keywords}")
-                        faq_match = None
-                        faq_score = 0.0
-                    elif faq_score < 0.58 and len(total_overlap) < 2:
-                        # For very low scores, require at least 2 matching keywords
-                        print(f"DEBUG: FAQ match rejected - very low score ({faq_score:.2f}) and insufficient semantic overlap ({len(total_overlap)} matches). User: '{user_message}' -> Matched: '{faq_match['question']}'")
-                        faq_match = None
-                        faq_score = 0.0
+            if prefetched and 'faq' in prefetched:
+                faq_match, faq_score = prefetched['faq']
+            else:
+                faq_match, faq_score = self._match_faq(user_message)
             
             # If FAQ match found and validated, use it
             if faq_match:
@@ -3511,15 +3832,32 @@ Please answer the question using the information from the web search results abo
             # If no FAQ match but needs_general_rag, try RAG from answer bank
             if needs_general_rag:
                 try:
-                    rag_results = self.rag_service.retrieve(self.db, user_message, doc_type=doc_type, audience=audience, top_k=4)
-                    if rag_results:
-                        rag_context = self.rag_service.format_rag_context(rag_results)
-                        # Generate concise answer using RAG
-                        response = self.openai_service.chat_completion([
-                            {"role": "system", "content": "You are a helpful assistant. Answer the question using ONLY the provided context. Be concise and engaging. Do NOT invent facts not in the context. For general process questions, provide general answers that apply to ALL degree levels, not just one specific degree level."},
-                            {"role": "user", "content": f"Context:\n{rag_context}\n\nUser question: {user_message}\n\nAnswer concisely using only the context above."}
-                        ])
-                        answer = response.choices[0].message.content
+                    # Same question answered recently (answer does not depend on the profile)
+                    if prefetched and 'cached' in prefetched:
+                        cache_key, cached = prefetched['cache_key'], prefetched['cached']
+                    else:
+                        cache_key = self._response_cache_key(user_message, doc_type)
+                        cached = self._get_cached_answer(cache_key, doc_type, audience)
+                    if cached:
+                        rag_results = None
+                    elif prefetched and 'rag_results' in prefetched:
+                        rag_results = prefetched['rag_results']
+                    else:
+                        rag_results = self.rag_service.retrieve(self.db, user_message, doc_type=doc_type, audience=audience, top_k=4)
+                    if cached or rag_results:
+                        if cached:
+                            rag_context = cached['rag_context']
+                            answer = cached['answer']
+                            if self.stream_handler:
+                                self.stream_handler(answer)
+                        else:
+                            rag_context = self.rag_service.format_rag_context(rag_results)
+                            # Generate concise answer using RAG
+                            answer = self.openai_service.chat_completion_text([
+                                {"role": "system", "content": "You are a helpful assistant. Answer the question using ONLY the provided context. Be concise and engaging. Do NOT invent facts not in the context. For general process questions, provide general answers that apply to ALL degree levels, not just one specific degree level."},
+                                {"role": "user", "content": f"Context:\n{rag_context}\n\nUser question: {user_message}\n\nAnswer concisely using only the context above."}
+                            ], on_delta=self.stream_handler)
+                            self._store_cached_answer(cache_key, doc_type, audience, answer, rag_context)
                         # Skip lead question for general process/FAQ questions
                         is_general_process_question = any(phrase in user_message.lower() for phrase in [
                             'how do you handle', 'how does', 'what is the process', 'what is the procedure',
@@ -3570,11 +3908,10 @@ Please answer the question using the information from the web search results abo
                                     )
                                     if tavily_results:
                                         tavily_context = self.tavily_service.format_search_results(tavily_results)
-                                        response = self.openai_service.chat_completion([
+                                        answer = self.openai_service.chat_completion_text([
                                             {"role": "system", "content": "You are a helpful assistant. Answer the question using the provided web search results. Be concise and informative. If the results don't fully answer the question, provide a helpful general answer based on common knowledge about studying in China."},
                                             {"role": "user", "content": f"Web search results:\n{tavily_context}\n\nUser question: {user_message}\n\nAnswer concisely."}
-                                        ])
-                                        answer = response.choices[0].message.content
+                                        ], on_delta=self.stream_handler)
                                         # Don't ask for lead info for general knowledge questions
                                         return {
                                             'response': answer,
@@ -3670,11 +4007,10 @@ Please answer the question using the information from the web search results abo
                         tavily_context = self.tavily_service.format_search_results(tavily_results)
                         print(f"DEBUG: Tavily returned {len(tavily_results)} results")
                         # Generate answer using Tavily context
-                        response = self.openai_service.chat_completion([
+                        answer = self.openai_service.chat_completion_text([
                             {"role": "system", "content": "Answer using ONLY the provided web search results. Be concise."},
                             {"role": "user", "content": f"Web search results:\n{tavily_context}\n\nUser question: {user_message}\n\nAnswer concisely."}
-                        ])
-                        answer = response.choices[0].message.content
+                        ], on_delta=self.stream_handler)
                         lead_question = self._build_single_lead_question(student_state, audience=audience)
                         response_text = answer + (f"\n\n{lead_question}" if lead_question else "")
                         return {
@@ -4243,11 +4579,11 @@ Please answer the question using the information from the web search results abo
         full_context = "\n\n".join(context_parts) if context_parts else None
         
         # Step 5: Generate response with OpenAI
-        # Add current date awareness to system prompt
-        current_date_instruction = f"\n\nCURRENT DATE: Today is {current_date_str} (Year: {current_year}, Month: {current_month}). When suggesting intake years or deadlines, ALWAYS use FUTURE dates relative to this date. If user says 'this march' or 'next march', calculate based on the current date. NEVER suggest past dates (e.g., if it's December 2025, do NOT suggest March 2024)."
-        system_prompt_with_date = self.SALES_SYSTEM_PROMPT + current_date_instruction
+        # SALES_SYSTEM_PROMPT goes first and unchanged (byte-stable prefix for prompt caching);
+        # the current date and everything per-turn follow it
+        current_date_instruction = f"CURRENT DATE: Today is {current_date_str} (Year: {current_year}, Month: {current_month}). When suggesting intake years or deadlines, ALWAYS use FUTURE dates relative to this date. If user says 'this march' or 'next march', calculate based on the current date. NEVER suggest past dates (e.g., if it's December 2025, do NOT suggest March 2024)."
         messages = [
-            {"role": "system", "content": system_prompt_with_date}
+            {"role": "system", "content": self.SALES_SYSTEM_PROMPT}
         ]
         
         # Add anonymous user instruction if use_db=False
@@ -4266,6 +4602,8 @@ Please answer the question using the information from the web search results abo
         
         missing_summary = ", ".join(missing_fields) if missing_fields else "None"
         
+        messages.append({"role": "system", "content": current_date_instruction})
+        
         dynamic_profile_instruction = f"""The following student profile state has been extracted from the conversation (this is authoritative):
 
 {profile_summary}
@@ -4574,12 +4912,16 @@ REMEMBER: Base all concrete fees, deadlines, and program details ONLY on DATABAS
         # Add current user message
         messages.append({"role": "user", "content": user_message})
         
-        # Generate response
-        response = self.openai_service.chat_completion(messages)
-        answer = response.choices[0].message.content
+        # Generate response (only streamed when no reflection pass will rewrite it)
+        needs_reflection = any(keyword in user_message.lower() for keyword in ['scholarship', 'fee', 'tuition', 'requirement', 'deadline', 'csca'])
+        answer = self.openai_service.chat_completion_text(
+            messages,
+            on_delta=None if needs_reflection else self.stream_handler,
+            prompt_name="sales_answer"
+        )
         
         # Step 6: Reflection - improve answer if important
-        if any(keyword in user_message.lower() for keyword in ['scholarship', 'fee', 'tuition', 'requirement', 'deadline', 'csca']):
+        if needs_reflection:
             improved_answer = self.openai_service.reflect_and_improve(
                 answer,
                 db_context or "",
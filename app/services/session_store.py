@@ -0,0 +1,289 @@
+"""
+SessionStore - shared conversation/session state backend
+
+Chat history (app/routers/chat.py) and PartnerAgent's per-conversation caches (query state,
+pending clarifications, pagination) live here instead of module-level dicts, so memory stays
+bounded and state can be shared between worker processes.
+
+Backends (SESSION_STORE_BACKEND):
+- "memory":   in-process LRU with per-entry TTL, an entry cap and a byte budget (single worker)
+- "postgres": rows in the session_state table, one per (namespace, key) (any number of workers);
+              expired rows are purged every SESSION_STORE_PURGE_SECONDS (start() from the app lifespan)
+
+Values are pickled on write and unpickled on read in both backends, so get() always returns a
+private copy: mutate it and set() it back to persist changes.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+import pickle
+import threading
+import time
+
+from app.config import settings
+
+
+class SessionStore(ABC):
+    """Key/value store for short-lived session state, grouped by namespace"""
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the value, or None if missing or expired"""
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: float):
+        """Store value for ttl_seconds"""
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str):
+        """Remove the value if present"""
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"backend": self.__class__.__name__}
+
+    def start(self):
+        """Start background maintenance, if the backend needs any (app startup)"""
+
+    def stop(self):
+        """Stop background maintenance (app shutdown)"""
+
+    @staticmethod
+    def _dumps(value: Any) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _loads(data: bytes) -> Any:
+        # Only values written by this process family are ever loaded
+        return pickle.loads(data)
+
+
+class InMemorySessionStore(SessionStore):
+    """LRU + TTL store bounded by entry count and total pickled size"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[bytes, float]]" = OrderedDict()  # -> (data, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evicted = 0
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        entry_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                self._misses += 1
+                return None
+            data, expires_at = entry
+            if time.time() >= expires_at:
+                self._remove(entry_key)
+                self._expired += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(entry_key)
+            self._hits += 1
+        return self._loads(data)
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: float):
+        try:
+            data = self._dumps(value)
+        except Exception as e:
+            print(f"Error serializing session state {namespace}/{key}: {e}")
+            return
+        entry_key = (namespace, key)
+        with self._lock:
+            if entry_key in self._entries:
+                self._remove(entry_key)
+            if len(data) > self.max_bytes:
+                print(f"WARNING: SessionStore value for {namespace}/{key} ({len(data)} bytes) exceeds the byte budget, not stored")
+                return
+            self._entries[entry_key] = (data, time.time() + ttl_seconds)
+            self._bytes += len(data)
+            self._evict()
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            if (namespace, key) in self._entries:
+                self._remove((namespace, key))
+
+    def _remove(self, entry_key: Tuple[str, str]):
+        data, _ = self._entries.pop(entry_key)
+        self._bytes -= len(data)
+
+    def _evict(self):
+        # Drop expired entries first, then least recently used ones until within budget
+        if len(self._entries) <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        now = time.time()
+        for entry_key in [k for k, (_, expires_at) in self._entries.items() if expires_at <= now]:
+            self._remove(entry_key)
+            self._expired += 1
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self._evicted += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "expired": self._expired,
+                "evicted": self._evicted,
+            }
+
+
+class PostgresSessionStore(SessionStore):
+    """
+    Stores each value as a session_state row keyed by (namespace, key), written with
+    INSERT ... ON CONFLICT DO UPDATE so concurrent workers never duplicate a key. Uses its own
+    short DB session per call so callers' transactions are never committed by the store.
+    """
+
+    def __init__(self, session_factory=None, purge_seconds: Optional[float] = None):
+        if session_factory is None:
+            from app.database import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.purge_seconds = purge_seconds or settings.SESSION_STORE_PURGE_SECONDS
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._purged = 0
+
+    def _find(self, db, namespace: str, key: str):
+        from app.models import SessionState
+        return db.query(SessionState).filter(
+            SessionState.namespace == namespace,
+            SessionState.key == key
+        ).first()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        db = self.session_factory()
+        try:
+            row = self._find(db, namespace, key)
+            if row is None:
+                return None
+            if _as_utc(row.expires_at) <= datetime.now(timezone.utc):
+                return None  # Deleted by the next purge
+            return self._loads(row.value)
+        except Exception as e:
+            print(f"Error reading session state {namespace}/{key}: {e}")
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: float):
+        from app.models import SessionState
+        try:
+            data = self._dumps(value)
+        except Exception as e:
+            print(f"Error serializing session state {namespace}/{key}: {e}")
+            return
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+        db = self.session_factory()
+        try:
+            if db.bind.dialect.name == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            statement = insert(SessionState).values(namespace=namespace, key=key, value=data, expires_at=expires_at)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=[SessionState.namespace, SessionState.key],
+                set_={"value": statement.excluded.value, "expires_at": statement.excluded.expires_at}
+            ))
+            db.commit()
+        except Exception as e:
+            print(f"Error writing session state {namespace}/{key}: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def delete(self, namespace: str, key: str):
+        from app.models import SessionState
+        db = self.session_factory()
+        try:
+            db.query(SessionState).filter(
+                SessionState.namespace == namespace,
+                SessionState.key == key
+            ).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            print(f"Error deleting session state {namespace}/{key}: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows (runs every purge_seconds once start() was called)"""
+        from app.models import SessionState
+        db = self.session_factory()
+        try:
+            deleted = db.query(SessionState).filter(
+                SessionState.expires_at <= datetime.now(timezone.utc)
+            ).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            print(f"Error purging session state: {e}")
+            db.rollback()
+            return 0
+        finally:
+            db.close()
+        with self._lock:
+            self._purged += deleted
+        return deleted
+
+    def _purge_loop(self):
+        while not self._stop.wait(self.purge_seconds):
+            self.purge_expired()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._purge_loop, name="session-store-purge", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": "postgres", "purge_seconds": self.purge_seconds, "purged": self._purged}
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes for timezone-aware columns
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def create_session_store() -> SessionStore:
+    """Build the backend selected by SESSION_STORE_BACKEND"""
+    backend = settings.SESSION_STORE_BACKEND.lower()
+    if backend == "postgres":
+        return PostgresSessionStore()
+    if backend != "memory":
+        print(f"WARNING: Unknown SESSION_STORE_BACKEND '{settings.SESSION_STORE_BACKEND}', using memory")
+    return InMemorySessionStore(
+        max_entries=settings.SESSION_STORE_MAX_ENTRIES,
+        max_bytes=settings.SESSION_STORE_MAX_BYTES
+    )
+
+
+# Process-wide session store
+session_store = create_session_store()
@@ -80,6 +80,7 @@ class PartnerQueryState:
     
     # Other
     wants_earliest: bool = False
+    extraction_path: Optional[str] = None  # "rules" or "llm": how slots were extracted for a fresh query
     
     # Scholarship types (Type A, Type B, Type C, CSC) - stored as list of strings
     _scholarship_types: Optional[List[str]] = field(default_factory=list)
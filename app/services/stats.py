@@ -0,0 +1,68 @@
+"""
+Counters - process-wide usage counters reported by /api/admin/metrics
+
+Each stats object (partner routing, template answers, prompt cache usage, ...) subclasses
+Counters: it records into thread-safe nested counts with add() / add_many() and turns a
+snapshot into its metrics dict in summarize(). Instances register under their metrics name
+when created, and the admin endpoint reports all of them with all_metrics().
+"""
+from typing import Any, Dict, Hashable, Optional
+import copy
+import threading
+
+_registry: Dict[str, "Counters"] = {}
+_registry_lock = threading.Lock()
+
+
+class Counters:
+    """Thread-safe nested counters (e.g. intent -> path -> count) registered under a metrics name"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._counts: Dict[Hashable, Any] = {}
+        with _registry_lock:
+            _registry[name] = self
+
+    def _node(self, keys) -> Dict[Hashable, Any]:
+        node = self._counts
+        for key in keys:
+            node = node.setdefault(key, {})
+        return node
+
+    def add(self, *keys: Hashable, amount: float = 1, limit: Optional[int] = None):
+        """Add amount to the counter at keys; limit caps how many distinct counters its parent holds"""
+        with self._lock:
+            node = self._node(keys[:-1])
+            if limit is not None and keys[-1] not in node and len(node) >= limit:
+                return
+            node[keys[-1]] = node.get(keys[-1], 0) + amount
+
+    def add_many(self, *keys: Hashable, **amounts: float):
+        """Add several counters under keys at once (a metrics snapshot never sees half an update)"""
+        with self._lock:
+            node = self._node(keys)
+            for counter, amount in amounts.items():
+                node[counter] = node.get(counter, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+    def snapshot(self) -> Dict[Hashable, Any]:
+        with self._lock:
+            return copy.deepcopy(self._counts)
+
+    def summarize(self, counts: Dict[Hashable, Any]) -> Dict[str, Any]:
+        """Metrics dict from a snapshot of the counts (override per stats object)"""
+        return counts
+
+    def metrics(self) -> Dict[str, Any]:
+        return self.summarize(self.snapshot())
+
+
+def all_metrics() -> Dict[str, Dict[str, Any]]:
+    """Metrics of every registered Counters object, keyed by its name"""
+    with _registry_lock:
+        registered = list(_registry.values())
+    return {counters.name: counters.metrics() for counters in registered}
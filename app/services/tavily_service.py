@@ -1,44 +1,184 @@
+"""
+TavilyService - web search fallback for the agents
+
+- Results are cached process-wide by normalized query for TAVILY_CACHE_TTL_SECONDS, so similar
+  questions from SalesAgent, AdmissionAgent and the chat router hit Tavily once
+- Identical searches already in flight (e.g. two sessions asking the same thing) wait for the
+  first one instead of issuing a second request
+- search_domains() runs the per-domain "site:" searches concurrently: latency is the slowest
+  domain, not the sum of all of them
+- TAVILY_STUB=true (or TavilyService(client=StubTavilyClient(...))) never calls the network
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+import time
+
 from tavily import TavilyClient
 from app.config import settings
-from typing import List, Dict
+from app.services.embedding_cache import normalize_query_text
+
+
+class StubTavilyClient:
+    """Offline stand-in for TavilyClient: canned responses by query, records every call"""
+
+    def __init__(self, responses: Optional[Dict[str, List[Dict]]] = None, delay_seconds: float = 0.0):
+        self.responses = responses or {}
+        self.delay_seconds = delay_seconds
+        self.calls: List[str] = []
+        self._lock = threading.Lock()
+
+    def search(self, query: str, max_results: int = 5, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            self.calls.append(query)
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        return {"results": list(self.responses.get(query, []))[:max_results]}
+
+
+class SearchCache:
+    """TTL cache of search results with in-flight deduplication (single flight per key)"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, List[Dict]]]" = OrderedDict()
+        self._in_flight: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+
+    def get_or_compute(self, key: Tuple, compute: Callable[[], List[Dict]]) -> List[Dict]:
+        """Return cached results for key, join an identical in-flight search, or run compute() (errors propagate, nothing cached)"""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] > time.time():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return list(cached[1])
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+                self._misses += 1
+            else:
+                self._coalesced += 1
+
+        if not owner:
+            return list(future.result())
+
+        try:
+            results = compute()
+        except Exception as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+            self._entries[key] = (time.time() + self.ttl_seconds, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        future.set_result(results)
+        return list(results)
+
+    def clear(self):
+        """Drop every entry (tests)"""
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses + self._coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._in_flight),
+                "hit_rate": round((self._hits + self._coalesced) / lookups, 3) if lookups else 0.0,
+            }
+
+
+# Process-wide cache and worker pool shared by all TavilyService instances
+search_cache = SearchCache(
+    max_entries=settings.TAVILY_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.TAVILY_CACHE_TTL_SECONDS
+)
+_search_pool = ThreadPoolExecutor(max_workers=settings.TAVILY_MAX_CONCURRENCY, thread_name_prefix="tavily")
+
 
 class TavilyService:
-    def __init__(self):
-        self.client = TavilyClient(api_key=settings.TAVILY_API_KEY)
-    
+    def __init__(self, client=None, cache: Optional[SearchCache] = None):
+        if client is None:
+            client = StubTavilyClient() if settings.TAVILY_STUB else TavilyClient(api_key=settings.TAVILY_API_KEY)
+        self.client = client
+        self.cache = cache or search_cache
+        self.search_depth = "advanced"
+
     def search(self, query: str, max_results: int = 5) -> List[Dict]:
-        """Search the web using Tavily"""
+        """Search the web using Tavily (cached by normalized query)"""
+        normalized = normalize_query_text(query)
+        key = (normalized, max_results, self.search_depth)
         try:
-            response = self.client.search(
-                query=query,
-                max_results=max_results,
-                search_depth="advanced"
-            )
-            
-            results = []
-            for result in response.get("results", []):
-                results.append({
-                    "title": result.get("title", ""),
-                    "url": result.get("url", ""),
-                    "content": result.get("content", ""),
-                    "score": result.get("score", 0)
-                })
-            
-            return results
+            return self.cache.get_or_compute(key, lambda: self._fetch(normalized, max_results))
         except Exception as e:
             print(f"Tavily search error: {e}")
             return []
-    
+
+    def _fetch(self, query: str, max_results: int) -> List[Dict]:
+        response = self.client.search(
+            query=query,
+            max_results=max_results,
+            search_depth=self.search_depth
+        )
+
+        results = []
+        for result in response.get("results", []):
+            results.append({
+                "title": result.get("title", ""),
+                "url": result.get("url", ""),
+                "content": result.get("content", ""),
+                "score": result.get("score", 0)
+            })
+
+        return results
+
+    def search_domains(self, query: str, domains: List[str], max_results: int = 2, max_total: int = 3) -> List[Dict]:
+        """
+        Run "<query> site:<domain>" for every domain concurrently and merge the results in domain order.
+        Results whose URL is not on their domain are dropped; at most max_total are returned.
+        """
+        base_query = normalize_query_text(query)
+        futures = [
+            (domain, _search_pool.submit(self.search, f"{base_query} site:{domain}", max_results))
+            for domain in domains
+        ]
+        merged = []
+        for domain, future in futures:
+            try:
+                merged.extend(r for r in future.result() if domain in r.get("url", "").lower())
+            except Exception as e:
+                print(f"DEBUG: Tavily search for {domain} failed: {e}")
+        return merged[:max_total]
+
     def format_search_results(self, results: List[Dict]) -> str:
         """Format search results into a readable string"""
         if not results:
             return ""
-        
+
         formatted = "Web Search Results:\n\n"
         for i, result in enumerate(results, 1):
             formatted += f"{i}. {result['title']}\n"
             formatted += f"   URL: {result['url']}\n"
             formatted += f"   Content: {result['content'][:500]}...\n\n"
-        
-        return formatted
 
+        return formatted
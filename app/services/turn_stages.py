@@ -0,0 +1,104 @@
+"""
+TurnStages - concurrent stages inside a single agent turn
+
+A SalesAgent turn ran profile extraction (one LLM call), classification, the FAQ match, the query
+embedding and RAG retrieval strictly one after another, although only the classification of some
+turns depends on the extracted profile. TurnStages lets a turn start the independent stages on a
+shared thread pool and keep working on the request thread:
+
+- start(name, fn, ...) runs fn on the stage pool; join(name) waits for it and re-raises its error
+- Stage functions must not touch the request's SQLAlchemy Session (it is not thread-safe):
+  database reads stay on the request thread
+- cancel(name) drops a stage that has not started yet; a stage that is already running finishes
+  in the background and its result is ignored. Leaving the `with` block cancels what is left
+- speculation_stats counts speculative work that was used, discarded (the real classification
+  differed) or abandoned before it finished
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.config import settings
+from app.services.stats import Counters
+
+# Process-wide pool shared by all turns (a turn keeps up to ~2 stages busy: extraction + an embedding)
+_stage_pool = ThreadPoolExecutor(max_workers=settings.TURN_STAGE_WORKERS, thread_name_prefix="turn-stage")
+
+
+class TurnStages:
+    """Named futures for the stages of one turn"""
+
+    def __init__(self, pool: Optional[ThreadPoolExecutor] = None):
+        self._pool = pool or _stage_pool
+        self._futures: Dict[str, Future] = {}
+
+    def start(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Run fn(*args, **kwargs) on the stage pool under name"""
+        if name in self._futures:
+            raise ValueError(f"Stage {name!r} already started")
+        future = self._pool.submit(fn, *args, **kwargs)
+        self._futures[name] = future
+        return future
+
+    def started(self, name: str) -> bool:
+        return name in self._futures
+
+    def done(self, name: str) -> bool:
+        """True once the stage has finished (successfully or not)"""
+        future = self._futures.get(name)
+        return future is not None and future.done()
+
+    def join(self, name: str, timeout: Optional[float] = None) -> Any:
+        """Wait for the stage and return its result (its exception is re-raised)"""
+        future = self._futures.get(name)
+        if future is None:
+            raise KeyError(f"Stage {name!r} was not started")
+        return future.result(timeout=timeout)
+
+    def cancel(self, name: str) -> bool:
+        """Drop the stage if it has not started running; True if it will not run"""
+        future = self._futures.pop(name, None)
+        return future is not None and future.cancel()
+
+    def close(self):
+        for name in list(self._futures):
+            self.cancel(name)
+
+    def __enter__(self) -> "TurnStages":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class SpeculationStats(Counters):
+    """Counters for speculative prefetches"""
+
+    def record_started(self):
+        self.add("speculated")
+
+    def record_used(self, prefetch_seconds: float):
+        """Prefetched results were consumed; prefetch_seconds of work overlapped the extraction"""
+        self.add_many(used=1, used_seconds=prefetch_seconds)
+
+    def record_discarded(self):
+        self.add("discarded")
+
+    def record_abandoned(self, cancelled_stages: int = 0):
+        self.add_many(abandoned=1, cancelled_stages=cancelled_stages)
+
+    def summarize(self, counts: Dict[str, float]) -> Dict[str, Any]:
+        started, used = counts.get("speculated", 0), counts.get("used", 0)
+        return {
+            "stage_workers": settings.TURN_STAGE_WORKERS,
+            "speculated": started,
+            "used": used,
+            "discarded": counts.get("discarded", 0),
+            "abandoned": counts.get("abandoned", 0),
+            "cancelled_stages": counts.get("cancelled_stages", 0),
+            "used_rate": round(used / started, 3) if started else 0.0,
+            "avg_overlapped_seconds": round(counts.get("used_seconds", 0.0) / used, 3) if used else 0.0,
+        }
+
+
+speculation_stats = SpeculationStats("sales_speculation")
@@ -0,0 +1,42 @@
+"""
+Migration script to add the background_jobs table (durable admin document import jobs)
+"""
+from sqlalchemy import text
+from app.database import engine
+
+def migrate_background_jobs():
+    """Create background_jobs table and its indexes"""
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS background_jobs (
+                    id VARCHAR(36) PRIMARY KEY,
+                    job_type VARCHAR NOT NULL,
+                    status VARCHAR NOT NULL DEFAULT 'queued',
+                    progress TEXT,
+                    params JSON,
+                    input_data BYTEA,
+                    result JSON,
+                    error TEXT,
+                    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id VARCHAR,
+                    created_by INTEGER REFERENCES users(id),
+                    created_at TIMESTAMPTZ DEFAULT now(),
+                    started_at TIMESTAMPTZ,
+                    heartbeat_at TIMESTAMPTZ,
+                    finished_at TIMESTAMPTZ
+                )
+            """))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_background_jobs_job_type ON background_jobs (job_type)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_background_jobs_status ON background_jobs (status)"))
+            conn.commit()
+            print("✓ Created background_jobs table")
+        except Exception as e:
+            print(f"Note: background_jobs table may already exist: {e}")
+            conn.rollback()
+        
+        print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_background_jobs()
@@ -0,0 +1,30 @@
+"""
+Migration script to add the query_embedding_cache table (persistent tier of the RAG query embedding cache)
+Only needed when EMBEDDING_CACHE_PERSISTENT=true
+"""
+from sqlalchemy import text
+from app.database import engine
+
+def migrate_query_embedding_cache():
+    """Create query_embedding_cache table"""
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS query_embedding_cache (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    embedding JSON NOT NULL,
+                    created_at TIMESTAMPTZ DEFAULT now(),
+                    PRIMARY KEY (model, text_hash)
+                )
+            """))
+            conn.commit()
+            print("✓ Created query_embedding_cache table")
+        except Exception as e:
+            print(f"Note: query_embedding_cache table may already exist: {e}")
+            conn.rollback()
+        
+        print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_query_embedding_cache()
@@ -64,6 +64,7 @@ def migrate():
                 CREATE INDEX IF NOT EXISTS rag_chunks_source_id_idx ON rag_chunks (source_id);
                 CREATE INDEX IF NOT EXISTS rag_chunks_priority_idx ON rag_chunks (priority);
                 CREATE INDEX IF NOT EXISTS rag_chunks_metadata_gin_idx ON rag_chunks USING GIN (metadata);
+                CREATE INDEX IF NOT EXISTS rag_chunks_content_fts_idx ON rag_chunks USING GIN (to_tsvector('english', content));
             """))
             
             print("Creating HNSW index on rag_chunks.embedding...")
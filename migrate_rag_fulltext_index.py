@@ -0,0 +1,27 @@
+"""
+Migration script to add a full-text (tsvector) GIN index on rag_chunks.content
+(used by the lexical half of hybrid retrieval in RAGService.retrieve)
+"""
+from sqlalchemy import text
+from app.database import engine
+
+def migrate_rag_fulltext_index():
+    """Create GIN index on to_tsvector('english', rag_chunks.content)"""
+    with engine.connect() as conn:
+        try:
+            # Must be the same expression as in RAGService's retrieval statement for the index to be used
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS rag_chunks_content_fts_idx
+                ON rag_chunks USING GIN (to_tsvector('english', content))
+            """))
+            conn.commit()
+            print("✓ Created rag_chunks_content_fts_idx on rag_chunks")
+        except Exception as e:
+            print(f"Error creating full-text index: {e}")
+            conn.rollback()
+            raise
+        
+        print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_rag_fulltext_index()
@@ -0,0 +1,23 @@
+"""
+Migration script to add content_hash column to rag_sources table
+(lets scripts/ingest_rag_folder.py skip files that have not changed since the last ingestion)
+"""
+from sqlalchemy import text
+from app.database import engine
+
+def migrate_rag_source_content_hash():
+    """Add content_hash column to rag_sources"""
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("ALTER TABLE rag_sources ADD COLUMN IF NOT EXISTS content_hash TEXT"))
+            conn.commit()
+            print("✓ Added content_hash column to rag_sources")
+        except Exception as e:
+            print(f"Error adding content_hash column: {e}")
+            conn.rollback()
+            raise
+        
+        print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_rag_source_content_hash()
@@ -0,0 +1,30 @@
+"""
+Migration script to add the session_state table (SESSION_STORE_BACKEND=postgres)
+"""
+from sqlalchemy import text
+from app.database import engine
+
+def migrate_session_state():
+    """Create session_state table"""
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS session_state (
+                    namespace VARCHAR NOT NULL,
+                    key VARCHAR NOT NULL,
+                    value BYTEA NOT NULL,
+                    expires_at TIMESTAMPTZ NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_session_state_expires_at ON session_state (expires_at)"))
+            conn.commit()
+            print("✓ Created session_state table")
+        except Exception as e:
+            print(f"Note: session_state table may already exist: {e}")
+            conn.rollback()
+        
+        print("\nMigration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_session_state()
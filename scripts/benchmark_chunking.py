@@ -0,0 +1,163 @@
+"""
+Retrieval-quality benchmark: legacy character chunker (700 chars / 120 overlap) vs the
+structure-aware MarkdownChunker, over the documents in app/rag_docs and a fixed question set.
+
+A question counts as answered at rank k if one of the top k chunks contains its expected
+answer snippet completely (a snippet cut in half by a chunk boundary counts as a miss).
+Ranking is BM25 by default (offline, free); --embeddings ranks by OpenAI embedding cosine
+similarity instead, which is what production retrieval does (costs a few cents).
+Usage: python -m scripts.benchmark_chunking [--max-tokens 300] [--top-k 3] [--embeddings]
+"""
+import sys
+import os
+import argparse
+import math
+import re
+from collections import Counter
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tiktoken
+
+from app.services.chunker import MarkdownChunker
+
+DOCS_DIR = Path(__file__).resolve().parent.parent / "app" / "rag_docs"
+
+# (question, snippet that a useful chunk must contain)
+QUESTIONS = [
+    ("What is CSCA?", "CSCA is a standardized entrance assessment for international students"),
+    ("Is the CSCA exam mandatory for scholarship applicants?", "must include a CSCA score report as part of the required materials"),
+    ("Does CSCA apply to master's and PhD students?", "Master’s/PhD requirements usually rely on degree transcripts"),
+    ("When is the CSCA exam held?", "First global CSCA test: **Dec 21, 2025**"),
+    ("Which subjects are tested in CSCA?", "Professional Chinese (Humanities Chinese OR STEM Chinese)"),
+    ("What is the CSCA score range?", "**0–100** score range per subject"),
+    ("In which language can I take the math and physics tests?", "Mathematics/Physics/Chemistry are offered in **Chinese or English**"),
+    ("Do I need a pre-admission letter before applying?", "Some scholarship routes require a **pre-admission document**"),
+    ("What does the Chinese government scholarship cover?", "Monthly living stipend"),
+    ("Can scholarship students work part-time?", "Some students can do part-time internships/work with university approval"),
+    ("How are scholarship applicants evaluated?", "CSCA scores (for relevant undergraduate scholarship/university cases)"),
+    ("Do I need IELTS or HSK?", "Chinese-taught programs typically require HSK (level 4-6 depending on program)"),
+    ("How much is tuition for a bachelor's degree in China?", "Bachelor's 1,800-8,000 RMB/year"),
+    ("What is the monthly living cost in China?", "monthly living expenses range from USD 150-400"),
+    ("Is the application deposit refundable?", "MalishaEdu's service deposit (80 USD) is refundable"),
+    ("How much does dormitory accommodation cost?", "Prices range from 300-2,500 RMB/month depending on room type"),
+    ("Is halal food available in China?", "halal food is available in many universities and cities across China"),
+    ("How long does the whole application take?", "typically takes 6-10 weeks from application submission to visa approval"),
+    ("When are the intakes in Chinese universities?", "two main intakes: March (Spring) and September (Fall)"),
+    ("Since when has MalishaEdu been operating?", "operating since 2012"),
+    ("When do I pay the service charge?", "Full service charges are paid after receiving the admission notice and JW202 copy"),
+    ("Are there hidden charges?", "all official fees and service charges are disclosed upfront"),
+    ("Does MalishaEdu pick me up at the airport?", "post-arrival support services including airport pickup"),
+    ("Will my Chinese degree be recognized abroad?", "Degrees from MOE-recognized Chinese universities are generally recognized internationally"),
+]
+
+
+def legacy_chunks(text: str, chunk_size: int = 700, overlap: int = 120):
+    """The previous RAGService.chunk_text: fixed character windows"""
+    chunks = []
+    start = 0
+    while start < len(text):
+        chunks.append(text[start:start + chunk_size])
+        start = start + chunk_size - overlap
+    return chunks
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def words(text: str):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+class BM25:
+    def __init__(self, documents, k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.docs = [Counter(words(d)) for d in documents]
+        self.lengths = [sum(d.values()) for d in self.docs]
+        self.avg_length = sum(self.lengths) / max(len(self.docs), 1)
+        df = Counter(term for d in self.docs for term in d)
+        n = len(self.docs)
+        self.idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+
+    def rank(self, query: str):
+        terms = words(query)
+        scores = []
+        for doc, length in zip(self.docs, self.lengths):
+            score = 0.0
+            for term in terms:
+                tf = doc.get(term, 0)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / self.avg_length))
+            scores.append(score)
+        return sorted(range(len(scores)), key=lambda i: -scores[i])
+
+
+class EmbeddingRanker:
+    def __init__(self, documents):
+        from app.services.openai_service import OpenAIService
+        self.openai_service = OpenAIService()
+        self.vectors = self.openai_service.generate_embeddings_batch(documents)
+
+    def rank(self, query: str):
+        q = self.openai_service.generate_embedding(query)
+        scores = [sum(a * b for a, b in zip(q, v)) for v in self.vectors]
+        return sorted(range(len(scores)), key=lambda i: -scores[i])
+
+
+def evaluate(label: str, chunks, encoding, ranker_class, top_k: int):
+    ranker = ranker_class(chunks)
+    normalized = [normalize(c) for c in chunks]
+    hits_1 = hits_k = 0
+    reciprocal_ranks = 0.0
+    contained = 0
+    context_tokens = 0
+    for question, snippet in QUESTIONS:
+        snippet = normalize(snippet)
+        if any(snippet in c for c in normalized):
+            contained += 1
+        order = ranker.rank(question)
+        context_tokens += sum(len(encoding.encode(chunks[i])) for i in order[:top_k])
+        for rank, index in enumerate(order[:10], 1):
+            if snippet in normalized[index]:
+                hits_1 += rank == 1
+                hits_k += rank <= top_k
+                reciprocal_ranks += 1 / rank
+                break
+
+    n = len(QUESTIONS)
+    tokens = [len(encoding.encode(c)) for c in chunks]
+    print(f"\n{label}")
+    print(f"  chunks:                 {len(chunks)} (avg {sum(tokens) / len(tokens):.0f} tokens, max {max(tokens)})")
+    print(f"  answer kept in 1 chunk: {contained}/{n}")
+    print(f"  hit@1:                  {hits_1}/{n}")
+    print(f"  hit@{top_k}:                  {hits_k}/{n}")
+    print(f"  MRR@10:                 {reciprocal_ranks / n:.3f}")
+    print(f"  context tokens (top {top_k}): {context_tokens / n:.0f} per question")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare chunkers on retrieval quality over app/rag_docs")
+    parser.add_argument("--max-tokens", type=int, default=300, help="MarkdownChunker chunk size (default: 300)")
+    parser.add_argument("--overlap-tokens", type=int, default=40)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--embeddings", action="store_true", help="Rank with OpenAI embeddings instead of BM25")
+    args = parser.parse_args()
+
+    encoding = tiktoken.get_encoding("cl100k_base")
+    texts = [path.read_text(encoding="utf-8") for path in sorted(DOCS_DIR.glob("*.md"))]
+    ranker_class = EmbeddingRanker if args.embeddings else BM25
+    print(f"{len(texts)} documents, {len(QUESTIONS)} questions, ranking: {'embeddings' if args.embeddings else 'BM25'}")
+
+    legacy = [chunk for text in texts for chunk in legacy_chunks(text)]
+    chunker = MarkdownChunker(encoding, max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens)
+    structured = [chunk.text for text in texts for chunk in chunker.chunk(text)]
+
+    evaluate("legacy: 700 chars / 120 overlap", legacy, encoding, ranker_class, args.top_k)
+    evaluate(f"markdown: {args.max_tokens} tokens", structured, encoding, ranker_class, args.top_k)
+
+
+if __name__ == "__main__":
+    main()
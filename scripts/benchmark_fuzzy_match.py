@@ -0,0 +1,135 @@
+"""
+Micro-benchmark: full SequenceMatcher scan vs MatchIndex candidates for university/major matching.
+Uses a synthetic catalog (no database needed).
+Usage: python -m scripts.benchmark_fuzzy_match [--universities 300] [--majors 6000] [--queries 200]
+"""
+import sys
+import os
+import argparse
+import random
+import time
+from difflib import SequenceMatcher
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.match_index import MatchIndex, normalize_match_text
+
+CITIES = ["Harbin", "Beijing", "Shanghai", "Wuhan", "Nanjing", "Xian", "Dalian", "Tianjin", "Chengdu", "Hangzhou",
+          "Jinan", "Qingdao", "Changsha", "Fuzhou", "Kunming", "Lanzhou", "Shenyang", "Hefei", "Zhengzhou", "Xiamen"]
+UNI_KINDS = ["University", "University of Technology", "Normal University", "Medical University",
+             "Institute of Technology", "University of Science and Technology", "Jiaotong University",
+             "Agricultural University", "Forestry University", "University of Finance and Economics"]
+SUBJECTS = ["Computer Science and Technology", "Software Engineering", "Electrical Engineering",
+            "Mechanical Engineering", "Civil Engineering", "Business Administration", "International Trade",
+            "Clinical Medicine", "Pharmacy", "Chemistry", "Applied Physics", "Mathematics", "Economics",
+            "Finance", "Accounting", "Chinese Language", "Architecture", "Environmental Engineering",
+            "Materials Science and Engineering", "Artificial Intelligence", "Data Science", "Biology",
+            "Automation", "Control Science and Engineering", "Information and Communication Engineering"]
+KEYWORDS = {"Computer Science and Technology": ["cs", "cse", "computer science"],
+            "Artificial Intelligence": ["ai"], "Business Administration": ["bba", "mba"],
+            "Clinical Medicine": ["mbbs"], "Electrical Engineering": ["eee"]}
+DEGREES = ["Bachelor", "Master", "PhD", "Language"]
+
+
+def build_catalog(n_universities: int, n_majors: int, seed: int = 7):
+    rng = random.Random(seed)
+    universities = []
+    for i in range(n_universities):
+        city = CITIES[i % len(CITIES)]
+        name = f"{city} {UNI_KINDS[(i // len(CITIES)) % len(UNI_KINDS)]}"
+        if i >= len(CITIES) * len(UNI_KINDS):
+            name = f"{name} {i}"
+        alias = "".join(w[0] for w in name.split() if w[0].isalpha()).upper()
+        universities.append({"id": i + 1, "name": name, "name_cn": None, "aliases": [alias],
+                             "is_partner": rng.random() < 0.8})
+    majors = []
+    for j in range(n_majors):
+        subject = SUBJECTS[j % len(SUBJECTS)]
+        uni = universities[rng.randrange(n_universities)]
+        majors.append({"id": j + 1, "name": subject if rng.random() < 0.7 else f"{subject} ({DEGREES[j % 4]})",
+                       "name_cn": None, "keywords": KEYWORDS.get(subject, []), "aliases": [],
+                       "degree_level": DEGREES[j % 4], "university_id": uni["id"], "university_name": uni["name"]})
+    return universities, majors
+
+
+def make_typo(text: str, rng: random.Random) -> str:
+    if len(text) < 5:
+        return text
+    i = rng.randrange(1, len(text) - 1)
+    return text[:i] + text[i + 1:]
+
+
+def university_score(query: str, uni: dict) -> float:
+    """Best SequenceMatcher ratio over name and aliases"""
+    texts = [uni["name"]] + list(uni.get("aliases") or [])
+    return max(SequenceMatcher(None, query, normalize_match_text(t)).ratio() for t in texts)
+
+
+def major_score(query: str, major: dict) -> float:
+    """Best SequenceMatcher ratio over name and keywords"""
+    texts = [major["name"]] + list(major.get("keywords") or [])
+    return max(SequenceMatcher(None, query, normalize_match_text(t)).ratio() for t in texts)
+
+
+def best_full_scan(query, entries, score):
+    return max(entries, key=lambda e: score(query, e), default=None)
+
+
+def best_indexed(query, candidates, score):
+    return max(candidates, key=lambda e: score(query, e), default=None)
+
+
+def run(n_universities: int, n_majors: int, n_queries: int):
+    rng = random.Random(11)
+    universities, majors = build_catalog(n_universities, n_majors)
+
+    started = time.perf_counter()
+    index = MatchIndex(universities, majors)
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"Catalog: {len(universities)} universities, {len(majors)} majors; index built in {build_ms:.1f} ms")
+
+    uni_queries = [normalize_match_text(make_typo(rng.choice(universities)["name"], rng)) for _ in range(n_queries)]
+    major_queries = [normalize_match_text(make_typo(rng.choice(SUBJECTS), rng)) for _ in range(n_queries)]
+    major_queries += ["cse", "ai", "mbbs", "computer sciance", "civil"]
+
+    for label, queries, entries, candidates_for, score in [
+        ("university", uni_queries, universities, lambda q: index.university_candidates(q), university_score),
+        ("major", major_queries, majors, lambda q: index.major_candidates(q), major_score),
+    ]:
+        started = time.perf_counter()
+        full = [best_full_scan(q, entries, score) for q in queries]
+        full_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+        started = time.perf_counter()
+        candidate_lists = [candidates_for(q) for q in queries]
+        candidates_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+        started = time.perf_counter()
+        indexed = [best_indexed(q, c, score) for q, c in zip(queries, candidate_lists)]
+        rescoring_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+        # Same best score means the same answer (ties between duplicate names are equivalent)
+        agree = sum(
+            1 for q, a, b in zip(queries, full, indexed)
+            if a is not None and b is not None and abs(score(q, a) - score(q, b)) < 1e-9
+        )
+        print(f"\n{label} matching ({len(queries)} queries)")
+        print(f"  full scan:           {full_ms:8.3f} ms/query")
+        print(f"  index candidates:    {candidates_ms:8.3f} ms/query")
+        print(f"  index + rescoring:   {candidates_ms + rescoring_ms:8.3f} ms/query "
+              f"({full_ms / max(candidates_ms + rescoring_ms, 1e-9):.0f}x faster)")
+        print(f"  same best score:     {agree}/{len(queries)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fuzzy matching with and without MatchIndex")
+    parser.add_argument("--universities", type=int, default=300)
+    parser.add_argument("--majors", type=int, default=6000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    run(args.universities, args.majors, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Labeled replay benchmark for PartnerAgent slot extraction: rules-first (rules_extract_state, LLM only
+when the rules are not confident) vs calling llm_extract_state on every fresh query.
+
+Cases are the fresh-query messages of tests/test_partner_agent_routing.py, labeled with the intent and
+slots a correct extraction produces. Offline by default: escalated cases are counted, not sent.
+--llm also sends every case to llm_extract_state (needs OPENAI_API_KEY, costs a few cents) so both
+pipelines can be scored end to end.
+Usage: python -m scripts.benchmark_partner_routing [--llm] [--verbose]
+"""
+import sys
+import os
+import argparse
+import contextlib
+import io
+import time
+from datetime import date
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.partner_agent import PartnerAgent
+
+# (message, expected fields); fields not listed are not scored
+CASES = [
+    ("Bachelorvvvv university list", {"intent": "LIST_UNIVERSITIES", "degree_level": "Bachelor"}),
+    ("university list", {"intent": "LIST_UNIVERSITIES"}),
+    ("language program march intake university list",
+     {"intent": "LIST_UNIVERSITIES", "degree_level": "Language", "intake_term": "March"}),
+    ("I want 4 months language course", {"degree_level": "Language"}),
+    ("I want 1.3 year program", {"duration_years": 1.3}),
+    ("at least 2 years master", {"degree_level": "Master", "duration_years": 2.0}),
+    ("max 1 year language", {"degree_level": "Language", "duration_years": 1.0}),
+    ("admission requirements", {"intent": "REQUIREMENTS"}),
+    ("bank statement under 5000 usd", {"intent": "REQUIREMENTS"}),
+    ("HSK required?", {"intent": "REQUIREMENTS"}),
+    ("earliest intake", {"wants_earliest": True}),
+    ("Scholarship available for university", {"intent": "SCHOLARSHIP", "wants_scholarship": True}),
+    ("CSC scholarship available", {"intent": "SCHOLARSHIP", "wants_scholarship": True}),
+    ("SCHOLARSHIP INFORMATION", {"intent": "SCHOLARSHIP", "wants_scholarship": True, "degree_level": None}),
+    ("Calculate fees", {"intent": "FEES", "wants_fees": True}),
+    ("Provide list of universities in Guangzhou", {"intent": "LIST_UNIVERSITIES", "city": "Guangzhou"}),
+    ("Provide requirement for Program_intakes", {"intent": "REQUIREMENTS"}),
+    ("Is country allowed", {"intent": "REQUIREMENTS"}),
+    ("is tuition fee free", {"intent": "FEES", "wants_fees": True}),
+    ("Type of accommodation of a program_intakes", {"intent": "FEES", "wants_fees": True}),
+    ("next march intake", {"intake_term": "March", "wants_earliest": True}),
+    ("next intake", {"wants_earliest": True}),
+    ("I want to complete my BSC in physics in next march intake from china. What scholarship do you have",
+     {"intent": "SCHOLARSHIP", "degree_level": "Bachelor", "major_raw": "physics", "intake_term": "March",
+      "wants_scholarship": True}),
+    ("scholarship info", {"intent": "SCHOLARSHIP", "wants_scholarship": True, "major_raw": None}),
+    ("Bachelor", {"degree_level": "Bachelor", "major_raw": None}),
+    ("CSE march", {"major_raw": "cse", "intake_term": "March"}),
+    ("next march", {"intake_term": "March", "wants_earliest": True}),
+]
+
+
+def field_matches(expected, actual) -> bool:
+    if isinstance(expected, float):
+        return actual is not None and abs(float(actual) - expected) < 0.01
+    if isinstance(expected, str) and isinstance(actual, str):
+        return expected.lower() == actual.lower()
+    return expected == actual or (expected is None and not actual)
+
+
+def score(extracted, expected):
+    """(fields correct, fields scored)"""
+    correct = sum(1 for name, value in expected.items() if field_matches(value, extracted.get(name)))
+    return correct, len(expected)
+
+
+def run(use_llm: bool, verbose: bool):
+    agent = PartnerAgent(None)
+    totals = {"rules": [0, 0, 0], "llm": [0, 0, 0], "always_llm": [0, 0, 0]}  # cases, fields correct, fields scored
+    rules_seconds = 0.0
+    llm_calls = 0
+
+    for message, expected in CASES:
+        history = [{"role": "user", "content": message}]
+        with contextlib.redirect_stdout(io.StringIO()):  # Agent DEBUG output
+            started = time.perf_counter()
+            extracted, reason = agent.rules_extract_state(history)
+            rules_seconds += time.perf_counter() - started
+
+        path = "rules" if extracted is not None else "llm"
+        llm_extracted = None
+        if use_llm:
+            with contextlib.redirect_stdout(io.StringIO()):
+                llm_extracted = agent.llm_extract_state(history, date.today())
+            llm_calls += 1
+            correct, scored = score(llm_extracted, expected)
+            totals["always_llm"][0] += 1
+            totals["always_llm"][1] += correct
+            totals["always_llm"][2] += scored
+        if path == "llm":
+            extracted = llm_extracted
+
+        line = f"  [{path:5}] {message[:60]!r}"
+        if extracted is not None:
+            correct, scored = score(extracted, expected)
+            totals[path][1] += correct
+            totals[path][2] += scored
+            line += f" {correct}/{scored}"
+            if verbose and correct < scored:
+                wrong = {k: extracted.get(k) for k, v in expected.items() if not field_matches(v, extracted.get(k))}
+                line += f" wrong={wrong}"
+        if reason:
+            line += f" ({reason})"
+        totals[path][0] += 1
+        print(line)
+
+    cases = len(CASES)
+    rules_cases, rules_correct, rules_scored = totals["rules"]
+    print(f"\n{cases} labeled fresh queries")
+    print(f"  answered by rules:      {rules_cases}/{cases} ({rules_cases / cases:.0%} of LLM extraction calls saved)")
+    print(f"  rules field accuracy:   {rules_correct}/{rules_scored}"
+          f" ({rules_correct / max(rules_scored, 1):.0%})")
+    print(f"  rules extraction time:  {rules_seconds * 1000 / cases:.2f} ms/query")
+    if use_llm:
+        always_cases, always_correct, always_scored = totals["always_llm"]
+        pipeline_correct = rules_correct + totals["llm"][1]
+        pipeline_scored = rules_scored + totals["llm"][2]
+        print(f"  always-LLM accuracy:    {always_correct}/{always_scored} ({always_correct / max(always_scored, 1):.0%}),"
+              f" {always_cases} LLM calls")
+        print(f"  rules-first accuracy:   {pipeline_correct}/{pipeline_scored}"
+              f" ({pipeline_correct / max(pipeline_scored, 1):.0%}), {cases - rules_cases} LLM calls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay labeled partner queries through rules-first extraction")
+    parser.add_argument("--llm", action="store_true", help="Also score llm_extract_state on every case (OpenAI calls)")
+    parser.add_argument("--verbose", action="store_true", help="Show wrong fields")
+    args = parser.parse_args()
+    run(args.llm, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
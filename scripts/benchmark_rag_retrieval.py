@@ -0,0 +1,252 @@
+"""
+Benchmark: legacy two-query RAG retrieval (MAX(version) lookup + similarity search with the
+embedding inlined twice as a literal) vs the single-statement retrieval in RAGService,
+both as a plain bound statement and as a server-side prepared statement, and the hybrid
+(full-text + vector, reciprocal rank fusion) variant of the prepared statement.
+
+Needs a PostgreSQL database with the pgvector extension available. Everything is seeded
+into a scratch schema (rag_bench), which is dropped afterwards unless --keep is given
+(--reuse runs against a schema kept by an earlier run; building the HNSW index is slow).
+Usage: python -m scripts.benchmark_rag_retrieval [--database-url URL] [--sources 40] [--chunks 20000] [--queries 200]
+
+The legacy query orders by (distance, priority), so it always ranks exactly; the single
+statement takes its vector candidates from the HNSW index. Results are compared with legacy
+twice: with index scans disabled (exact, must be identical) and as top-k recall (HNSW).
+"""
+import sys
+import os
+import argparse
+import random
+import statistics
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.services.rag_service import RAGService, _RETRIEVE_QUERY, _vector_literal
+
+SCHEMA = "rag_bench"
+DIMENSIONS = 1536
+DOC_TYPES = ["csca", "b2c_study", "b2b_partner", "people_contact", "service_policy"]
+AUDIENCES = ["student", "partner", "Both"]
+
+
+def random_unit_vector(rng: random.Random):
+    values = [rng.gauss(0, 1) for _ in range(DIMENSIONS)]
+    norm = sum(v * v for v in values) ** 0.5
+    return [round(v / norm, 6) for v in values]
+
+
+def seed(engine, n_sources: int, n_chunks: int):
+    rng = random.Random(3)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"""
+            CREATE TABLE {SCHEMA}.rag_sources (
+                id BIGSERIAL PRIMARY KEY,
+                name TEXT NOT NULL,
+                doc_type TEXT NOT NULL,
+                audience TEXT NOT NULL,
+                version TEXT,
+                status TEXT NOT NULL DEFAULT 'active',
+                metadata JSON
+            )
+        """))
+        conn.execute(text(f"""
+            CREATE TABLE {SCHEMA}.rag_chunks (
+                id BIGSERIAL PRIMARY KEY,
+                source_id BIGINT NOT NULL REFERENCES {SCHEMA}.rag_sources(id) ON DELETE CASCADE,
+                chunk_index INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                embedding vector({DIMENSIONS}) NOT NULL,
+                priority SMALLINT NOT NULL DEFAULT 3,
+                metadata JSON NOT NULL DEFAULT '{{}}'
+            )
+        """))
+
+        sources = []
+        for i in range(n_sources):
+            sources.append({
+                "name": f"source_{i}.md",
+                "doc_type": DOC_TYPES[i % len(DOC_TYPES)],
+                "audience": AUDIENCES[i % len(AUDIENCES)],
+                "version": f"2025.{i % 3}" if i % 4 else None,
+                "status": "active" if i % 10 else "archived",
+            })
+        conn.execute(text(f"""
+            INSERT INTO {SCHEMA}.rag_sources (name, doc_type, audience, version, status)
+            VALUES (:name, :doc_type, :audience, :version, :status)
+        """), sources)
+        source_ids = [row[0] for row in conn.execute(text(f"SELECT id FROM {SCHEMA}.rag_sources ORDER BY id"))]
+
+        batch = []
+        for j in range(n_chunks):
+            batch.append({
+                "source_id": source_ids[j % len(source_ids)],
+                "chunk_index": j,
+                "content": f"Chunk {j} about tuition, scholarships and admission requirements. " * 4,
+                "embedding": _vector_literal(random_unit_vector(rng)),
+                "priority": 1 + j % 3,
+            })
+            if len(batch) == 1000:
+                conn.execute(text(f"""
+                    INSERT INTO {SCHEMA}.rag_chunks (source_id, chunk_index, content, embedding, priority)
+                    VALUES (:source_id, :chunk_index, :content, CAST(:embedding AS vector), :priority)
+                """), batch)
+                batch = []
+        if batch:
+            conn.execute(text(f"""
+                INSERT INTO {SCHEMA}.rag_chunks (source_id, chunk_index, content, embedding, priority)
+                VALUES (:source_id, :chunk_index, :content, CAST(:embedding AS vector), :priority)
+            """), batch)
+
+        conn.execute(text(f"""
+            CREATE INDEX rag_chunks_embedding_hnsw_idx ON {SCHEMA}.rag_chunks USING hnsw (embedding vector_cosine_ops)
+        """))
+        conn.execute(text(f"""
+            CREATE INDEX ON {SCHEMA}.rag_chunks USING GIN (to_tsvector('english', content))
+        """))
+        conn.execute(text(f"ANALYZE {SCHEMA}.rag_sources"))
+        conn.execute(text(f"ANALYZE {SCHEMA}.rag_chunks"))
+
+
+def legacy_retrieve(db, embedding, query, doc_type, audience, top_k):
+    """The previous RAGService.retrieve: two round trips, embedding inlined twice as a literal"""
+    embedding_str = _vector_literal(embedding)
+    where_conditions = ["s.doc_type = :doc_type", "s.status = 'active'"]
+    params = {"doc_type": doc_type, "top_k": top_k}
+    if audience:
+        where_conditions.append("(s.audience = :audience OR s.audience = 'Both')")
+        params["audience"] = audience
+    version_params = {k: v for k, v in params.items() if k != "top_k"}
+    max_version_row = db.execute(text(f"""
+        SELECT MAX(s.version) as max_version
+        FROM rag_sources s
+        WHERE {" AND ".join(where_conditions)}
+    """), version_params).fetchone()
+    max_version = max_version_row[0] if max_version_row and max_version_row[0] else None
+    if max_version:
+        where_conditions.append("(s.version = :max_version OR s.version IS NULL)")
+        params["max_version"] = max_version
+    return [row.id for row in db.execute(text("""
+        SELECT c.id, c.content, c.metadata, c.source_id, c.priority,
+               s.name as source_name, s.doc_type, s.audience, s.version,
+               1 - (c.embedding <=> '""" + embedding_str + """'::vector) as similarity
+        FROM rag_chunks c
+        JOIN rag_sources s ON c.source_id = s.id
+        WHERE """ + " AND ".join(where_conditions) + """
+        ORDER BY c.embedding <=> '""" + embedding_str + """'::vector, c.priority ASC
+        LIMIT :top_k
+    """), params)]
+
+
+def single_statement_retrieve(db, embedding, query, doc_type, audience, top_k):
+    # Empty query text: vector ranking only, comparable with legacy
+    params = RAGService._retrieve_params(embedding, "", doc_type, audience, top_k)
+    return [row.id for row in db.execute(_RETRIEVE_QUERY, params)]
+
+
+def prepared_retrieve(db, embedding, query, doc_type, audience, top_k):
+    params = RAGService._retrieve_params(embedding, "", doc_type, audience, top_k)
+    return [row.id for row in RAGService._execute_prepared(db, params)]
+
+
+def hybrid_prepared_retrieve(db, embedding, query, doc_type, audience, top_k):
+    params = RAGService._retrieve_params(embedding, query, doc_type, audience, top_k)
+    return [row.id for row in RAGService._execute_prepared(db, params)]
+
+
+def run(database_url: str, n_sources: int, n_chunks: int, n_queries: int, top_k: int, keep: bool, reuse: bool,
+        ef_search: int = None):
+    options = f"-c search_path={SCHEMA},public" + (f" -c hnsw.ef_search={ef_search}" if ef_search else "")
+    engine = create_engine(database_url, connect_args={"options": options})
+    if reuse:
+        with engine.connect() as conn:
+            n_chunks = conn.execute(text(f"SELECT COUNT(*) FROM {SCHEMA}.rag_chunks")).scalar()
+        print(f"Reusing {SCHEMA} ({n_chunks} chunks)")
+    else:
+        started = time.perf_counter()
+        seed(engine, n_sources, n_chunks)
+        print(f"Seeded {n_sources} sources / {n_chunks} chunks in {time.perf_counter() - started:.1f} s")
+
+    rng = random.Random(5)
+    queries = [
+        (random_unit_vector(rng), f"chunk {rng.randrange(n_chunks)} scholarship requirements",
+         DOC_TYPES[i % len(DOC_TYPES)], AUDIENCES[i % 2] if i % 3 else None)
+        for i in range(n_queries)
+    ]
+    Session = sessionmaker(bind=engine)
+
+    try:
+        results = {}
+        for label, retrieve, exact in [
+            ("legacy (2 queries, inlined literal)", legacy_retrieve, False),
+            ("single statement, bound vector", single_statement_retrieve, False),
+            ("single statement, prepared", prepared_retrieve, False),
+            ("single statement, prepared, exact (index scans off)", prepared_retrieve, True),
+            ("hybrid (full-text + vector), prepared", hybrid_prepared_retrieve, False),
+        ]:
+            db = Session()
+            try:
+                if exact:
+                    db.execute(text("SET enable_indexscan = off"))
+                retrieve(db, *queries[0], top_k)  # Warm up (connection, PREPARE)
+                timings = []
+                ids = []
+                for query in queries:
+                    started = time.perf_counter()
+                    ids.append(retrieve(db, *query, top_k))
+                    timings.append((time.perf_counter() - started) * 1000)
+                db.rollback()
+            finally:
+                db.close()
+                # Fresh connections per variant: no SET or PREPAREd statement leaks into the next one
+                engine.dispose()
+            results[label] = ids
+            timings.sort()
+            print(f"\n{label}")
+            print(f"  median: {statistics.median(timings):8.3f} ms")
+            print(f"  p95:    {timings[int(len(timings) * 0.95) - 1]:8.3f} ms")
+            print(f"  mean:   {statistics.mean(timings):8.3f} ms")
+
+        baseline = results["legacy (2 queries, inlined literal)"]
+        print()
+        for label, ids in results.items():
+            same = sum(1 for a, b in zip(baseline, ids) if a == b)
+            found = sum(len(set(a) & set(b)) for a, b in zip(baseline, ids))
+            recall = found / max(sum(len(a) for a in baseline), 1)
+            print(f"{label}: same chunks as legacy for {same}/{len(ids)} queries, recall@{top_k} {recall:.3f}")
+    finally:
+        if not keep:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark legacy vs single-statement RAG retrieval")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"),
+                        help="PostgreSQL URL with pgvector (default: $DATABASE_URL)")
+    parser.add_argument("--sources", type=int, default=40)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="Keep the rag_bench schema afterwards")
+    parser.add_argument("--reuse", action="store_true", help="Skip seeding; use the rag_bench schema of a --keep run")
+    parser.add_argument("--ef-search", type=int, help="hnsw.ef_search for the benchmark connections (pgvector default 40)")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+    database_url = args.database_url
+    if database_url.startswith("postgres://"):
+        database_url = database_url.replace("postgres://", "postgresql+psycopg2://", 1)
+    run(database_url, args.sources, args.chunks, args.queries, args.top_k, args.keep, args.reuse, args.ef_search)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 """
 CLI script to ingest markdown documents from a folder into RAG database.
 Usage: python -m scripts.ingest_rag_folder <folder_path> [--doc-type <type>] [--audience <audience>] [--version <version>]
+       [--workers 4] [--dry-run] [--force]
 """
 import sys
 import os
 import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # Add parent directory to path
@@ -28,64 +31,123 @@ def determine_doc_type_from_filename(filename: str) -> str:
     else:
         return 'b2c_study'
 
+def determine_audience_from_filename(filename: str, default: str) -> str:
+    """Partner/B2B documents are for partners, everything else uses the default audience"""
+    filename_lower = filename.lower()
+    if 'partner' in filename_lower or 'b2b' in filename_lower:
+        return 'partner'
+    return default
+
+def process_file(
+    rag_service: RAGService,
+    md_file: Path,
+    doc_type: str = None,
+    audience: str = 'student',
+    version: str = None,
+    dry_run: bool = False,
+    force: bool = False
+) -> dict:
+    """Ingest (or estimate) one file in its own DB session; returns a result dict for progress reporting"""
+    started = time.perf_counter()
+    db: Session = SessionLocal()
+    try:
+        # Read file content
+        with open(md_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        # Determine doc_type / audience from filename if not provided
+        file_doc_type = doc_type or determine_doc_type_from_filename(md_file.name)
+        file_audience = determine_audience_from_filename(md_file.name, audience)
+        
+        # Resume: same text already ingested for this source
+        if not force and rag_service.is_source_current(db, md_file.name, file_doc_type, content,
+                                                       audience=file_audience, version=version):
+            return {"file": md_file.name, "status": "unchanged", "seconds": time.perf_counter() - started}
+        
+        if dry_run:
+            estimate = rag_service.estimate_ingestion(db, file_doc_type, content, version=version)
+            return {"file": md_file.name, "status": "estimate", "seconds": time.perf_counter() - started, **estimate}
+        
+        result = rag_service.ingest_source(
+            db=db,
+            name=md_file.name,
+            doc_type=file_doc_type,
+            audience=file_audience,
+            version=version,
+            source_url=None,
+            last_verified_at=None,
+            full_text=content
+        )
+        return {"file": md_file.name, "status": "ingested", "seconds": time.perf_counter() - started, **result}
+    except Exception as e:
+        db.rollback()
+        return {"file": md_file.name, "status": "error", "error": str(e), "seconds": time.perf_counter() - started}
+    finally:
+        db.close()
+
 def ingest_folder(
     folder_path: str,
     doc_type: str = None,
     audience: str = 'student',
-    version: str = None
+    version: str = None,
+    workers: int = 4,
+    dry_run: bool = False,
+    force: bool = False,
+    price_per_million_tokens: float = 0.02
 ):
-    """Ingest all markdown files from a folder"""
+    """
+    Ingest all markdown files from a folder.
+    Files are processed by a pool of `workers` threads (each with its own DB session), so at most
+    `workers` embedding requests are in flight. Unchanged files are skipped unless force=True.
+    """
     folder = Path(folder_path)
     if not folder.exists():
         print(f"Error: Folder {folder_path} does not exist")
         return
     
-    db: Session = SessionLocal()
-    rag_service = RAGService()
-    
-    md_files = list(folder.glob("*.md"))
+    md_files = sorted(folder.glob("*.md"))
     if not md_files:
         print(f"No .md files found in {folder_path}")
         return
     
-    print(f"Found {len(md_files)} markdown files")
+    print(f"Found {len(md_files)} markdown files ({'dry run, ' if dry_run else ''}{workers} workers)")
+    
+    rag_service = RAGService()
+    started = time.perf_counter()
+    counts = {"ingested": 0, "unchanged": 0, "estimate": 0, "error": 0}
+    chunks_created = 0
+    new_chunks = 0
+    new_tokens = 0
     
-    for md_file in md_files:
-        try:
-            print(f"\nProcessing: {md_file.name}")
-            
-            # Read file content
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Determine doc_type if not provided
-            file_doc_type = doc_type or determine_doc_type_from_filename(md_file.name)
-            
-            # Determine audience from filename if not provided
-            file_audience = audience
-            if 'partner' in md_file.name.lower() or 'b2b' in md_file.name.lower():
-                file_audience = 'partner'
-            
-            # Ingest the file
-            result = rag_service.ingest_source(
-                db=db,
-                name=md_file.name,
-                doc_type=file_doc_type,
-                audience=file_audience,
-                version=version,
-                source_url=None,
-                last_verified_at=None,
-                full_text=content
-            )
-            
-            print(f"  ✓ Ingested: {result['chunks_created']} chunks created, {result['chunks_skipped']} skipped")
-            
-        except Exception as e:
-            print(f"  ✗ Error processing {md_file.name}: {e}")
-            continue
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [
+            executor.submit(process_file, rag_service, md_file, doc_type, audience, version, dry_run, force)
+            for md_file in md_files
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            counts[result["status"]] += 1
+            prefix = f"[{done}/{len(md_files)}] {result['file']}"
+            if result["status"] == "ingested":
+                chunks_created += result["chunks_created"]
+                print(f"  ✓ {prefix}: {result['chunks_created']} chunks created, {result['chunks_skipped']} skipped ({result['seconds']:.1f}s)")
+            elif result["status"] == "unchanged":
+                print(f"  - {prefix}: unchanged, skipped")
+            elif result["status"] == "estimate":
+                new_chunks += result["new_chunks"]
+                new_tokens += result["new_tokens"]
+                print(f"  ~ {prefix}: {result['new_chunks']}/{result['total_chunks']} chunks to embed, {result['new_tokens']} tokens")
+            else:
+                print(f"  ✗ {prefix}: {result['error']}")
     
-    db.close()
-    print("\n✓ Ingestion complete!")
+    elapsed = time.perf_counter() - started
+    if dry_run:
+        cost = new_tokens / 1_000_000 * price_per_million_tokens
+        print(f"\nDry run: {counts['estimate']} files to ingest, {counts['unchanged']} unchanged, {counts['error']} errors")
+        print(f"Would embed {new_chunks} chunks / {new_tokens} tokens (~${cost:.4f} at ${price_per_million_tokens}/1M tokens)")
+    else:
+        print(f"\n✓ Ingestion complete in {elapsed:.1f}s: {counts['ingested']} files ingested ({chunks_created} chunks created), "
+              f"{counts['unchanged']} unchanged, {counts['error']} errors")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Ingest markdown files from a folder into RAG database")
@@ -95,6 +157,14 @@ if __name__ == "__main__":
     parser.add_argument("--audience", choices=['student', 'partner'], default='student',
                        help="Target audience (default: student)")
     parser.add_argument("--version", help="Document version (e.g., '2026', 'v1.0')")
+    parser.add_argument("--workers", type=int, default=4,
+                       help="Files processed in parallel / embedding requests in flight (default: 4)")
+    parser.add_argument("--dry-run", action="store_true",
+                       help="Only estimate chunks, tokens and embedding cost (no writes, no API calls)")
+    parser.add_argument("--force", action="store_true",
+                       help="Re-process files even if their content is unchanged since the last ingestion")
+    parser.add_argument("--price-per-million-tokens", type=float, default=0.02,
+                       help="Embedding price used for the dry-run estimate (default: 0.02, text-embedding-3-small)")
     
     args = parser.parse_args()
     
@@ -102,7 +172,9 @@ if __name__ == "__main__":
         folder_path=args.folder,
         doc_type=args.doc_type,
         audience=args.audience,
-        version=args.version
+        version=args.version,
+        workers=args.workers,
+        dry_run=args.dry_run,
+        force=args.force,
+        price_per_million_tokens=args.price_per_million_tokens
     )
-
-
@@ -0,0 +1,32 @@
+"""
+Shared pytest fixtures.
+"""
+import pytest
+
+from app.services.catalog_service import catalog_service
+from app.services.response_cache import response_cache
+from app.services.tavily_service import search_cache
+
+
+@pytest.fixture(autouse=True)
+def reset_catalog():
+    """The catalog snapshot is process-wide; start every test without one"""
+    catalog_service.reset()
+    yield
+    catalog_service.reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_response_cache():
+    """Cached answers are process-wide; never carry them between tests"""
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_tavily_cache():
+    """Web search results are cached process-wide; never carry them between tests"""
+    search_cache.clear()
+    yield
+    search_cache.clear()
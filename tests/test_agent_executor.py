@@ -0,0 +1,95 @@
+"""
+Tests for the bounded agent turn executor
+"""
+import asyncio
+import threading
+import time
+import pytest
+from app.services.agent_executor import AgentExecutor, AgentBusyError, AgentTimeoutError
+
+
+class TestAgentExecutor:
+    
+    def test_run_returns_result_off_event_loop(self):
+        executor = AgentExecutor(max_workers=2, max_queue=4, turn_timeout=5)
+        loop_thread = threading.get_ident()
+        
+        async def main():
+            return await executor.run(lambda: threading.get_ident())
+        
+        worker_thread = asyncio.run(main())
+        assert worker_thread != loop_thread
+        metrics = executor.metrics()
+        assert metrics["completed"] == 1
+        assert metrics["queued"] == 0 and metrics["running"] == 0
+        executor.shutdown()
+    
+    def test_timeout(self):
+        executor = AgentExecutor(max_workers=1, max_queue=4, turn_timeout=0.05)
+        
+        async def main():
+            await executor.run(time.sleep, 0.5)
+        
+        with pytest.raises(AgentTimeoutError):
+            asyncio.run(main())
+        assert executor.metrics()["timed_out"] == 1
+        executor.shutdown()
+    
+    def test_queue_full_rejects(self):
+        executor = AgentExecutor(max_workers=1, max_queue=1, turn_timeout=5)
+        release = threading.Event()
+        executor.submit(release.wait)
+        # Wait until the first task occupies the only worker
+        deadline = time.time() + 2
+        while executor.metrics()["running"] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        executor.submit(release.wait)  # queued
+        with pytest.raises(AgentBusyError):
+            executor.submit(release.wait)
+        metrics = executor.metrics()
+        assert metrics["queued"] == 1
+        assert metrics["rejected"] == 1
+        release.set()
+        executor.shutdown(wait=True)
+    
+    def test_failure_counted(self):
+        executor = AgentExecutor(max_workers=1, max_queue=1, turn_timeout=5)
+        
+        def boom():
+            raise ValueError("boom")
+        
+        with pytest.raises(ValueError):
+            executor.submit(boom).result()
+        assert executor.metrics()["failed"] == 1
+        executor.shutdown()
+    
+    def test_timed_out_turn_keeps_its_own_session(self):
+        sessions = []
+        
+        class FakeSession:
+            def __init__(self):
+                self.closed = False
+                self.thread = threading.get_ident()
+                sessions.append(self)
+            
+            def close(self):
+                self.closed = True
+        
+        executor = AgentExecutor(max_workers=1, max_queue=4, turn_timeout=0.05, session_factory=FakeSession)
+        release = threading.Event()
+        
+        def turn(db):
+            release.wait(5)
+            return db
+        
+        async def main():
+            await executor.run_in_session(turn)
+        
+        loop_thread = threading.get_ident()
+        with pytest.raises(AgentTimeoutError):
+            asyncio.run(main())
+        assert len(sessions) == 1 and sessions[0].thread != loop_thread
+        assert not sessions[0].closed  # Still in use by the running turn
+        release.set()
+        executor.shutdown(wait=True)
+        assert sessions[0].closed
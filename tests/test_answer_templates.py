@@ -0,0 +1,136 @@
+"""
+Tests for deterministic partner answer templates (no database / OpenAI calls)
+"""
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models import IntakeTerm, Major, ProgramIntake, University
+from app.services.answer_templates import estimate_total_cost, render_answer, template_kind, template_stats
+from app.services.partner_agent import PartnerAgent
+
+
+@pytest.fixture(autouse=True)
+def reset_template_stats():
+    template_stats.reset()
+    yield
+    template_stats.reset()
+
+
+def intake(intake_id=1, university="Beihang University", major="Computer Science", **fields):
+    row = {
+        "id": intake_id, "university_id": intake_id, "university_name": university, "major_name": major,
+        "degree_level": "Master", "teaching_language": "English", "intake_term": "September",
+        "intake_year": 2026, "application_deadline": "2026-05-31T00:00:00", "currency": "CNY",
+    }
+    row.update(fields)
+    return row
+
+
+class TestRenderAnswer:
+    """Test cases for the per-intent templates"""
+
+    def test_fees_labels_periods_and_skips_nulls(self):
+        answer = render_answer("FEES", [intake(
+            tuition_per_year=30000.0, application_fee=800.0, accommodation_fee=1000.0,
+            accommodation_fee_period="month", medical_insurance_fee=None, duration_years=2.5
+        )], {}, {}, {})
+
+        assert "**Beihang University - Computer Science** (Master, English-taught, September 2026 intake)" in answer
+        assert "- Tuition: 30,000 CNY per year" in answer
+        assert "- Accommodation: 1,000 CNY per month" in answer
+        assert "- Application fee: 800 CNY (one-time)" in answer
+        assert "insurance" not in answer.lower() and "Not provided" not in answer
+        assert "- Application deadline: 2026-05-31" in answer
+
+    def test_requirements_render_documents_and_exams(self):
+        documents = {1: [{"name": "Passport", "is_required": True}, {"name": "CV", "is_required": False, "rules": "English"}]}
+        exams = {1: [{"exam_name": "CSCA", "required": True, "subjects": "Math"}]}
+        answer = render_answer("REQUIREMENTS", [intake(age_max=35, bank_statement_required=True,
+                                                       bank_statement_amount=5000, bank_statement_currency="USD")],
+                               documents, {}, exams)
+
+        assert "- Age: up to 35" in answer
+        assert "**Bank statement required:** Yes, amount 5,000 USD" in answer
+        assert "- Passport\n- CV (optional): English" in answer
+        assert "- CSCA (required, subjects: Math)" in answer
+
+    def test_scholarship_without_data_omits_the_line(self):
+        scholarships = {2: [{"scholarship_name": "CSC Type A", "covers_tuition": True, "covers_accommodation": True,
+                             "living_allowance_monthly": 3000, "deadline": "2026-03-01"}]}
+        answer = render_answer("SCHOLARSHIP", [intake(1), intake(2, university="Tongji University")], {}, scholarships, {})
+
+        first, second = answer.split("\n\n")
+        assert first.splitlines() == [
+            "**Beihang University - Computer Science** (Master, English-taught, September 2026 intake)",
+            "- Application deadline: 2026-05-31",
+        ]
+        assert "Not provided" not in answer
+        assert "**CSC Type A**: covers tuition, accommodation; living allowance 3,000 CNY/month; deadline 2026-03-01" in second
+
+    def test_comparison_table_caps_width(self):
+        rows = [intake(n, university=f"University {n}", tuition_per_year=20000 + n) for n in range(1, 5)]
+        answer = render_answer("COMPARISON", rows, {}, {}, {})
+
+        assert "| | Option 1 | Option 2 | Option 3 |" in answer
+        assert "| **Tuition** | 20,001 CNY/year | 20,002 CNY/year | 20,003 CNY/year |" in answer
+        assert "University 4" not in answer and "1 more matching program(s) not shown" in answer
+
+    def test_total_cost_matches_context_arithmetic(self):
+        estimate = estimate_total_cost(intake(duration_years=2, tuition_per_year=10000, accommodation_fee=500,
+                                              accommodation_fee_period="semester", application_fee=400,
+                                              visa_extension_fee=100))
+        assert estimate == {"duration": 2, "total": 22600, "one_time": 400, "recurring": 22000, "visa": 200}
+
+    def test_general_intent_uses_llm(self):
+        assert template_kind("GENERAL") is None and template_kind("LIST_PROGRAMS") is None
+        assert render_answer("GENERAL", [intake()], {}, {}, {}) is None
+
+
+class TestPartnerAgentTemplates:
+    """render_template_answer builds the dicts from ProgramIntake rows and loads only what it shows"""
+
+    def make_intake(self):
+        return ProgramIntake(
+            id=7, university_id=3, university=University(name="Harbin Institute of Technology"),
+            major=Major(name="Mechanical Engineering", degree_level="Bachelor", teaching_language="English", duration_years=4),
+            intake_term=IntakeTerm.SEPTEMBER, intake_year=2026, application_deadline=datetime(2026, 6, 15),
+            tuition_per_year=25000.0, currency="CNY"
+        )
+
+    def test_fees_answer_without_llm_or_extra_queries(self):
+        agent = PartnerAgent(Mock(spec=Session))
+        agent.openai_service = Mock()
+        with patch.object(agent, "_get_program_documents_batch") as docs, \
+                patch.object(agent, "_get_program_scholarships_batch") as scholarships:
+            answer = agent.render_template_answer([self.make_intake()], "FEES", {"fees": True})
+
+        assert "**Harbin Institute of Technology - Mechanical Engineering** (Bachelor, English-taught" in answer
+        assert "- **Estimated total over 4 year(s):** 100,000 CNY" in answer
+        docs.assert_not_called()
+        scholarships.assert_not_called()
+        agent.openai_service.chat_completion_text.assert_not_called()
+        assert template_stats.metrics()["by_intent"] == {"FEES": {"template": 1, "llm": 0}}
+
+    def test_details_batch_loads_related_rows(self):
+        agent = PartnerAgent(Mock(spec=Session))
+        with patch.object(agent, "_get_program_documents_batch", return_value={7: [{"name": "Passport"}]}) as docs, \
+                patch.object(agent, "_get_program_exam_requirements_batch", return_value={}), \
+                patch.object(agent, "_get_program_scholarships_batch", return_value={}):
+            answer = agent.render_template_answer([self.make_intake()], "PROGRAM_DETAILS", {})
+
+        docs.assert_called_once_with([7])
+        assert "**Required documents:**\n- Passport" in answer
+
+    def test_render_error_falls_back_to_llm(self):
+        agent = PartnerAgent(Mock(spec=Session))
+        with patch.object(agent, "_get_program_documents_batch", side_effect=RuntimeError("db gone")):
+            assert agent.render_template_answer([self.make_intake()], "REQUIREMENTS", {}) is None
+        assert template_stats.metrics()["by_intent"] == {}
+
+    def test_non_intake_results_fall_back(self):
+        agent = PartnerAgent(Mock(spec=Session))
+        assert agent.render_template_answer([{"university": Mock()}], "FEES", {}) is None
+        assert agent.render_template_answer([self.make_intake()], "GENERAL", {}) is None
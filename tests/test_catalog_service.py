@@ -0,0 +1,88 @@
+"""
+Tests for the shared university/major catalog snapshot.
+"""
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from app.services.catalog_service import CatalogService
+
+
+def _university(id, name, is_partner=True):
+    return SimpleNamespace(
+        id=id, name=name, name_cn=None, aliases='["Alias"]', city="Harbin", province=None,
+        university_ranking=None, country=None, description=None, is_partner=is_partner
+    )
+
+
+def _major(id, name, university_id):
+    return SimpleNamespace(
+        id=id, name=name, name_cn=None, keywords="CS, computing", aliases=None,
+        degree_level="Master", teaching_language="English", discipline=None, category=None,
+        duration_years=2, university_id=university_id
+    )
+
+
+class TestCatalogService:
+    """Test cases for CatalogService"""
+
+    def _db_service(self):
+        db_service = Mock()
+        db_service.search_universities.return_value = [
+            _university(1, "Northeast Forestry University"),
+            _university(2, "Other University", is_partner=False),
+        ]
+        db_service.search_majors.return_value = [
+            _major(10, "Computer Science", 1),
+            _major(11, "Physics", 2),
+        ]
+        return db_service
+
+    def test_snapshot_is_shared_until_invalidated(self):
+        service = CatalogService(ttl_seconds=600)
+        db_service = self._db_service()
+
+        first = service.get(db_service)
+        assert service.get(db_service) is first
+        assert db_service.search_universities.call_count == 1
+
+        service.invalidate()
+        second = service.get(db_service)
+        assert second is not first
+        assert second.version == first.version + 1
+        assert db_service.search_universities.call_count == 2
+
+    def test_partner_filtering_and_university_names(self):
+        snapshot = CatalogService(ttl_seconds=600).get(self._db_service())
+
+        assert [u["id"] for u in snapshot.partner_universities] == [1]
+        assert [m["id"] for m in snapshot.partner_majors] == [10]
+        assert snapshot.major_by_id[11]["university_name"] == "Other University"
+        assert snapshot.university_by_id[1]["aliases"] == ["Alias"]
+        assert snapshot.major_by_id[10]["keywords"] == ["CS", "computing"]
+
+    def test_partial_load_keeps_previous_snapshot(self):
+        service = CatalogService(ttl_seconds=600)
+        db_service = self._db_service()
+        first = service.get(db_service)
+
+        db_service.search_majors.side_effect = Exception("connection lost")
+        assert service.get(db_service, force_reload=True) is first
+        db_service.db.rollback.assert_called()
+
+    def test_ttl_expiry_reloads(self):
+        service = CatalogService(ttl_seconds=0)
+        db_service = self._db_service()
+        service.get(db_service)
+        service.get(db_service)
+        assert db_service.search_universities.call_count == 2
+
+    def test_match_index_follows_snapshot(self):
+        service = CatalogService(ttl_seconds=600)
+        db_service = self._db_service()
+
+        index = service.get_match_index(db_service)
+        assert service.get_match_index(db_service) is index
+        assert index.university_candidates("northeast forestry")[0]["id"] == 1
+
+        service.invalidate()
+        assert service.get_match_index(db_service) is not index
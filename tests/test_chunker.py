@@ -0,0 +1,61 @@
+"""
+Tests for the structure-aware RAG chunker.
+"""
+from app.services.chunker import MarkdownChunker
+
+
+class WordEncoding:
+    """Stand-in for a tiktoken encoding: one token per whitespace-separated word"""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def make_chunker(max_tokens=60, overlap_tokens=5):
+    return MarkdownChunker(WordEncoding(), max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+
+class TestMarkdownChunker:
+    """Test cases for MarkdownChunker"""
+
+    def test_headings_start_chunks_and_form_section_path(self):
+        text = (
+            "# Answer Bank\n\nIntro paragraph.\n\n"
+            "## Cost & Fees\n\n**Q: Is the deposit refundable?**\nA: Yes, if admission fails.\n\n"
+            "## Safety\n\nChina is safe.\n"
+        )
+        chunks = make_chunker().chunk(text)
+        assert [c.section_path for c in chunks] == [["Answer Bank"], ["Answer Bank", "Cost & Fees"], ["Answer Bank", "Safety"]]
+        assert chunks[1].text.startswith("Answer Bank > Cost & Fees\n\n**Q: Is the deposit refundable?**")
+        assert chunks[1].metadata()["section_path"] == ["Answer Bank", "Cost & Fees"]
+
+    def test_question_and_answer_stay_together(self):
+        qa = [f"**Q: Question {i}?**\nA: " + " ".join(["word"] * 35) for i in range(4)]
+        chunks = make_chunker(max_tokens=60).chunk("## FAQ\n\n" + "\n\n".join(qa))
+        assert len(chunks) == 4
+        for i, chunk in enumerate(chunks):
+            assert f"Question {i}?" in chunk.text and "A: word" in chunk.text
+            assert chunk.token_count <= 60
+
+    def test_answer_paragraphs_follow_their_question(self):
+        text = "### Q: What subjects are in CSCA?\n**Answer:**\n- Mathematics\n- Physics\n\n---\n\nNote for agent."
+        chunks = make_chunker().chunk(text)
+        assert len(chunks) == 1
+        assert chunks[0].section_path == ["Q: What subjects are in CSCA?"]
+        assert "- Physics" in chunks[0].text and "Note for agent." in chunks[0].text
+
+    def test_oversized_paragraph_is_split_on_sentences_with_overlap(self):
+        sentences = [f"Sentence {i} has exactly six words." for i in range(30)]
+        chunks = make_chunker(max_tokens=40, overlap_tokens=6).chunk(" ".join(sentences))
+        assert len(chunks) > 1
+        assert all(c.token_count <= 40 for c in chunks)
+        assert all(c.text.rstrip().endswith(".") for c in chunks)
+        # The last sentence of a chunk is repeated at the start of the next one
+        assert chunks[1].text.startswith(chunks[0].text.split(". ")[-1])
+
+    def test_text_without_breaks_falls_back_to_token_windows(self):
+        chunks = make_chunker(max_tokens=50, overlap_tokens=10).chunk(" ".join(["x"] * 120))
+        assert [c.token_count for c in chunks] == [50, 50, 40]
@@ -0,0 +1,144 @@
+"""
+Tests for DataIngestionService: set-based (bulk) path vs row-by-row path (run against SQLite).
+"""
+import copy
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.models import (
+    Base, University, Major, ProgramIntake, ProgramDocument, Scholarship, ProgramIntakeScholarship, IntakeTerm
+)
+from app.services import data_ingestion_service
+from app.services.data_ingestion_service import DataIngestionService
+
+TABLES = [University.__table__, Major.__table__, ProgramIntake.__table__, ProgramDocument.__table__,
+          Scholarship.__table__, ProgramIntakeScholarship.__table__]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=TABLES)
+    session = sessionmaker(bind=engine)()
+    university = University(id=1, name="Harbin Institute of Technology")
+    session.add(university)
+    session.flush()
+    major = Major(university_id=1, name="Computer Science", degree_level="Master", teaching_language="English")
+    session.add(major)
+    session.flush()
+    intake = ProgramIntake(university_id=1, major_id=major.id, intake_term=IntakeTerm.SEPTEMBER, intake_year=2026,
+                           tuition_per_year=25000)
+    session.add_all([intake, Scholarship(name="CSC Type B", provider="CSC")])
+    session.flush()
+    session.add(ProgramDocument(program_intake_id=intake.id, name="Passport"))
+    session.commit()
+    yield session
+    session.close()
+
+
+def intake(term="September", year=2026, scholarships=("csc type b",)):
+    return {
+        "intake_term": term, "intake_year": year, "application_deadline": "2026-03-10",
+        "fees": {"tuition_per_year": 30000.0, "currency": "CNY"}, "requirements": {"hsk_required": False},
+        "documents": [{"name": "Passport"}, {"name": "Transcript", "rules": "Notarized"}],
+        "scholarships": [{"name": name, "covers_tuition": True} for name in scholarships],
+    }
+
+
+EXTRACTED = {
+    "university_name": "harbin institute of technology",
+    "majors": [
+        {"name": "computer science", "degree_level": "Master", "teaching_language": "English",
+         "intakes": [intake(), intake("March", 2027, ("CSC Type B", "University Scholarship"))]},
+        {"name": "Software Engineering", "degree_level": "Master", "teaching_language": "English", "intakes": [intake()]},
+        {"name": "", "degree_level": "Master", "teaching_language": "English", "intakes": [intake()]},
+    ],
+    "major_groups": [
+        {"major_names": ["Physics", "Software Engineering"], "degree_level": "Master", "teaching_language": "English",
+         "intakes": [intake()]},
+    ],
+}
+
+
+def snapshot(db):
+    return {
+        "majors": sorted((m.name, m.degree_level) for m in db.query(Major)),
+        "intakes": sorted((i.major_id, i.intake_term.value, i.intake_year, i.tuition_per_year) for i in db.query(ProgramIntake)),
+        "documents": sorted((d.program_intake_id, d.name, d.rules) for d in db.query(ProgramDocument)),
+        "scholarships": sorted((s.name, s.provider) for s in db.query(Scholarship)),
+        "links": sorted((l.program_intake_id, l.scholarship_id, l.covers_tuition) for l in db.query(ProgramIntakeScholarship)),
+    }
+
+
+class TestDataIngestion:
+    """Test cases for set-based ingestion"""
+
+    def test_bulk_matches_row_by_row(self, db):
+        with patch.object(data_ingestion_service.settings, "DATA_INGESTION_BULK", False):
+            expected_counts = DataIngestionService(db).ingest_extracted_data(copy.deepcopy(EXTRACTED))
+        expected_state = snapshot(db)
+        db.rollback()
+
+        # Fresh database with the same seed rows for the bulk path
+        for table in reversed(TABLES[1:]):
+            db.execute(table.delete())
+        db.commit()
+        major = Major(university_id=1, name="Computer Science", degree_level="Master", teaching_language="English")
+        db.add(major)
+        db.flush()
+        seeded = ProgramIntake(university_id=1, major_id=major.id, intake_term=IntakeTerm.SEPTEMBER, intake_year=2026)
+        db.add_all([seeded, Scholarship(name="CSC Type B", provider="CSC")])
+        db.flush()
+        db.add(ProgramDocument(program_intake_id=seeded.id, name="Passport"))
+        db.commit()
+
+        counts = DataIngestionService(db).ingest_extracted_data(copy.deepcopy(EXTRACTED))
+
+        assert counts == expected_counts
+        assert counts["majors_inserted"] == 2 and counts["majors_updated"] == 2
+        assert counts["program_intakes_inserted"] == 3 and counts["program_intakes_updated"] == 2
+        assert counts["links_inserted"] == 5
+        assert snapshot(db)["majors"] == expected_state["majors"]
+        assert len(snapshot(db)["links"]) == len(expected_state["links"])
+        assert snapshot(db)["documents"][0][2] == expected_state["documents"][0][2]
+
+    def test_bulk_statement_count_does_not_grow_with_majors(self, db):
+        extracted = {
+            "university_name": "Harbin Institute of Technology",
+            "majors": [{"name": f"Major {i}", "degree_level": "Bachelor", "teaching_language": "English",
+                        "intakes": [intake(), intake("March", 2027)]} for i in range(60)],
+        }
+        statements = []
+        event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        counts = DataIngestionService(db).ingest_extracted_data(extracted)
+
+        assert counts["majors_inserted"] == 60 and counts["program_intakes_inserted"] == 120
+        assert counts["documents_inserted"] == 240 and counts["links_inserted"] == 120
+        assert counts["errors"] == []
+        assert len(statements) < 20
+        assert db.query(ProgramDocument).count() == 241
+
+    def test_bulk_failure_falls_back_to_row_by_row(self, db):
+        service = DataIngestionService(db)
+        with patch.object(service, "_ingest_bulk", side_effect=RuntimeError("boom")):
+            counts = service.ingest_extracted_data(copy.deepcopy(EXTRACTED))
+        assert counts["majors_inserted"] == 2
+        assert db.query(Major).count() == 3
+
+    def test_string_year_matches_existing_intake(self, db):
+        extracted = {
+            "university_name": "Harbin Institute of Technology",
+            "majors": [{"name": "Computer Science", "degree_level": "Master", "teaching_language": "English",
+                        "intakes": [intake(term="september", year="2026"), intake(year=2026)]}],
+        }
+        service = DataIngestionService(db)
+        with patch.object(service, "_ingest_row_by_row") as row_by_row:
+            counts = service.ingest_extracted_data(extracted)
+
+        row_by_row.assert_not_called()
+        assert counts["program_intakes_inserted"] == 0 and counts["program_intakes_updated"] == 2
+        assert [(i.intake_year, i.tuition_per_year) for i in db.query(ProgramIntake)] == [(2026, 30000.0)]
@@ -0,0 +1,81 @@
+"""
+Tests for DBQueryService.find_program_intakes (single-query page + total) and its explain mode.
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import University, Major, ProgramIntake, IntakeTerm
+from app.services.db_query_service import DBQueryService
+
+
+class TestFindProgramIntakes:
+    """Test cases for find_program_intakes / explain_program_intakes"""
+
+    @pytest.fixture
+    def db(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[University.__table__, Major.__table__, ProgramIntake.__table__])
+        session = Session(engine)
+        future = datetime.now(timezone.utc) + timedelta(days=60)
+
+        partner = University(id=1, name="Harbin Institute of Technology", is_partner=True, city="Harbin")
+        other = University(id=2, name="Other University", is_partner=False)
+        session.add_all([partner, other])
+        session.add_all([
+            Major(id=1, university_id=1, name="Computer Science", degree_level="Master", teaching_language="English"),
+            Major(id=2, university_id=1, name="Civil Engineering", degree_level="Bachelor", teaching_language="Chinese"),
+            Major(id=3, university_id=2, name="Computer Science", degree_level="Master", teaching_language="English"),
+        ])
+        for i in range(5):
+            session.add(ProgramIntake(
+                university_id=1, major_id=1, intake_term=IntakeTerm.SEPTEMBER, intake_year=2026 + i,
+                application_deadline=future + timedelta(days=i), scholarship_info="Type A scholarship" if i % 2 else None
+            ))
+        session.add(ProgramIntake(university_id=1, major_id=2, intake_term=IntakeTerm.MARCH, intake_year=2026,
+                                  application_deadline=future))
+        session.add(ProgramIntake(university_id=2, major_id=3, intake_term=IntakeTerm.SEPTEMBER, intake_year=2026,
+                                  application_deadline=future))
+        session.commit()
+        yield session
+        session.close()
+
+    def _count_statements(self, db):
+        statements = []
+        event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+        return statements
+
+    def test_page_and_total_in_one_query(self, db):
+        statements = self._count_statements(db)
+        intakes, total = DBQueryService(db).find_program_intakes(
+            filters={"major_ids": [1], "degree_level": "Master", "intake_term": IntakeTerm.SEPTEMBER}, limit=2
+        )
+        assert total == 5
+        assert [i.intake_year for i in intakes] == [2026, 2027]
+        assert len(statements) == 1
+
+    def test_offset_past_end_still_reports_total(self, db):
+        intakes, total = DBQueryService(db).find_program_intakes(filters={"major_ids": [1]}, limit=10, offset=10)
+        assert intakes == []
+        assert total == 5
+
+    def test_partner_only_and_scholarship_types(self, db):
+        service = DBQueryService(db)
+        _, total = service.find_program_intakes(filters={"major_text": "Computer"})
+        assert total == 5
+        intakes, total = service.find_program_intakes(filters={"has_scholarship": True, "scholarship_types": ["Type A"]})
+        assert total == 2
+        assert all("Type A" in i.scholarship_info for i in intakes)
+
+    def test_explain_returns_filter_funnel(self, db):
+        result = DBQueryService(db).explain_program_intakes(
+            {"university_ids": [1], "major_ids": [1, 3], "intake_term": IntakeTerm.MARCH}
+        )
+        assert result["base_count"] == 6
+        assert [(s["filter"], s["count"]) for s in result["steps"]] == [
+            ("university_ids", 6), ("major_ids", 5), ("intake_term", 0)
+        ]
+        assert result["total_count"] == 0
+        assert result["warnings"][0]["major_ids"] == [3]
@@ -0,0 +1,113 @@
+"""
+Tests for map-reduce extraction of large program documents.
+"""
+import json
+import threading
+import time
+from unittest.mock import Mock, patch
+
+from app.schemas.document_import import ExtractedData
+from app.services import document_extraction_service
+from app.services.document_extraction_service import DocumentExtractionService
+from app.services.extraction_map_reduce import merge_extracted_fragments, split_document_sections
+
+
+def intake(term="September", year=2026, **fees):
+    return {"intake_term": term, "intake_year": year, "fees": dict(fees), "requirements": {},
+            "documents": [{"name": "Passport", "is_required": True}], "scholarships": []}
+
+
+def major(name, degree="Master", language="English", intakes=None, **fields):
+    return {"name": name, "degree_level": degree, "teaching_language": language,
+            "intakes": intakes if intakes is not None else [intake()], **fields}
+
+
+class TestSplitDocumentSections:
+    """Test cases for section-aligned splitting"""
+
+    def test_small_document_is_one_part(self):
+        assert split_document_sections("Short brochure", 100) == ["Short brochure"]
+
+    def test_splits_between_sections_without_losing_text(self):
+        sections = [f"## Major {i}\nTuition {i}000 RMB per year. Duration 2 years." for i in range(30)]
+        text = "\n\n".join(sections)
+        parts = split_document_sections(text, 300)
+
+        assert len(parts) > 1
+        assert all(len(p) <= 300 for p in parts)
+        for section in sections:
+            assert sum(section in p for p in parts) == 1  # Never cut inside a section
+
+    def test_oversized_section_is_split(self):
+        parts = split_document_sections("x" * 1000, 300)
+        assert "".join(parts) == "x" * 1000
+
+
+class TestMergeExtractedFragments:
+    """Test cases for the deterministic merge"""
+
+    def test_majors_and_intakes_are_deduplicated(self):
+        merged = merge_extracted_fragments([
+            {"university_name": "Harbin Institute of Technology", "errors": [],
+             "majors": [major("Computer Science", keywords=["computer science"], duration_years=None,
+                              intakes=[intake(tuition_per_year=30000)])]},
+            {"university_name": "", "errors": ["Could not extract university name"],
+             "majors": [major("computer  science", keywords=["cs"], duration_years=2.0,
+                              intakes=[intake(tuition_per_year=None, application_fee=600), intake("March", 2027)]),
+                        major("Computer Science", degree="Phd")]},
+        ])
+
+        assert merged["university_name"] == "Harbin Institute of Technology"
+        assert merged["errors"] == []
+        assert [(m["name"], m["degree_level"]) for m in merged["majors"]] == [
+            ("Computer Science", "Master"), ("Computer Science", "Phd")
+        ]
+        master = merged["majors"][0]
+        assert master["duration_years"] == 2.0
+        assert master["keywords"] == ["computer science", "cs"]
+        assert [(i["intake_term"], i["intake_year"]) for i in master["intakes"]] == [("September", 2026), ("March", 2027)]
+        assert master["intakes"][0]["fees"] == {"tuition_per_year": 30000, "application_fee": 600}
+        assert len(master["intakes"][0]["documents"]) == 1
+        ExtractedData(**merged)
+
+    def test_major_groups_are_expanded(self):
+        merged = merge_extracted_fragments([
+            {"university_name": "BNU", "major_groups": [
+                {"major_names": ["Physics", "Chemistry"], "degree_level": "Phd", "teaching_language": "Chinese", "intakes": [intake()]}
+            ]},
+            {"university_name": "BNU", "majors": [major("Physics", degree="Phd", language="Chinese")]},
+        ])
+        assert [m["name"] for m in merged["majors"]] == ["Physics", "Chemistry"]
+
+
+class TestExtractDataFromText:
+    """Test cases for concurrent part extraction"""
+
+    def test_large_document_is_extracted_in_parts_concurrently(self):
+        with patch.object(document_extraction_service, "OpenAIService"):
+            service = DocumentExtractionService()
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def chat_completion(messages, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            prompt = messages[1]["content"]
+            names = [line[3:] for line in prompt.split("extract every major listed in this part:")[-1].splitlines()
+                     if line.startswith("## ")]
+            content = json.dumps({"university_name": "Test University", "majors": [major(n) for n in names], "errors": []})
+            return Mock(usage=None, choices=[Mock(message=Mock(content=content))])
+
+        service.openai_service.chat_completion.side_effect = chat_completion
+        text = "\n\n".join(f"## Major {i}\n" + "Program details. " * 20 for i in range(40))
+        with patch.object(document_extraction_service.settings, "DOCUMENT_EXTRACTION_CHUNK_CHARS", 2000):
+            result = service.extract_data_from_text(text)
+
+        assert service.openai_service.chat_completion.call_count > 1
+        assert peak[0] > 1
+        assert [m["name"] for m in result["majors"]] == [f"Major {i}" for i in range(40)]
+        assert result["university_name"] == "Test University"
@@ -0,0 +1,82 @@
+"""
+Tests for the query embedding cache.
+"""
+import pytest
+from unittest.mock import Mock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import QueryEmbeddingCache
+from app.services.embedding_cache import EmbeddingCache, normalize_query_text
+
+
+class TestEmbeddingCache:
+    """Test cases for the in-memory tier"""
+
+    def test_normalized_text_hits(self):
+        cache = EmbeddingCache(max_entries=10)
+        compute = Mock(return_value=[0.5, 0.25])
+        assert cache.get_or_compute("How to apply?", "m1", compute) == [0.5, 0.25]
+        assert cache.get_or_compute("  how TO   apply ", "m1", compute) == [0.5, 0.25]
+        compute.assert_called_once_with("How to apply?")
+        metrics = cache.metrics()
+        assert metrics["memory_hits"] == 1
+        assert metrics["misses"] == 1
+        assert metrics["hit_rate"] == 0.5
+
+    def test_keyed_on_model(self):
+        cache = EmbeddingCache(max_entries=10)
+        compute = Mock(side_effect=[[1.0], [2.0]])
+        assert cache.get_or_compute("tuition fee", "text-embedding-3-small", compute) == [1.0]
+        assert cache.get_or_compute("tuition fee", "text-embedding-3-large", compute) == [2.0]
+        assert compute.call_count == 2
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(max_entries=2)
+        compute = Mock(side_effect=lambda text: [float(len(text))])
+        cache.get_or_compute("a", "m", compute)
+        cache.get_or_compute("bb", "m", compute)
+        cache.get_or_compute("a", "m", compute)  # "bb" is now least recently used
+        cache.get_or_compute("ccc", "m", compute)
+        cache.get_or_compute("a", "m", compute)
+        assert compute.call_count == 3
+        cache.get_or_compute("bb", "m", compute)
+        assert compute.call_count == 4
+        assert cache.metrics()["entries"] == 2
+
+    def test_compute_errors_are_not_cached(self):
+        cache = EmbeddingCache(max_entries=10)
+        compute = Mock(side_effect=[RuntimeError("rate limited"), [1.0]])
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute("scholarship", "m", compute)
+        assert cache.get_or_compute("scholarship", "m", compute) == [1.0]
+
+    def test_normalize_query_text(self):
+        assert normalize_query_text(" What is the  Deadline?? ") == "what is the deadline"
+        assert normalize_query_text(None) == ""
+
+
+class TestPersistentEmbeddingCache:
+    """Test cases for the query_embedding_cache table tier (run against SQLite)"""
+
+    @pytest.fixture
+    def session_factory(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+        QueryEmbeddingCache.__table__.create(engine)
+        return sessionmaker(bind=engine)
+
+    def test_shared_between_caches(self, session_factory):
+        first = EmbeddingCache(max_entries=10, persistent=True, session_factory=session_factory)
+        compute = Mock(return_value=[0.1, 0.2])
+        first.get_or_compute("hsk requirement", "m", compute)
+        first.get_or_compute("hsk requirement", "m", compute)  # memory hit, no duplicate row
+
+        # A fresh process (empty memory tier) reads the stored embedding
+        second = EmbeddingCache(max_entries=10, persistent=True, session_factory=session_factory)
+        assert second.get_or_compute("HSK requirement", "m", compute) == pytest.approx([0.1, 0.2])
+        compute.assert_called_once()
+        assert second.metrics()["persistent_hits"] == 1
+
+        db = session_factory()
+        assert db.query(QueryEmbeddingCache).count() == 1
+        db.close()
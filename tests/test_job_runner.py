@@ -0,0 +1,160 @@
+"""
+Tests for the durable background job runner (run against SQLite).
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, BackgroundJob
+from app.services.job_runner import JobRunner
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[BackgroundJob.__table__])
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def make_runner(session_factory):
+    runners = []
+
+    def make(**kwargs):
+        runner = JobRunner(session_factory=session_factory, poll_seconds=0.05, **kwargs)
+        runners.append(runner)
+        return runner
+
+    yield make
+    for runner in runners:
+        runner.stop(wait=True)
+
+
+class TestJobRunner:
+    """Test cases for job lifecycle, concurrency, cancellation and recovery"""
+
+    def test_job_completes_with_progress_and_result(self, make_runner):
+        runner = make_runner(max_workers=1)
+
+        def handler(ctx):
+            ctx.progress("Counting bytes...")
+            return {"filename": ctx.params["filename"], "size": len(ctx.input_data)}
+
+        runner.register("count", handler)
+        job_id = runner.submit("count", {"filename": "brochure.pdf"}, b"%PDF-1.4 ...")
+        job = runner.wait(job_id, timeout=5)
+
+        assert job["status"] == "completed"
+        assert job["result"] == {"filename": "brochure.pdf", "size": 12}
+        assert job["attempts"] == 1 and job["finished_at"] is not None
+        assert runner.metrics()["completed"] == 1
+
+    def test_failed_job_records_error(self, make_runner):
+        runner = make_runner(max_workers=1)
+        runner.register("broken", lambda ctx: 1 / 0)
+        job = runner.wait(runner.submit("broken"), timeout=5)
+        assert job["status"] == "failed"
+        assert "division by zero" in job["error"]
+
+    def test_concurrency_limit(self, make_runner):
+        runner = make_runner(max_workers=2)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def handler(ctx):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.1)
+            with lock:
+                active[0] -= 1
+            return {}
+
+        runner.register("slow", handler)
+        job_ids = [runner.submit("slow") for _ in range(5)]
+        assert all(runner.wait(job_id, timeout=5)["status"] == "completed" for job_id in job_ids)
+        assert peak[0] == 2
+
+    def test_cancel_running_and_queued_jobs(self, make_runner):
+        runner = make_runner(max_workers=1)
+        started, release = threading.Event(), threading.Event()
+
+        def handler(ctx):
+            started.set()
+            release.wait(5)
+            ctx.progress("Next step...")
+            return {"done": True}
+
+        runner.register("step", handler)
+        running_id = runner.submit("step")
+        queued_id = runner.submit("step")
+        assert started.wait(5)
+
+        assert runner.cancel(queued_id)["status"] == "cancelled"
+        assert runner.cancel(running_id)["cancel_requested"] is True
+        release.set()
+
+        assert runner.wait(running_id, timeout=5)["status"] == "cancelled"
+        assert runner.get(queued_id)["attempts"] == 0  # Never started
+
+    def test_wait_timeout_returns_current_status(self, make_runner):
+        runner = make_runner(max_workers=1)
+        release = threading.Event()
+        runner.register("blocked", lambda ctx: release.wait(5) and {})
+        running_id = runner.submit("blocked")
+        queued_id = runner.submit("blocked")
+
+        # /ingest-data relies on this to answer 202 instead of hanging behind long jobs
+        assert runner.wait(queued_id, timeout=0.1)["status"] == "queued"
+        release.set()
+        assert runner.wait(running_id, timeout=5)["status"] == "completed"
+        assert runner.wait(queued_id, timeout=5)["status"] == "completed"
+
+    def test_orphaned_job_is_requeued_and_resumed(self, make_runner, session_factory):
+        # A job left "processing" by a worker that died (no heartbeat for a while)
+        db = session_factory()
+        stale = datetime.now(timezone.utc) - timedelta(minutes=10)
+        db.add(BackgroundJob(id="orphan", job_type="echo", status="processing", params={"value": 7},
+                             attempts=1, worker_id="old-host:1", started_at=stale, heartbeat_at=stale,
+                             created_at=stale, cancel_requested=False))
+        db.add(BackgroundJob(id="gave-up", job_type="echo", status="processing", params={},
+                             attempts=2, worker_id="old-host:1", started_at=stale, heartbeat_at=stale,
+                             created_at=stale, cancel_requested=False))
+        db.commit()
+        db.close()
+
+        runner = make_runner(max_workers=1, stale_seconds=60, max_attempts=2)
+        runner.register("echo", lambda ctx: {"value": ctx.params["value"]})
+        summary = runner.run_maintenance()
+
+        assert summary["requeued"] == 1 and summary["abandoned"] == 1
+        job = runner.wait("orphan", timeout=5)
+        assert job["status"] == "completed" and job["result"] == {"value": 7}
+        assert job["attempts"] == 2
+        assert runner.get("gave-up")["status"] == "failed"
+
+    def test_expired_jobs_are_purged(self, make_runner):
+        runner = make_runner(max_workers=1, retention_seconds=60)
+        runner.register("noop", lambda ctx: {})
+        job_id = runner.submit("noop")
+        assert runner.wait(job_id, timeout=5)["status"] == "completed"
+        assert runner.run_maintenance()["purged"] == 0
+
+        db = runner.session_factory()
+        db.query(BackgroundJob).update({"finished_at": datetime.now(timezone.utc) - timedelta(hours=1)})
+        db.commit()
+        db.close()
+
+        assert runner.run_maintenance()["purged"] == 1
+        assert runner.get(job_id) is None
+
+    def test_unknown_job_type_is_rejected(self, make_runner):
+        runner = make_runner(max_workers=1)
+        with pytest.raises(ValueError):
+            runner.submit("missing")
+
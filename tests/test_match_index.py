@@ -0,0 +1,54 @@
+"""
+Tests for the fuzzy-match candidate index.
+"""
+from app.services.match_index import MatchIndex, acronyms, expand_major_acronym, major_acronyms, normalize_match_text
+
+
+UNIVERSITIES = [
+    {"id": 1, "name": "Harbin Institute of Technology", "name_cn": "哈尔滨工业大学", "aliases": ["HIT"], "is_partner": True},
+    {"id": 2, "name": "Northeast Forestry University", "name_cn": "东北林业大学", "aliases": ["NEFU"], "is_partner": True},
+    {"id": 3, "name": "Beihang University", "name_cn": None, "aliases": ["BUAA"], "is_partner": False},
+]
+MAJORS = [
+    {"id": 10, "name": "Computer Science and Technology", "keywords": ["cse", "cs"], "university_id": 1},
+    {"id": 11, "name": "Mechanical Engineering", "keywords": [], "university_id": 1},
+    {"id": 12, "name": "Computer Science and Technology", "keywords": ["cse"], "university_id": 3},
+    {"id": 13, "name": "Forestry", "keywords": [], "university_id": 2},
+]
+
+
+class TestMatchIndex:
+    """Test cases for MatchIndex candidate generation"""
+
+    def setup_method(self):
+        self.index = MatchIndex(UNIVERSITIES, MAJORS)
+
+    def test_normalize_and_acronyms(self):
+        assert normalize_match_text("  Computer  Science & Tech. ") == "computer science & tech"
+        assert acronyms("harbin institute of technology") == {"hiot", "hit"}
+        assert major_acronyms("Computer Science and Technology") == {"cs", "cse"}
+        assert expand_major_acronym("B.B.A.") == "bachelor of business administration"
+
+    def test_exact_alias_and_chinese_name_rank_first(self):
+        assert self.index.university_candidates("hit")[0]["id"] == 1
+        assert self.index.university_candidates("东北林业大学")[0]["id"] == 2
+
+    def test_typo_finds_university(self):
+        assert self.index.university_candidates("harbin institue of technolgy")[0]["id"] == 1
+
+    def test_partner_only_filter(self):
+        ids = [u["id"] for u in self.index.university_candidates("beihang university", partner_only=True)]
+        assert 3 not in ids
+
+    def test_major_keyword_and_acronym(self):
+        assert [m["id"] for m in self.index.major_candidates("cse", limit=2)] == [10, 12]
+        # Acronyms come from the agents' MAJOR_ACRONYMS map, not from name initials
+        assert self.index.major_candidates("cs")[0]["id"] == 10
+        assert major_acronyms("Mechanical Engineering") == set()
+        assert self.index.major_candidates("mechanical engeneering")[0]["id"] == 11
+
+    def test_predicate_applies_before_limit(self):
+        majors = self.index.major_candidates("computer science", limit=1, predicate=lambda m: m["university_id"] == 3)
+        assert [m["id"] for m in majors] == [12]
+        majors = self.index.major_candidates("computer science", limit=5, partner_only=True)
+        assert 12 not in [m["id"] for m in majors]
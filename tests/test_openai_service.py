@@ -0,0 +1,54 @@
+"""
+Tests for the shared OpenAI client layer
+"""
+import asyncio
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from openai import APIConnectionError
+from app.services import openai_service as openai_module
+from app.services.openai_service import OpenAIService, AsyncOpenAIService
+
+
+class TestOpenAIClientLayer:
+    
+    def test_services_share_one_client(self):
+        assert OpenAIService().client is OpenAIService().client
+        assert AsyncOpenAIService().client is AsyncOpenAIService().client
+    
+    def test_async_retry_uses_asyncio_sleep(self):
+        service = AsyncOpenAIService()
+        error = APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+        fake_response = MagicMock()
+        create = AsyncMock(side_effect=[error, fake_response])
+        fake_client = MagicMock()
+        fake_client.chat.completions.create = create
+        
+        with patch.object(openai_module, "get_async_openai_client", return_value=fake_client), \
+             patch.object(openai_module.asyncio, "sleep", new=AsyncMock()) as fake_sleep, \
+             patch.object(openai_module.time, "sleep") as blocking_sleep:
+            result = asyncio.run(service.chat_completion([{"role": "user", "content": "hi"}]))
+        
+        assert result is fake_response
+        assert create.await_count == 2
+        fake_sleep.assert_awaited_once_with(2.0)
+        blocking_sleep.assert_not_called()
+    
+    def test_async_stream_yields_deltas(self):
+        service = AsyncOpenAIService()
+        
+        def chunk(text):
+            c = MagicMock()
+            c.choices = [MagicMock()]
+            c.choices[0].delta.content = text
+            return c
+        
+        async def fake_stream():
+            for text in ["Hel", None, "lo"]:
+                yield chunk(text)
+        
+        async def collect():
+            with patch.object(service, "chat_completion", new=AsyncMock(return_value=fake_stream())):
+                return [delta async for delta in service.stream_chat_completion([])]
+        
+        assert asyncio.run(collect()) == ["Hel", "lo"]
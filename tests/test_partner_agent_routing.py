@@ -7,7 +7,7 @@ from unittest.mock import Mock, MagicMock, patch
 from datetime import date
 from app.services.partner_agent import PartnerAgent
 from app.services.slot_schema import PartnerQueryState, RequirementFocus, ScholarshipFocus
-from app.services.router import PartnerRouter
+from app.services.router import PartnerRouter, routing_stats
 from app.services.db_query_service import DBQueryService
 from app.services.openai_service import OpenAIService
 
@@ -328,6 +328,74 @@ class TestPartnerAgentRouting:
         assert state.intake_term == "March"
         assert state.pending_slot is None
     
+    # ========== RULES-FIRST EXTRACTION TESTS ==========
+    
+    def test_rules_first_skips_llm_when_confident(self, agent):
+        """Test: 'What documents are required for bachelor march 2026' → rules path, no LLM extraction call"""
+        routing_stats.reset()
+        with patch.object(agent, 'llm_extract_state') as mock_llm:
+            state = agent.extract_partner_query_state(
+                [{"role": "user", "content": "What documents are required for bachelor march 2026"}]
+            )
+        mock_llm.assert_not_called()
+        assert state.extraction_path == "rules"
+        assert state.degree_level == "Bachelor"
+        assert state.intake_term == "March"
+        assert state.intake_year == 2026
+        assert routing_stats.metrics()["rules"] == 1
+    
+    def test_rules_first_calls_llm_for_free_text_major(self, agent):
+        """Test: unresolved words (free-text major) → LLM extraction"""
+        routing_stats.reset()
+        extracted, reason = agent.rules_extract_state(
+            [{"role": "user", "content": "tuition fee for master in mechanical engineering"}]
+        )
+        assert extracted is None and reason == "unrecognized_text"
+        
+        with patch.object(agent, 'llm_extract_state', return_value={"intent": "FEES", "degree_level": "Master",
+                                                                   "major_raw": "mechanical engineering"}) as mock_llm:
+            state = agent.extract_partner_query_state(
+                [{"role": "user", "content": "tuition fee for master in mechanical engineering"}]
+            )
+        mock_llm.assert_called_once()
+        assert state.extraction_path == "llm"
+        assert routing_stats.metrics()["llm_reasons"] == {"unrecognized_text": 1}
+    
+    def test_rules_first_acronym_major_and_typo_degree(self, agent):
+        """Test: 'masters in cse fees' and 'Bachelorvvvv university list' are fully explained by rules"""
+        extracted, reason = agent.rules_extract_state([{"role": "user", "content": "masters in cse fees"}])
+        assert reason is None
+        assert extracted["intent"] == "FEES"
+        assert extracted["degree_level"] == "Master"
+        assert extracted["major_raw"] == "cse"
+        
+        extracted, reason = agent.rules_extract_state([{"role": "user", "content": "Bachelorvvvv university list"}])
+        assert reason is None
+        assert extracted["intent"] == "LIST_UNIVERSITIES"
+        assert extracted["degree_level"] == "Bachelor"
+    
+    def test_rules_first_defers_to_llm_when_context_needed(self, agent):
+        """Test: follow-ups that reference or depend on earlier turns go to the LLM"""
+        history = [
+            {"role": "user", "content": "Masters in Pharmacy at Ningxia Medical University"},
+            {"role": "assistant", "content": "Here are the programs..."},
+        ]
+        _, reason = agent.rules_extract_state(history + [{"role": "user", "content": "what are the fees for it"}])
+        assert reason == "context_reference"
+        _, reason = agent.rules_extract_state(history + [{"role": "user", "content": "scholarship info"}])
+        assert reason == "missing_slots"
+        # Conflicting parsers
+        _, reason = agent.rules_extract_state([{"role": "user", "content": "Scholarship available for university"}])
+        assert reason == "ambiguous_intent"
+    
+    def test_rules_first_disabled(self, agent):
+        """Test: PARTNER_RULES_FIRST=False → always LLM extraction"""
+        with patch('app.services.partner_agent.settings.PARTNER_RULES_FIRST', False):
+            with patch.object(agent, 'llm_extract_state', return_value={"intent": "SCHOLARSHIP"}) as mock_llm:
+                state = agent.extract_partner_query_state([{"role": "user", "content": "scholarship info"}])
+        mock_llm.assert_called_once()
+        assert state.extraction_path == "llm"
+    
     # ========== SQL PARAMETER BUILDING TESTS ==========
     
     def test_build_sql_params_with_fuzzy_major(self, agent):
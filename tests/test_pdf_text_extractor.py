@@ -0,0 +1,77 @@
+"""
+Tests for page-level PDF text extraction (text layer, OCR fallback, process pool).
+"""
+from unittest.mock import patch
+
+import pytest
+
+from app.services import pdf_text_extractor as extractor_module
+from app.services.pdf_text_extractor import PdfTextExtractor, _ocr_dpi
+
+
+def make_pdf(page_texts):
+    """Minimal PDF with one Helvetica text line per page ("" = page without a text layer)"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET" if text else ""
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    pdf = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return pdf.encode("latin-1")
+
+
+class TestPdfTextExtractor:
+    """Test cases for per-page extraction"""
+
+    def test_ocr_only_pages_without_text_layer(self):
+        pdf = make_pdf(["Harbin Institute of Technology tuition 30000 RMB", "", "Scholarship deadline March 31 2026"])
+        extractor = PdfTextExtractor(max_workers=1, min_text_chars=10)
+        with patch.object(extractor_module, "_ocr_page", return_value="Scanned fee table") as ocr_page:
+            result = extractor.extract(pdf, ocr=True)
+
+        ocr_page.assert_called_once()
+        assert ocr_page.call_args[0][1] == 2  # 1-based page number
+        assert [p.method for p in result.pages] == ["text", "ocr", "text"]
+        assert "tuition 30000 RMB" in result.text and "Scanned fee table" in result.text
+        assert result.summary()["methods"] == {"text": 2, "ocr": 1}
+
+    def test_ocr_failure_keeps_other_pages(self):
+        pdf = make_pdf(["Harbin Institute of Technology tuition 30000 RMB", ""])
+        extractor = PdfTextExtractor(max_workers=1, min_text_chars=10)
+        with patch.object(extractor_module, "_ocr_page", side_effect=OSError("tesseract not installed")):
+            result = extractor.extract(pdf, ocr=True)
+        assert [p.method for p in result.pages] == ["text", "error"]
+        assert "tesseract" in result.pages[1].error
+        assert "tuition 30000 RMB" in result.text
+
+    def test_large_pdf_uses_process_pool_in_page_order(self):
+        pdf = make_pdf([f"Page {i} program details" for i in range(1, 13)])
+        extractor = PdfTextExtractor(max_workers=2, parallel_min_pages=4, min_text_chars=5)
+        try:
+            result = extractor.extract(pdf, ocr=False)
+        finally:
+            extractor.shutdown()
+        assert result.workers == 2
+        assert [p.page_number for p in result.pages] == list(range(1, 13))
+        assert all(f"Page {p.page_number} program" in p.text for p in result.pages)
+
+    def test_ocr_dpi_is_bounded_by_pixels(self):
+        class Page:
+            class mediabox:
+                width, height = 2384, 3370  # A0 in points
+        assert _ocr_dpi(Page, dpi=200, max_pixels=12_000_000) < 200
+        Page.mediabox.width, Page.mediabox.height = 612, 792  # Letter
+        assert _ocr_dpi(Page, dpi=200, max_pixels=12_000_000) == 200
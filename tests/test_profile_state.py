@@ -0,0 +1,165 @@
+"""
+Tests for incremental profile-state extraction (SalesAgent / PartnerAgent, OpenAI calls faked)
+"""
+import json
+import uuid
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.services.partner_agent import PartnerAgent
+from app.services.profile_state import is_topic_reset, profile_state_stats
+from app.services.sales_agent import SalesAgent, StudentProfileState
+from app.services.session_store import session_store
+from app.services.slot_schema import PartnerQueryState
+
+CATALOG = SimpleNamespace(majors=[
+    {"name": "Computer Science and Technology"}, {"name": "Mechanical Engineering"}, {"name": "Artificial Intelligence"}
+])
+
+
+class FakeOpenAI:
+    """Returns queued JSON replies and records every prompt"""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.prompts = []
+
+    def chat_completion(self, messages, temperature=0.0, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(reply)))])
+
+
+@pytest.fixture(autouse=True)
+def reset_profile_state_stats():
+    profile_state_stats.reset()
+    yield
+    profile_state_stats.reset()
+
+
+def make_agent(*replies):
+    agent = SalesAgent.__new__(SalesAgent)
+    agent.db_service = Mock()
+    agent.openai_service = FakeOpenAI(*replies)
+    return agent
+
+
+def history(*user_messages):
+    messages = []
+    for i, text in enumerate(user_messages):
+        if i:
+            messages.append({"role": "assistant", "content": f"Answer {i}. Anything else?"})
+        messages.append({"role": "user", "content": text})
+    return messages
+
+
+class TestTopicReset:
+
+    def test_reset_phrases(self):
+        assert is_topic_reset("Let's start over")
+        assert is_topic_reset("Now I'm asking for my brother, he wants a bachelor")
+        assert is_topic_reset("forget that, new question")
+        assert not is_topic_reset("I want to study Computer Science in March")
+        assert not is_topic_reset(None)
+
+
+class TestSalesIncrementalProfileState:
+    """Test cases for the per-session StudentProfileState"""
+
+    def test_newest_message_updates_stored_state(self):
+        key = str(uuid.uuid4())
+        agent = make_agent(
+            {"degree_level": "Master", "major": "Computer Science and Technology", "nationality": "Bangladesh"},
+            {"intake_term": "March", "intake_year": 2027},
+        )
+        first = history("I am from Bangladesh and want to study masters in computer science")
+        state = agent.load_student_profile_state(first, key, CATALOG)
+        assert state.nationality == "Bangladesh" and state.program_type == "Degree"
+
+        second = history(first[0]["content"], "March 2027 intake please")
+        state = agent.load_student_profile_state(second, key, CATALOG)
+        assert (state.degree_level, state.major, state.nationality) == ("Master", "Computer Science and Technology", "Bangladesh")
+        assert (state.intake_term, state.intake_year) == ("March", 2027)
+
+        update_prompt = agent.openai_service.prompts[-1]
+        assert "March 2027 intake please" in update_prompt
+        assert "I am from Bangladesh" not in update_prompt  # Only the newest message, plus the state summary
+        assert "Nationality: Bangladesh" in update_prompt
+        metrics = profile_state_stats.metrics()["sales"]
+        assert metrics["full"] == 1 and metrics["incremental"] == 1
+        assert metrics["avg_prompt_chars"]["incremental"] < metrics["avg_prompt_chars"]["full"]
+
+    def test_prompt_size_does_not_grow_with_history(self):
+        key = str(uuid.uuid4())
+        messages = ["I want to study masters in artificial intelligence"] + [f"question number {i} about visa" for i in range(8)]
+        agent = make_agent({"degree_level": "Master", "major": "Artificial Intelligence"}, *[{}] * 8)
+        for turn in range(1, len(messages) + 1):
+            agent.load_student_profile_state(history(*messages[:turn])[-12:], key, CATALOG)
+
+        incremental_sizes = {len(prompt) for prompt in agent.openai_service.prompts[1:]}
+        assert max(incremental_sizes) - min(incremental_sizes) <= 2  # Only the turn number changes
+        assert profile_state_stats.metrics()["sales"]["incremental"] == 8
+
+    def test_topic_reset_and_broken_continuity_reread_history(self):
+        key = str(uuid.uuid4())
+        agent = make_agent({"degree_level": "Master"}, {"degree_level": "Bachelor"}, {"degree_level": "PhD"})
+        agent.load_student_profile_state(history("I want a masters degree"), key, CATALOG)
+
+        state = agent.load_student_profile_state(history("I want a masters degree", "start over, bachelor for my sister"), key, CATALOG)
+        assert state.degree_level == "Bachelor"
+        # History that does not follow on from the stored state (e.g. edited) is re-read as well
+        agent.load_student_profile_state(history("something else entirely", "phd please"), key, CATALOG)
+        assert profile_state_stats.metrics()["sales"]["full_reasons"] == {"no_state": 1, "topic_reset": 1, "discontinuous": 1}
+
+    def test_failed_update_keeps_previous_state(self):
+        key = str(uuid.uuid4())
+        agent = make_agent({"degree_level": "Master", "nationality": "India"}, RuntimeError("timeout"), {"nationality": "India"})
+        agent.load_student_profile_state(history("I am from India, masters please"), key, CATALOG)
+        state = agent.load_student_profile_state(history("I am from India, masters please", "in Beijing"), key, CATALOG)
+        assert state.nationality == "India" and state.city is None
+        assert session_store.get(SalesAgent.PROFILE_STATE_NAMESPACE, key) is None  # Next turn re-reads the history
+
+    def test_major_info_query_keeps_stored_major(self):
+        key = str(uuid.uuid4())
+        agent = make_agent({"degree_level": "Master", "major": "Mechanical Engineering"}, {})
+        first = "I want to study masters in mechanical engineering"
+        agent.load_student_profile_state(history(first), key, CATALOG)
+        state = agent.load_student_profile_state(history(first, "which majors does Beihang offer?"), key, CATALOG)
+        assert state.major is None
+        assert session_store.get(SalesAgent.PROFILE_STATE_NAMESPACE, key)["state"].major == "Mechanical Engineering"
+
+    def test_without_session_key_extracts_in_full(self):
+        agent = make_agent({"degree_level": "Master"})
+        state = agent.load_student_profile_state(history("masters please"), None, CATALOG)
+        assert isinstance(state, StudentProfileState) and state.degree_level == "Master"
+        assert profile_state_stats.metrics()["sales"]["full_reasons"] == {"no_session": 1}
+
+
+class TestPartnerIncrementalExtraction:
+
+    def test_previous_state_sends_only_newest_exchange(self):
+        agent = PartnerAgent(Mock(spec=Session))
+        agent.openai_service = FakeOpenAI({"intent": "FEES", "wants_fees": True}, {"intent": "FEES"})
+        conversation = [
+            {"role": "user", "content": "Master programs in Beijing"},
+            {"role": "assistant", "content": "Here are 12 programs. " + "x" * 2000},
+            {"role": "user", "content": "what are the fees"},
+        ]
+        prev_state = PartnerQueryState(intent="LIST_PROGRAMS", degree_level="Master", city="Beijing")
+
+        agent.llm_extract_state(conversation, date(2026, 1, 10), prev_state)
+        prompt = agent.openai_service.prompts[-1]
+        assert "what are the fees" in prompt and "Master programs in Beijing" not in prompt
+        assert "x" * 500 not in prompt
+        assert "degree=Master" in prompt and "city=Beijing" in prompt
+
+        agent.llm_extract_state(conversation, date(2026, 1, 10), None)
+        assert "Master programs in Beijing" in agent.openai_service.prompts[-1]
+        metrics = profile_state_stats.metrics()["partner"]
+        assert metrics["incremental"] == 1 and metrics["full"] == 1
@@ -0,0 +1,134 @@
+"""
+Tests for cache-friendly prompt layout and prompt usage stats (OpenAI calls faked)
+"""
+import json
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock, Mock
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.services.document_extraction_service import EXTRACTION_SYSTEM_PROMPT, DocumentExtractionService
+from app.services.openai_service import OpenAIService
+from app.services.partner_agent import PartnerAgent
+from app.services.prompt_cache import cacheable_messages, prompt_usage_stats
+from app.services.slot_schema import PartnerQueryState
+
+
+class RecordingOpenAI:
+    """Records the messages of every call and returns a fixed reply"""
+
+    def __init__(self, reply="{}"):
+        self.reply = reply
+        self.calls = []
+
+    def chat_completion(self, messages, **kwargs):
+        self.calls.append((messages, kwargs))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))])
+
+    def chat_completion_text(self, messages, **kwargs):
+        self.calls.append((messages, kwargs))
+        return self.reply
+
+
+def usage(prompt_tokens, cached_tokens):
+    return SimpleNamespace(prompt_tokens=prompt_tokens, prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens))
+
+
+@pytest.fixture(autouse=True)
+def reset_prompt_usage_stats():
+    prompt_usage_stats.reset()
+    yield
+    prompt_usage_stats.reset()
+
+
+class TestCacheableMessages:
+
+    def test_static_prefix_first_and_empty_parts_skipped(self):
+        messages = cacheable_messages("STATIC", "", "dynamic", None, user="question")
+        assert messages == [
+            {"role": "system", "content": "STATIC"},
+            {"role": "system", "content": "dynamic"},
+            {"role": "user", "content": "question"},
+        ]
+
+
+class TestPartnerPromptLayout:
+    """The first message must not change with the date, the conversation or the DB context"""
+
+    def test_extraction_prefix_is_stable(self):
+        agent = PartnerAgent(Mock(spec=Session))
+        agent.openai_service = RecordingOpenAI(json.dumps({"intent": "FEES"}))
+        agent.llm_extract_state([{"role": "user", "content": "fees for HIT"}], date(2026, 1, 10))
+        agent.llm_extract_state(
+            [{"role": "user", "content": "masters in Beijing"}], date(2027, 3, 2),
+            PartnerQueryState(intent="LIST_PROGRAMS", city="Beijing")
+        )
+
+        (first, first_kwargs), (second, _) = agent.openai_service.calls
+        assert first[0] == second[0] == {"role": "system", "content": PartnerAgent.PARTNER_EXTRACTION_PROMPT}
+        assert "2026-01-10" in first[-1]["content"] and "2027-03-02" in second[-1]["content"]
+        assert first_kwargs["prompt_name"] == "partner_extraction"
+
+    def test_formatter_prefix_is_stable(self):
+        agent = PartnerAgent(Mock(spec=Session))
+        agent.openai_service = RecordingOpenAI("answer")
+        agent.format_answer_with_llm("University A context", "fees?", "FEES", {"fees": True})
+        agent.format_answer_with_llm("University B context", "scholarship?", "SCHOLARSHIP", {"scholarship": True})
+
+        (first, _), (second, kwargs) = agent.openai_service.calls
+        assert first[0] == second[0]
+        assert first[0]["content"].startswith(PartnerAgent.PARTNER_SYSTEM_PROMPT)
+        assert "INTENT: FEES" in first[1]["content"] and "INTENT: SCHOLARSHIP" in second[1]["content"]
+        assert first[-1]["content"].startswith("University A context")
+        assert kwargs["prompt_name"] == "partner_format"
+
+
+class TestDocumentExtractionLayout:
+
+    def test_parts_share_system_prompt_and_preamble(self):
+        service = DocumentExtractionService.__new__(DocumentExtractionService)
+        service.openai_service = RecordingOpenAI(json.dumps({"majors": []}))
+        service._extract_part("part two text", part_number=2, part_count=3, preamble="Harbin University fees")
+        service._extract_part("part three text", part_number=3, part_count=3, preamble="Harbin University fees")
+
+        (second, _), (third, _) = service.openai_service.calls
+        assert second[0]["content"] == third[0]["content"] == EXTRACTION_SYSTEM_PROMPT
+        prefix = second[1]["content"].split("This is part")[0]
+        assert "Harbin University fees" in prefix and third[1]["content"].startswith(prefix)
+
+
+class TestPromptUsageStats:
+
+    def test_cached_tokens_from_usage(self):
+        messages = [{"role": "system", "content": "STATIC"}]
+        prompt_usage_stats.record("partner_format", messages, usage(2000, 0), 2.0)
+        prompt_usage_stats.record("partner_format", messages, usage(2000, 1536), 1.0)
+
+        metrics = prompt_usage_stats.metrics()["partner_format"]
+        assert metrics["calls"] == 2 and metrics["cache_hit_calls"] == 1
+        assert metrics["cached_tokens"] == 1536 and metrics["cached_token_rate"] == 0.384
+        assert metrics["avg_seconds_cache_hit"] == 1.0 and metrics["avg_seconds_cache_miss"] == 2.0
+        assert metrics["static_prefix_variants"] == 1
+
+    def test_chat_completion_records_usage(self):
+        service = OpenAIService.__new__(OpenAIService)
+        service.model = "gpt-test"
+        service.client = MagicMock()
+        service.client.chat.completions.create.return_value = SimpleNamespace(choices=[], usage=usage(1200, 1024))
+        service.chat_completion([{"role": "system", "content": "STATIC"}], prompt_name="document_extraction")
+
+        # MagicMock usage (no real token counts) must not break the call or the stats
+        service.client.chat.completions.create.return_value = MagicMock()
+        service.chat_completion([{"role": "system", "content": "STATIC"}])
+
+        metrics = prompt_usage_stats.metrics()
+        assert metrics["document_extraction"]["cached_tokens"] == 1024
+        assert metrics["other"]["calls"] == 1 and metrics["other"]["prompt_tokens"] == 0
+
+    def test_prefix_variants_are_capped(self):
+        for n in range(40):
+            prompt_usage_stats.record("partner_format", [{"role": "system", "content": f"STATIC {n}"}], usage(10, 0), 0.1)
+        metrics = prompt_usage_stats.metrics()["partner_format"]
+        assert metrics["calls"] == 40 and metrics["static_prefix_variants"] == 32
@@ -0,0 +1,88 @@
+"""
+Tests for the R2 storage client (in-memory S3 stand-in and a stubbed boto3 client).
+"""
+import asyncio
+import io
+from unittest.mock import patch
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.stub import ANY, Stubber
+
+from app.services import r2_service as r2_module
+from app.services.r2_service import InMemoryObjectStore, R2Service
+
+
+def make_service(**kwargs):
+    return R2Service(client=InMemoryObjectStore(), bucket_name="docs", **kwargs)
+
+
+class TestR2Service:
+    """Test cases for uploads, server-side copies and URL/key mapping"""
+
+    def test_upload_returns_public_url_and_stores_content_type(self):
+        service = make_service()
+        with patch.object(r2_module.settings, "R2_BUCKET_URL", "https://pub.example.r2.dev"):
+            url = service.upload_file(b"%PDF-1.4", "passport.pdf", folder="temp")
+            key = service.key_from_url(url)
+        assert url.startswith("https://pub.example.r2.dev/temp/") and url.endswith(".pdf")
+        stored = service.s3_client.objects[("docs", key)]
+        assert stored["body"] == b"%PDF-1.4" and stored["content_type"] == "application/pdf"
+
+    def test_large_stream_is_uploaded_in_parts(self):
+        service = make_service(transfer_config=TransferConfig(multipart_threshold=1024, multipart_chunksize=1024))
+        stream = io.BytesIO(b"x" * 5000)
+        url = service.upload_file(stream, "brochure.pdf")
+        stored = service.s3_client.objects[("docs", service.key_from_url(url))]
+        assert stored["parts"] == 5 and len(stored["body"]) == 5000
+
+    def test_move_uses_server_side_copy(self):
+        service = make_service()
+        temp_url = service.upload_file(b"scan", "diploma.jpg", folder="temp")
+        verified_url = service.move_file(temp_url, folder="verified", filename="diploma.jpg")
+
+        operations = [operation for operation, _ in service.s3_client.calls]
+        assert operations == ["upload", "copy", "delete"]  # Uploaded once
+        assert service.download_bytes(verified_url) == b"scan"
+        assert ("docs", service.key_from_url(temp_url)) not in service.s3_client.objects
+        assert service.s3_client.objects[("docs", service.key_from_url(verified_url))]["content_type"] == "image/jpeg"
+
+    def test_key_from_url_without_public_bucket_url(self):
+        service = make_service()
+        with patch.object(r2_module.settings, "R2_BUCKET_URL", ""), \
+                patch.object(r2_module.settings, "R2_ENDPOINT_URL", "https://acct.r2.cloudflarestorage.com"):
+            url = service.upload_file(b"data", "cv.pdf", folder="documents")
+            assert url.startswith("https://acct.r2.cloudflarestorage.com/docs/documents/")
+            assert service.key_from_url(url).startswith("documents/")
+        assert service.key_from_url("documents/a.pdf") == "documents/a.pdf"
+
+    def test_async_methods_do_not_block_the_event_loop(self):
+        service = make_service()
+
+        async def scenario():
+            urls = await asyncio.gather(*[
+                service.upload_file_async(f"file {i}".encode(), f"f{i}.txt", folder="temp") for i in range(5)
+            ])
+            moved = await service.move_file_async(urls[0], folder="verified")
+            return urls, moved, await service.download_bytes_async(moved)
+
+        urls, moved, content = asyncio.run(scenario())
+        assert len(set(urls)) == 5
+        assert "/verified/" in moved and content == b"file 0"
+
+    def test_boto3_client_streams_multipart_upload(self):
+        client = boto3.client("s3", region_name="auto", endpoint_url="https://acct.r2.cloudflarestorage.com",
+                              aws_access_key_id="key", aws_secret_access_key="secret")
+        service = R2Service(client=client, bucket_name="docs", transfer_config=TransferConfig(
+            multipart_threshold=5 * 1024 * 1024, multipart_chunksize=5 * 1024 * 1024, use_threads=False
+        ))
+        with Stubber(client) as stubber:
+            stubber.add_response("create_multipart_upload", {"UploadId": "u1"},
+                                 {"Bucket": "docs", "Key": ANY, "ContentType": "application/pdf"})
+            for part in (1, 2):
+                stubber.add_response("upload_part", {"ETag": f'"etag{part}"'},
+                                     {"Bucket": "docs", "Key": ANY, "UploadId": "u1", "PartNumber": part, "Body": ANY})
+            stubber.add_response("complete_multipart_upload", {},
+                                 {"Bucket": "docs", "Key": ANY, "UploadId": "u1", "MultipartUpload": ANY})
+            service.upload_file(io.BytesIO(b"x" * (6 * 1024 * 1024)), "brochure.pdf")
+            stubber.assert_no_pending_responses()
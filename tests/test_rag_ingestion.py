@@ -0,0 +1,126 @@
+"""
+Tests for RAGService.ingest_source (hash-first deduplication, bounded embedding batches, bulk insert).
+"""
+import pytest
+from unittest.mock import Mock, patch
+from sqlalchemy import BigInteger, create_engine, event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from app.models import RagSource, RagChunk
+from app.services import rag_service
+from app.services.rag_service import RAGService
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_bigint(type_, compiler, **kw):
+    # SQLite only autoincrements INTEGER PRIMARY KEY columns
+    return "INTEGER"
+
+
+@pytest.fixture
+def rag():
+    with patch.object(rag_service, "OpenAIService"), patch.object(rag_service.tiktoken, "get_encoding") as get_encoding:
+        get_encoding.return_value.encode.side_effect = lambda text: text.split()
+        get_encoding.return_value.decode.side_effect = lambda tokens: " ".join(tokens)
+        service = RAGService()
+    service.openai_service.generate_embeddings_batch = Mock(side_effect=lambda texts: [[0.1] * 1536 for _ in texts])
+    return service
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    RagSource.__table__.create(engine)
+    RagChunk.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def document(paragraphs: int) -> str:
+    return "".join(f"Paragraph {i}: tuition, scholarship and visa details for semester {i}. " * 3 for i in range(paragraphs))
+
+
+class TestIngestSource:
+    """Test cases for the ingestion pipeline"""
+
+    def test_reingest_unchanged_document_embeds_nothing(self, rag, db):
+        text = document(40)
+        first = rag.ingest_source(db, name="guide.md", doc_type="b2c_study", full_text=text, version="2025")
+        assert first["chunks_created"] == first["total_chunks"] > 1
+        assert db.query(RagChunk).count() == first["chunks_created"]
+
+        rag.openai_service.generate_embeddings_batch.reset_mock()
+        statements = []
+        event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        second = rag.ingest_source(db, name="guide.md", doc_type="b2c_study", full_text=text, version="2025")
+
+        rag.openai_service.generate_embeddings_batch.assert_not_called()
+        assert second["chunks_created"] == 0
+        assert second["chunks_skipped"] == second["total_chunks"]
+        assert len(statements) <= 4
+        assert db.query(RagChunk).count() == first["chunks_created"]
+
+    def test_only_new_chunks_are_embedded(self, rag, db):
+        rag.ingest_source(db, name="guide.md", doc_type="b2c_study", full_text=document(10), version="2025")
+        rag.openai_service.generate_embeddings_batch.reset_mock()
+
+        result = rag.ingest_source(db, name="guide.md", doc_type="b2c_study", full_text=document(10) + "New fee table. " * 60, version="2025")
+
+        embedded = sum(len(c[0][0]) for c in rag.openai_service.generate_embeddings_batch.call_args_list)
+        assert embedded == result["chunks_created"] > 0
+        assert result["chunks_skipped"] > 0
+
+    def test_duplicate_chunks_within_document(self, rag, db):
+        text = "## Fees\n\nService charge is paid after admission.\n\n" * 3
+        result = rag.ingest_source(db, name="faq.md", doc_type="b2c_study", full_text=text)
+        assert result["total_chunks"] == 3
+        assert result["chunks_created"] == 1
+
+    def test_reingest_replaces_stale_chunks_and_stores_sections(self, rag, db):
+        rag.ingest_source(db, name="faq.md", doc_type="b2c_study", version="2025",
+                          full_text="## Fees\n\n**Q: Is there a deposit?**\nA: Yes, 80 USD.")
+        rag.ingest_source(db, name="faq.md", doc_type="b2c_study", version="2025",
+                          full_text="## Fees\n\n**Q: Is there a deposit?**\nA: Yes, 100 USD.")
+        chunks = db.query(RagChunk).all()
+        assert [c.content for c in chunks] == ["Fees\n\n**Q: Is there a deposit?**\nA: Yes, 100 USD."]
+        assert chunks[0].meta_data["section_path"] == ["Fees"]
+
+    def test_embedding_batches_are_bounded(self, rag):
+        with patch.object(rag_service.settings, "EMBEDDING_BATCH_MAX_INPUTS", 3), \
+                patch.object(rag_service.settings, "EMBEDDING_BATCH_MAX_TOKENS", 10):
+            embeddings = rag.embed_texts(["one two three four"] * 5 + ["a b c d e f g h i j k l"])
+        sizes = [len(c[0][0]) for c in rag.openai_service.generate_embeddings_batch.call_args_list]
+        assert sizes == [2, 2, 1, 1]
+        assert len(embeddings) == 6
+
+    def test_resume_and_estimate(self, rag, db):
+        text = document(10)
+        assert not rag.is_source_current(db, "guide.md", "b2c_study", text, version="2025")
+        estimate = rag.estimate_ingestion(db, "b2c_study", text, version="2025")
+        rag.openai_service.generate_embeddings_batch.assert_not_called()
+        assert estimate["new_chunks"] == estimate["total_chunks"] > 0
+        assert estimate["new_tokens"] > 0
+
+        rag.ingest_source(db, name="guide.md", doc_type="b2c_study", full_text=text, version="2025")
+        assert rag.is_source_current(db, "guide.md", "b2c_study", text, version="2025")
+        assert not rag.is_source_current(db, "guide.md", "b2c_study", text + " Updated.", version="2025")
+        assert not rag.is_source_current(db, "guide.md", "b2c_study", text, version="2026")
+        assert rag.estimate_ingestion(db, "b2c_study", text, version="2025")["new_chunks"] == 0
+
+    def test_reingest_edited_source_invalidates_cached_answers(self, rag, db):
+        text = "## Fees\n\nApplication fee is 80 USD.\n\n## Deadline\n\nApply before 31 May."
+        rag.ingest_source(db, name="faq.md", doc_type="b2c_study", full_text=text, version="2025")
+        version = rag_service.response_cache.corpus_version(db, "b2c_study")
+        rag_service.response_cache.set([1.0, 0.0], "b2c_study", None, version, "The fee is 80 USD.")
+        chunk_count = db.query(RagChunk).count()
+
+        # Same source id / version / status and chunk count, one chunk's text changed
+        rag.ingest_source(db, name="faq.md", doc_type="b2c_study", full_text=text.replace("80", "100"), version="2025")
+        assert db.query(RagChunk).count() == chunk_count
+
+        new_version = rag_service.response_cache.corpus_version(db, "b2c_study")
+        assert new_version != version
+        assert rag_service.response_cache.get([1.0, 0.0], "b2c_study", None, new_version) is None
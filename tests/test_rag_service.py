@@ -0,0 +1,168 @@
+"""
+Tests for RAGService retrieval statements.
+"""
+import os
+import random
+
+import pytest
+from unittest.mock import Mock, patch
+from sqlalchemy import create_engine, text
+
+from app.services import rag_service
+from app.services.rag_service import RAGService, _PREPARED_NAME, _RETRIEVE_QUERY, _vector_literal
+
+
+def make_row(chunk_id, distance, content="Tuition is 20000 RMB per year.", score=0.03, vector_rank=1, lexical_rank=None):
+    return Mock(id=chunk_id, content=content, metadata={}, source_id=1, source_name="fees.md",
+                doc_type="b2c_study", audience="student", version="2025", priority=1, distance=distance,
+                score=score, vector_rank=vector_rank, lexical_rank=lexical_rank)
+
+
+@pytest.fixture
+def rag():
+    # No OpenAI client or tiktoken download needed: embeddings and token counts are faked
+    with patch.object(rag_service, "OpenAIService"), patch.object(rag_service.tiktoken, "get_encoding") as get_encoding:
+        get_encoding.return_value.encode.side_effect = lambda text: text.split()
+        service = RAGService()
+    service.embed_query = Mock(return_value=[0.1, 0.2, 0.3])
+    return service
+
+
+def make_db(dialect, info=None):
+    db = Mock()
+    db.get_bind.return_value.dialect.name = dialect
+    connection = db.connection.return_value
+    connection.connection.info = {} if info is None else info
+    return db, connection
+
+
+class TestRetrieve:
+    """Test cases for single-statement retrieval"""
+
+    def test_one_statement_with_bound_embedding(self, rag):
+        db, _ = make_db("sqlite")
+        db.execute.return_value = [make_row(7, 0.25)]
+
+        chunks = rag.retrieve(db, "tuition fee", doc_type="b2c_study", audience="student", top_k=3)
+
+        assert db.execute.call_count == 1
+        statement, params = db.execute.call_args[0]
+        sql = str(statement)
+        assert "MAX(version)" in sql and "0.1" not in sql
+        assert sql.count(":embedding") == 1
+        assert params == {"embedding": "[0.1,0.2,0.3]", "query": "tuition fee", "doc_type": "b2c_study",
+                          "audience": "student", "top_k": 3, "candidates": 20, "rrf_k": 60}
+        assert chunks[0]["id"] == 7
+        assert chunks[0]["similarity"] == pytest.approx(0.75)
+
+    def test_prepared_once_per_connection(self, rag):
+        db, connection = make_db("postgresql")
+        connection.exec_driver_sql.side_effect = lambda sql, *args: [make_row(1, 0.1)] if sql.startswith("EXECUTE") else None
+
+        rag.retrieve(db, "tuition fee", doc_type="b2c_study")
+        rag.retrieve(db, "scholarship", doc_type="b2c_study")
+
+        statements = [c[0][0] for c in connection.exec_driver_sql.call_args_list]
+        assert [s.split()[0] for s in statements] == ["PREPARE", "EXECUTE", "EXECUTE"]
+        assert "$1" in statements[0] and "$7" in statements[0] and "0.1" not in statements[0]
+        assert "%(query)s" in statements[1]
+        assert connection.connection.info[_PREPARED_NAME] is True
+        db.execute.assert_not_called()
+
+    def test_prepared_failure_falls_back_to_plain_statement(self, rag):
+        info = {_PREPARED_NAME: True}
+        db, connection = make_db("postgresql", info)
+        connection.exec_driver_sql.side_effect = Exception('prepared statement "rag_retrieve" does not exist')
+        db.execute.return_value = [make_row(2, 0.5)]
+
+        chunks = rag.retrieve(db, "tuition fee", doc_type="b2c_study")
+
+        assert [c["id"] for c in chunks] == [2]
+        assert _PREPARED_NAME not in info  # Prepared again on the next call
+        db.rollback.assert_called_once()
+
+    def test_hybrid_statement_fuses_lexical_and_vector_ranks(self, rag):
+        db, _ = make_db("sqlite")
+        db.execute.return_value = [make_row(3, 0.6, score=0.032, vector_rank=None, lexical_rank=1), make_row(4, 0.2)]
+
+        chunks = rag.retrieve(db, "HSK 4 requirement", doc_type="b2c_study", top_k=3)
+
+        sql = str(db.execute.call_args[0][0])
+        assert "to_tsvector('english', c.content) @@" in sql
+        assert "FULL OUTER JOIN lexical_ranked" in sql
+        assert "1.0 / (:rrf_k + v.rank)" in sql
+        # Latest-version/audience filters apply to both rankings (indexed and exact vector side)
+        assert sql.count("JOIN eligible_sources s") == 4
+        # Index-friendly vector candidates: ROW_NUMBER() only runs over the LIMITed set
+        assert "ORDER BY c.embedding <=> (SELECT embedding FROM query_vector)\n        LIMIT :candidates" in sql
+        assert [c["id"] for c in chunks] == [3, 4]
+        assert chunks[0]["lexical_rank"] == 1 and chunks[0]["vector_rank"] is None
+
+    def test_hybrid_search_disabled_binds_empty_query(self, rag):
+        db, _ = make_db("sqlite")
+        db.execute.return_value = []
+        with patch.object(rag_service.settings, "RAG_HYBRID_SEARCH", False):
+            rag.retrieve(db, "HSK 4 requirement", doc_type="b2c_study", top_k=30)
+        params = db.execute.call_args[0][1]
+        assert params["query"] == ""
+        assert params["candidates"] == 30
+
+
+PLAN_TEST_SCHEMA = "rag_plan_test"
+
+
+@pytest.fixture(scope="module")
+def pgvector_engine():
+    engine = create_engine(os.environ["RAG_TEST_DATABASE_URL"],
+                           connect_args={"options": f"-c search_path={PLAN_TEST_SCHEMA},public"})
+    rng = random.Random(7)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {PLAN_TEST_SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {PLAN_TEST_SCHEMA}"))
+        conn.execute(text("""
+            CREATE TABLE rag_sources (id BIGSERIAL PRIMARY KEY, name TEXT, doc_type TEXT, audience TEXT,
+                                      version TEXT, status TEXT)
+        """))
+        conn.execute(text("""
+            CREATE TABLE rag_chunks (id BIGSERIAL PRIMARY KEY, source_id BIGINT, content TEXT,
+                                     embedding vector(8), priority SMALLINT, metadata JSON)
+        """))
+        # csca is 2 of 20 sources: too selective for the 40 rows an HNSW scan returns
+        conn.execute(text("INSERT INTO rag_sources (name, doc_type, audience, version, status) "
+                          "VALUES (:name, :doc_type, 'Both', '2025', 'active')"),
+                     [{"name": f"s{i}.md", "doc_type": "csca" if i < 2 else "b2c_study"} for i in range(20)])
+        conn.execute(text("INSERT INTO rag_chunks (source_id, content, embedding, priority, metadata) "
+                          "VALUES (:source_id, :content, CAST(:embedding AS vector), 3, '{}')"),
+                     [{"source_id": 1 + i % 20, "content": f"Chunk {i} about tuition fees",
+                       "embedding": _vector_literal([rng.gauss(0, 1) for _ in range(8)])} for i in range(4000)])
+        conn.execute(text("CREATE INDEX rag_chunks_embedding_hnsw_idx ON rag_chunks USING hnsw (embedding vector_cosine_ops)"))
+        conn.execute(text("ANALYZE"))
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {PLAN_TEST_SCHEMA} CASCADE"))
+    engine.dispose()
+
+
+@pytest.mark.skipif(not os.environ.get("RAG_TEST_DATABASE_URL"),
+                    reason="needs PostgreSQL with pgvector (set RAG_TEST_DATABASE_URL)")
+class TestRetrievePgvector:
+    """Plans and results of the retrieval statement on a real pgvector database (scratch schema)"""
+
+    def params(self, doc_type):
+        embedding = [random.Random(11).gauss(0, 1) for _ in range(8)]
+        return RAGService._retrieve_params(embedding, "", doc_type, None, 3)
+
+    def test_vector_candidates_use_hnsw_index(self, pgvector_engine):
+        with pgvector_engine.connect() as conn:
+            conn.execute(text("SET enable_seqscan = off"))
+            plan = "\n".join(row[0] for row in conn.execute(
+                text("EXPLAIN " + _RETRIEVE_QUERY.text), self.params("b2c_study")))
+        assert "Index Scan using rag_chunks_embedding_hnsw_idx" in plan
+
+    def test_selective_filter_falls_back_to_exact_ranking(self, pgvector_engine):
+        with pgvector_engine.connect() as conn:
+            ids = [row.id for row in conn.execute(_RETRIEVE_QUERY, self.params("csca"))]
+            conn.execute(text("SET enable_indexscan = off"))
+            exact = [row.id for row in conn.execute(_RETRIEVE_QUERY, self.params("csca"))]
+        assert len(ids) == 3 and ids == exact
@@ -0,0 +1,83 @@
+"""
+Tests for the semantic response cache.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import RagSource, RagChunk
+from app.services.response_cache import ResponseCache, is_profile_independent
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache(max_entries=10, ttl_seconds=60, similarity=0.95, version_check_seconds=60)
+
+
+class TestResponseCache:
+    """Test cases for similarity lookup, grouping and eviction"""
+
+    def test_similar_question_hits(self, cache):
+        cache.set([1.0, 0.0, 0.0], "b2c_study", "student", "v1", "Tuition starts at 15,000 RMB.", "ctx")
+        hit = cache.get([0.99, 0.05, 0.0], "b2c_study", "student", "v1")
+        assert hit["answer"] == "Tuition starts at 15,000 RMB."
+        assert hit["rag_context"] == "ctx"
+        assert cache.get([0.5, 0.5, 0.0], "b2c_study", "student", "v1") is None
+        assert cache.metrics()["hit_rate"] == 0.5
+
+    def test_grouped_by_doc_type_audience_and_version(self, cache):
+        cache.set([1.0, 0.0], "csca", None, "v1", "CSCA answer")
+        assert cache.get([1.0, 0.0], "csca", None, "v1") is not None
+        assert cache.get([1.0, 0.0], "b2c_study", None, "v1") is None
+        assert cache.get([1.0, 0.0], "csca", "partner", "v1") is None
+        assert cache.get([1.0, 0.0], "csca", None, "v2") is None
+
+    def test_ttl_and_eviction(self):
+        cache = ResponseCache(max_entries=2, ttl_seconds=0, similarity=0.95, version_check_seconds=60)
+        cache.set([1.0, 0.0], "csca", None, "v1", "expired")
+        assert cache.get([1.0, 0.0], "csca", None, "v1") is None
+
+        cache = ResponseCache(max_entries=2, ttl_seconds=60, similarity=0.95, version_check_seconds=60)
+        cache.set([1.0, 0.0], "csca", None, "v1", "first")
+        cache.set([0.0, 1.0], "csca", None, "v1", "second")
+        cache.set([-1.0, 0.0], "csca", None, "v1", "third")
+        assert cache.get([1.0, 0.0], "csca", None, "v1") is None
+        assert cache.get([-1.0, 0.0], "csca", None, "v1")["answer"] == "third"
+        assert cache.metrics()["entries"] == 2
+
+    def test_profile_dependent_questions(self):
+        assert is_profile_independent("What is the CSCA exam?")
+        assert is_profile_independent("How does the application process work")
+        assert not is_profile_independent("Can I apply with a 2.8 GPA?")
+        assert not is_profile_independent("Which scholarship suits my profile?")
+        assert not is_profile_independent("I am from Bangladesh, what documents are needed")
+
+
+class TestCorpusVersion:
+    """Test cases for rag_sources fingerprinting (run against SQLite)"""
+
+    @pytest.fixture
+    def db(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+        RagSource.__table__.create(engine)
+        RagChunk.__table__.create(engine)
+        session = sessionmaker(bind=engine)()
+        session.add(RagSource(id=1, name="csca.md", doc_type="csca", audience="student", version="2025", status="active"))
+        session.commit()
+        yield session
+        session.close()
+
+    def test_version_change_invalidates_entries(self, cache, db):
+        version = cache.corpus_version(db, "csca")
+        cache.set([1.0, 0.0], "csca", None, version, "Old answer")
+        assert cache.corpus_version(db, "b2c_study") != version
+
+        db.query(RagSource).filter(RagSource.id == 1).update({"version": "2026"})
+        db.commit()
+        assert cache.corpus_version(db, "csca") == version  # Re-read only after version_check_seconds
+
+        cache.invalidate("csca")
+        new_version = cache.corpus_version(db, "csca")
+        assert new_version != version
+        assert cache.get([1.0, 0.0], "csca", None, new_version) is None
+        assert cache.metrics()["entries"] == 0
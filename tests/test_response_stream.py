@@ -0,0 +1,72 @@
+"""
+Tests for the agent streaming bridge (app/services/response_stream.py)
+"""
+import pytest
+from app.services.response_stream import stream_agent_turn, stream_session_turn
+
+
+class FakeAgent:
+    """Minimal agent: streams deltas through stream_handler, then returns a result dict"""
+    
+    def __init__(self, deltas, response):
+        self.deltas = deltas
+        self.response = response
+        self.stream_handler = None
+    
+    def generate_response(self, user_message):
+        if self.stream_handler:
+            for delta in self.deltas:
+                self.stream_handler(delta)
+        return {"response": self.response, "used_db": True}
+
+
+class TestStreamAgentTurn:
+    
+    def test_deltas_forwarded_then_result(self):
+        agent = FakeAgent(["Hel", "lo"], "Hello")
+        events = list(stream_agent_turn(agent, agent.generate_response, user_message="hi"))
+        assert events[:2] == [("delta", "Hel"), ("delta", "lo")]
+        assert events[-1] == ("result", {"response": "Hello", "used_db": True})
+        assert agent.stream_handler is None
+    
+    def test_appended_text_streamed_as_tail(self):
+        agent = FakeAgent(["Answer."], "Answer.\n\nWhich intake?")
+        events = list(stream_agent_turn(agent, agent.generate_response, user_message="hi"))
+        deltas = [payload for kind, payload in events if kind == "delta"]
+        assert "".join(deltas) == "Answer.\n\nWhich intake?"
+    
+    def test_deterministic_answer_single_delta(self):
+        agent = FakeAgent([], "Please choose a university.")
+        events = list(stream_agent_turn(agent, agent.generate_response, user_message="hi"))
+        assert events[0] == ("delta", "Please choose a university.")
+        assert events[-1][0] == "result"
+    
+    def test_replaced_answer(self):
+        agent = FakeAgent(["Draft"], "Fallback answer")
+        events = list(stream_agent_turn(agent, agent.generate_response, user_message="hi"))
+        assert ("replace", "Fallback answer") in events
+    
+    def test_error_propagates(self):
+        class BrokenAgent(FakeAgent):
+            def generate_response(self, user_message):
+                raise RuntimeError("boom")
+        agent = BrokenAgent([], "")
+        with pytest.raises(RuntimeError):
+            list(stream_agent_turn(agent, agent.generate_response, user_message="hi"))
+    
+    def test_session_turn_builds_agent_with_own_session(self):
+        from unittest.mock import Mock
+        from app.services.agent_executor import AgentExecutor
+        session = Mock()
+        executor = AgentExecutor(max_workers=1, max_queue=1, turn_timeout=5, session_factory=lambda: session)
+        built_with = []
+        
+        def build(db):
+            built_with.append(db)
+            agent = FakeAgent(["Hi"], "Hi")
+            return agent, agent.generate_response, {"user_message": "hi"}
+        
+        events = list(stream_session_turn(build, executor))
+        assert events[-1][0] == "result" and built_with == [session]
+        session.close.assert_called_once()
+        executor.shutdown(wait=True)
@@ -0,0 +1,90 @@
+"""
+Tests for the session state backends.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import SessionState
+from app.services.session_store import InMemorySessionStore, PostgresSessionStore
+
+
+class TestInMemorySessionStore:
+    """Test cases for the LRU + TTL in-memory backend"""
+
+    def test_get_returns_private_copy(self):
+        store = InMemorySessionStore(max_entries=10, max_bytes=10_000)
+        store.set("ns", "a", {"items": [1]}, ttl_seconds=60)
+        value = store.get("ns", "a")
+        value["items"].append(2)
+        assert store.get("ns", "a") == {"items": [1]}
+        assert store.get("other", "a") is None
+
+    def test_ttl_expiry(self):
+        store = InMemorySessionStore(max_entries=10, max_bytes=10_000)
+        store.set("ns", "a", "value", ttl_seconds=0)
+        assert store.get("ns", "a") is None
+        assert store.metrics()["expired"] == 1
+
+    def test_lru_eviction_by_entries_and_bytes(self):
+        store = InMemorySessionStore(max_entries=2, max_bytes=10_000)
+        store.set("ns", "a", 1, ttl_seconds=60)
+        store.set("ns", "b", 2, ttl_seconds=60)
+        store.get("ns", "a")  # "b" is now least recently used
+        store.set("ns", "c", 3, ttl_seconds=60)
+        assert store.get("ns", "b") is None
+        assert store.get("ns", "a") == 1
+
+        store = InMemorySessionStore(max_entries=100, max_bytes=300)
+        for i in range(5):
+            store.set("ns", str(i), "x" * 100, ttl_seconds=60)
+        metrics = store.metrics()
+        assert metrics["bytes"] <= 300
+        assert metrics["evicted"] >= 2
+        assert store.get("ns", "4") == "x" * 100
+
+    def test_delete(self):
+        store = InMemorySessionStore(max_entries=10, max_bytes=10_000)
+        store.set("ns", "a", 1, ttl_seconds=60)
+        store.delete("ns", "a")
+        store.delete("ns", "missing")
+        assert store.get("ns", "a") is None
+        assert store.metrics()["bytes"] == 0
+
+
+class TestPostgresSessionStore:
+    """Test cases for the session_state-table backend (run against SQLite)"""
+
+    @pytest.fixture
+    def store(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(engine, tables=[SessionState.__table__])
+        return PostgresSessionStore(session_factory=sessionmaker(bind=engine))
+
+    def test_round_trip_and_upsert(self, store):
+        store.set("partner_state", "1:conv", {"ts": 1.0, "pending": None}, ttl_seconds=60)
+        store.set("partner_state", "1:conv", {"ts": 2.0, "pending": {"slot": "degree_level"}}, ttl_seconds=60)
+        assert store.get("partner_state", "1:conv") == {"ts": 2.0, "pending": {"slot": "degree_level"}}
+
+        db = store.session_factory()
+        assert [(r.namespace, r.key) for r in db.query(SessionState).all()] == [("partner_state", "1:conv")]
+        db.close()
+
+    def test_concurrent_writers_keep_one_row(self, store):
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda i: store.set("chat_history", "s1", [i], ttl_seconds=60), range(20)))
+        assert store.session_factory().query(SessionState).count() == 1
+
+    def test_expired_values_purged(self, store):
+        store.set("ns", "old", "value", ttl_seconds=0)
+        store.set("ns", "a", "value", ttl_seconds=60)
+        assert store.get("ns", "old") is None
+        assert store.purge_expired() == 1
+        store.delete("ns", "a")
+        assert store.get("ns", "a") is None
+        assert store.session_factory().query(SessionState).count() == 0
+        assert store.metrics()["purged"] == 1
@@ -0,0 +1,57 @@
+"""
+Tests for the shared Counters helper behind /api/admin/metrics
+"""
+import threading
+
+from app.services import stats
+from app.services.answer_templates import template_stats
+from app.services.prompt_cache import prompt_usage_stats
+from app.services.router import routing_stats
+from app.services.stats import Counters, all_metrics
+from app.services.turn_stages import speculation_stats
+from app.services.profile_state import profile_state_stats
+
+
+class TestCounters:
+
+    def test_nested_counts_limit_and_reset(self):
+        counters = Counters("test_nested")
+        try:
+            counters.add("FEES", "template")
+            counters.add("FEES", "template", amount=2)
+            counters.add_many("FEES", "prompts", count=1, chars=120)
+            counters.add("reasons", "a", limit=1)
+            counters.add("reasons", "b", limit=1)
+            counters.add("reasons", "a", limit=1)
+
+            snapshot = counters.snapshot()
+            assert snapshot == {"FEES": {"template": 3, "prompts": {"count": 1, "chars": 120}}, "reasons": {"a": 2}}
+            snapshot["FEES"]["template"] = 0  # Snapshots are copies
+            assert counters.metrics()["FEES"]["template"] == 3
+
+            counters.reset()
+            assert counters.metrics() == {}
+        finally:
+            stats._registry.pop("test_nested", None)
+
+    def test_concurrent_adds(self):
+        counters = Counters("test_concurrent")
+        try:
+            def worker():
+                for _ in range(1000):
+                    counters.add_many("paths", rules=1, llm=1)
+
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert counters.metrics() == {"paths": {"rules": 8000, "llm": 8000}}
+        finally:
+            stats._registry.pop("test_concurrent", None)
+
+    def test_agent_counters_are_registered(self):
+        metrics = all_metrics()
+        for counters in (routing_stats, speculation_stats, profile_state_stats, prompt_usage_stats, template_stats):
+            assert counters.name in metrics
+        assert metrics["partner_templates"]["template_rate"] == template_stats.metrics()["template_rate"]
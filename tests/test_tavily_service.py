@@ -0,0 +1,72 @@
+"""
+Tests for the cached, deduplicating Tavily search layer (no network: StubTavilyClient).
+"""
+import threading
+import time
+
+import pytest
+
+from app.services.tavily_service import SearchCache, StubTavilyClient, TavilyService
+
+
+def result(url, title="Result"):
+    return {"title": title, "url": url, "content": "CSCA details", "score": 0.9}
+
+
+@pytest.fixture
+def cache():
+    return SearchCache(max_entries=10, ttl_seconds=60)
+
+
+class TestTavilyService:
+    """Test cases for caching, in-flight deduplication and concurrent domain searches"""
+
+    def test_normalized_queries_share_cache(self, cache):
+        client = StubTavilyClient({"what is csca": [result("https://malishaedu.com/csca")]})
+        service = TavilyService(client=client, cache=cache)
+
+        first = service.search("What is CSCA?", max_results=2)
+        second = service.search("  what is  CSCA ", max_results=2)
+
+        assert first == second and first[0]["url"] == "https://malishaedu.com/csca"
+        assert client.calls == ["what is csca"]
+        assert cache.metrics()["hits"] == 1
+
+    def test_errors_are_not_cached(self, cache):
+        client = StubTavilyClient()
+        client.search = lambda **kwargs: (_ for _ in ()).throw(RuntimeError("rate limited"))
+        service = TavilyService(client=client, cache=cache)
+        assert service.search("csca") == []
+        assert cache.metrics()["entries"] == 0
+
+    def test_identical_in_flight_searches_are_collapsed(self, cache):
+        client = StubTavilyClient({"csca exam date": [result("https://csc.edu.cn/a")]}, delay_seconds=0.2)
+        service = TavilyService(client=client, cache=cache)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(service.search("CSCA exam date"))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(client.calls) == 1
+        assert len(results) == 5 and all(r == results[0] for r in results)
+        assert cache.metrics()["coalesced"] == 4
+
+    def test_domain_searches_run_concurrently(self, cache):
+        client = StubTavilyClient({
+            "csca fees site:malishaedu.com": [result("https://malishaedu.com/fees"), result("https://other.com/x")],
+            "csca fees site:gov.cn": [result("https://www.moe.gov.cn/csca")],
+            "csca fees site:csc.edu.cn": [result("https://www.csc.edu.cn/a"), result("https://www.csc.edu.cn/b")],
+        }, delay_seconds=0.2)
+        service = TavilyService(client=client, cache=cache)
+
+        started = time.perf_counter()
+        results = service.search_domains("CSCA fees?", ["malishaedu.com", "gov.cn", "csc.edu.cn", "chineseembassy.org"])
+        elapsed = time.perf_counter() - started
+
+        assert [r["url"] for r in results] == [
+            "https://malishaedu.com/fees", "https://www.moe.gov.cn/csca", "https://www.csc.edu.cn/a"
+        ]
+        assert len(client.calls) == 4
+        assert elapsed < 0.6  # Sequential would take 0.8 s
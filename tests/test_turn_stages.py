@@ -0,0 +1,142 @@
+"""
+Tests for per-turn stages and SalesAgent speculative retrieval (no OpenAI / database calls)
+"""
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+
+from app.services.sales_agent import FAQService, SalesAgent, StudentProfileState
+from app.services.turn_stages import TurnStages, speculation_stats
+
+
+@pytest.fixture(autouse=True)
+def reset_speculation_stats():
+    speculation_stats.reset()
+    yield
+    speculation_stats.reset()
+
+
+def make_agent(rag_results=None):
+    """SalesAgent with mocked services (skips __init__: no DB, catalog or OpenAI client)"""
+    agent = SalesAgent.__new__(SalesAgent)
+    agent.db = Mock()
+    agent.db_service = Mock()
+    agent.rag_service = Mock()
+    agent.rag_service.embed_query.return_value = [0.1, 0.2]
+    agent.rag_service.retrieve.return_value = rag_results if rag_results is not None else [{"content": "chunk"}]
+    agent.faq_service = FAQService()
+    agent.all_universities = []
+    agent.all_majors = []
+    return agent
+
+
+class TestTurnStages:
+    """Test cases for starting, joining and cancelling stages"""
+
+    def test_stages_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        with TurnStages() as stages:
+            stages.start("a", lambda: barrier.wait() is not None)
+            stages.start("b", lambda: barrier.wait() is not None)
+            assert stages.join("a", timeout=5) and stages.join("b", timeout=5)
+
+    def test_join_reraises_stage_error(self):
+        with TurnStages() as stages:
+            stages.start("broken", lambda: 1 / 0)
+            with pytest.raises(ZeroDivisionError):
+                stages.join("broken", timeout=5)
+            assert stages.done("broken")
+
+    def test_cancel_and_close_drop_queued_stages(self):
+        pool = ThreadPoolExecutor(max_workers=1)
+        release = threading.Event()
+        ran = []
+        try:
+            with TurnStages(pool) as stages:
+                stages.start("busy", release.wait, 5)
+                queued = stages.start("queued", ran.append, "queued")
+                leftover = stages.start("leftover", ran.append, "leftover")
+                assert stages.cancel("queued") is True
+                assert not stages.started("queued")
+            release.set()
+            pool.shutdown(wait=True)
+        finally:
+            release.set()
+        assert queued.cancelled() and leftover.cancelled()
+        with pytest.raises(CancelledError):
+            leftover.result()
+        assert ran == []
+
+
+class TestSalesAgentSpeculation:
+    """Test cases for prefetching the likely route while the profile is extracted"""
+
+    def test_csca_prefetch_is_used(self):
+        agent = make_agent()
+        release = threading.Event()
+        with TurnStages() as stages:
+            stages.start("extract_state", lambda: release.wait(5) and StudentProfileState(degree_level="Master"))
+            speculation = agent._speculate_retrieval("CSC scholarship for masters", stages)
+            release.set()
+            student_state = stages.join("extract_state", timeout=5)
+
+        assert speculation["rag_results"] == [{"content": "chunk"}]
+        search_query = agent.rag_service.retrieve.call_args.args[1]
+        assert search_query == agent._csca_search_query("CSC scholarship for masters")
+        assert "masters phd not required" in search_query
+
+        classification = agent.classify_query("CSC scholarship for masters", student_state)
+        assert agent._take_speculation(speculation, classification) is speculation
+        metrics = speculation_stats.metrics()
+        assert metrics["speculated"] == 1 and metrics["used"] == 1 and metrics["used_rate"] == 1.0
+
+    def test_faq_match_skips_retrieval(self):
+        agent = make_agent()
+        message = "What is the living cost in China?"
+        with TurnStages() as stages:
+            stages.start("extract_state", StudentProfileState)
+            speculation = agent._speculate_retrieval(message, stages)
+
+        assert speculation["intent"] == "general_faq"
+        assert speculation["faq"] == agent._match_faq(message) and speculation["faq"][0] is not None
+        agent.rag_service.retrieve.assert_not_called()
+
+    def test_route_changed_by_profile_is_discarded(self):
+        agent = make_agent()
+        message = "requirements for september intake"
+        release = threading.Event()
+        with TurnStages() as stages:
+            stages.start("extract_state", lambda: release.wait(5) and StudentProfileState(major="Physics"))
+            speculation = agent._speculate_retrieval(message, stages)
+            release.set()
+            student_state = stages.join("extract_state", timeout=5)
+
+        classification = agent.classify_query(message, student_state)
+        assert speculation["intent"] == "general_faq" and classification["intent"] == "program_specific"
+        assert agent._take_speculation(speculation, classification) is None
+        assert speculation_stats.metrics()["discarded"] == 1
+
+    def test_speculation_abandoned_once_extraction_disagrees(self):
+        agent = make_agent()
+        message = "requirements for september intake"
+        with TurnStages() as stages:
+            stages.start("extract_state", StudentProfileState, major="Physics")
+            deadline = time.monotonic() + 5
+            while not stages.done("extract_state") and time.monotonic() < deadline:
+                time.sleep(0.01)
+            speculation = agent._speculate_retrieval(message, stages)
+
+        assert speculation["abandoned"] is True
+        agent.rag_service.retrieve.assert_not_called()
+        assert agent._take_speculation(speculation, agent.classify_query(message, StudentProfileState())) is None
+        assert speculation_stats.metrics()["abandoned"] == 1
+
+    def test_no_speculation_for_program_queries(self):
+        agent = make_agent()
+        with TurnStages() as stages:
+            stages.start("extract_state", StudentProfileState)
+            assert agent._speculate_retrieval("Which university has the lowest tuition for Computer Science major?", stages) is None
+        assert speculation_stats.metrics()["speculated"] == 0